@@ -1,6 +1,5 @@
 import io
 import os
-import time
 from collections import defaultdict
 
 import pandas as pd
@@ -13,29 +12,6 @@ use_built_in = True
 model.init('movie-lens', '1.0')
 
 
-class Profiler(object):
-    """
-    Profile time for functions
-    """
-
-    def __init__(self, name='', logger=None):
-        """
-        Construct profiler
-        :param name:
-        :param logger:
-        :return:
-        """
-        self._name = name
-
-    def __enter__(self):
-        self._start_time = time.time()
-
-    def __exit__(self, type, value, traceback):
-        duration = time.time() - self._start_time
-        print("Name: " + self._name + " Elapsed time: {:.3f} sec".format(duration))
-        model.send_metric(self._name, duration)
-
-
 # get item names for built-in 100k dataset
 def read_movies_100k():
     """Read the u.item file from MovieLens 100-k dataset and returns a
@@ -113,7 +89,7 @@ def print_recommendations(recommendations):
 # limit to top3 recommendations
 data, movie_names = get_data()
 
-with Profiler('Training'):
+with model.profile('Training'):
     trainingSet = data.build_full_trainset()
     knn = run_train(trainingSet)
 
@@ -121,7 +97,7 @@ with_optimisation = True
 
 
 if with_optimisation:
-    with Profiler('Generate predictions'):
+    with model.profile('Generate predictions'):
         recs = {}
 
         for u in trainingSet.all_users():
@@ -153,7 +129,7 @@ if with_optimisation:
             ]
         }
 else:
-    with Profiler('Cross-validation'):
+    with model.profile('Cross-validation'):
         # get predictions based on training set
         testSet = trainingSet.build_anti_testset()
         testPredictions = knn.test(testSet)
@@ -17,13 +17,26 @@
 CLI entrypoint
 """
 import argparse
+import importlib
 import logging
 import sys
 
 from legion.cli import version
-from legion.cli.parsers import security, config, local, edge, vcs, training, deployment, cloud
 from legion.sdk import config as legion_config
 
+# Modules from legion.cli.parsers and names (with aliases) of subcommands they declare.
+# Module is imported only if its subcommand is called, other modules are loaded only for help output
+SUBCOMMAND_MODULES = (
+    ('security', ('login', 'generate-token')),
+    ('config', ('list-dependencies', 'config')),
+    ('local', ('build', 'create-sandbox')),
+    ('edge', ('model',)),
+    ('vcs', ('vcs-credentials', 'vcs')),
+    ('training', ('model-training', 'mt', 'training')),
+    ('deployment', ('model-deployment', 'md', 'deployment')),
+    ('cloud', ('cloud', 'cloud-bulk')),
+)
+
 
 def configure_logging(args):
     """
@@ -43,10 +56,39 @@ def configure_logging(args):
                         stream=sys.stderr)
 
 
-def build_parser():  # pylint: disable=R0915
+def _get_required_modules(args):
+    """
+    Get names of parser modules which are required to parse arguments
+
+    :param args: (Optional) command line arguments, all modules are required if it is None
+    :type args: list[str]
+    :return: list[str] -- names of modules from legion.cli.parsers
+    """
+    all_modules = [module for module, _ in SUBCOMMAND_MODULES]
+    if args is None:
+        return all_modules
+
+    # Global options have no values, so the first positional argument is a subcommand
+    subcommand = next((arg for arg in args if not arg.startswith('-')), None)
+    if subcommand is None:
+        if '--version' in args and not {'-h', '--help'}.intersection(args):
+            return []
+        return all_modules
+
+    for module, subcommands in SUBCOMMAND_MODULES:
+        if subcommand in subcommands:
+            return [module]
+
+    # Unknown subcommand, full parser gives the list of valid choices
+    return all_modules
+
+
+def build_parser(args=None):  # pylint: disable=R0915
     """
     Build parser for CLI
 
+    :param args: (Optional) command line arguments, parsers only for the called subcommand are built if passed
+    :type args: list[str]
     :return: (:py:class:`argparse.ArgumentParser`, py:class:`argparse._SubParsersAction`)  -- CLI parser for LegionCTL
     """
     parser = argparse.ArgumentParser(description='legion Command-Line Interface')
@@ -58,14 +100,9 @@ def build_parser():  # pylint: disable=R0915
                         action='store_true')
     subparsers = parser.add_subparsers()
 
-    security.generate_parsers(subparsers)
-    config.generate_parsers(subparsers)
-    local.generate_parsers(subparsers)
-    edge.generate_parsers(subparsers)
-    vcs.generate_parsers(subparsers)
-    training.generate_parsers(subparsers)
-    deployment.generate_parsers(subparsers)
-    cloud.generate_parsers(subparsers)
+    for module_name in _get_required_modules(args):
+        module = importlib.import_module('legion.cli.parsers.' + module_name)
+        module.generate_parsers(subparsers)
 
     return parser, subparsers
 
@@ -75,7 +112,7 @@ def main():
     CLI entrypoint method
     :return:
     """
-    parser, _ = build_parser()
+    parser, _ = build_parser(sys.argv[1:])
     args = parser.parse_args(sys.argv[1:])
 
     v = vars(args)
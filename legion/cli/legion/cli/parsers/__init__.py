@@ -19,11 +19,8 @@ CLI parsers
 import argparse
 from typing import Any, Dict
 
-import colorama
-from termcolor import colored
-
 TRAIN_LOGS_COLOR = 'cyan'
-colorama.init()
+_COLORED_OUTPUT_INITIALIZED = False
 
 
 def prepare_resources(args: argparse.Namespace) -> Dict[str, Any]:
@@ -68,4 +65,14 @@ def print_training_logs(msg: str):
     Print model training logs
     :param msg: training log
     """
+    global _COLORED_OUTPUT_INITIALIZED
+
+    # Colored output is needed only for logs, so it is initialized on first print
+    import colorama
+    from termcolor import colored
+
+    if not _COLORED_OUTPUT_INITIALIZED:
+        colorama.init()
+        _COLORED_OUTPUT_INITIALIZED = True
+
     print(colored(msg, TRAIN_LOGS_COLOR))
@@ -23,7 +23,8 @@ import typing
 
 from legion.cli.parsers import security
 from legion.sdk.clients.edi import build_client, RemoteEdiClient
-from legion.sdk.clients.edi_aggregated import parse_resources_file, apply, LegionCloudResourceUpdatePair
+from legion.sdk.clients.edi_aggregated import parse_resources_file, apply, LegionCloudResourceUpdatePair, \
+    DEFAULT_APPLY_PARALLELISM
 
 LOGGER = logging.getLogger(__name__)
 
@@ -43,7 +44,8 @@ def _print_resources_info_counter(objects: typing.Tuple[LegionCloudResourceUpdat
         return str(len(objects))
 
 
-def process_bulk_operation(edi_client: RemoteEdiClient, filename: str, is_removal: bool):
+def process_bulk_operation(edi_client: RemoteEdiClient, filename: str, is_removal: bool,
+                           parallelism: int = DEFAULT_APPLY_PARALLELISM, dry_run: bool = False):
     """
     Apply bulk operation helper
 
@@ -53,11 +55,15 @@ def process_bulk_operation(edi_client: RemoteEdiClient, filename: str, is_remova
     :type filename: str
     :param is_removal: is it removal operation
     :type is_removal: bool
+    :param parallelism: (Optional) count of concurrent requests to EDI server
+    :type parallelism: int
+    :param dry_run: (Optional) only print changes, do not apply them
+    :type dry_run: bool
     :return: None
     """
     resources = parse_resources_file(filename)
-    result = apply(resources, edi_client, is_removal)
-    output = ['Operation completed']
+    result = apply(resources, edi_client, is_removal, parallelism, dry_run)
+    output = ['Dry run completed' if dry_run else 'Operation completed']
     if result.created:
         output.append(f'created resources: {_print_resources_info_counter(result.created)}')
     if result.changed:
@@ -80,7 +86,7 @@ def apply_command(args: argparse.Namespace):
     :param args: cli parameters
     """
     client = build_client(args)
-    process_bulk_operation(client, args.filename, False)
+    process_bulk_operation(client, args.filename, False, args.parallelism, args.dry_run)
 
 
 def remove_command(args: argparse.Namespace):
@@ -90,7 +96,19 @@ def remove_command(args: argparse.Namespace):
     :param args: cli parameters
     """
     client = build_client(args)
-    process_bulk_operation(client, args.filename, True)
+    process_bulk_operation(client, args.filename, True, args.parallelism, args.dry_run)
+
+
+def add_bulk_operation_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Add arguments of bulk operation in the parser
+
+    :param parser: Argument Parser
+    """
+    parser.add_argument('filename', type=str, help='Path to file with resources declaration (YAML/JSON)')
+    parser.add_argument('--parallelism', '-p', type=int, default=DEFAULT_APPLY_PARALLELISM,
+                        help='Count of resources of the same kind that are processed concurrently')
+    parser.add_argument('--dry-run', action='store_true', help='Only show changes, do not apply them')
 
 
 def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:
@@ -104,10 +122,10 @@ def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:
 
     apply_parser = mt_subparser.add_parser('apply', description='Create/Update Legion resources on a cloud')
     security.add_edi_arguments(apply_parser)
-    apply_parser.add_argument('filename', type=str, help='Path to file with resources declaration (YAML/JSON)')
+    add_bulk_operation_arguments(apply_parser)
     apply_parser.set_defaults(func=apply_command)
 
     remove_parser = mt_subparser.add_parser('remove', description='Remove Legion resources from a cloud')
     security.add_edi_arguments(remove_parser)
-    remove_parser.add_argument('filename', type=str, help='Path to file with resources declaration (YAML/JSON)')
+    add_bulk_operation_arguments(remove_parser)
     remove_parser.set_defaults(func=remove_command)
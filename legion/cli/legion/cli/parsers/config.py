@@ -122,15 +122,18 @@ def config_path(_):
     print(config.get_config_file_path())
 
 
-def list_dependencies(_):
+def list_dependencies(args):
     """
     Print package dependencies
 
-    :param _: command arguments
-    :type _: :py:class:`argparse.Namespace`
+    :param args: command arguments
+    :type args: :py:class:`argparse.Namespace`
     :return: None
     """
-    dependencies = utils.get_list_of_requirements()
+    if args.missed:
+        dependencies = utils.get_missed_requirements()
+    else:
+        dependencies = utils.get_list_of_requirements()
     for name, version in dependencies:
         print('{}=={}'.format(name, version))
 
@@ -142,6 +145,8 @@ def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:
     :param main_subparser: parent cli parser
     """
     list_dependencies_parser = main_subparser.add_parser('list-dependencies', description='list package dependencies')
+    list_dependencies_parser.add_argument('--missed', action='store_true',
+                                          help='list only dependencies which are not installed')
     list_dependencies_parser.set_defaults(func=list_dependencies)
 
     config_parser = main_subparser.add_parser('config', description='manipulate config')
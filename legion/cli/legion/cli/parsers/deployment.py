@@ -31,8 +31,6 @@ from legion.sdk.clients.deployment import build_client, ModelDeployment, ModelDe
 from legion.sdk.clients.edi import WrongHttpStatusCode, LocalEdiClient
 from legion.sdk.containers.headers import DOMAIN_MODEL_ID, DOMAIN_MODEL_VERSION
 
-DEFAULT_WAIT_TIMEOUT = 5
-
 DEFAULT_WIDTH = 120
 MD_HEADER = ["Name", "State", "Replicas", "Service URL"]
 
@@ -88,18 +86,20 @@ def get_local(args: argparse.Namespace):
     :param args: cli parameters
     """
     md_client = LocalEdiClient()
-    model_deployments = md_client.inspect(args.name, args.model_id, args.model_version)
+    model_deployments = md_client.inspect(args.name, args.model_id, args.model_version,
+                                          check_health=args.check_health)
 
+    header = MD_LOCAL_HEADER + (["Healthy"] if args.check_health else [])
     table = Texttable(max_width=DEFAULT_WIDTH_LOCAL)
-    table.set_cols_align("c" * len(MD_LOCAL_HEADER))
-    table.set_cols_valign("t" * len(MD_LOCAL_HEADER))
-    table.add_rows([MD_LOCAL_HEADER] + [[
+    table.set_cols_align("c" * len(header))
+    table.set_cols_valign("t" * len(header))
+    table.add_rows([header] + [[
         md.deployment_name,
         md.image,
         md.local_port,
         md.id_and_version.id,
         md.id_and_version.version
-    ] for md in model_deployments])
+    ] + ([md.model_api_ok] if args.check_health else []) for md in model_deployments])
     print(table.draw() + "\n")
 
 
@@ -139,7 +139,18 @@ def create(args: argparse.Namespace):
     """
     if args.local:
         md_client = LocalEdiClient()
-        return md_client.deploy(args.name, args.image, args.port)
+        if args.no_wait:
+            return md_client.deploy(args.name, args.image, args.port)
+
+        if args.timeout <= 0:
+            raise Exception('Invalid --timeout argument: should be positive integer')
+
+        start = time.time()
+        model_deployments = md_client.deploy(args.name, args.image, args.port,
+                                             wait_ready=True, ready_timeout=args.timeout)
+        print(f'Model {args.name} was deployed. '
+              f'Model became ready in {time.time() - start:.1f} seconds')
+        return model_deployments
 
     md_client = build_client(args)
 
@@ -237,32 +248,23 @@ def wait_operation_finish(args: argparse.Namespace, md_name: str, md_client: Mod
     if args.timeout <= 0:
         raise Exception('Invalid --timeout argument: should be positive integer')
 
-    while True:
-        elapsed = time.time() - start
-        if elapsed > args.timeout:
-            raise Exception('Time out: operation has not been confirmed')
-
-        try:
-            md = md_client.get(md_name)
-            if md.state == SUCCESS_STATE:
-                if md.replicas == md.available_replicas:
-                    print(f'Model {md_name} was deployed. '
-                          f'Deployment process took is {round(time.time() - start)} seconds')
-                    return
-                else:
-                    print(f'Model {md_name} was deployed. '
-                          f'Number of available pods is {md.available_replicas}/{md.replicas}')
-            elif md.state == FAILED_STATE:
-                raise Exception(f'Model deployment {md_name} was failed')
-            elif md.state == "":
-                print(f"Can't determine the state of {md.name}. Sleeping...")
+    for md in md_client.watch(md_name, args.timeout):
+        if md.state == SUCCESS_STATE:
+            if md.replicas == md.available_replicas:
+                print(f'Model {md_name} was deployed. '
+                      f'Deployment process took is {round(time.time() - start)} seconds')
+                return
             else:
-                print(f'Current deployment state is {md.state}. Sleeping...')
-        except WrongHttpStatusCode:
-            LOGGER.info('Callback have not confirmed completion of the operation')
+                print(f'Model {md_name} was deployed. '
+                      f'Number of available pods is {md.available_replicas}/{md.replicas}')
+        elif md.state == FAILED_STATE:
+            raise Exception(f'Model deployment {md_name} was failed')
+        elif md.state == "":
+            print(f"Can't determine the state of {md.name}. Waiting...")
+        else:
+            print(f'Current deployment state is {md.state}. Waiting...')
 
-        LOGGER.debug('Sleep before next request')
-        time.sleep(DEFAULT_WAIT_TIMEOUT)
+    raise Exception('Time out: operation has not been confirmed')
 
 
 def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:  # pylint: disable=R0915
@@ -316,6 +318,8 @@ def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:  # pyl
     md_get_parser.add_argument('name', type=str, nargs='?', help='VCS Credential name', default="")
     md_get_parser.add_argument('--local', action='store_true',
                                help='get locally deployed models. Incompatible with other arguments')
+    md_get_parser.add_argument('--check-health', action='store_true',
+                               help='check health of locally deployed models. Only for --local mode')
     md_get_parser.add_argument('--model-id', type=str, help='model ID')
     md_get_parser.add_argument('--model-version', type=str, help='model version')
     security.add_edi_arguments(md_get_parser)
@@ -18,11 +18,17 @@ EDGE commands for legion cli
 """
 import argparse
 import json
+import sys
 import typing
 
 from legion.sdk import config
 from legion.sdk.clients import edge
 
+BENCH_HEADER = ["Endpoint", "Requests", "Errors", "Throughput, inputs/s",
+                "p50, ms", "p95, ms", "p99, ms", "Stages (mean), ms"]
+LOADTEST_HEADER = ["Request", "Requests", "Errors", "p50, ms", "p95, ms", "p99, ms", "p99.9, ms", "Max, ms"]
+DEFAULT_WIDTH = 160
+
 
 def _parse_p_parameter(var: str):
     """
@@ -89,6 +95,129 @@ def info(args: argparse.Namespace):
     print(result)
 
 
+def bench(args: argparse.Namespace):
+    """
+    Benchmark model file endpoints in process
+
+    :param args: command arguments with .model_file, .endpoint, .input, .batch_size, .concurrency and etc.
+    :return: None
+    """
+    # Model file can be loaded only with legion toolchain package, it is not needed for other commands
+    from legion.toolchain import benchmark
+    from texttable import Texttable
+
+    inputs = benchmark.load_inputs(args.input) if args.input else None
+    results = benchmark.run_benchmark(args.model_file, inputs=inputs, endpoints=args.endpoint,
+                                      batch_size=args.batch_size, concurrency=args.concurrency,
+                                      use_processes=args.processes, requests=args.requests,
+                                      warmup_requests=args.warmup)
+
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    table = Texttable(max_width=DEFAULT_WIDTH)
+    table.set_cols_align("c" * len(BENCH_HEADER))
+    table.set_cols_valign("t" * len(BENCH_HEADER))
+    table.add_rows([BENCH_HEADER] + [[
+        endpoint_name,
+        result['requests'],
+        result['errors'],
+        round(result['throughput'], 1),
+        round(result['latency_ms'].get('p50', 0), 3),
+        round(result['latency_ms'].get('p95', 0), 3),
+        round(result['latency_ms'].get('p99', 0), 3),
+        ', '.join(f'{stage}: {stage_result["mean"]:.3f}' for stage, stage_result in result['stages_ms'].items()),
+    ] for endpoint_name, result in results['endpoints'].items()])
+    print(table.draw() + "\n")
+
+    if results['peak_rss_mb'] is not None:
+        print(f'Peak memory (RSS): {results["peak_rss_mb"]:.1f} MB')
+
+
+def _print_loadtest_results(results: typing.Dict[str, typing.Any]):
+    """
+    Print results of load test as table
+
+    :param results: results of load test
+    """
+    from texttable import Texttable
+
+    sections = [(name, section) for name, section in sorted(results['targets'].items())]
+    sections.append(('total', results))
+
+    table = Texttable(max_width=DEFAULT_WIDTH)
+    table.set_cols_align("c" * len(LOADTEST_HEADER))
+    table.set_cols_valign("t" * len(LOADTEST_HEADER))
+    table.add_rows([LOADTEST_HEADER] + [
+        [name, section['requests'], section['errors']] +
+        [round(section['latency_ms'].get(metric, 0), 3) for metric in ('p50', 'p95', 'p99', 'p99.9', 'max')]
+        for name, section in sections
+    ])
+    print(table.draw() + "\n")
+    print(f'Throughput: {results["throughput"]:.1f} requests/s in {results["duration"]:.1f}s')
+
+
+def loadtest_command(args: argparse.Namespace):
+    """
+    Run load test scenario against model server and compare results with baseline
+
+    :param args: command arguments with .scenario, .model_file or .model_server_url, .baseline and etc.
+    :return: None
+    """
+    # Load test tools are not needed for other commands
+    from legion.sdk import loadtest
+
+    if args.update_baseline and not args.baseline:
+        raise Exception('Path to baseline should be set with --baseline')
+
+    scenario = loadtest.load_scenario(args.scenario)
+    model_id = args.model_id or scenario.model_id
+    model_version = args.model_version or scenario.model_version
+
+    server = None
+    if args.model_file:
+        # Local model server can be started only with legion toolchain package, it is not needed for other commands
+        from legion.toolchain.server import pyserve
+
+        # Server runs in child process, so it does not share GIL with load generator
+        server = pyserve.start_local_server(args.model_file)
+        host = f'http://127.0.0.1:{server.server_port}'
+        model_id, model_version = model_id or server.model_id, model_version or server.model_version
+    else:
+        host = args.model_server_url
+
+    if not model_id or not model_version:
+        raise Exception('Model ID and version should be set in scenario or with --model-id and --model-version')
+
+    client_factory = loadtest.build_model_client_factory(model_id, model_version, host, args.jwt, scenario.timeout)
+    try:
+        results = loadtest.run_scenario(scenario._replace(model_id=model_id, model_version=model_version),
+                                        client_factory)
+    finally:
+        if server:
+            server.shutdown()
+
+    if args.output:
+        loadtest.save_results(results, args.output)
+    _print_loadtest_results(results)
+
+    if args.baseline:
+        if args.update_baseline:
+            loadtest.save_results(results, args.baseline)
+            print(f'Baseline {args.baseline} has been updated')
+            return
+
+        tolerance = loadtest.REGRESSION_TOLERANCE if args.tolerance is None else args.tolerance
+        regressions = loadtest.compare_results(results, loadtest.load_results(args.baseline), tolerance)
+        if regressions:
+            print(f'Performance regressions against baseline {args.baseline}:')
+            for regression in regressions:
+                print(f'\t{regression}')
+            sys.exit(1)
+        print(f'No performance regressions against baseline {args.baseline}')
+
+
 def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:
     """
     Generate cli parsers
@@ -121,3 +250,39 @@ def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:
                                    help='Model jwt token')
 
     model_info_parser.set_defaults(func=info)
+
+    model_bench_parser = model_subparser.add_parser('bench', description='benchmark model file in process')
+    model_bench_parser.add_argument('model_file', type=str, help='path to model file')
+    model_bench_parser.add_argument('--endpoint', action='append',
+                                    help='endpoint to benchmark (can be repeated), all endpoints by default')
+    model_bench_parser.add_argument('--input', type=str,
+                                    help='JSON file with list of inputs or dict of input lists by endpoints. '
+                                         'Sample inputs are built from endpoint types by default')
+    model_bench_parser.add_argument('--batch-size', default=1, type=int, help='count of inputs in one request')
+    model_bench_parser.add_argument('--concurrency', default=1, type=int, help='count of parallel workers')
+    model_bench_parser.add_argument('--processes', action='store_true',
+                                    help='use processes instead of threads as parallel workers')
+    model_bench_parser.add_argument('--requests', default=100, type=int,
+                                    help='count of measured requests per endpoint')
+    model_bench_parser.add_argument('--warmup', default=5, type=int,
+                                    help='count of requests of each worker before measurement')
+    model_bench_parser.add_argument('--output', '-o', type=str, help='path to JSON file with results')
+    model_bench_parser.set_defaults(func=bench)
+
+    model_loadtest_parser = model_subparser.add_parser('loadtest', description='run load test scenario')
+    model_loadtest_parser.add_argument('scenario', type=str, help='path to YAML or JSON file with scenario')
+    model_loadtest_parser.add_argument('--model-file', type=str,
+                                       help='path to model file, it is served by local model server during test')
+    model_loadtest_parser.add_argument('--model-server-url', type=str, default=config.MODEL_SERVER_URL,
+                                       help='Url of model server')
+    model_loadtest_parser.add_argument('--jwt', type=str, default=config.MODEL_JWT_TOKEN, help='Model jwt token')
+    model_loadtest_parser.add_argument('--model-id', type=str, help='model ID (overrides scenario)')
+    model_loadtest_parser.add_argument('--model-version', type=str, help='model version (overrides scenario)')
+    model_loadtest_parser.add_argument('--output', '-o', type=str, help='path to JSON file with results')
+    model_loadtest_parser.add_argument('--baseline', type=str,
+                                       help='path to JSON file with baseline results to compare with')
+    model_loadtest_parser.add_argument('--update-baseline', action='store_true',
+                                       help='save results as baseline instead of comparison')
+    model_loadtest_parser.add_argument('--tolerance', type=float,
+                                       help='allowed relative increase of latency percentiles (0.1 by default)')
+    model_loadtest_parser.set_defaults(func=loadtest_command)
@@ -33,7 +33,6 @@ from legion.sdk.clients.training import build_client, ModelTraining, ModelTraini
     TRAINING_FAILED_STATE
 
 DEFAULT_WIDTH = 240
-DEFAULT_WAIT_TIMEOUT = 1
 MT_HEADER = ["Name", "State", "Toolchain Type", "Entrypoint", "Arguments", "VCS Credential", "Reference",
              "Model ID", "Model Version", "Trained Docker image"]
 
@@ -112,7 +111,7 @@ def logs(args: argparse.Namespace):
     """
     mt_client = build_client(args)
 
-    for msg in mt_client.log(args.name, args.follow):
+    for msg in mt_client.log(args.name, args.follow, since_time=args.since_time):
         print_training_logs(msg)
 
 
@@ -170,29 +169,26 @@ def wait_training_finish(args: argparse.Namespace, mt_name: str, mt_client: Mode
     if args.timeout <= 0:
         raise Exception('Invalid --timeout argument: should be positive integer')
 
-    while True:
-        elapsed = time.time() - start
-        if elapsed > args.timeout:
-            raise Exception('Time out: operation has not been confirmed')
+    # Timestamp of the last printed line of logs. It is used to resume logs streaming
+    logs_cursor = None
 
-        try:
-            mt = mt_client.get(mt_name)
-            if mt.state == TRAINING_SUCCESS_STATE:
-                print(f'Model {mt_name} was trained. Training took {round(time.time() - start)} seconds')
-                return
-            elif mt.state == TRAINING_FAILED_STATE:
-                raise Exception(f'Model training {mt_name} was failed.')
-            elif mt.state == "":
-                print(f"Can't determine the state of {mt.name}. Sleeping...")
-            else:
-                for msg in mt_client.log(mt.name, follow=True):
-                    print_training_logs(msg)
+    for mt in mt_client.watch(mt_name, args.timeout):
+        if mt.state == TRAINING_SUCCESS_STATE:
+            print(f'Model {mt_name} was trained. Training took {round(time.time() - start)} seconds')
+            return
+        elif mt.state == TRAINING_FAILED_STATE:
+            raise Exception(f'Model training {mt_name} was failed.')
+        elif mt.state == "":
+            print(f"Can't determine the state of {mt.name}. Waiting...")
+        else:
+            try:
+                for line in mt_client.log_since(mt.name, logs_cursor, follow=True):
+                    print_training_logs(line.message)
+                    logs_cursor = line.timestamp
+            except (WrongHttpStatusCode, HTTPException, RequestException) as e:
+                LOGGER.info('Can not stream training logs. Exception: %s', str(e))
 
-        except (WrongHttpStatusCode, HTTPException, RequestException) as e:
-            LOGGER.info('Callback have not confirmed completion of the operation. Exception: %s', str(e))
-
-        LOGGER.debug('Sleep before next request')
-        time.sleep(DEFAULT_WAIT_TIMEOUT)
+    raise Exception('Time out: operation has not been confirmed')
 
 
 def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:
@@ -248,5 +244,7 @@ def generate_parsers(main_subparser: argparse._SubParsersAction) -> None:
     mt_log_parser = mt_subparser.add_parser('logs', description='Stream training logs')
     mt_log_parser.add_argument('name', type=str, help='Model Training name', default="")
     mt_log_parser.add_argument('--follow', '-f', action='store_true', help='Follow logs stream')
+    mt_log_parser.add_argument('--since-time', type=str,
+                               help='Show logs after this time (RFC3339, e.g. 2019-05-27T10:00:00Z)')
     security.add_edi_arguments(mt_log_parser)
     mt_log_parser.set_defaults(func=logs)
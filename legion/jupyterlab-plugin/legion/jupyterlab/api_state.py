@@ -16,6 +16,26 @@
 """
 Declare plugin state handlers
 """
+import itertools
+import threading
+import time
+import typing
+
+# TTL of cached cloud entities (in seconds)
+CLOUD_ENTITIES_CACHE_TTL = 5
+
+# Credentials are identified by EDI URL and token
+CloudCredentials = typing.Tuple[str, str]
+
+
+class CachedCloudEntities(typing.NamedTuple):
+    """
+    Cloud entities of one kind, fetched with particular credentials
+    """
+
+    entities: typing.List[dict]
+    fetched_at: float
+    version: int
 
 
 class ApiState:
@@ -23,8 +43,59 @@ class ApiState:
     Plugin state handlers (stores plugin state)
     """
 
-    def __init__(self):
+    def __init__(self, cache_ttl: float = CLOUD_ENTITIES_CACHE_TTL):
         """
         Initialize state
+
+        :param cache_ttl: (Optional) TTL of cached cloud entities in seconds
+        """
+        self._cache_ttl = cache_ttl
+        self._lock = threading.Lock()
+        self._cloud_entities = {}  # type: typing.Dict[CloudCredentials, typing.Dict[str, CachedCloudEntities]]
+        # Versions are seeded with current time so they grow across restarts of the server
+        self._versions = itertools.count(int(time.time() * 1000))
+
+    def get_cloud_entities(self, credentials: CloudCredentials, kind: str) -> typing.Optional[CachedCloudEntities]:
+        """
+        Get cached cloud entities if they have not expired
+
+        :param credentials: EDI URL and token
+        :param kind: kind of entities, e.g. trainings
+        :return: typing.Optional[CachedCloudEntities] -- cached entities or None
+        """
+        with self._lock:
+            cached = self._cloud_entities.get(credentials, {}).get(kind)
+
+        if cached and time.time() - cached.fetched_at < self._cache_ttl:
+            return cached
+        return None
+
+    def update_cloud_entities(self, credentials: CloudCredentials, kind: str,
+                              entities: typing.List[dict]) -> CachedCloudEntities:
+        """
+        Put fresh cloud entities to cache. Version of entities is changed only if they have been changed
+
+        :param credentials: EDI URL and token
+        :param kind: kind of entities, e.g. trainings
+        :param entities: fresh entities
+        :return: CachedCloudEntities -- cached entities
+        """
+        with self._lock:
+            cache = self._cloud_entities.setdefault(credentials, {})
+            previous = cache.get(kind)
+
+            version = previous.version if previous and previous.entities == entities else next(self._versions)
+            cache[kind] = CachedCloudEntities(entities, time.time(), version)
+
+            return cache[kind]
+
+    def invalidate_cloud_entities(self, credentials: CloudCredentials):
+        """
+        Force next request of cloud entities to fetch them from a cluster (e.g. after modification)
+
+        :param credentials: EDI URL and token
+        :return: None
         """
-        pass
+        with self._lock:
+            for kind, cached in self._cloud_entities.get(credentials, {}).items():
+                self._cloud_entities[credentials][kind] = cached._replace(fetched_at=0)
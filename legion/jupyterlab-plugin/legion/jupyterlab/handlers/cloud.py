@@ -16,9 +16,11 @@
 """
 Declaration of cloud handlers
 """
+import asyncio
 import functools
 import typing
 
+from tornado.ioloop import IOLoop
 from tornado.web import HTTPError
 
 from legion.sdk.clients.edi import EDIConnectionException, IncorrectAuthorizationToken, RemoteEdiClient
@@ -42,6 +44,17 @@ def _decorate_handler_for_exception(function):
     :param function: function to wrap
     :return: wrapped function
     """
+    if asyncio.iscoroutinefunction(function):
+        @functools.wraps(function)
+        async def async_wrapper(*args, **kwargs):
+            try:
+                return await function(*args, **kwargs)
+            except IncorrectAuthorizationToken as base_exception:
+                raise HTTPError(log_message=str(base_exception), status_code=403) from base_exception
+            except EDIConnectionException as base_exception:
+                raise HTTPError(log_message=str(base_exception)) from base_exception
+        return async_wrapper
+
     @functools.wraps(function)
     def wrapper(*args, **kwargs):
         try:
@@ -92,6 +105,20 @@ class BaseCloudLegionHandler(BaseLegionHandler):
         """
         return vcs.to_json()
 
+    def get_cloud_credentials(self) -> typing.Tuple[str, str]:
+        """
+        Get credentials for REST API from request headers
+
+        :return: typing.Tuple[str, str] -- EDI URL and token
+        """
+        edi_url = self.request.headers.get(LEGION_CLOUD_CREDENTIALS_EDI, '')
+        edi_token = self.request.headers.get(LEGION_CLOUD_CREDENTIALS_TOKEN, '')
+
+        if not edi_url:
+            raise HTTPError(log_message='Credentials are corrupted')
+
+        return edi_url, edi_token
+
     def build_cloud_client(self, target_client_class):
         """
         Build client for REST API
@@ -100,13 +127,15 @@ class BaseCloudLegionHandler(BaseLegionHandler):
         :type target_client_class: type
         :return: [target_client_class] -- instance of target_client_class class
         """
-        edi_url = self.request.headers.get(LEGION_CLOUD_CREDENTIALS_EDI, '')
-        edi_token = self.request.headers.get(LEGION_CLOUD_CREDENTIALS_TOKEN, '')
+        return target_client_class(*self.get_cloud_credentials())
 
-        if not edi_url:
-            raise HTTPError(log_message='Credentials are corrupted')
+    def invalidate_cloud_entities(self):
+        """
+        Invalidate cached cloud entities after modification of them
 
-        return target_client_class(edi_url, edi_token)
+        :return: None
+        """
+        self.state.invalidate_cloud_entities(self.get_cloud_credentials())
 
     def get_cloud_trainings(self) -> typing.List[dict]:
         """
@@ -162,6 +191,7 @@ class CloudTrainingsHandler(BaseCloudLegionHandler):
         try:
             client = self.build_cloud_client(ModelTrainingClient)
             client.delete(data.name)
+            self.invalidate_cloud_entities()
             self.finish_with_json()
         except Exception as query_exception:
             raise HTTPError(log_message='Can not remove cluster model training') from query_exception
@@ -175,18 +205,23 @@ class CloudTrainingLogsHandler(BaseCloudLegionHandler):
     @_decorate_handler_for_exception
     def get(self, training_name):
         """
-        Get training logs
+        Get training logs. If cursor query argument is passed, only lines after it are returned
 
         :arg training_name: name of training
         :type training_name: str
         :return: None
         """
+        cursor = self.get_query_argument('cursor', None)
+
         client = self.build_cloud_client(ModelTrainingClient)
         training = client.get(training_name)  # type: ModelTraining
 
+        lines = list(client.log_since(training_name, cursor))
+
         self.finish_with_json({
             'futureLogsExpected': training.state not in (TRAINING_SUCCESS_STATE, TRAINING_FAILED_STATE),
-            'data': '\n'.join(client.log(training_name))
+            'data': '\n'.join(line.message for line in lines),
+            'cursor': lines[-1].timestamp if lines else cursor
         })
 
 
@@ -207,6 +242,7 @@ class CloudDeploymentsHandler(BaseCloudLegionHandler):
         try:
             client = self.build_cloud_client(ModelDeploymentClient)
             client.create(data.convert_to_deployment())
+            self.invalidate_cloud_entities()
             self.finish_with_json()
         except Exception as query_exception:
             raise HTTPError(log_message='Can not query cloud deployments') from query_exception
@@ -223,6 +259,7 @@ class CloudDeploymentsHandler(BaseCloudLegionHandler):
         try:
             client = self.build_cloud_client(ModelDeploymentClient)
             client.delete(data.name)
+            self.invalidate_cloud_entities()
         except Exception as query_exception:
             raise HTTPError(log_message='Can not remove cluster model deployment') from query_exception
 
@@ -246,6 +283,7 @@ class CloudDeploymentsScaleHandler(BaseCloudLegionHandler):
         try:
             client = self.build_cloud_client(ModelDeploymentClient)
             client.scale(data.name, data.newScale)
+            self.invalidate_cloud_entities()
             self.finish_with_json()
         except Exception as query_exception:
             raise HTTPError(log_message='Can not query cloud deployments') from query_exception
@@ -311,6 +349,8 @@ class CloudApplyFromFileHandler(BaseCloudLegionHandler):
         except Exception as apply_exception:
             raise HTTPError(log_message=f'Can not apply changes from resources file {data.path}: {apply_exception}')
 
+        self.invalidate_cloud_entities()
+
         self.finish_with_json({
             'created': self._prepare_resources_list(result.created),
             'changed': self._prepare_resources_list(result.changed),
@@ -324,15 +364,55 @@ class CloudAllEntitiesHandler(BaseCloudLegionHandler):
     Return all information for cloud mode
     """
 
+    async def _get_cloud_entities(self, kind: str, loader: typing.Callable[[], typing.List[dict]]):
+        """
+        Get cloud entities from cache or load them in a thread pool (loaders are blocking)
+
+        :param kind: kind of entities, e.g. trainings
+        :param loader: function that loads entities from a cluster
+        :return: :py:class:`legion.jupyterlab.api_state.CachedCloudEntities` -- entities
+        """
+        credentials = self.get_cloud_credentials()
+
+        cached = self.state.get_cloud_entities(credentials, kind)
+        if cached is None:
+            entities = await IOLoop.current().run_in_executor(None, loader)
+            cached = self.state.update_cloud_entities(credentials, kind, entities)
+
+        return cached
+
     @_decorate_handler_for_exception
-    def get(self):
+    async def get(self):
         """
-        Get all information related to cloud state
+        Get all information related to cloud state.
+        If version query argument is passed, only kinds of entities that have been changed after it are returned
 
         :return: None
         """
-        self.finish_with_json({
-            'trainings': self.get_cloud_trainings(),
-            'deployments': self.get_cloud_deployments(),
-            'vcss': self.get_vcs_instances()
-        })
+        try:
+            client_version = int(self.get_query_argument('version', 0))
+        except ValueError:
+            raise HTTPError(status_code=400, log_message='Version should be integer')
+
+        loaders = {
+            'trainings': self.get_cloud_trainings,
+            'deployments': self.get_cloud_deployments,
+            'vcss': self.get_vcs_instances
+        }
+
+        entities = await asyncio.gather(*(self._get_cloud_entities(kind, loader) for kind, loader in loaders.items()))
+        entities = dict(zip(loaders, entities))
+
+        version = max(cached.version for cached in entities.values())
+        # Client could get version from previous run of the server
+        if client_version > version:
+            client_version = 0
+
+        response = {
+            kind: cached.entities
+            for kind, cached in entities.items()
+            if cached.version > client_version
+        }
+        response['version'] = version
+
+        self.finish_with_json(response)
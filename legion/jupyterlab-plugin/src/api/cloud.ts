@@ -69,7 +69,8 @@ export interface ICloudApi {
 
   // Aggregated
   getCloudAllEntities: (
-    credentials: ICloudCredentials
+    credentials: ICloudCredentials,
+    version?: number
   ) => Promise<models.ICloudAllEntitiesResponse>;
 
   // Issue model JWT token
@@ -131,10 +132,13 @@ export class CloudApi implements IApiGroup, ICloudApi {
     credentials: ICloudCredentials
   ): Promise<models.ICloudTrainingLogsResponse> {
     try {
-      const url = URLs.cloudTrainingLogsUrl.replace(
+      let url = URLs.cloudTrainingLogsUrl.replace(
         ':trainingName:',
         request.name
       );
+      if (request.cursor) {
+        url += '?cursor=' + encodeURIComponent(request.cursor);
+      }
       let response = await httpRequest(url, 'GET', undefined, credentials);
       if (response.status !== 200) {
         const data = await response.json();
@@ -229,11 +233,16 @@ export class CloudApi implements IApiGroup, ICloudApi {
 
   // Aggregated
   async getCloudAllEntities(
-    credentials: ICloudCredentials
+    credentials: ICloudCredentials,
+    version?: number
   ): Promise<models.ICloudAllEntitiesResponse> {
     try {
+      let url = URLs.cloudAllDataUrl;
+      if (version) {
+        url += '?version=' + version;
+      }
       let response = await httpRequest(
-        URLs.cloudAllDataUrl,
+        url,
         'GET',
         null,
         credentials
@@ -347,7 +347,10 @@ export function addCommands(options: IAddCloudCommandsOptions) {
       options.state.signalLoadingStarted();
 
       options.api.cloud
-        .getCloudAllEntities(options.state.credentials)
+        .getCloudAllEntities(
+          options.state.credentials,
+          options.state.version
+        )
         .then(response => {
           options.state.updateAllState(response);
         })
@@ -124,12 +124,18 @@ export class CloudTrainingLogsWidget extends BaseLegionWidget {
     this._api
       .getTrainingLogs(
         {
-          name: this._trainingName
+          name: this._trainingName,
+          cursor: this._data.cursor
         },
         this._state.credentials
       )
       .then(logs => {
-        this._data = logs;
+        // Only new lines are returned, so append them to already received
+        this._data = {
+          data: [this._data.data, logs.data].filter(part => part).join('\n'),
+          futureLogsExpected: logs.futureLogsExpected,
+          cursor: logs.cursor
+        };
         this.component.refresh();
         this._finishUpdating();
       })
@@ -26,6 +26,7 @@ export interface IApiCloudState {
   trainings: Array<cloud.ICloudTrainingResponse>;
   deployments: Array<cloud.ICloudDeploymentResponse>;
   vcss: Array<cloud.IVCSResponse>;
+  version?: number;
 
   isLoading: boolean;
   signalLoadingStarted(): void;
@@ -44,6 +45,7 @@ class APICloudStateImplementation implements IApiCloudState {
   private _trainings: Array<cloud.ICloudTrainingResponse>;
   private _deployments: Array<cloud.ICloudDeploymentResponse>;
   private _vcss: Array<cloud.IVCSResponse>;
+  private _version?: number;
 
   private _isLoading: boolean;
   private _dataChanged = new Signal<this, void>(this);
@@ -72,6 +74,10 @@ class APICloudStateImplementation implements IApiCloudState {
     return this._vcss;
   }
 
+  get version(): number | undefined {
+    return this._version;
+  }
+
   get isLoading(): boolean {
     return this._isLoading;
   }
@@ -87,9 +93,16 @@ class APICloudStateImplementation implements IApiCloudState {
 
   updateAllState(data?: cloud.ICloudAllEntitiesResponse): void {
     if (data) {
-      this._trainings = data.trainings;
-      this._deployments = data.deployments;
-      this._vcss = data.vcss;
+      if (data.trainings !== undefined) {
+        this._trainings = data.trainings;
+      }
+      if (data.deployments !== undefined) {
+        this._deployments = data.deployments;
+      }
+      if (data.vcss !== undefined) {
+        this._vcss = data.vcss;
+      }
+      this._version = data.version;
     }
     this._isLoading = false;
     this._dataChanged.emit(null);
@@ -110,6 +123,8 @@ class APICloudStateImplementation implements IApiCloudState {
       console.log('Resetting credentials');
       this._credentials = null;
     }
+    // Data of another cluster has to be fully loaded
+    this._version = undefined;
 
     if (skipPersisting !== true) {
       if (this._credentials) {
@@ -43,11 +43,13 @@ export interface ICloudTrainingRemoveRequest {
 
 export interface ICloudTrainingLogsRequest {
   name: string;
+  cursor?: string;
 }
 
 export interface ICloudTrainingLogsResponse {
   data: string;
   futureLogsExpected: boolean;
+  cursor?: string;
 }
 
 export interface ICloudDeploymentCreateRequest {
@@ -105,9 +107,11 @@ export interface IVCSResponse {
  * All data for cloud widget
  */
 export interface ICloudAllEntitiesResponse {
-  trainings: Array<ICloudTrainingResponse>;
-  deployments: Array<ICloudDeploymentResponse>;
-  vcss: Array<IVCSResponse>;
+  // Kinds of entities that have not been changed since requested version are omitted
+  trainings?: Array<ICloudTrainingResponse>;
+  deployments?: Array<ICloudDeploymentResponse>;
+  vcss?: Array<IVCSResponse>;
+  version: number;
 }
 
 export interface ICloudIssueTokenRequest {
@@ -688,6 +688,18 @@ var doc = `{
                         "name": "follow",
                         "in": "query"
                     },
+                    {
+                        "type": "string",
+                        "description": "return logs after this time (RFC3339)",
+                        "name": "sinceTime",
+                        "in": "query"
+                    },
+                    {
+                        "type": "boolean",
+                        "description": "prefix every line of logs with RFC3339Nano timestamp",
+                        "name": "timestamps",
+                        "in": "query"
+                    },
                     {
                         "type": "string",
                         "description": "Model Training name",
@@ -22,6 +22,7 @@ import (
 	"github.com/spf13/viper"
 	"io"
 	core_v1 "k8s.io/api/core/v1"
+	metav1 "k8s.io/apimachinery/pkg/apis/meta/v1"
 	"k8s.io/apimachinery/pkg/runtime"
 	"k8s.io/client-go/kubernetes"
 	"k8s.io/client-go/rest"
@@ -119,10 +120,16 @@ type LogStream struct {
 	Data []byte
 }
 
-func StreamTrainingLogs(k8sConfig *rest.Config, trainingName string, follow bool) (io.ReadCloser, error) {
+func StreamTrainingLogs(k8sConfig *rest.Config, trainingName string, follow bool,
+	sinceTime *metav1.Time, timestamps bool) (io.ReadCloser, error) {
 	clientset, _ := kubernetes.NewForConfig(k8sConfig)
 	request := clientset.CoreV1().Pods(viper.GetString(legion.Namespace)).
-		GetLogs(legion.GenerateBuildModelName(trainingName), &core_v1.PodLogOptions{Follow: follow, Container: "builder"})
+		GetLogs(legion.GenerateBuildModelName(trainingName), &core_v1.PodLogOptions{
+			Follow:     follow,
+			Container:  "builder",
+			SinceTime:  sinceTime,
+			Timestamps: timestamps,
+		})
 
 	readCloser, err := request.Stream()
 	if err != nil {
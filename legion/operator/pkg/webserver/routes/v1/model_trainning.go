@@ -33,6 +33,7 @@ import (
 	"sigs.k8s.io/controller-runtime/pkg/client"
 	logf "sigs.k8s.io/controller-runtime/pkg/runtime/log"
 	"strconv"
+	"time"
 )
 
 var logMT = logf.Log.WithName("mt-controller")
@@ -305,6 +306,8 @@ func (controller *ModelTrainingController) deleteMTByLabels(c *gin.Context) {
 // @Produce  plain
 // @Accept  plain
 // @Param follow query bool false "follow logs"
+// @Param sinceTime query string false "return logs after this time (RFC3339)"
+// @Param timestamps query bool false "prefix every line of logs with RFC3339Nano timestamp"
 // @Param name path string true "Model Training name"
 // @Success 200 {string} string
 // @Failure 500 {string} string
@@ -327,6 +330,34 @@ func (controller *ModelTrainingController) getModelTrainingLog(c *gin.Context) {
 		}
 	}
 
+	var sinceTime *metav1.Time
+	sinceTimeParam := urlParameters.Get("sinceTime")
+
+	if len(sinceTimeParam) != 0 {
+		parsedSinceTime, err := time.Parse(time.RFC3339Nano, sinceTimeParam)
+		if err != nil {
+			errMessage := fmt.Sprintf("Convert %s to RFC3339 time", sinceTimeParam)
+			logMT.Error(err, errMessage)
+			routes.AbortWithError(c, http.StatusBadRequest, errMessage)
+			return
+		}
+
+		sinceTime = &metav1.Time{Time: parsedSinceTime}
+	}
+
+	timestamps := false
+	timestampsParam := urlParameters.Get("timestamps")
+
+	if len(timestampsParam) != 0 {
+		timestamps, err = strconv.ParseBool(timestampsParam)
+		if err != nil {
+			errMessage := fmt.Sprintf("Convert %s to bool", timestampsParam)
+			logMT.Error(err, errMessage)
+			routes.AbortWithError(c, http.StatusBadRequest, errMessage)
+			return
+		}
+	}
+
 	var mt v1alpha1.ModelTraining
 	if err := controller.k8sClient.Get(context.TODO(),
 		types.NamespacedName{Name: mtName, Namespace: controller.namespace},
@@ -345,7 +376,7 @@ func (controller *ModelTrainingController) getModelTrainingLog(c *gin.Context) {
 		}
 	}
 
-	reader, err := utils.StreamTrainingLogs(controller.k8sConfig, mtName, follow)
+	reader, err := utils.StreamTrainingLogs(controller.k8sConfig, mtName, follow, sinceTime, timestamps)
 	if err != nil {
 		routes.AbortWithError(c, http.StatusBadRequest,
 			fmt.Sprintf("Error during creation of log stream: %s", err.Error()))
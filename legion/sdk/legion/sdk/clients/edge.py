@@ -25,8 +25,6 @@ import typing
 import requests
 
 from legion.sdk import config
-from legion.sdk.containers.docker import build_docker_client, find_host_model_port
-from legion.sdk import definitions
 from legion.sdk.utils import normalize_name
 
 DEFAULT_TIMEOUT = 10
@@ -168,27 +166,23 @@ class LocalEdgeClient(EdgeClient):
         :param payload: payload
         :return: json model response
         """
-        client = build_docker_client()
-        containers = client.containers.list(filters={
-            'label': [f'{definitions.LEGION_COMPONENT_LABEL}.model_id={model_id}',
-                      f'{definitions.LEGION_COMPONENT_LABEL}.model_version={model_version}']
-        })
-
-        if not containers:
-            raise ValueError(
-                f'Can not find container with {model_id} model id and {model_version} model version labels')
+        # Docker SDK is slow to import and is not needed for remote EDGE
+        from legion.sdk.containers.docker import build_docker_client
+        from legion.sdk.containers.local_deploy import get_model_port, invalidate_model_port
 
-        if len(containers) > 1:
-            raise ValueError(
-                f'Find multiple containers with {model_id} model id and {model_version} model version labels')
-
-        model_port = find_host_model_port(containers[0])
+        client = build_docker_client()
+        model_port = get_model_port(client, model_id, model_version)
 
         url = f'http://localhost:{model_port}/api/model/{model_id}/{model_version}/invoke/{endpoint}'
-        response = requests.post(
-            url,
-            data=payload
-        )
+        try:
+            response = requests.post(
+                url,
+                data=payload
+            )
+        except requests.exceptions.ConnectionError:
+            # Model may have been redeployed on another port
+            invalidate_model_port(model_id, model_version)
+            raise
 
         if not response.ok:
             raise Exception(f'Returned wrong status code: {response.status_code}, text: {response.text}')
@@ -19,6 +19,8 @@ EDI client
 import argparse
 import json
 import logging
+import time
+from http.client import HTTPException
 from urllib.parse import urlparse
 import typing
 
@@ -26,12 +28,14 @@ import requests
 import requests.exceptions
 
 from legion.sdk import config
-from legion.sdk.containers import local_deploy
-from legion.sdk.containers.docker import build_docker_client
 from legion.sdk.definitions import EDI_VERSION, MODEL_TOKEN_TOKEN_URL
 
 LOGGER = logging.getLogger(__name__)
 
+WATCH_INITIAL_DELAY = 0.5
+WATCH_MAX_DELAY = 10
+WATCH_BACKOFF_FACTOR = 1.5
+
 
 class WrongHttpStatusCode(Exception):
     """
@@ -215,6 +219,52 @@ class RemoteEdiClient:
             for line in response.iter_lines():
                 yield line.decode("utf-8")
 
+    def watch(self, name: str, timeout: typing.Optional[float] = None,
+              initial_delay: float = WATCH_INITIAL_DELAY, max_delay: float = WATCH_MAX_DELAY,
+              backoff_factor: float = WATCH_BACKOFF_FACTOR) -> typing.Iterator[typing.Any]:
+        """
+        Watch for changes of a resource. Client has to implement get(name) method.
+
+        Resource is polled with adaptive delay: it starts with initial_delay, grows by backoff_factor
+        (up to max_delay) while resource stays unchanged or cannot be got and resets after every change.
+        Errors of connection and HTTP errors are retried until timeout.
+
+        :param name: name of resource
+        :param timeout: (Optional) stop watching after timeout in seconds. None for infinite watching
+        :param initial_delay: (Optional) first delay between requests in seconds
+        :param max_delay: (Optional) max delay between requests in seconds
+        :param backoff_factor: (Optional) multiplier of delay for unchanged resource
+        :return: typing.Iterator[typing.Any] -- resource on every change of it
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        delay = initial_delay
+        previous = None
+
+        while True:
+            try:
+                resource = self.get(name)
+            except IncorrectAuthorizationToken:
+                raise
+            except (WrongHttpStatusCode, EDIConnectionException, HTTPException,
+                    requests.exceptions.RequestException) as http_exception:
+                LOGGER.info('Can not get state of %r: %s', name, http_exception)
+            else:
+                if resource != previous:
+                    previous = resource
+                    delay = initial_delay
+                    yield resource
+
+            sleep_time = delay
+            if deadline is not None:
+                left = deadline - time.time()
+                if left <= 0:
+                    return
+                sleep_time = min(sleep_time, left)
+
+            LOGGER.debug('Sleep %.1f s. before next request', sleep_time)
+            time.sleep(sleep_time)
+            delay = min(delay * backoff_factor, max_delay)
+
     def get_token(self, model_id, model_version, expiration_date=None):
         """
         Get API token
@@ -248,9 +298,21 @@ class RemoteEdiClient:
             pass
 
 
+def _load_local_deploy():
+    """
+    Import local deployment tools on demand, docker SDK is slow to import and is not needed for remote EDI
+
+    :return: (module, :py:class:`docker.client.DockerClient`) -- local_deploy module and docker client
+    """
+    from legion.sdk.containers import local_deploy
+    from legion.sdk.containers.docker import build_docker_client
+
+    return local_deploy, build_docker_client()
+
+
 class LocalEdiClient:
 
-    def inspect(self, deployment_name=None, model=None, version=None):
+    def inspect(self, deployment_name=None, model=None, version=None, check_health=False):
         """
         Perform inspect query on EDI server
 
@@ -260,12 +322,14 @@ class LocalEdiClient:
         :type model: str
         :param version: (Optional) model version
         :type version: str
+        :param check_health: (Optional) check health of models API
+        :type check_health: bool
         :return: list[:py:class:`legion.containers.k8s.ModelDeploymentDescription`]
         """
-        client = build_docker_client()
-        return local_deploy.get_models(client, deployment_name, model, version)
+        local_deploy, client = _load_local_deploy()
+        return local_deploy.get_models(client, deployment_name, model, version, check_health=check_health)
 
-    def deploy(self, deployment_name, image, local_port=None):
+    def deploy(self, deployment_name, image, local_port=None, wait_ready=False, ready_timeout=None):
         """
         Deploy API endpoint
 
@@ -275,10 +339,49 @@ class LocalEdiClient:
         :type image: str
         :param local_port: (Optional) port to deploy model on (for local mode deploy)
         :type local_port: int
+        :param wait_ready: (Optional) wait until model API passes health check
+        :type wait_ready: bool
+        :param ready_timeout: (Optional) timeout of waiting for model readiness in seconds
+        :type ready_timeout: float
+        :return: list[:py:class:`legion.containers.k8s.ModelDeploymentDescription`] -- affected model deployments
+        """
+        local_deploy, client = _load_local_deploy()
+        return local_deploy.deploy_model(client, deployment_name, image, local_port=local_port,
+                                         wait_ready=wait_ready,
+                                         ready_timeout=ready_timeout or local_deploy.LOCAL_READINESS_TIMEOUT)
+
+    def deploy_many(self, deployments, wait_ready=False, ready_timeout=None, parallelism=None):
+        """
+        Deploy several API endpoints in parallel. Images are pulled before start of any model
+
+        :param deployments: deployment name, image and local port (0 or None for any) of each deployment
+        :type deployments: list[tuple[str, str, int]]
+        :param wait_ready: (Optional) wait until models API pass health check
+        :type wait_ready: bool
+        :param ready_timeout: (Optional) timeout of waiting for readiness of each model in seconds
+        :type ready_timeout: float
+        :param parallelism: (Optional) count of parallel operations
+        :type parallelism: int
         :return: list[:py:class:`legion.containers.k8s.ModelDeploymentDescription`] -- affected model deployments
         """
-        client = build_docker_client()
-        return local_deploy.deploy_model(client, deployment_name, image, local_port=local_port)
+        local_deploy, client = _load_local_deploy()
+        deployments = [local_deploy.LocalModelDeployment(*deployment) for deployment in deployments]
+        return local_deploy.deploy_models(client, deployments, wait_ready=wait_ready,
+                                          ready_timeout=ready_timeout or local_deploy.LOCAL_READINESS_TIMEOUT,
+                                          parallelism=parallelism)
+
+    def pull(self, images, parallelism=None):
+        """
+        Pull model images which are missed locally (in parallel)
+
+        :param images: Docker images
+        :type images: list[str]
+        :param parallelism: (Optional) count of parallel pulls
+        :type parallelism: int
+        :return: list[str] -- images
+        """
+        local_deploy, client = _load_local_deploy()
+        return list(local_deploy.pull_images(client, images, parallelism))
 
     def undeploy(self, deployment_name=None, model=None, version=None, ignore_not_found=False):
         """
@@ -294,7 +397,7 @@ class LocalEdiClient:
         :type ignore_not_found: bool
         :return: list[:py:class:`legion.containers.k8s.ModelDeploymentDescription`] -- affected model deployments
         """
-        client = build_docker_client()
+        local_deploy, client = _load_local_deploy()
         return local_deploy.undeploy_model(client, deployment_name, model, version, ignore_not_found)
 
     def get_builds(self):
@@ -303,7 +406,7 @@ class LocalEdiClient:
 
         :return: list[:py:class:`legion.containers.definitions.ModelBuildInformation`] -- registered model builds
         """
-        client = build_docker_client()
+        local_deploy, client = _load_local_deploy()
         return local_deploy.get_local_builds(client)
 
     def __repr__(self):
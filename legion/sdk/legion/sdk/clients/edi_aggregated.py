@@ -16,6 +16,7 @@
 """
 Aggregated EDI client (can apply multiple resources)
 """
+import concurrent.futures
 import logging
 import os
 import typing
@@ -23,13 +24,18 @@ import json
 
 import yaml
 
-from legion.sdk.clients.edi import RemoteEdiClient, WrongHttpStatusCode
+from legion.sdk.clients.edi import RemoteEdiClient
 from legion.sdk.clients.training import ModelTrainingClient, ModelTraining
 from legion.sdk.clients.deployment import ModelDeploymentClient, ModelDeployment
 from legion.sdk.clients.vcs import VcsClient, VCSCredential
 
 LOGGER = logging.getLogger(__name__)
 
+DEFAULT_APPLY_PARALLELISM = 10
+
+# Resources of next kinds can refer to resources of previous kinds
+RESOURCES_APPLY_ORDER = (VCSCredential, ModelTraining, ModelDeployment)
+
 
 class InvalidResourceType(Exception):
     """
@@ -176,9 +182,68 @@ def parse_resources_file_with_one_item(path: str) -> LegionCloudResourceUpdatePa
     return resources.changes[0]
 
 
-def apply(updates: LegionCloudResourcesUpdateList, edi_client: RemoteEdiClient, is_removal: bool) -> ApplyResult:
+def _get_existing_resources(client: object) -> typing.Dict[str, object]:
+    """
+    Get all resources of client's kind from EDI server (one request per kind)
+
+    :param client: remote client for particular kind of resources
+    :type client: object
+    :return: typing.Dict[str, object] -- existing resources by name
+    """
+    return {resource.name: resource for resource in client.get_all()}
+
+
+def _apply_change(change: LegionCloudResourceUpdatePair, client: object,
+                  existing: typing.Dict[str, object], is_removal: bool, dry_run: bool) -> typing.Optional[str]:
+    """
+    Apply one change on Legion cloud
+
+    :param change: change to apply
+    :type change: :py:class:LegionCloudResourceUpdatePair
+    :param client: remote client for resource kind
+    :type client: object
+    :param existing: resources of the same kind that exist on a cluster
+    :type existing: typing.Dict[str, object]
+    :param is_removal: is it removal?
+    :type is_removal: bool
+    :param dry_run: only calculate changes, do not apply them
+    :type dry_run: bool
+    :return: typing.Optional[str] -- name of result group (created, changed, removed) or None if nothing done
+    """
+    resource_exist = change.resource_name in existing
+
+    # If not removal (creation / update)
+    if not is_removal:
+        if resource_exist:
+            if dry_run:
+                return 'changed' if existing[change.resource_name].to_json() != change.resource.to_json() else None
+            LOGGER.info('Editing of %s (name: %s)', change.resource, change.resource_name)
+            client.edit(change.resource)
+            return 'changed'
+
+        if not dry_run:
+            LOGGER.info('Creating of %s (name: %s)', change.resource, change.resource_name)
+            client.create(change.resource)
+        return 'created'
+
+    # Only if resource exists on a cluster
+    if resource_exist:
+        if not dry_run:
+            LOGGER.info('Removing of %s (name: %s)', change.resource, change.resource_name)
+            client.delete(change.resource_name)
+        return 'removed'
+
+    return None
+
+
+def apply(updates: LegionCloudResourcesUpdateList, edi_client: RemoteEdiClient, is_removal: bool,
+          parallelism: int = DEFAULT_APPLY_PARALLELISM, dry_run: bool = False) -> ApplyResult:
     """
-    Apply changes on Legion cloud
+    Apply changes on Legion cloud.
+
+    Resources are grouped by kind and kinds are processed in dependency order
+    (VCSCredential, ModelTraining, ModelDeployment; reversed for removal).
+    Changes of the same kind are independent and are applied concurrently.
 
     :param updates: changes to apply
     :type updates: :py:class:LegionCloudResourcesUpdateList
@@ -186,61 +251,70 @@ def apply(updates: LegionCloudResourcesUpdateList, edi_client: RemoteEdiClient,
     :type edi_client: RemoteEdiClient
     :param is_removal: is it removal?
     :type is_removal: bool
+    :param parallelism: (Optional) count of concurrent requests to EDI server
+    :type parallelism: int
+    :param dry_run: (Optional) only calculate changes, do not apply them
+    :type dry_run: bool
     :return: :py:class:ApplyResult -- result of applying
     """
-    created = []
-    removed = []
-    changed = []
+    if parallelism < 1:
+        raise ValueError('Parallelism should be positive integer, {!r} provided'.format(parallelism))
+
+    outcomes = {}  # type: typing.Dict[int, typing.Tuple[typing.Optional[str], LegionCloudResourceUpdatePair]]
     errors = []
 
-    # Operate over all resources
+    # Group resources by kind, preserving order of declaration inside every group
+    groups = {resource_type: [] for resource_type in RESOURCES_APPLY_ORDER}
     for idx, change in enumerate(updates.changes):
         resource_str_identifier = f'#{idx+1}. {change.resource_name}' if change.resource_name else f'#{idx+1}'
 
-        LOGGER.debug('Processing resource %r', resource_str_identifier)
-        # Build and check client
-        try:
-            client = build_client(change, edi_client)
-        except Exception as general_exception:
-            errors.append(Exception(f'Can not get build client for {resource_str_identifier}: {general_exception}'))
+        if type(change.resource) not in groups:
+            errors.append(Exception(f'Can not get build client for {resource_str_identifier}: '
+                                    f'{change.resource!r} is invalid resource'))
+            continue
 
-        # Check is resource exist or not
-        try:
-            client.get(change.resource_name)
-            resource_exist = True
-        except WrongHttpStatusCode as http_exception:
-            if http_exception.status_code == 404:
-                resource_exist = False
-            else:
-                errors.append(Exception(f'Can not get status of resource '
-                                        f'{resource_str_identifier}: {http_exception}'))
+        groups[type(change.resource)].append((idx, resource_str_identifier, change))
+
+    kinds_order = reversed(RESOURCES_APPLY_ORDER) if is_removal else RESOURCES_APPLY_ORDER
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallelism) as executor:
+        for resource_type in kinds_order:
+            group = groups[resource_type]
+            if not group:
                 continue
-        except Exception as general_exception:
-            errors.append(Exception(f'Can not get status of resource '
-                                    f'{resource_str_identifier}: {general_exception}'))
-            continue
 
-        # Change resource (update/create/delete)
-        try:
-            # If not removal (creation / update)
-            if not is_removal:
-                if resource_exist:
-                    LOGGER.info('Editing of #%d %s (name: %s)', idx+1, change.resource, change.resource_name)
-                    client.edit(change.resource)
-                    changed.append(change)
-                else:
-                    LOGGER.info('Creating of #%d %s (name: %s)', idx+1, change.resource, change.resource_name)
-                    client.create(change.resource)
-                    created.append(change)
-            # If removal
-            else:
-                # Only if resource exists on a cluster
-                if resource_exist:
-                    LOGGER.info('Removing of #%d %s (name: %s)', idx+1, change.resource, change.resource_name)
-                    client.delete(change.resource_name)
-                    removed.append(change)
-        except Exception as general_exception:
-            errors.append(Exception(f'Can not update resource {resource_str_identifier}: {general_exception}'))
-            continue
+            LOGGER.debug('Processing %d resource(s) of kind %s', len(group), resource_type.__name__)
+            client = build_client(group[0][2], edi_client)
+
+            # Check which resources exist
+            try:
+                existing = _get_existing_resources(client)
+            except Exception as general_exception:
+                for _, resource_str_identifier, _ in group:
+                    errors.append(Exception(f'Can not get status of resource '
+                                            f'{resource_str_identifier}: {general_exception}'))
+                continue
 
-    return ApplyResult(tuple(created), tuple(removed), tuple(changed), tuple(errors))
+            # Change resources (update/create/delete)
+            futures = {
+                executor.submit(_apply_change, change, client, existing, is_removal, dry_run):
+                    (idx, resource_str_identifier, change)
+                for idx, resource_str_identifier, change in group
+            }
+
+            # Next kind can depend on current one, so wait for all changes of the current kind
+            for future in concurrent.futures.as_completed(futures):
+                idx, resource_str_identifier, change = futures[future]
+                try:
+                    outcomes[idx] = future.result(), change
+                except Exception as general_exception:
+                    errors.append(Exception(f'Can not update resource {resource_str_identifier}: {general_exception}'))
+
+    results = {'created': [], 'removed': [], 'changed': []}
+    for idx in sorted(outcomes):
+        outcome, change = outcomes[idx]
+        if outcome:
+            results[outcome].append(change)
+
+    return ApplyResult(tuple(results['created']), tuple(results['removed']), tuple(results['changed']),
+                       tuple(errors))
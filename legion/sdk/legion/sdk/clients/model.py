@@ -25,6 +25,9 @@ from requests.utils import to_key_val_list
 from legion.sdk import config
 from legion.sdk.utils import normalize_name, ensure_function_succeed
 
+MODEL_REQUEST_RETRIES = 40
+MODEL_REQUEST_RETRY_DELAY = 3
+
 
 def load_image(path):
     """
@@ -71,7 +74,8 @@ class ModelClient:
     """
 
     def __init__(self, model_id, model_version, token=None, host=None, http_client=None,
-                 http_exception=requests.exceptions.RequestException, use_relative_url=False, timeout=None):
+                 http_exception=requests.exceptions.RequestException, use_relative_url=False, timeout=None,
+                 retries=MODEL_REQUEST_RETRIES, retry_delay=MODEL_REQUEST_RETRY_DELAY):
         """
         Build client
 
@@ -91,6 +95,10 @@ class ModelClient:
         :type use_relative_url: bool
         :param timeout: timeout for connections
         :type timeout: int
+        :param retries: (Optional) count of attempts to send request if HTTP client raises exception
+        :type retries: int
+        :param retry_delay: (Optional) delay between attempts in seconds
+        :type retry_delay: int
         """
         self._model_id = normalize_name(model_id)
         self._model_version = model_version
@@ -115,6 +123,8 @@ class ModelClient:
             self._host = self._host.rstrip('/')
 
         self._timeout = timeout
+        self._retries = retries
+        self._retry_delay = retry_delay
 
     @staticmethod
     def build_from_model_service(model_service, timeout=3):
@@ -251,7 +261,7 @@ class ModelClient:
             kwargs['timeout'] = self._timeout
         return kwargs
 
-    def _request(self, http_method, url, data=None, files=None, retries=40, sleep=3, **kwargs):
+    def _request(self, http_method, url, data=None, files=None, retries=None, sleep=None, **kwargs):
         """
         Send request with provided method and other parameters
         :param http_method: HTTP method
@@ -262,9 +272,10 @@ class ModelClient:
         :type data: any
         :param files: files to send with request
         :type files: dict
-        :param retries: How many times to retry executing a request
+        :param retries: (Optional) How many times to retry executing a request (retries of client by default)
         :type retries: int
-        :param sleep: How much time to sleep between retries in case of errors
+        :param sleep: (Optional) How much time to sleep between retries in case of errors
+                      (retry delay of client by default)
         :type sleep: int
         :return: dict -- parsed model response
         """
@@ -283,7 +294,9 @@ class ModelClient:
             except self._http_exception:
                 pass
 
-        response = ensure_function_succeed(check_function, retries, sleep)
+        response = ensure_function_succeed(check_function,
+                                           retries if retries is not None else self._retries,
+                                           sleep if sleep is not None else self._retry_delay)
         if not response:
             raise self._http_exception('HTTP request failed')
         return self._parse_response(response)
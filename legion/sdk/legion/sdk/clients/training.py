@@ -99,6 +99,26 @@ class ModelTraining(typing.NamedTuple):
         return result
 
 
+class ModelTrainingLogLine(typing.NamedTuple):
+    """
+    Line of Model Training logs
+    """
+
+    timestamp: str
+    message: str
+
+
+def _log_timestamp_key(timestamp: str) -> str:
+    """
+    Build comparable key for RFC3339Nano timestamp of log line (pads fraction of seconds)
+
+    :param timestamp: RFC3339Nano UTC timestamp, e.g. 2019-05-27T10:00:00.12Z
+    :return: str -- key that can be compared with keys of other timestamps
+    """
+    seconds, _, fraction = timestamp.rstrip('Z').partition('.')
+    return f'{seconds}.{fraction.ljust(9, "0")}'
+
+
 class ModelTrainingClient(RemoteEdiClient):
     """
     EDI client
@@ -149,15 +169,45 @@ class ModelTrainingClient(RemoteEdiClient):
         """
         return self.query(f'{MODEL_TRAINING_URL}/{name}', action='DELETE')['message']
 
-    def log(self, name: str, follow: bool = False) -> str:
+    def log(self, name: str, follow: bool = False, since_time: typing.Optional[str] = None,
+            timestamps: bool = False) -> typing.Iterator[str]:
         """
         Stream logs from training
 
         :param follow: follow stream
         :param name: Name of a Model Training
+        :param since_time: (Optional) return only logs after this time (RFC3339)
+        :param timestamps: (Optional) prefix every line with RFC3339Nano timestamp
         :return Message from EDI server
         """
-        return self.stream(f'{MODEL_TRAINING_URL}/{name}/log', 'GET', params={'follow': follow})
+        params = {'follow': follow}
+        if since_time:
+            params['sinceTime'] = since_time
+        if timestamps:
+            params['timestamps'] = timestamps
+
+        return self.stream(f'{MODEL_TRAINING_URL}/{name}/log', 'GET', params=params)
+
+    def log_since(self, name: str, cursor: typing.Optional[str] = None,
+                  follow: bool = False) -> typing.Iterator[ModelTrainingLogLine]:
+        """
+        Stream logs from training, starting after cursor (timestamp of the last received line).
+        Only new lines are downloaded, so it can be used to resume reading of logs.
+
+        :param name: Name of a Model Training
+        :param cursor: (Optional) timestamp of the last received line. None to get all logs
+        :param follow: follow stream
+        :return: lines of logs with their timestamps
+        """
+        cursor_key = _log_timestamp_key(cursor) if cursor else None
+
+        for line in self.log(name, follow, since_time=cursor, timestamps=True):
+            timestamp, _, message = line.partition(' ')
+            # EDI server can return lines that have been already received (sinceTime has seconds precision)
+            if cursor_key and _log_timestamp_key(timestamp) <= cursor_key:
+                continue
+
+            yield ModelTrainingLogLine(timestamp, message)
 
 
 def build_client(args: argparse.Namespace = None) -> ModelTrainingClient:
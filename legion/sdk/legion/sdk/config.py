@@ -18,6 +18,8 @@ legion env names
 """
 import configparser
 import os
+import sys
+import types
 from pathlib import Path
 import logging
 
@@ -284,24 +286,56 @@ def cast_bool(value):
     return value.lower() in ['true', '1', 't', 'y', 'yes']
 
 
+def _evaluate_variable(information):
+    """
+    Evaluate variable value (from config file, env. or default)
+
+    :param information: information about variable
+    :type information: :py:class:`legion.sdk.config.ConfigVariableInformation`
+    :return: Any -- default or explicit value
+    """
+    explicit_value = _load_variable(information.name, information.cast_func, information.configurable_manually)
+    return explicit_value if explicit_value is not None else information.default
+
+
 def reinitialize_variables():
     """
-    Reinitialize variables due to new ENV variables
+    Reinitialize variables due to new ENV variables.
+    Values are dropped and will be evaluated again on the next access
 
     :return: None
     """
-    for value_information in ALL_VARIABLES.values():
-        explicit_value = _load_variable(value_information.name,
-                                        value_information.cast_func,
-                                        value_information.configurable_manually)
-        value = explicit_value if explicit_value is not None else value_information.default
+    module_globals = globals()
+    for name in ALL_VARIABLES:
+        module_globals.pop(name, None)
+
+
+class _LazyConfigModule(types.ModuleType):
+    """
+    Type of this module. Evaluates declared variables on first access and caches their values
+    """
+
+    def __getattr__(self, name):
+        """
+        Get value of variable that has not been evaluated yet
+
+        :param name: name of variable
+        :type name: str
+        :return: Any -- default or explicit value
+        """
+        information = ALL_VARIABLES.get(name)
+        if information is None:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(self.__name__, name))
 
-        globals()[value_information.name] = value
+        value = _evaluate_variable(information)
+        setattr(self, name, value)
+        return value
 
 
 class ConfigVariableDeclaration:
     """
-    Class that builds declaration of variable (and returns it's value as an instance)
+    Class that builds declaration of variable.
+    Variable value is evaluated on first access to the module attribute with the same name
     """
 
     def __new__(cls, name, default=None, cast_func=str, description=None, configurable_manually=True):
@@ -318,14 +352,11 @@ class ConfigVariableDeclaration:
         :type description: str
         :param configurable_manually: (Optional) can be modified by config file or CLI
         :type configurable_manually: bool
-        :return: Any -- default or explicit value
+        :return: :py:class:`legion.sdk.config.ConfigVariableInformation` -- information about variable
         """
         information = ConfigVariableInformation(name, default, cast_func, description, configurable_manually)
-
-        explicit_value = _load_variable(name, cast_func, configurable_manually)
-        value = explicit_value if explicit_value is not None else default
         ALL_VARIABLES[information.name] = information
-        return value
+        return information
 
 
 # Verbose tracing
@@ -382,13 +413,23 @@ MODEL_CLUSTER_TRAIN_METRICS_ENABLED = ConfigVariableDeclaration(
     'MODEL_CLUSTER_TRAIN_METRICS_ENABLED', False, cast_bool, 'Send model metrics on train', False
 )
 MODEL_LOCAL_METRIC_STORE = ConfigVariableDeclaration(
-    'MODEL_LOCAL_METRIC_STORE', '.legion/build_metric_store.json', str,
-    'File name where model build metric are saved', True
+    'MODEL_LOCAL_METRIC_STORE', '.legion/build_metric_store.db', str,
+    'File name where model build metric are saved (SQLite database, legacy JSON store with the same name '
+    'or with .json extension is converted on first use)',
+    True
 )
 METRICS_HOST = ConfigVariableDeclaration('METRICS_HOST', 'graphite', str,
                                          'Host that gets train metrics. It is used during model training', False)
 METRICS_PORT = ConfigVariableDeclaration('METRICS_PORT', 9125, int,
                                          'Port that gets train metrics. It is used during model training', False)
+METRICS_PROTOCOL = ConfigVariableDeclaration('METRICS_PROTOCOL', 'tcp', str,
+                                             'Protocol of sending train metrics (tcp or udp)', False)
+METRICS_BUFFER_SIZE = ConfigVariableDeclaration('METRICS_BUFFER_SIZE', 10000, int,
+                                                'Count of train metric lines which can be buffered before sending, '
+                                                'metrics are dropped if buffer is full', False)
+METRICS_FLUSH_INTERVAL = ConfigVariableDeclaration('METRICS_FLUSH_INTERVAL', 1.0, float,
+                                                   'Max time in seconds during which train metrics are buffered',
+                                                   False)
 
 # API for models
 LEGION_ADDR = ConfigVariableDeclaration('LEGION_ADDR', '0.0.0.0', str,
@@ -432,6 +473,23 @@ DOCKER_REGISTRY_PASSWORD = ConfigVariableDeclaration('DOCKER_REGISTRY_PASSWORD',
                                                      'Docker API password (for saving built model images)', True)
 DOCKER_REGISTRY_PROTOCOL = ConfigVariableDeclaration('DOCKER_REGISTRY_PROTOCOL', 'https', str,
                                                      'Docker registry protocol: https/http', True)
+INSTALLED_PACKAGES_CACHE_FILE = ConfigVariableDeclaration(
+    'INSTALLED_PACKAGES_CACHE_FILE', os.path.join('~', '.legion', 'installed_packages.json'), str,
+    'File where list of installed packages is cached till site-packages directories are modified '
+    '(empty value disables cache)',
+    False
+)
+DOCKER_IMAGE_LABELS_CACHE_SIZE = ConfigVariableDeclaration('DOCKER_IMAGE_LABELS_CACHE_SIZE', 256, int,
+                                                           'Count of images which labels are cached',
+                                                           False)
+DOCKER_IMAGE_LABELS_CACHE_FILE = ConfigVariableDeclaration('DOCKER_IMAGE_LABELS_CACHE_FILE', None, str,
+                                                           'File where image labels are persisted by manifest digest '
+                                                           '(SQLite database), labels are cached only in memory '
+                                                           'if it is not set',
+                                                           False)
+DOCKER_IMAGE_LABELS_CACHE_FILE_SIZE = ConfigVariableDeclaration('DOCKER_IMAGE_LABELS_CACHE_FILE_SIZE', 4096, int,
+                                                                'Count of images which labels are persisted',
+                                                                False)
 
 # EDI server configuration
 CLUSTER_CONFIG_PATH = ConfigVariableDeclaration('CLUSTER_CONFIG_PATH', None, str,
@@ -472,6 +530,24 @@ K8S_API_RETRY_NUMBER_MAX_LIMIT = ConfigVariableDeclaration('K8S_API_RETRY_NUMBER
 K8S_API_RETRY_DELAY_SEC = ConfigVariableDeclaration('K8S_API_RETRY_DELAY_SEC', 3, int,
                                                     'Time wait before next retry to call K8S API',
                                                     False)
+K8S_API_CONFIRMATION_TIMEOUT_SEC = ConfigVariableDeclaration('K8S_API_CONFIRMATION_TIMEOUT_SEC', 15, int,
+                                                             'Time to wait for confirmation of K8S object creation '
+                                                             'or deletion',
+                                                             False)
+K8S_PARALLEL_OPERATIONS = ConfigVariableDeclaration('K8S_PARALLEL_OPERATIONS', 10, int,
+                                                    'Count of model deploy/delete operations which can run '
+                                                    'in parallel',
+                                                    False)
+K8S_API_CLIENT_TTL = ConfigVariableDeclaration('K8S_API_CLIENT_TTL', 300, int,
+                                               'Time after which shared K8S API client reloads configuration '
+                                               'and credentials',
+                                               False)
+K8S_INFORMER_RESYNC_PERIOD = ConfigVariableDeclaration('K8S_INFORMER_RESYNC_PERIOD', 300, int,
+                                                       'Period of full resync of in-memory K8S resources cache',
+                                                       False)
+K8S_API_LIST_PAGE_SIZE = ConfigVariableDeclaration('K8S_API_LIST_PAGE_SIZE', 500, int,
+                                                   'Count of objects requested from K8S API in one page of list',
+                                                   False)
 
 # Sandbox mode
 SANDBOX_PYTHON_TOOLCHAIN_IMAGE = ConfigVariableDeclaration('SANDBOX_PYTHON_TOOLCHAIN_IMAGE',
@@ -485,6 +561,11 @@ SANDBOX_CREATE_SELF_REMOVING_CONTAINER = ConfigVariableDeclaration('SANDBOX_CREA
 SANDBOX_DOCKER_MOUNT_PATH = ConfigVariableDeclaration('SANDBOX_DOCKER_MOUNT_PATH', '/var/run/docker.sock', str,
                                                       'Path to docker engine socket on host machine', True)
 
+LOCAL_DEPLOY_PARALLEL_OPERATIONS = ConfigVariableDeclaration('LOCAL_DEPLOY_PARALLEL_OPERATIONS', 4, int,
+                                                             'Count of local image pulls and model deployments which '
+                                                             'can run in parallel',
+                                                             True)
+
 LOCAL_DEPLOY_HOSTNAME = ConfigVariableDeclaration('LOCAL_DEPLOY_HOSTNAME', 'http://localhost', str,
                                                   'Name of host on which local deployed models will be accessable',
                                                   True)
@@ -503,3 +584,7 @@ MODEL_K8S_MEMORY = ConfigVariableDeclaration('MODEL_K8S_MEMORY', '256Mi', str, '
 MODEL_K8S_CPU = ConfigVariableDeclaration('MODEL_K8S_CPU', '256m', str, 'Default k8s cpu for a model', True)
 REDUCE_MODEL_REQUESTS_BY = ConfigVariableDeclaration('REDUCE_MODEL_REQUESTS_BY', 33, int,
                                                      'Reduce k8s resource for model by specific percent', True)
+
+# Drop declarations from module namespace, values are evaluated on demand
+reinitialize_variables()
+sys.modules[__name__].__class__ = _LazyConfigModule
@@ -114,6 +114,23 @@ class ModelIdVersion:
     __str__ = __repr__
 
 
+def get_container_summary_port(container_summary, private_port):
+    """
+    Get host port which container port is bound to
+
+    :param container_summary: container summary (item of docker containers list API response)
+    :type container_summary: dict
+    :param private_port: port of container
+    :type private_port: int
+    :return: int or None -- host port
+    """
+    for port in container_summary.get('Ports') or []:
+        if str(port.get('PrivatePort')) == str(private_port) and port.get('PublicPort'):
+            return int(port['PublicPort'])
+
+    return None
+
+
 class ModelDeploymentDescription:
     """
     Holder for model deployment description
@@ -178,49 +195,46 @@ class ModelDeploymentDescription:
         self._model_api_info = model_api_info
 
     @staticmethod
-    def build_from_docker_container_info(docker_container_info, model_api_ok=None, model_api_info=None):
+    def build_from_docker_container_summary(container_summary, image_tags=None, model_api_ok=None,
+                                            model_api_info=None):
         """
-        Build from existed model service
+        Build from container summary (item of docker containers list API response), which does not require
+        additional requests to docker for each container
 
-        :param docker_container_info: model service
-        :type docker_container_info: :py:class:`docker.models.containers.Container`
+        :param container_summary: container summary
+        :type container_summary: dict
+        :param image_tags: (Optional) tags of images by image ID
+        :type image_tags: dict[str, list[str]]
         :param model_api_ok: (Optional) model API state from EDGE invocation
         :type model_api_ok: bool or None
         :param model_api_info: (Optional) model API info from EDGE invocation
         :type model_api_info: dict or None
         :return: :py:class:`legion.k8s.definitions.ModelDeploymentDescription` -- built model deployment
         """
-        is_working = docker_container_info.status == 'running'
-        local_port = None
-        binded_ports = docker_container_info.attrs['NetworkSettings']['Ports']
-        for name, info in binded_ports.items():
-            if name.startswith('{}/'.format(config.LEGION_PORT)):
-                if not info:
-                    LOGGER.debug('Port {} has not been bound for container {}'.format(config.LEGION_PORT,
-                                                                                      docker_container_info.id))
-                else:
-                    local_port = int(info[0]['HostPort'])
-
-                break
+        is_working = container_summary.get('State') == 'running'
+        local_port = get_container_summary_port(container_summary, config.LEGION_PORT)
 
         if not local_port:
             LOGGER.debug('Cannot find port {} for container {}'.format(config.LEGION_PORT,
-                                                                       docker_container_info.id))
+                                                                       container_summary['Id']))
+
+        image_id = container_summary.get('ImageID', '')
+        tags = (image_tags or {}).get(image_id, [])
+        image = tags[0] if len(tags) == 1 else image_id[:17] if image_id.startswith('sha256:') else image_id[:10]
 
-        image = docker_container_info.image.short_id
-        if len(docker_container_info.image.tags) == 1:
-            image = docker_container_info.image.tags[0]
+        labels = container_summary.get('Labels') or {}
+        names = container_summary.get('Names') or ['']
 
         return ModelDeploymentDescription(
             status=STATUS_OK if is_working else STATUS_FAIL,
-            deployment_name=docker_container_info.name,
-            model=docker_container_info.labels[headers.DOMAIN_MODEL_ID],
-            version=docker_container_info.labels[headers.DOMAIN_MODEL_VERSION],
+            deployment_name=names[0].lstrip('/'),
+            model=labels[headers.DOMAIN_MODEL_ID],
+            version=labels[headers.DOMAIN_MODEL_VERSION],
             image=image,
             scale=1 if is_working else 0,
             ready_replicas=1 if is_working else 0,
             deploy_mode=ModelDeploymentDescription.MODE_LOCAL,
-            container_id=docker_container_info.id,
+            container_id=container_summary['Id'],
             local_port=local_port,
             model_api_ok=model_api_ok,
             model_api_info=model_api_info,
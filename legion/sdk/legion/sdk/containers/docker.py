@@ -16,24 +16,70 @@
 """
 legion k8s functions
 """
+import hashlib
+import io
+import json
 import logging
 import os
+import stat
+import tarfile
+import tempfile
+import time
 import typing
 
 import docker
 import docker.errors
-from docker.models.containers import Container
+import requests.exceptions
 from docker.models.images import Image as DockerImage
 
 from legion.sdk.containers import headers
 from legion.sdk import config, utils
 from legion.sdk.containers.definitions import ModelBuildParameters
+from legion.sdk.containers.exceptions import ImagePushException
 
 from legion.sdk.model import load_meta_model, PROPERTY_TRAINING_WORKING_DIRECTORY
-from legion.sdk.utils import get_installed_packages, get_list_of_requirements, copy_file, copy_directory_contents
+from legion.sdk.utils import get_missed_requirements
 
 LOGGER = logging.getLogger(__name__)
 MODEL_TARGET_WORKSPACE = '/app'
+# Model binary is kept out of workspace, so workspace copied from previous build does not depend on it
+MODEL_TARGET_DIRECTORY = '/model'
+
+# Label of committed build base images with fingerprint of captured container
+BUILD_BASE_FINGERPRINT_LABEL = headers.DOMAIN_PREFIX + 'legion.build-base-fingerprint'
+# Filesystem of current container, where changed paths are read for fingerprint of build base image
+CURRENT_CONTAINER_ROOT = '/'
+# Changes in these paths do not require new commit of build base image
+BUILD_BASE_IGNORED_PATHS = ('/tmp', '/var/tmp', '/root/.cache', MODEL_TARGET_WORKSPACE)
+# Number of committed build base images that are kept, older ones are removed if they are not in use
+BUILD_BASE_IMAGES_KEPT = 3
+# Locations of workspace and model binary in build context
+BUILD_CONTEXT_WORKSPACE = 'workspace'
+BUILD_CONTEXT_MODEL = 'model'
+# Digests of workspace items of last build, which are used to send only changed items in next build context
+BUILD_WORKSPACE_MANIFEST = '/tmp/legion-build-workspace.json'
+# Size of chunks for calculation of file digests
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# Image push is retried on failure, layers which have been pushed are skipped by registry on retry
+PUSH_RETRIES = 3
+PUSH_RETRY_INITIAL_DELAY = 2
+PUSH_RETRY_BACKOFF_FACTOR = 2
+# Only connection problems and registry server errors are retried
+PUSH_RETRIABLE_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                             requests.exceptions.ChunkedEncodingError)
+# Parts of (lowercased) push stream errors which Docker daemon reports for connection and registry server errors
+PUSH_RETRIABLE_ERROR_MARKERS = ('unexpected http status: 5', 'connection reset', 'connection refused',
+                                'timeout', 'broken pipe', 'eof')
+# Progress of layer upload is logged each time this percent of layer is uploaded
+PUSH_PROGRESS_LOG_STEP = 25
+
+PUSH_STATUS_PUSHING = 'Pushing'
+PUSH_STATUS_PUSHED = 'Pushed'
+PUSH_STATUS_LAYER_EXISTS = 'Layer already exists'
+
+# Kind of deleted path in changes of container filesystem
+DOCKER_CHANGE_DELETED = 2
 
 
 def build_docker_client():
@@ -46,21 +92,6 @@ def build_docker_client():
     return client
 
 
-def find_host_model_port(model_container: Container) -> int:
-    """
-    Find exposed on host model port
-    :param model_container: model container
-    :return exposed ports
-    """
-    model_ports: typing.Dict[str, typing.Any] = model_container.attrs['NetworkSettings']['Ports']
-
-    for _, host_port in model_ports.items():
-        if host_port:
-            return host_port[0]['HostPort']
-
-    raise ValueError(f'Can not find exposed port of model container {model_container.id}')
-
-
 def get_docker_container_id_from_cgroup_line(line):
     """
     Get docker container id from proc cgroups line
@@ -96,7 +127,7 @@ def get_current_docker_container_id():
         return get_docker_container_id_from_cgroup_line(longest_line)
 
 
-def commit_image(client, container_id=None):
+def commit_image(client, container_id=None, labels=None):
     """
     Commit container and return image sha commit id
 
@@ -104,18 +135,148 @@ def commit_image(client, container_id=None):
     :type client: :py:class:`docker.client.DockerClient`
     :param container_id: (Optional) id of target container. Current if None
     :type container_id: str
+    :param labels: (Optional) labels of image
+    :type labels: dict[str, str]
     :return: str -- docker image id
     """
     if not container_id:
         container_id = get_current_docker_container_id()
 
     container = client.containers.get(container_id)
-    image = container.commit()
+    image = container.commit(conf={'Labels': labels} if labels else None)
     LOGGER.info('Image %s has been captured', image.id)
 
     return image.id
 
 
+def _is_path_ignored(path, ignored_paths):
+    """
+    Check that path is one of ignored paths or is placed in one of them
+
+    :param path: absolute path
+    :type path: str
+    :param ignored_paths: ignored paths
+    :type ignored_paths: typing.Iterable[str]
+    :return: bool -- is path ignored
+    """
+    return any(path == ignored or path.startswith(ignored.rstrip('/') + '/') for ignored in ignored_paths)
+
+
+def get_path_digest(path):
+    """
+    Get digest of filesystem item: mode and content of file or target of symlink
+
+    :param path: path to item
+    :type path: str
+    :return: str -- digest
+    """
+    path_stat = os.lstat(path)
+    content = hashlib.sha256()
+
+    if stat.S_ISLNK(path_stat.st_mode):
+        content.update(os.readlink(path).encode('utf-8'))
+    elif stat.S_ISREG(path_stat.st_mode):
+        with open(path, 'rb') as stream:
+            for chunk in iter(lambda: stream.read(DIGEST_CHUNK_SIZE), b''):
+                content.update(chunk)
+
+    return '{:o}:{}'.format(path_stat.st_mode, content.hexdigest())
+
+
+def get_container_fingerprint(container, ignored_paths=BUILD_BASE_IGNORED_PATHS, root=None):
+    """
+    Get fingerprint of container filesystem: source image, changed paths (excluding ignored paths)
+    and digests of their contents
+
+    :param container: Docker container
+    :type container: :py:class:`docker.models.containers.Container`
+    :param ignored_paths: (Optional) paths, changes in which are ignored
+    :type ignored_paths: typing.Iterable[str]
+    :param root: (Optional) path where container filesystem can be read (for current container it is /)
+    :type root: str
+    :return: typing.Optional[str] -- fingerprint or None if contents of changed paths cannot be read
+    """
+    changes = sorted((change['Path'], change['Kind']) for change in container.diff() or []
+                     if not _is_path_ignored(change['Path'], ignored_paths))
+    if changes and not root:
+        return None
+
+    digests = []
+    for path, kind in changes:
+        if kind == DOCKER_CHANGE_DELETED:
+            digests.append(None)
+            continue
+
+        try:
+            digests.append(get_path_digest(os.path.join(root, path.lstrip('/'))))
+        except OSError as read_error:
+            LOGGER.debug('Cannot read changed path %s: %s', path, read_error)
+            return None
+
+    source = json.dumps([container.attrs.get('Image'), changes, digests])
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+def prune_build_base_images(client, kept=BUILD_BASE_IMAGES_KEPT):
+    """
+    Remove old committed build base images. Images that are in use (by containers or model images) are kept
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param kept: (Optional) number of newest images which are not removed
+    :type kept: int
+    :return: list[str] -- ids of removed images
+    """
+    images = sorted(client.images.list(filters={'label': BUILD_BASE_FINGERPRINT_LABEL}),
+                    key=lambda image: image.attrs.get('Created', ''), reverse=True)
+    removed = []
+
+    for image in images[kept:]:
+        try:
+            client.images.remove(image.id)
+        except docker.errors.APIError as remove_error:
+            LOGGER.debug('Build base image %s has not been removed: %s', image.id, remove_error)
+        else:
+            removed.append(image.id)
+
+    if removed:
+        LOGGER.info('Old build base images have been removed: %s', ', '.join(removed))
+
+    return removed
+
+
+def get_build_base_image(client, container_id=None, ignored_paths=BUILD_BASE_IGNORED_PATHS):
+    """
+    Get image of container to build model image from. Container is committed only if its filesystem has been
+    changed since previous commit, otherwise previously committed image is used (so docker cache of
+    next layers is valid). Contents of changed paths can be compared only for current container,
+    other containers are always committed
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param container_id: (Optional) id of target container. Current if None
+    :type container_id: str
+    :param ignored_paths: (Optional) paths, changes in which are ignored
+    :type ignored_paths: typing.Iterable[str]
+    :return: str -- docker image id
+    """
+    root = None
+    if not container_id:
+        container_id = get_current_docker_container_id()
+        root = CURRENT_CONTAINER_ROOT
+
+    fingerprint = get_container_fingerprint(client.containers.get(container_id), ignored_paths, root)
+    if fingerprint:
+        images = client.images.list(filters={'label': '{}={}'.format(BUILD_BASE_FINGERPRINT_LABEL, fingerprint)})
+        if images:
+            LOGGER.info('Container %s has not been changed, using image %s', container_id, images[0].id)
+            return images[0].id
+
+    image_id = commit_image(client, container_id, labels={BUILD_BASE_FINGERPRINT_LABEL: fingerprint or ''})
+    prune_build_base_images(client)
+    return image_id
+
+
 def get_docker_log_line_content(log_line):
     """
     Get string from Docker log line object
@@ -142,9 +303,7 @@ def _check_python_packages() -> None:
     """
     LOGGER.info('Checking package state')
 
-    installed_packages = set(get_installed_packages())
-    requirements = set(get_list_of_requirements())
-    missed_packages = requirements - installed_packages
+    missed_packages = get_missed_requirements()
 
     if missed_packages:
         missed_packages_requirements_list = ['{}=={}'.format(name, version)
@@ -152,42 +311,144 @@ def _check_python_packages() -> None:
         raise Exception('Some packages are missed: {}'.format(', '.join(missed_packages_requirements_list)))
 
 
-def _copy_model_files(working_directory: str, model_file: str, target_model_file: str) -> None:
+def _normalize_build_context_item(tar_info):
     """
-    Copy model files to the workspace
+    Reset ownership of build context item, so docker cache does not depend on user that runs build
 
-    :param working_directory: working directory
-    :param model_file: a serialized model file
-    :param target_model_file: path to the target model file location
+    :param tar_info: item of build context
+    :type tar_info: tarfile.TarInfo
+    :return: tarfile.TarInfo -- normalized item
+    """
+    tar_info.uid = tar_info.gid = 0
+    tar_info.uname = tar_info.gname = ''
+    return tar_info
+
+
+def get_workspace_manifest(workspace_path):
+    """
+    Get digests of all items of workspace
+
+    :param workspace_path: path to model workspace
+    :type workspace_path: str
+    :return: dict[str, str] -- digests by paths relative to workspace
+    """
+    manifest = {}
+    for directory, directory_names, file_names in os.walk(workspace_path):
+        for name in directory_names + file_names:
+            path = os.path.join(directory, name)
+            manifest[os.path.relpath(path, workspace_path)] = get_path_digest(path)
+
+    return manifest
+
+
+def get_previous_build(client, manifest_path, workspace_path, model_id, workspace_manifest):
+    """
+    Find image of previous build of workspace, which workspace can be reused by next build
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param manifest_path: path to manifest of previous build
+    :type manifest_path: str
+    :param workspace_path: path to model workspace
+    :type workspace_path: str
+    :param model_id: model id
+    :type model_id: str
+    :param workspace_manifest: digests of current workspace items
+    :type workspace_manifest: dict[str, str]
+    :return: tuple[typing.Optional[str], typing.Optional[list[str]]] -- previous image id and changed workspace items
+             or (None, None) if whole workspace has to be sent
     """
     try:
-        LOGGER.info('Copying model binary from {!r} to {!r}'
-                    .format(model_file, target_model_file))
-        copy_file(model_file, target_model_file)
-    except Exception as model_binary_copy_exception:
-        LOGGER.exception('Unable to move model binary to persistent location',
-                         exc_info=model_binary_copy_exception)
-        raise
+        with open(manifest_path) as stream:
+            previous = json.load(stream)
+    except (OSError, ValueError):
+        return None, None
+
+    if previous.get('workspace') != workspace_path or previous.get('model_id') != model_id:
+        return None, None
+
+    previous_items = previous.get('items', {})
+    # Items cannot be removed from workspace of previous image, so whole workspace is sent in that case
+    if set(previous_items) - set(workspace_manifest):
+        return None, None
 
     try:
-        LOGGER.info('Copying model workspace from {!r} to {!r}'.format(working_directory, MODEL_TARGET_WORKSPACE))
-        copy_directory_contents(working_directory, MODEL_TARGET_WORKSPACE)
-    except Exception as model_workspace_copy_exception:
-        LOGGER.exception('Unable to move model workspace to persistent location',
-                         exc_info=model_workspace_copy_exception)
-        raise
+        client.images.get(previous.get('image'))
+    except docker.errors.NotFound:
+        return None, None
 
+    changed_items = [item for item, digest in workspace_manifest.items() if previous_items.get(item) != digest]
+    return previous['image'], changed_items
 
-def prepare_build(working_directory: str, model_id: str, model_file: str) -> None:
+
+def save_build_manifest(manifest_path, image_id, workspace_path, model_id, workspace_manifest):
+    """
+    Save manifest of built image, so next build can send only changed items of workspace
+
+    :param manifest_path: path to manifest
+    :type manifest_path: str
+    :param image_id: id of built image
+    :type image_id: str
+    :param workspace_path: path to model workspace
+    :type workspace_path: str
+    :param model_id: model id
+    :type model_id: str
+    :param workspace_manifest: digests of workspace items
+    :type workspace_manifest: dict[str, str]
+    :return: None
     """
-    Execute some actions before building image
+    try:
+        with open(manifest_path, 'w') as stream:
+            json.dump({'image': image_id, 'workspace': workspace_path, 'model_id': model_id,
+                       'items': workspace_manifest}, stream)
+    except OSError as write_error:
+        LOGGER.warning('Cannot save build manifest to %s: %s', manifest_path, write_error)
+
 
-    :param working_directory: working directory
+def write_build_context(context_file, dockerfile_content, additional_directory, workspace_path, model_file, model_id,
+                        workspace_items=None):
+    """
+    Write docker build context (tar archive) with files of workspace and model binary.
+    Files are read from workspace directly, so nothing is copied to the container filesystem
+
+    :param context_file: target file object
+    :param dockerfile_content: content of Dockerfile
+    :type dockerfile_content: str
+    :param additional_directory: directory with additional files (placed to root of context)
+    :type additional_directory: str
+    :param workspace_path: path to model workspace (placed to workspace/)
+    :type workspace_path: str
+    :param model_file: path to model binary (placed to model/<model id>)
+    :type model_file: str
     :param model_id: model id
-    :param model_file: path to model file (in the temporary directory)
-    :return: docker.models.Image
+    :type model_id: str
+    :param workspace_items: (Optional) paths of workspace items relative to workspace to add, whole workspace if None
+    :type workspace_items: list[str]
+    :return: None
     """
-    _copy_model_files(working_directory, model_file, os.path.join(working_directory, model_id))
+    with tarfile.open(fileobj=context_file, mode='w') as context:
+        for name in sorted(os.listdir(additional_directory)):
+            context.add(os.path.join(additional_directory, name), arcname=name, filter=_normalize_build_context_item)
+
+        dockerfile_bytes = dockerfile_content.encode('utf-8')
+        dockerfile_info = tarfile.TarInfo('Dockerfile')
+        dockerfile_info.size = len(dockerfile_bytes)
+        dockerfile_info.mode = 0o644
+        context.addfile(dockerfile_info, io.BytesIO(dockerfile_bytes))
+
+        if workspace_items is None:
+            context.add(workspace_path, arcname=BUILD_CONTEXT_WORKSPACE, filter=_normalize_build_context_item)
+        else:
+            context.add(workspace_path, arcname=BUILD_CONTEXT_WORKSPACE, recursive=False,
+                        filter=_normalize_build_context_item)
+            for item in sorted(workspace_items):
+                context.add(os.path.join(workspace_path, item), arcname='{}/{}'.format(BUILD_CONTEXT_WORKSPACE, item),
+                            recursive=False, filter=_normalize_build_context_item)
+
+        context.add(model_file, arcname='{}/{}'.format(BUILD_CONTEXT_MODEL, model_id),
+                    filter=_normalize_build_context_item)
+
+    context_file.seek(0)
 
 
 def build_docker_image(client: docker.client.DockerClient, params: ModelBuildParameters,
@@ -218,54 +479,52 @@ def build_docker_image(client: docker.client.DockerClient, params: ModelBuildPar
 
     image_labels = generate_docker_labels_for_image(params.model_file, model_id)
 
-    prepare_build(workspace_path, model_id, params.model_file)
+    # Filesystem modifications of container below this line are ignored
+    base_image_id = get_build_base_image(client, container_id,
+                                         BUILD_BASE_IGNORED_PATHS + (workspace_path, params.model_file))
 
-    with utils.TemporaryFolder('legion-docker-build') as temp_directory:
-        target_model_file = os.path.join(MODEL_TARGET_WORKSPACE, model_id)
+    if workspace_path.count(os.path.sep) > 1:
+        symlink_holder = os.path.abspath(os.path.join(workspace_path, os.path.pardir))
+    else:
+        symlink_holder = '/'
 
-        # Copy additional files for docker build
-        additional_directory = os.path.abspath(os.path.join(
-            os.path.dirname(__file__),
-            '..', 'templates', 'docker_files'
-        ))
-        utils.copy_directory_contents(additional_directory, temp_directory.path)
+    # Remove old workspace (if exists), create path to old workspace's parent, create symlink
+    symlink_create_command = 'rm -rf "{0}" && mkdir -p "{1}" && ln -s "{2}" "{0}"'.format(
+        workspace_path,
+        symlink_holder,
+        MODEL_TARGET_WORKSPACE
+    )
+    LOGGER.info('Executing %s', symlink_create_command)
 
-        # ALL Filesystem modification below next line would be ignored
-        captured_image_id = commit_image(client, container_id)
+    # Workspace of previous build is reused, so build context contains only changed items of workspace
+    workspace_manifest = get_workspace_manifest(workspace_path)
+    previous_image_id, workspace_items = get_previous_build(client, BUILD_WORKSPACE_MANIFEST, workspace_path,
+                                                            model_id, workspace_manifest)
+    if previous_image_id:
+        LOGGER.info('Reusing workspace of image %s, changed items: %d', previous_image_id, len(workspace_items))
 
-        if workspace_path.count(os.path.sep) > 1:
-            symlink_holder = os.path.abspath(os.path.join(workspace_path, os.path.pardir))
-        else:
-            symlink_holder = '/'
-
-        # Remove old workspace (if exists), create path to old workspace's parent, create symlink
-        symlink_create_command = 'rm -rf "{0}" && mkdir -p "{1}" && ln -s "{2}" "{0}"'.format(
-            workspace_path,
-            symlink_holder,
-            MODEL_TARGET_WORKSPACE
-        )
-        LOGGER.info('Executing %s', symlink_create_command)
-
-        docker_file_content = utils.render_template('Dockerfile.tmpl', {
-            'MODEL_PORT': config.LEGION_PORT,
-            'DOCKER_BASE_IMAGE_ID': captured_image_id,
-            'MODEL_ID': model_id,
-            'MODEL_FILE': target_model_file,
-            'CREATE_SYMLINK_COMMAND': symlink_create_command
-        })
-
-        labels = {k: str(v) if v else None
-                  for (k, v) in image_labels.items()}
-
-        with open(os.path.join(temp_directory.path, 'Dockerfile'), 'w') as file:
-            file.write(docker_file_content)
-
-        LOGGER.info('Building docker image in folder {}'.format(temp_directory.path))
+    docker_file_content = generate_dockerfile(base_image_id, previous_image_id, model_id, symlink_create_command)
+
+    labels = {k: str(v) if v else None
+              for (k, v) in image_labels.items()}
+
+    # Additional files for docker build
+    additional_directory = os.path.abspath(os.path.join(
+        os.path.dirname(__file__),
+        '..', 'templates', 'docker_files'
+    ))
+
+    with tempfile.TemporaryFile(prefix='legion-docker-build') as context_file:
+        write_build_context(context_file, docker_file_content, additional_directory,
+                            workspace_path, params.model_file, model_id, workspace_items)
+
+        LOGGER.info('Building docker image from workspace {}'.format(workspace_path))
         try:
+            # Layers are cached by docker: only changed workspace and model binary are rebuilt
             image, _ = client.images.build(
                 tag=local_image_tag,
-                nocache=True,
-                path=temp_directory.path,
+                fileobj=context_file,
+                custom_context=True,
                 rm=True,
                 labels=labels
             )
@@ -277,9 +536,37 @@ def build_docker_image(client: docker.client.DockerClient, params: ModelBuildPar
                 LOGGER.error(get_docker_log_line_content(log_line))
             raise
 
+        save_build_manifest(BUILD_WORKSPACE_MANIFEST, image.id, workspace_path, model_id, workspace_manifest)
         return image
 
 
+def generate_dockerfile(base_image_id, previous_image_id, model_id, symlink_create_command):
+    """
+    Render Dockerfile of model image
+
+    :param base_image_id: ID of build base image
+    :type base_image_id: str
+    :param previous_image_id: (Optional) ID of image of previous build, its workspace is reused
+    :type previous_image_id: str
+    :param model_id: model ID
+    :type model_id: str
+    :param symlink_create_command: command which links original workspace path to image workspace
+    :type symlink_create_command: str
+    :return: str -- Dockerfile content
+    """
+    return utils.render_template('Dockerfile.tmpl', {
+        'MODEL_PORT': config.LEGION_PORT,
+        'DOCKER_BASE_IMAGE_ID': base_image_id,
+        'PREVIOUS_IMAGE_ID': previous_image_id,
+        'MODEL_ID': model_id,
+        'MODEL_FILE': os.path.join(MODEL_TARGET_DIRECTORY, model_id),
+        'MODEL_TARGET_WORKSPACE': MODEL_TARGET_WORKSPACE,
+        'CREATE_SYMLINK_COMMAND': symlink_create_command,
+        'BUILD_CONTEXT_WORKSPACE': BUILD_CONTEXT_WORKSPACE,
+        'BUILD_CONTEXT_MODEL': BUILD_CONTEXT_MODEL
+    })
+
+
 def generate_docker_labels_for_image(model_file, model_id):
     """
     Generate docker image labels from model file
@@ -321,9 +608,118 @@ def generate_docker_labels_for_container(image):
     return image.labels
 
 
-def push_image_to_registry(client, image, external_image_name):
+class ImagePushProgress:
+    """
+    Progress of docker image push (by layer)
     """
-    Push docker image to registry
+
+    def __init__(self, image):
+        """
+        Build empty progress
+
+        :param image: name of image
+        :type image: str
+        """
+        self._image = image
+        self.layers = {}
+        self._logged_percents = {}
+        self.digest = None
+
+    @property
+    def skipped_layers(self):
+        """
+        Get layers which have been found in registry
+
+        :return: list[str] -- layer ids
+        """
+        return sorted(layer for layer, status in self.layers.items() if status == PUSH_STATUS_LAYER_EXISTS)
+
+    @property
+    def pushed_layers(self):
+        """
+        Get layers which have been uploaded to registry
+
+        :return: list[str] -- layer ids
+        """
+        return sorted(layer for layer, status in self.layers.items() if status == PUSH_STATUS_PUSHED)
+
+    def handle_event(self, event):
+        """
+        Update progress with event from docker push stream
+
+        :param event: decoded event of docker push stream
+        :type event: dict
+        :return: None
+        """
+        if 'error' in event:
+            error = event['error']
+            retriable = any(marker in error.lower() for marker in PUSH_RETRIABLE_ERROR_MARKERS)
+            raise ImagePushException('Cannot push image {}: {}'.format(self._image, error), retriable)
+
+        if 'aux' in event:
+            self.digest = event['aux'].get('Digest')
+            return
+
+        layer, status = event.get('id'), event.get('status')
+        if not layer or not status:
+            return
+
+        if status == PUSH_STATUS_PUSHING:
+            progress = event.get('progressDetail') or {}
+            if progress.get('total'):
+                percent = int(progress.get('current', 0) * 100 / progress['total'])
+                step = percent - percent % PUSH_PROGRESS_LOG_STEP
+                if step > self._logged_percents.get(layer, -1):
+                    self._logged_percents[layer] = step
+                    LOGGER.info('Pushing layer {} of {}: {}% of {} bytes'
+                                .format(layer, self._image, percent, progress['total']))
+        elif self.layers.get(layer) != status:
+            LOGGER.info('Layer {} of {}: {}'.format(layer, self._image, status))
+
+        self.layers[layer] = status
+
+
+def _push_image(client, image_and_registry, version, auth_config):
+    """
+    Push image to registry once, streaming progress
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param image_and_registry: image name with registry
+    :type image_and_registry: str
+    :param version: image tag
+    :type version: str
+    :param auth_config: registry credentials
+    :type auth_config: dict or None
+    :return: :py:class:`legion.sdk.containers.docker.ImagePushProgress` -- progress of finished push
+    """
+    progress = ImagePushProgress('{}:{}'.format(image_and_registry, version))
+    for event in client.images.push(image_and_registry, tag=version, auth_config=auth_config,
+                                    stream=True, decode=True):
+        progress.handle_event(event)
+
+    return progress
+
+
+def _is_retriable_push_error(exception):
+    """
+    Check if failed push can be retried (failure is caused by connection problem or registry server error)
+
+    :param exception: push failure
+    :type exception: Exception
+    :return: bool -- can push be retried
+    """
+    if isinstance(exception, ImagePushException):
+        return exception.retriable
+    if isinstance(exception, docker.errors.APIError):
+        return exception.is_server_error()
+    return isinstance(exception, PUSH_RETRIABLE_EXCEPTIONS)
+
+
+def push_image_to_registry(client, image, external_image_name, retries=PUSH_RETRIES):
+    """
+    Push docker image to registry. Progress of layers upload is logged, push failed because of connection problem
+    or registry server error is retried with backoff (layers which have already been pushed are skipped by registry)
 
     :param client: Docker client
     :type client: :py:class:`docker.client.DockerClient`
@@ -331,8 +727,13 @@ def push_image_to_registry(client, image, external_image_name):
     :type image: :py:class:`docker.models.images.Image`
     :param external_image_name: target Docker image name (with repository)
     :type external_image_name: str
-    :return: None
+    :param retries: (Optional) count of push attempts
+    :type retries: int
+    :return: :py:class:`legion.sdk.containers.docker.ImagePushProgress` -- progress of finished push
     """
+    if retries < 1:
+        raise ValueError('Count of push attempts should be positive, got {}'.format(retries))
+
     docker_registry = external_image_name
     version = None
 
@@ -363,12 +764,29 @@ def push_image_to_registry(client, image, external_image_name):
     image.tag(image_and_registry, version)
     LOGGER.info('Pushing {}:{} to {}'.format(image_and_registry, version, registry))
 
-    client.images.push(image_and_registry, tag=version, auth_config=auth_config)
-    LOGGER.info('Successfully pushed image {}:{}'.format(image_and_registry, version))
+    delay = PUSH_RETRY_INITIAL_DELAY
+    for attempt in range(1, retries + 1):
+        try:
+            progress = _push_image(client, image_and_registry, version, auth_config)
+            break
+        except Exception as push_exception:
+            if attempt == retries or not _is_retriable_push_error(push_exception):
+                raise
+
+            LOGGER.warning('Attempt {} of {} to push image has failed: {}. Retrying in {}s'
+                           .format(attempt, retries, push_exception, delay))
+            time.sleep(delay)
+            delay *= PUSH_RETRY_BACKOFF_FACTOR
+
+    LOGGER.info('Successfully pushed image {}:{} (digest {}): {} layers pushed, {} layers already existed'
+                .format(image_and_registry, version, progress.digest,
+                        len(progress.pushed_layers), len(progress.skipped_layers)))
 
     image_with_version = '{}/{}:{}'.format(registry, image_name, version)
     utils.send_header_to_stderr(headers.IMAGE_TAG_EXTERNAL, image_with_version)
 
+    return progress
+
 
 def build_model_docker_image(params: ModelBuildParameters, container_id: typing.Optional[str] = None) -> str:
     """
@@ -32,3 +32,22 @@ class IncompatibleLegionModelDockerImage(Exception):
         """
         self.message = message
         super().__init__('Incompatible Legion image: {!r}'.format(self.message))
+
+
+class ImagePushException(Exception):
+    """
+    Exception occurs when Docker daemon reports error in image push stream
+    """
+
+    def __init__(self, message, retriable):
+        """
+        Build exception instance
+
+        :param message: description
+        :type message: str
+        :param retriable: is error caused by connection problem or registry server error
+        :type retriable: bool
+        """
+        self.message = message
+        self.retriable = retriable
+        super().__init__(message)
@@ -16,10 +16,15 @@
 """
 legion k8s functions
 """
+import concurrent.futures
 import logging
+import threading
+import time
+import typing
 
 import docker
 import docker.errors
+import requests
 
 from legion.sdk import config
 from legion.sdk import definitions
@@ -29,8 +34,95 @@ from legion.sdk.containers.exceptions import IncompatibleLegionModelDockerImage
 
 LOGGER = logging.getLogger(__name__)
 
+LOCAL_HEALTH_CHECK_URL = 'http://localhost:{port}/healthcheck'
+LOCAL_HEALTH_CHECK_TIMEOUT = 2
+LOCAL_HEALTH_CHECK_PARALLELISM = 10
+# Time during which found host port of local model is reused
+LOCAL_MODEL_PORT_CACHE_TTL = 10
+# Model readiness is polled with exponential backoff (delays in seconds)
+LOCAL_READINESS_TIMEOUT = 120
+LOCAL_READINESS_INITIAL_DELAY = 0.1
+LOCAL_READINESS_MAX_DELAY = 2
+LOCAL_READINESS_BACKOFF_FACTOR = 2
+
+LocalModelDeployment = typing.NamedTuple('LocalModelDeployment', [
+    ('name', str),
+    ('image', str),
+    ('local_port', int),
+])
+
+_MODEL_PORTS_LOCK = threading.Lock()
+# (model id, model version) -> (host port, found at)
+_MODEL_PORTS_CACHE = {}
+
+
+def _list_model_containers(client, name=None, model_id=None, model_version=None):
+    """
+    Get summaries of running model containers. Containers are filtered by docker daemon
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param name: name of deployment
+    :type name: str
+    :param model_id: model id or */None for all models
+    :type model_id: str or None
+    :param model_version: (Optional) model version or */None for all
+    :type model_version: str or None
+    :return: list[dict] -- container summaries
+    """
+    label_filters = []
+    for label, value in ((headers.DOMAIN_MODEL_ID, model_id), (headers.DOMAIN_MODEL_VERSION, model_version)):
+        label_filters.append(label if value in (None, '*') else '{}={}'.format(label, value))
+
+    filters = {'label': label_filters}
+    if name:
+        filters['name'] = name
+
+    containers = client.api.containers(filters=filters)
+
+    # Name filter of docker daemon matches substrings, so matches are checked once again
+    return [
+        container
+        for container in containers
+        if (not name or '/{}'.format(name) in (container.get('Names') or []))
+        and model_id in (None, '*', (container.get('Labels') or {}).get(headers.DOMAIN_MODEL_ID))
+        and model_version in (None, '*', (container.get('Labels') or {}).get(headers.DOMAIN_MODEL_VERSION))
+    ]
+
+
+def _get_model_image_tags(client):
+    """
+    Get tags of all local model images
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :return: dict[str, list[str]] -- image tags by image ID
+    """
+    return {
+        image['Id']: [tag for tag in image.get('RepoTags') or [] if tag != '<none>:<none>']
+        for image in client.api.images(filters={'label': headers.DOMAIN_MODEL_ID})
+    }
+
+
+def _check_local_model_health(local_port):
+    """
+    Check that local model API is responding
+
+    :param local_port: host port of model
+    :type local_port: int or None
+    :return: bool -- is model API healthy
+    """
+    if not local_port:
+        return False
 
-def get_models(client, name=None, model_id=None, model_version=None):
+    try:
+        return requests.get(LOCAL_HEALTH_CHECK_URL.format(port=local_port), timeout=LOCAL_HEALTH_CHECK_TIMEOUT).ok
+    except requests.exceptions.RequestException as health_check_exception:
+        LOGGER.debug('Health check of model on port {} has failed: {}'.format(local_port, health_check_exception))
+        return False
+
+
+def get_models(client, name=None, model_id=None, model_version=None, check_health=False):
     """
     Get models that fit match criterions (model id and model version, model id may be *, model version may be *)
 
@@ -42,43 +134,92 @@ def get_models(client, name=None, model_id=None, model_version=None):
     :type model_id: str or None
     :param model_version: (Optional) model version or */None for all
     :type model_version: str or None
+    :param check_health: (Optional) check health of models API (concurrently)
+    :type check_health: bool
     :return: list[:py:class:`legion.k8s.ModelService`] -- founded model services
     """
-    # Gather all deployments (valid)
-    containers = [container
-                  for container in client.containers.list()
-                  if container.labels
-                  and headers.DOMAIN_MODEL_ID in container.labels
-                  and headers.DOMAIN_MODEL_VERSION in container.labels
+    containers = _list_model_containers(client, name, model_id, model_version)
+    if not containers:
+        return []
+
+    health = [None] * len(containers)
+    if check_health:
+        ports = [container_definitions.get_container_summary_port(container, config.LEGION_PORT)
+                 for container in containers]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(ports), LOCAL_HEALTH_CHECK_PARALLELISM),
+                                                   thread_name_prefix='health-check') as executor:
+            health = list(executor.map(_check_local_model_health, ports))
+
+    image_tags = _get_model_image_tags(client)
+    prepared_containers = [
+        container_definitions.ModelDeploymentDescription.build_from_docker_container_summary(
+            container, image_tags, model_api_ok=healthy
+        )
+        for container, healthy in zip(containers, health)
     ]
 
-    # First - filter by deployment name, if it exist
-    if name:
-        containers = [
-            container
-            for container in containers
-            if container.name == name
-        ]
-
-    # Next - filter by model_id & model_version, it they are present
-    if model_id or model_version:
-        containers = [container
-                      for container in containers
-                      if model_id in (None, '*', container.labels[headers.DOMAIN_MODEL_ID])
-                      and model_version in (None, '*', container.labels[headers.DOMAIN_MODEL_VERSION])
-                      ]
-
-    prepared_containers = []
-
-    for container in containers:
-        prepared_containers.append(
-            container_definitions.ModelDeploymentDescription.build_from_docker_container_info(
-                container
-            ))
-
     return sorted(prepared_containers, key=lambda ms: ms.deployment_name)
 
 
+def get_model_port(client, model_id, model_version, use_cache=True):
+    """
+    Get host port of locally deployed model. Found port is cached for LOCAL_MODEL_PORT_CACHE_TTL seconds
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param model_id: model id
+    :type model_id: str
+    :param model_version: model version
+    :type model_version: str
+    :param use_cache: (Optional) use cached port
+    :type use_cache: bool
+    :return: int -- host port
+    """
+    key = model_id, model_version
+
+    if use_cache:
+        with _MODEL_PORTS_LOCK:
+            cached = _MODEL_PORTS_CACHE.get(key)
+        if cached and time.monotonic() - cached[1] < LOCAL_MODEL_PORT_CACHE_TTL:
+            return cached[0]
+
+    containers = client.api.containers(filters={
+        'label': [f'{definitions.LEGION_COMPONENT_LABEL}.model_id={model_id}',
+                  f'{definitions.LEGION_COMPONENT_LABEL}.model_version={model_version}']
+    })
+
+    if not containers:
+        raise ValueError(
+            f'Can not find container with {model_id} model id and {model_version} model version labels')
+
+    if len(containers) > 1:
+        raise ValueError(
+            f'Find multiple containers with {model_id} model id and {model_version} model version labels')
+
+    model_port = container_definitions.get_container_summary_port(containers[0], config.LEGION_PORT)
+    if not model_port:
+        raise ValueError(f'Can not find exposed port of model container {containers[0]["Id"]}')
+
+    with _MODEL_PORTS_LOCK:
+        _MODEL_PORTS_CACHE[key] = model_port, time.monotonic()
+
+    return model_port
+
+
+def invalidate_model_port(model_id, model_version):
+    """
+    Drop cached host port of locally deployed model
+
+    :param model_id: model id
+    :type model_id: str
+    :param model_version: model version
+    :type model_version: str
+    :return: None
+    """
+    with _MODEL_PORTS_LOCK:
+        _MODEL_PORTS_CACHE.pop((model_id, model_version), None)
+
+
 def get_models_strict(client, name=None, model_id=None, model_version=None, ignore_not_found=False):
     """
     Get models that fit match criterions (model id and model version, model id may be *, model version may be *)
@@ -116,19 +257,15 @@ def get_models_strict(client, name=None, model_id=None, model_version=None, igno
     return model_services
 
 
-def deploy_model(client, name, image, local_port=0):
+def get_or_pull_image(client, image):
     """
-    Deploy legion image locally
+    Get local docker image, image is pulled if it can not be found locally
 
     :param client: Docker client
     :type client: :py:class:`docker.client.DockerClient`
-    :param name: name of deployment
-    :type name: str
-    :param image: Docker image to deploy
+    :param image: Docker image
     :type image: str
-    :param local_port: port to deploy on
-    :type local_port: int
-    :return: list[:py:class:`legion.k8s.ModelService`] -- affected model services
+    :return: :py:class:`docker.models.images.Image` -- docker image
     """
     LOGGER.debug('Trying to find image {}'.format(image))
     try:
@@ -139,6 +276,84 @@ def deploy_model(client, name, image, local_port=0):
         docker_image = client.images.pull(image)
         LOGGER.debug('Image {} has been pulled'.format(image))
 
+    return docker_image
+
+
+def pull_images(client, images, parallelism=None):
+    """
+    Pull docker images (that can not be found locally) in parallel
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param images: Docker images
+    :type images: list[str]
+    :param parallelism: (Optional) count of parallel pulls, LOCAL_DEPLOY_PARALLEL_OPERATIONS by default
+    :type parallelism: int
+    :return: dict[str, :py:class:`docker.models.images.Image`] -- docker images by image names
+    """
+    images = list(dict.fromkeys(images))
+    if not images:
+        return {}
+
+    parallelism = min(len(images), parallelism or config.LOCAL_DEPLOY_PARALLEL_OPERATIONS)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='image-pull') as executor:
+        return dict(zip(images, executor.map(lambda image: get_or_pull_image(client, image), images)))
+
+
+def wait_for_model_ready(client, container, timeout=LOCAL_READINESS_TIMEOUT):
+    """
+    Wait until model API in local container passes health check.
+    Health check is polled with exponential backoff
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param container: model container
+    :type container: :py:class:`docker.models.containers.Container`
+    :param timeout: (Optional) timeout in seconds
+    :type timeout: float
+    :return: float -- time (in seconds) since start of waiting till model readiness
+    """
+    start = time.monotonic()
+    delay = LOCAL_READINESS_INITIAL_DELAY
+
+    while True:
+        # Container is removed on stop, so it disappears from list if model has failed to start
+        container_summary = next(iter(client.api.containers(filters={'id': container.id})), None)
+        if not container_summary:
+            raise Exception('Container {} has stopped before model became ready'.format(container.id))
+
+        local_port = container_definitions.get_container_summary_port(container_summary, config.LEGION_PORT)
+        if _check_local_model_health(local_port):
+            return time.monotonic() - start
+
+        elapsed = time.monotonic() - start
+        if elapsed >= timeout:
+            raise Exception('Model in container {} has not become ready in {}s'.format(container.id, timeout))
+
+        time.sleep(min(delay, timeout - elapsed))
+        delay = min(delay * LOCAL_READINESS_BACKOFF_FACTOR, LOCAL_READINESS_MAX_DELAY)
+
+
+def deploy_model(client, name, image, local_port=0, wait_ready=False, ready_timeout=LOCAL_READINESS_TIMEOUT):
+    """
+    Deploy legion image locally
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param name: name of deployment
+    :type name: str
+    :param image: Docker image to deploy
+    :type image: str
+    :param local_port: port to deploy on
+    :type local_port: int
+    :param wait_ready: (Optional) wait until model API passes health check
+    :type wait_ready: bool
+    :param ready_timeout: (Optional) timeout of waiting for model readiness in seconds
+    :type ready_timeout: float
+    :return: list[:py:class:`legion.k8s.ModelService`] -- affected model services
+    """
+    docker_image = get_or_pull_image(client, image)
+
     model_id = docker_image.labels.get(headers.DOMAIN_MODEL_ID)
     model_version = docker_image.labels.get(headers.DOMAIN_MODEL_VERSION)
 
@@ -171,7 +386,45 @@ def deploy_model(client, name, image, local_port=0):
                                       remove=True)
     LOGGER.debug('Container {} has been stared'.format(container.id))
 
-    return get_models(client, name)
+    if wait_ready:
+        ready_time = wait_for_model_ready(client, container, ready_timeout)
+        LOGGER.info('Model deployment {} has become ready in {:.2f}s'.format(name, ready_time))
+
+    return get_models(client, name, check_health=wait_ready)
+
+
+def deploy_models(client, deployments, wait_ready=False, ready_timeout=LOCAL_READINESS_TIMEOUT, parallelism=None):
+    """
+    Deploy legion images locally in parallel. Images are pulled before start of any container
+
+    :param client: Docker client
+    :type client: :py:class:`docker.client.DockerClient`
+    :param deployments: deployments to create
+    :type deployments: list[:py:class:`legion.sdk.containers.local_deploy.LocalModelDeployment`]
+    :param wait_ready: (Optional) wait until models API pass health check
+    :type wait_ready: bool
+    :param ready_timeout: (Optional) timeout of waiting for readiness of each model in seconds
+    :type ready_timeout: float
+    :param parallelism: (Optional) count of parallel operations, LOCAL_DEPLOY_PARALLEL_OPERATIONS by default
+    :type parallelism: int
+    :return: list[:py:class:`legion.k8s.ModelService`] -- affected model services
+    """
+    if not deployments:
+        return []
+
+    pull_images(client, [deployment.image for deployment in deployments], parallelism)
+
+    parallelism = min(len(deployments), parallelism or config.LOCAL_DEPLOY_PARALLEL_OPERATIONS)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=parallelism, thread_name_prefix='local-deploy') as executor:
+        futures = [executor.submit(deploy_model, client, deployment.name, deployment.image, deployment.local_port,
+                                   wait_ready, ready_timeout)
+                   for deployment in deployments]
+
+    affected_models = []
+    for future in futures:
+        affected_models.extend(future.result())
+
+    return sorted(affected_models, key=lambda ms: ms.deployment_name)
 
 
 def undeploy_model(client, name, model_id, model_version, ignore_not_found):
@@ -192,8 +445,8 @@ def undeploy_model(client, name, model_id, model_version, ignore_not_found):
     """
     target_deployments = get_models_strict(client, name, model_id, model_version, ignore_not_found)
     for deployment in target_deployments:
-        container = client.containers.get(deployment.container_id)
-        container.stop()
+        client.api.stop(deployment.container_id)
+        invalidate_model_port(deployment.model, deployment.version)
 
     return target_deployments
 
@@ -0,0 +1,671 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Load testing of model API with declarative scenarios
+"""
+import concurrent.futures
+import datetime
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import typing
+
+import requests
+import yaml
+
+from legion.sdk.clients.model import ModelClient
+
+LOGGER = logging.getLogger(__name__)
+
+LOADTEST_CONCURRENCY = 16
+LOADTEST_TIMEOUT = 10
+LOADTEST_SEED = 0
+LOADTEST_WARMUP_REQUESTS = 0
+
+HISTOGRAM_SIGNIFICANT_DIGITS = 3
+MICROSECONDS_IN_SECOND = 1000000
+SUMMARY_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+REGRESSION_TOLERANCE = 0.1
+REGRESSION_ERROR_RATE_TOLERANCE = 0.01
+# Latency differences below this value are noise and never regressions
+REGRESSION_MIN_LATENCY_DIFFERENCE_MS = 1
+REGRESSION_PERCENTILES = ('p50', 'p95', 'p99')
+
+Phase = typing.NamedTuple('Phase', [
+    ('rate', float),
+    ('duration', float),
+])
+
+RequestTarget = typing.NamedTuple('RequestTarget', [
+    ('name', str),
+    ('endpoint', typing.Optional[str]),
+    ('weight', float),
+    ('payloads', typing.List[typing.Dict[str, typing.Any]]),
+    ('batch_size', typing.Optional[int]),
+])
+
+Scenario = typing.NamedTuple('Scenario', [
+    ('name', str),
+    ('model_id', typing.Optional[str]),
+    ('model_version', typing.Optional[str]),
+    ('phases', typing.List[Phase]),
+    ('targets', typing.List[RequestTarget]),
+    ('concurrency', int),
+    ('timeout', float),
+    ('seed', int),
+    ('warmup_requests', int),
+])
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with HDR layout: values (in microseconds) are stored in buckets with
+    fixed count of significant digits, so percentiles have bounded relative error for any value range
+    """
+
+    def __init__(self, significant_digits=HISTOGRAM_SIGNIFICANT_DIGITS):
+        """
+        Create empty histogram
+
+        :param significant_digits: (Optional) count of significant decimal digits of recorded values
+        :type significant_digits: int
+        """
+        self.significant_digits = significant_digits
+        self._sub_bucket_bits = int(math.ceil(math.log2(2 * 10 ** significant_digits)))
+        self.counts = {}
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def _get_index(self, value):
+        """
+        Get index of bucket for value
+
+        :param value: value in microseconds
+        :type value: int
+        :return: int -- index of bucket
+        """
+        shift = max(0, value.bit_length() - self._sub_bucket_bits)
+        return (shift << self._sub_bucket_bits) | (value >> shift)
+
+    def _get_value(self, index):
+        """
+        Get value in the middle of bucket
+
+        :param index: index of bucket
+        :type index: int
+        :return: int -- value in microseconds
+        """
+        shift = index >> self._sub_bucket_bits
+        sub_bucket = index & ((1 << self._sub_bucket_bits) - 1)
+        return (sub_bucket << shift) + ((1 << shift) >> 1)
+
+    def record(self, seconds, count=1):
+        """
+        Record latency
+
+        :param seconds: latency in seconds
+        :type seconds: float
+        :param count: (Optional) count of occurrences
+        :type count: int
+        :return: None
+        """
+        value = max(0, int(round(seconds * MICROSECONDS_IN_SECOND)))
+        index = self._get_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other):
+        """
+        Add values of other histogram
+
+        :param other: histogram with the same count of significant digits
+        :type other: :py:class:`legion.sdk.loadtest.LatencyHistogram`
+        :return: None
+        """
+        if other.significant_digits != self.significant_digits:
+            raise ValueError('Cannot merge histograms with different precision')
+
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.count:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent):
+        """
+        Get percentile of recorded values
+
+        :param percent: percent, e.g. 99.9
+        :type percent: float
+        :return: float -- value in milliseconds (None if histogram is empty)
+        """
+        if not self.count:
+            return None
+
+        rank = max(1, int(math.ceil(percent / 100 * self.count)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                value = min(max(self._get_value(index), self.min), self.max)
+                return value / 1000
+
+    def summary(self):
+        """
+        Get latency statistics in milliseconds
+
+        :return: dict[str, float] -- min, mean, max and percentiles (p50, p90, p95, p99, p99.9)
+        """
+        if not self.count:
+            return {}
+
+        result = {
+            'min': self.min / 1000,
+            'mean': self.total / self.count / 1000,
+            'max': self.max / 1000,
+        }
+        for percent in SUMMARY_PERCENTILES:
+            result['p{:g}'.format(percent)] = self.percentile(percent)
+        return result
+
+    def to_dict(self):
+        """
+        Get JSON serializable representation of histogram
+
+        :return: dict -- histogram
+        """
+        return {
+            'significant_digits': self.significant_digits,
+            'count': self.count,
+            'total_us': self.total,
+            'min_us': self.min,
+            'max_us': self.max,
+            'counts': {str(index): count for index, count in sorted(self.counts.items())},
+        }
+
+    @staticmethod
+    def from_dict(data):
+        """
+        Build histogram from JSON serializable representation
+
+        :param data: histogram, see :py:meth:`legion.sdk.loadtest.LatencyHistogram.to_dict`
+        :type data: dict
+        :return: :py:class:`legion.sdk.loadtest.LatencyHistogram` -- histogram
+        """
+        histogram = LatencyHistogram(data['significant_digits'])
+        histogram.counts = {int(index): count for index, count in data['counts'].items()}
+        histogram.count = data['count']
+        histogram.total = data['total_us']
+        histogram.min = data['min_us']
+        histogram.max = data['max_us']
+        return histogram
+
+
+def _parse_phases(phases_data):
+    """
+    Parse load phases. Phase is either constant arrival rate or step ramp (expanded to constant rate phases)
+
+    :param phases_data: phases, e.g. [{"rate": 10, "duration": 30},
+                                      {"ramp": {"from": 10, "to": 50, "step": 10, "step_duration": 10}}]
+    :type phases_data: list[dict]
+    :return: list[:py:class:`legion.sdk.loadtest.Phase`] -- constant rate phases
+    """
+    phases = []
+    for phase_data in phases_data:
+        if 'ramp' in phase_data:
+            ramp = phase_data['ramp']
+            start, stop, step = float(ramp['from']), float(ramp['to']), float(ramp['step'])
+            if step <= 0:
+                raise ValueError('Step of ramp should be positive')
+
+            steps = int(math.floor(abs(stop - start) / step)) + 1
+            direction = 1 if stop >= start else -1
+            phases.extend(Phase(start + direction * step * no, float(ramp['step_duration'])) for no in range(steps))
+        else:
+            phases.append(Phase(float(phase_data['rate']), float(phase_data['duration'])))
+
+    for phase in phases:
+        if phase.rate <= 0 or phase.duration <= 0:
+            raise ValueError('Rate and duration of phase should be positive: {!r}'.format(phase))
+
+    if not phases:
+        raise ValueError('Scenario should have at least one phase')
+
+    return phases
+
+
+def _parse_target(target_data, base_path):
+    """
+    Parse request target of scenario
+
+    :param target_data: target, e.g. {"endpoint": "default", "weight": 2, "parameters": {"a": 1}}.
+                        Payloads are set by one of keys: parameters (single invoke), batch (list of parameters),
+                        payload_file (JSON file with list of parameters) or files (parameter names to file paths)
+    :type target_data: dict
+    :param base_path: directory to resolve relative paths of files
+    :type base_path: str
+    :return: :py:class:`legion.sdk.loadtest.RequestTarget` -- request target
+    """
+    endpoint = target_data.get('endpoint')
+    name = target_data.get('name') or endpoint or 'default'
+    batch_size = target_data.get('batch_size')
+
+    if 'batch' in target_data:
+        payloads = list(target_data['batch'])
+        batch_size = batch_size or len(payloads)
+    elif 'payload_file' in target_data:
+        with open(os.path.join(base_path, target_data['payload_file']), 'r') as payload_stream:
+            payloads = json.load(payload_stream)
+        if not isinstance(payloads, list):
+            raise ValueError('Payload file of target {!r} should contain list of parameters'.format(name))
+    else:
+        payload = dict(target_data.get('parameters', {}))
+        for parameter, path in target_data.get('files', {}).items():
+            with open(os.path.join(base_path, path), 'rb') as file_stream:
+                payload[parameter] = file_stream.read()
+        payloads = [payload]
+
+    if not payloads:
+        raise ValueError('Target {!r} does not have payloads'.format(name))
+
+    return RequestTarget(name, endpoint, float(target_data.get('weight', 1)), payloads, batch_size)
+
+
+def parse_scenario(data, base_path='.'):
+    """
+    Parse scenario from dictionary
+
+    :param data: scenario data: name, phases, requests and (optional) model_id, model_version,
+                 concurrency, timeout, seed, warmup_requests
+    :type data: dict
+    :param base_path: (Optional) directory to resolve relative paths of payload files
+    :type base_path: str
+    :return: :py:class:`legion.sdk.loadtest.Scenario` -- scenario
+    """
+    targets = [_parse_target(target_data, base_path) for target_data in data.get('requests', [])]
+    if not targets:
+        raise ValueError('Scenario should have at least one request')
+    if len({target.name for target in targets}) != len(targets):
+        raise ValueError('Names of scenario requests should be unique')
+
+    scenario = Scenario(name=data.get('name', 'default'),
+                        model_id=data.get('model_id'),
+                        model_version=str(data['model_version']) if 'model_version' in data else None,
+                        phases=_parse_phases(data.get('phases', [])),
+                        targets=targets,
+                        concurrency=int(data.get('concurrency', LOADTEST_CONCURRENCY)),
+                        timeout=float(data.get('timeout', LOADTEST_TIMEOUT)),
+                        seed=int(data.get('seed', LOADTEST_SEED)),
+                        warmup_requests=int(data.get('warmup_requests', LOADTEST_WARMUP_REQUESTS)))
+
+    if scenario.concurrency < 1:
+        raise ValueError('Concurrency should be positive')
+
+    return scenario
+
+
+def load_scenario(path):
+    """
+    Load scenario from YAML or JSON file. Paths to payload files are relative to scenario file
+
+    :param path: path to scenario file
+    :type path: str
+    :return: :py:class:`legion.sdk.loadtest.Scenario` -- scenario
+    """
+    with open(path, 'r') as scenario_stream:
+        data = yaml.safe_load(scenario_stream)
+
+    if not isinstance(data, dict):
+        raise ValueError('Scenario file {} should contain dictionary'.format(path))
+
+    return parse_scenario(data, os.path.dirname(os.path.abspath(path)))
+
+
+def build_schedule(scenario):
+    """
+    Build reproducible schedule of requests: constant arrival rate in each phase,
+    targets are chosen by weights with random generator seeded by scenario
+
+    :param scenario: scenario
+    :type scenario: :py:class:`legion.sdk.loadtest.Scenario`
+    :return: list[tuple[float, int, int, list[dict]]] -- offset from start in seconds, phase index,
+             target index and payloads of request
+    """
+    generator = random.Random(scenario.seed)
+    weights = [target.weight for target in scenario.targets]
+    payload_cycles = [itertools.cycle(target.payloads) for target in scenario.targets]
+
+    schedule = []
+    phase_start = 0.0
+    for phase_index, phase in enumerate(scenario.phases):
+        for no in range(int(round(phase.rate * phase.duration))):
+            target_index = generator.choices(range(len(scenario.targets)), weights)[0]
+            target = scenario.targets[target_index]
+            payloads = [next(payload_cycles[target_index]) for _ in range(target.batch_size or 1)]
+            schedule.append((phase_start + no / phase.rate, phase_index, target_index, payloads))
+        phase_start += phase.duration
+
+    return schedule
+
+
+def build_model_client_factory(model_id, model_version, host, token=None, timeout=LOADTEST_TIMEOUT):
+    """
+    Build factory of model clients (one client with HTTP session is built for each worker thread)
+
+    :param model_id: model id
+    :type model_id: str
+    :param model_version: model version
+    :type model_version: str
+    :param host: model server URL
+    :type host: str
+    :param token: (Optional) model API token
+    :type token: str
+    :param timeout: (Optional) request timeout in seconds
+    :type timeout: float
+    :return: Callable[[], :py:class:`legion.sdk.clients.model.ModelClient`] -- factory
+    """
+    def factory():
+        # Failed requests are not retried: retries would hide errors and distort latencies
+        return ModelClient(model_id, model_version, token=token, host=host, http_client=requests.Session(),
+                           timeout=timeout, retries=1, retry_delay=0)
+
+    return factory
+
+
+class _ResultCollector:
+    """
+    Thread safe collector of request latencies
+    """
+
+    def __init__(self, scenario):
+        """
+        Create collector
+
+        :param scenario: scenario
+        :type scenario: :py:class:`legion.sdk.loadtest.Scenario`
+        """
+        self._lock = threading.Lock()
+        self.latency = {target.name: LatencyHistogram() for target in scenario.targets}
+        self.service_time = {target.name: LatencyHistogram() for target in scenario.targets}
+        self.errors = {target.name: 0 for target in scenario.targets}
+        self.phase_latency = [LatencyHistogram() for _ in scenario.phases]
+        self.phase_errors = [0 for _ in scenario.phases]
+        self.first_errors = []
+
+    def add(self, target_name, phase_index, latency, service_time, error):
+        """
+        Add result of request
+
+        :param target_name: name of target
+        :type target_name: str
+        :param phase_index: index of phase
+        :type phase_index: int
+        :param latency: time from scheduled send time to response in seconds
+        :type latency: float
+        :param service_time: time from actual send time to response in seconds
+        :type service_time: float
+        :param error: error of request or None
+        :type error: str
+        :return: None
+        """
+        with self._lock:
+            if error:
+                self.errors[target_name] += 1
+                self.phase_errors[phase_index] += 1
+                if len(self.first_errors) < 10:
+                    self.first_errors.append(error)
+            else:
+                self.latency[target_name].record(latency)
+                self.service_time[target_name].record(service_time)
+                self.phase_latency[phase_index].record(latency)
+
+
+def _send(client, target, payloads):
+    """
+    Send request of target
+
+    :param client: model client
+    :type client: :py:class:`legion.sdk.clients.model.ModelClient`
+    :param target: request target
+    :type target: :py:class:`legion.sdk.loadtest.RequestTarget`
+    :param payloads: parameters of request
+    :type payloads: list[dict]
+    :return: Any -- model response
+    """
+    if target.batch_size:
+        return client.batch(payloads, endpoint=target.endpoint)
+    return client.invoke(endpoint=target.endpoint, **payloads[0])
+
+
+def run_scenario(scenario, client_factory):
+    """
+    Run scenario with open-loop load: requests are sent on schedule regardless of responses.
+    Latency is measured from scheduled send time, so queueing of requests (when all workers are busy)
+    is not hidden (coordinated omission), service time is measured from actual send time
+
+    :param scenario: scenario
+    :type scenario: :py:class:`legion.sdk.loadtest.Scenario`
+    :param client_factory: factory of model clients, it is called once in each worker thread
+    :type client_factory: Callable[[], :py:class:`legion.sdk.clients.model.ModelClient`]
+    :return: dict -- results (JSON serializable)
+    """
+    schedule = build_schedule(scenario)
+    collector = _ResultCollector(scenario)
+    local = threading.local()
+
+    def get_client():
+        if not hasattr(local, 'client'):
+            local.client = client_factory()
+        return local.client
+
+    def execute(scheduled_time, phase_index, target_index, payloads):
+        target = scenario.targets[target_index]
+        send_time = time.perf_counter()
+        error = None
+        try:
+            _send(get_client(), target, payloads)
+        except Exception as request_exception:
+            error = '{}: {!r}'.format(target.name, request_exception)
+        end_time = time.perf_counter()
+        collector.add(target.name, phase_index, end_time - scheduled_time, end_time - send_time, error)
+
+    for no in range(scenario.warmup_requests):
+        _, _, target_index, payloads = schedule[no % len(schedule)]
+        try:
+            _send(get_client(), scenario.targets[target_index], payloads)
+        except Exception as warmup_exception:
+            LOGGER.warning('Warmup request has failed: {!r}'.format(warmup_exception))
+
+    LOGGER.info('Running scenario {!r}: {} requests in {} phases'
+                .format(scenario.name, len(schedule), len(scenario.phases)))
+    started_at = datetime.datetime.utcnow()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=scenario.concurrency) as executor:
+        start = time.perf_counter()
+        for offset, phase_index, target_index, payloads in schedule:
+            scheduled_time = start + offset
+            delay = scheduled_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(execute, scheduled_time, phase_index, target_index, payloads)
+    duration = time.perf_counter() - start
+
+    if collector.first_errors:
+        LOGGER.warning('{} requests have failed, first errors: {}'
+                       .format(sum(collector.errors.values()), '; '.join(collector.first_errors)))
+
+    return _build_results(scenario, collector, schedule, started_at, duration)
+
+
+def _build_results(scenario, collector, schedule, started_at, duration):
+    """
+    Build JSON serializable results of scenario
+
+    :param scenario: scenario
+    :type scenario: :py:class:`legion.sdk.loadtest.Scenario`
+    :param collector: collected latencies
+    :type collector: :py:class:`legion.sdk.loadtest._ResultCollector`
+    :param schedule: schedule of requests
+    :type schedule: list[tuple]
+    :param started_at: start time (UTC)
+    :type started_at: :py:class:`datetime.datetime`
+    :param duration: duration in seconds
+    :type duration: float
+    :return: dict -- results
+    """
+    overall = LatencyHistogram()
+    overall_service_time = LatencyHistogram()
+    targets = {}
+    for target in scenario.targets:
+        overall.merge(collector.latency[target.name])
+        overall_service_time.merge(collector.service_time[target.name])
+        requests_count = collector.latency[target.name].count + collector.errors[target.name]
+        targets[target.name] = {
+            'requests': requests_count,
+            'errors': collector.errors[target.name],
+            'error_rate': collector.errors[target.name] / requests_count if requests_count else 0,
+            'latency_ms': collector.latency[target.name].summary(),
+            'service_time_ms': collector.service_time[target.name].summary(),
+            'histogram': collector.latency[target.name].to_dict(),
+        }
+
+    phases = []
+    for phase, latency, errors in zip(scenario.phases, collector.phase_latency, collector.phase_errors):
+        phases.append({
+            'rate': phase.rate,
+            'duration': phase.duration,
+            'requests': latency.count + errors,
+            'errors': errors,
+            'latency_ms': latency.summary(),
+        })
+
+    errors = sum(collector.errors.values())
+    return {
+        'scenario': scenario.name,
+        'model_id': scenario.model_id,
+        'model_version': scenario.model_version,
+        'seed': scenario.seed,
+        'started_at': started_at.isoformat() + 'Z',
+        'duration': duration,
+        'requests': len(schedule),
+        'errors': errors,
+        'error_rate': errors / len(schedule) if schedule else 0,
+        'throughput': overall.count / duration if duration else 0,
+        'latency_ms': overall.summary(),
+        'service_time_ms': overall_service_time.summary(),
+        'histogram': overall.to_dict(),
+        'phases': phases,
+        'targets': targets,
+    }
+
+
+def _compare_section(name, results, baseline, tolerance, error_rate_tolerance):
+    """
+    Compare latencies and error rate of results section (whole scenario or one target) with baseline
+
+    :param name: name of section
+    :type name: str
+    :param results: section of current results
+    :type results: dict
+    :param baseline: section of baseline results
+    :type baseline: dict
+    :param tolerance: allowed relative increase of latency percentiles
+    :type tolerance: float
+    :param error_rate_tolerance: allowed absolute increase of error rate
+    :type error_rate_tolerance: float
+    :return: list[str] -- regressions
+    """
+    regressions = []
+    for percentile in REGRESSION_PERCENTILES:
+        current, expected = results['latency_ms'].get(percentile), baseline['latency_ms'].get(percentile)
+        if current is None or expected is None:
+            continue
+        if current > expected * (1 + tolerance) and current - expected > REGRESSION_MIN_LATENCY_DIFFERENCE_MS:
+            regressions.append('{}: {} latency {:.3f} ms is higher than baseline {:.3f} ms'
+                               .format(name, percentile, current, expected))
+
+    if results['error_rate'] > baseline['error_rate'] + error_rate_tolerance:
+        regressions.append('{}: error rate {:.2%} is higher than baseline {:.2%}'
+                           .format(name, results['error_rate'], baseline['error_rate']))
+
+    return regressions
+
+
+def compare_results(results, baseline, tolerance=REGRESSION_TOLERANCE,
+                    error_rate_tolerance=REGRESSION_ERROR_RATE_TOLERANCE):
+    """
+    Compare results of scenario with baseline results
+
+    :param results: current results
+    :type results: dict
+    :param baseline: baseline results of the same scenario
+    :type baseline: dict
+    :param tolerance: (Optional) allowed relative increase of latency percentiles (p50, p95, p99)
+    :type tolerance: float
+    :param error_rate_tolerance: (Optional) allowed absolute increase of error rate
+    :type error_rate_tolerance: float
+    :return: list[str] -- regressions (empty if there are no regressions)
+    """
+    if results['scenario'] != baseline['scenario']:
+        raise ValueError('Baseline has been recorded for other scenario: {!r}'.format(baseline['scenario']))
+
+    # Throughput is not compared: under open-loop load it is defined by schedule of scenario
+    regressions = _compare_section('scenario', results, baseline, tolerance, error_rate_tolerance)
+
+    for target_name, target_results in sorted(results['targets'].items()):
+        if target_name in baseline['targets']:
+            regressions.extend(_compare_section(target_name, target_results, baseline['targets'][target_name],
+                                                tolerance, error_rate_tolerance))
+
+    return regressions
+
+
+def save_results(results, path):
+    """
+    Save results to JSON file
+
+    :param results: results of scenario
+    :type results: dict
+    :param path: path to file
+    :type path: str
+    :return: None
+    """
+    with open(path, 'w') as results_stream:
+        json.dump(results, results_stream, indent=2, sort_keys=True)
+
+
+def load_results(path):
+    """
+    Load results from JSON file
+
+    :param path: path to file
+    :type path: str
+    :return: dict -- results
+    """
+    with open(path, 'r') as results_stream:
+        return json.load(results_stream)
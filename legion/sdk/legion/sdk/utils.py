@@ -41,6 +41,11 @@ from legion.sdk.containers import headers
 KUBERNETES_STRING_LENGTH_LIMIT = 63
 LOGGER = logging.getLogger(__name__)
 MODEL_NAMING_UID_ENV = 'JUPYTERHUB_USER', 'NB_USER', 'BUILD_ID'
+PACKAGE_NAME_SEPARATORS_PATTERN = re.compile(r'[-_.]+')
+# Package keys are built as pkg_resources does (dots are kept)
+PACKAGE_KEY_SEPARATORS_PATTERN = re.compile(r'[^A-Za-z0-9.]+')
+# Directories of sys.path where packages are installed, their modification invalidates cached installed packages
+SITE_PACKAGES_DIRECTORIES = ('site-packages', 'dist-packages')
 
 
 def render_template(template_name, values=None):
@@ -419,13 +424,33 @@ def parse_value_to_type(value, target_type):
         return target_type(value)
 
 
+def _get_requirements_file_path():
+    """
+    Get path to file with requirements
+
+    :return: str -- path to data/Pipfile.lock
+    """
+    return os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data', 'Pipfile.lock')
+
+
+def normalize_package_name(name):
+    """
+    Normalize python package name (PEP 503), e.g. Foo_Bar -> foo-bar
+
+    :param name: package name
+    :type name: str
+    :return: str -- normalized name
+    """
+    return PACKAGE_NAME_SEPARATORS_PATTERN.sub('-', name).lower()
+
+
 def get_list_of_requirements():
     """
     Get list of requirements stored in data/Pipfile.lock
 
     :return: list[(str, str)] -- list of requirements in the "package==version" format
     """
-    file_path = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'data', 'Pipfile.lock')
+    file_path = _get_requirements_file_path()
     if not os.path.exists(file_path):
         raise Exception('File with requirements ({}) is not exists'.format(file_path))
 
@@ -439,17 +464,131 @@ def get_list_of_requirements():
     ], key=lambda item: item[0])
 
 
+def _get_installed_distributions():
+    """
+    Get names and versions of installed distributions (using importlib.metadata if it is available)
+
+    :return: list[(str, str)] -- names and versions of installed distributions
+    """
+    try:
+        import importlib.metadata as importlib_metadata
+    except ImportError:
+        try:
+            import importlib_metadata
+        except ImportError:
+            importlib_metadata = None
+
+    if importlib_metadata:
+        return [(distribution.metadata['Name'], distribution.version)
+                for distribution in importlib_metadata.distributions()
+                if distribution.metadata['Name']]
+
+    import pkg_resources
+    return [(item.project_name, item.version) for item in pkg_resources.working_set]  # pylint: disable=E1133
+
+
+def _get_installed_packages_cache_key():
+    """
+    Get key of installed packages: interpreter and modification times of site-packages directories of sys.path
+    (directories are modified when packages are installed or removed)
+
+    :return: list -- cache key (JSON serializable)
+    """
+    key = [sys.executable]
+    for path in sys.path:
+        if os.path.basename(os.path.normpath(path)) not in SITE_PACKAGES_DIRECTORIES:
+            continue
+        try:
+            key.append([path, os.stat(path).st_mtime_ns])
+        except OSError:
+            key.append([path, None])
+    return key
+
+
+def _load_installed_packages_cache(cache_path, cache_key):
+    """
+    Load installed packages from cache file if they have been saved with the same key
+
+    :param cache_path: path to cache file
+    :type cache_path: str
+    :param cache_key: current cache key
+    :type cache_key: list
+    :return: list[(str, str)] or None -- installed packages
+    """
+    try:
+        with open(cache_path, 'r') as cache_stream:
+            cache = json.load(cache_stream)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cache, dict) or cache.get('key') != cache_key:
+        return None
+
+    return [(name, version) for name, version in cache.get('packages', [])]
+
+
+def _save_installed_packages_cache(cache_path, cache_key, packages):
+    """
+    Save installed packages to cache file (file is replaced atomically, errors are ignored)
+
+    :param cache_path: path to cache file
+    :type cache_path: str
+    :param cache_key: current cache key
+    :type cache_key: list
+    :param packages: installed packages
+    :type packages: list[(str, str)]
+    :return: None
+    """
+    try:
+        cache_directory = os.path.dirname(cache_path) or os.curdir
+        os.makedirs(cache_directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=cache_directory, delete=False) as cache_stream:
+            json.dump({'key': cache_key, 'packages': packages}, cache_stream)
+        os.replace(cache_stream.name, cache_path)
+    except OSError as cache_exception:
+        LOGGER.debug('Cannot save list of installed packages to %s: %s', cache_path, cache_exception)
+
+
 def get_installed_packages():
     """
-    Get list of installed packages
+    Get list of installed packages (names are lowercased, dots are kept as in pkg_resources keys).
+    Result is cached in INSTALLED_PACKAGES_CACHE_FILE till any site-packages directory of sys.path is modified
+    (e.g. package is installed or removed)
 
     :return: list[(str, str)] -- list of installed packages in the "package==version" format
     """
-    import pkg_resources
-    return sorted([
-        (item.key, item.version)
-        for item in pkg_resources.working_set  # pylint: disable=E1133
-    ], key=lambda item: item[0])
+    cache_path = os.path.expanduser(config.INSTALLED_PACKAGES_CACHE_FILE or '')
+    cache_key = _get_installed_packages_cache_key()
+
+    if cache_path:
+        installed_packages = _load_installed_packages_cache(cache_path, cache_key)
+        if installed_packages is not None:
+            return installed_packages
+
+    # First found distribution is used by import system if there are many distributions with the same name
+    packages = {}
+    for name, version in _get_installed_distributions():
+        packages.setdefault(normalize_package_name(name), (PACKAGE_KEY_SEPARATORS_PATTERN.sub('-', name).lower(),
+                                                           version))
+
+    installed_packages = sorted(packages.values(), key=lambda item: item[0])
+    if cache_path:
+        _save_installed_packages_cache(cache_path, cache_key, installed_packages)
+    return installed_packages
+
+
+def get_missed_requirements():
+    """
+    Get requirements from data/Pipfile.lock which are not installed (or installed with other version)
+
+    :return: list[(str, str)] -- list of missed requirements in the "package==version" format
+    """
+    installed_packages = {normalize_package_name(name): version for name, version in get_installed_packages()}
+    return [
+        (name, version)
+        for (name, version) in get_list_of_requirements()
+        if installed_packages.get(normalize_package_name(name)) != version
+    ]
 
 
 def deduce_extra_version():
@@ -17,7 +17,6 @@
 legion k8s enclave class
 """
 import logging
-from collections import Counter
 
 import kubernetes
 import kubernetes.client
@@ -26,21 +25,32 @@ import kubernetes.config.config_exception
 from kubernetes.client import V1ResourceRequirements
 
 from legion.sdk import config
-from legion.services.k8s import utils as k8s_utils, services
+from legion.services.k8s import utils as k8s_utils
 from legion.sdk.definitions import ENCLAVE_NAMESPACE_LABEL, EVENT_ADDED, EVENT_MODIFIED, EVENT_DELETED
 from legion.sdk.definitions import \
-    LEGION_COMPONENT_NAME_API, LEGION_COMPONENT_NAME_EDI
+    LEGION_COMPONENT_NAME_API, LEGION_COMPONENT_NAME_EDI, LEGION_COMPONENT_LABEL, LEGION_SYSTEM_LABEL
 from legion.services.k8s.exceptions import KubernetesOperationIsNotConfirmed
 from legion.services.k8s.services import get_service, ModelService, find_model_services_by, find_model_service, \
-    find_model_deployment, ModelServiceEndpoint, Service
-from legion.services.k8s.watch import ResourceWatch
-from legion.sdk.utils import ensure_function_succeed
+    find_model_deployments_by, ModelEndpointsIndex, ModelEndpointsState, Service, ModelUpstream, \
+    get_ready_endpoint_addresses
+from legion.sdk.containers.headers import DOMAIN_MODEL_ID, DOMAIN_MODEL_VERSION
+from legion.services.k8s.watch import ResourceWatch, wait_for_object
 
 LOGGER = logging.getLogger(__name__)
 
 SERVE_HEALTH_CHECK = '/healthcheck'
 
 
+def _object_exists(k8s_object):
+    """
+    Check that K8S object exists (condition for waiting of object creation)
+
+    :param k8s_object: K8S object or None
+    :return: bool -- does object exist
+    """
+    return k8s_object is not None
+
+
 class Enclave:
     """
     Contains overall information about enclave, its services and models
@@ -149,7 +159,11 @@ class Enclave:
         :type model_version: str or None
         :return: list[:py:class:`legion.k8s.ModelService`] -- founded model services
         """
-        items = [ModelService(service) for service in
+        # Deployments are fetched with one list call and joined with services by name
+        deployments = {deployment.metadata.name: deployment for deployment in
+                       find_model_deployments_by(self.name, model_id, model_version)}
+
+        items = [ModelService(service, deployments.get(service.metadata.name)) for service in
                  find_model_services_by(self.name, model_id, model_version)]
 
         return sorted(items, key=lambda ms: '{}/{}'.format(ms.id, ms.version))
@@ -311,14 +325,9 @@ class Enclave:
             body=deployment,
             namespace=self.namespace)
 
-        retries = config.K8S_API_RETRY_NUMBER_MAX_LIMIT
-        retry_timeout = config.K8S_API_RETRY_DELAY_SEC
-
-        deployment_ready = ensure_function_succeed(
-            lambda: find_model_deployment(self.name, image_meta_information.model_id,
-                                          image_meta_information.model_version),
-            retries, retry_timeout, boolean_check=True
-        )
+        deployment_ready, _ = wait_for_object(apps_api.list_namespaced_deployment, self.namespace,
+                                              image_meta_information.k8s_name, _object_exists,
+                                              config.K8S_API_CONFIRMATION_TIMEOUT_SEC)
 
         if not deployment_ready:
             raise KubernetesOperationIsNotConfirmed(
@@ -346,12 +355,9 @@ class Enclave:
             body=service,
             namespace=self.namespace)
 
-        service_ready = ensure_function_succeed(
-            lambda: services.find_model_service(self.namespace,
-                                                image_meta_information.model_id,
-                                                image_meta_information.model_version),
-            retries, retry_timeout, boolean_check=True
-        )
+        service_ready, _ = wait_for_object(core_v1api.list_namespaced_service, self.namespace,
+                                           image_meta_information.k8s_name, _object_exists,
+                                           config.K8S_API_CONFIRMATION_TIMEOUT_SEC)
 
         if not service_ready:
             raise KubernetesOperationIsNotConfirmed(
@@ -361,67 +367,108 @@ class Enclave:
         LOGGER.info('Building model service object')
         return True, ModelService(k8s_service)
 
-    def watch_models(self):
+    def deploy_model_async(self, image, **kwargs):
+        """
+        Deploy new model in background thread, so many models can be deployed in parallel
+
+        :param image: docker image with model
+        :type image: str
+        :param kwargs: other arguments of :py:meth:`Enclave.deploy_model`
+        :return: :py:class:`concurrent.futures.Future` -- future with result of :py:meth:`Enclave.deploy_model`
+        """
+        return k8s_utils.run_operation_async(self.deploy_model, image, **kwargs)
+
+    def deploy_models_async(self, images, **kwargs):
+        """
+        Deploy many models in background threads. Labels of all images are fetched from registry concurrently
+        before deploys are started
+
+        :param images: docker images with models
+        :type images: list[str]
+        :param kwargs: other arguments of :py:meth:`Enclave.deploy_model` (same for all models)
+        :return: list[:py:class:`concurrent.futures.Future`] -- futures with results of
+                 :py:meth:`Enclave.deploy_model` in order of images
+        """
+        k8s_utils.prefetch_docker_image_labels(images)
+        return [self.deploy_model_async(image, **kwargs) for image in images]
+
+    def watch_models(self, metrics_log_interval=None):
         """
         Watch for models update events in this Enclave object
 
+        :param metrics_log_interval: (Optional) interval of logging of watch metrics in seconds
+        :type metrics_log_interval: float
         :return: (str, :py:class:`legion.k8s.services.ModelService`) -- (event type [ADDED, DELETED, MODIFIED], model)
         """
-        for event_type, service in self.watch_services():
+        for event_type, service in self.watch_services(metrics_log_interval):
             if ModelService.is_model_service(service.k8s_service):
                 model_service = ModelService(service.k8s_service)
                 yield event_type, model_service
 
-    def watch_model_service_endpoints_state(self):
+    def watch_model_service_endpoints_state(self, metrics_log_interval=None):
         """
-        Watch for model service endpoints state
+        Watch for model service endpoints state. Endpoints are updated incrementally: each event changes only
+        endpoints of one model
 
-        :return: (list[:py:class:`legion.k8s.services.ModelServiceEndpoint`] -- new version of model service endpoints
+        :param metrics_log_interval: (Optional) interval of logging of watch metrics in seconds
+        :type metrics_log_interval: float
+        :return: :py:class:`legion.k8s.services.ModelEndpointsState` -- new version of model service endpoints
+                 and endpoints of changed models by model id (empty if event has not changed routing)
         """
-        endpoints = set()
+        index = ModelEndpointsIndex()
 
-        def normalize_endpoints(endpoints_to_normalize):
-            """
-            Normalize endpoints set to list with default endpoints for each models
-
-            :param endpoints_to_normalize: source model endpoints
-            :type endpoints_to_normalize: set[:py:class:`legion.k8s.services.ModelServiceEndpoint`]
-            :return list[:py:class:`legion.k8s.services.ModelServiceEndpoint`] -- endpoints with default
-            """
-            model_endpoints = []
-            unspecified_version_endpoints = {}
-            model_id_counter = Counter(x.model_service.id for x in endpoints_to_normalize)
-
-            for endpoint in endpoints_to_normalize:
-                model_id = endpoint.model_service.id
-                model_endpoints.append(endpoint)
+        for event_type, model_service in self.watch_models(metrics_log_interval):
+            if event_type not in (EVENT_ADDED, EVENT_MODIFIED, EVENT_DELETED):
+                LOGGER.error('Got unknown event type: {}'.format(event_type))
+                changes = {}
+            else:
+                changes = index.update(event_type, model_service)
 
-                if model_id_counter[model_id] == 1:
-                    model_endpoints.append(endpoint.build_default())
-                else:
-                    unspecified_version_endpoints[model_id] = endpoint.build_default()
+            yield ModelEndpointsState(*index.snapshot, changes=changes)
 
-            return model_endpoints, list(unspecified_version_endpoints.values())
+    def watch_model_upstreams(self, metrics_log_interval=None):
+        """
+        Watch for ready pods of model services. New state is generated only if addresses of pods have been changed
 
-        for event_type, model_service in self.watch_models():
-            model_endpoint = ModelServiceEndpoint(model_service)
+        :param metrics_log_interval: (Optional) interval of logging of watch metrics in seconds
+        :type metrics_log_interval: float
+        :return: dict[str, :py:class:`legion.k8s.services.ModelUpstream`] -- upstreams with ready pods
+                 by name of model service
+        """
+        client = k8s_utils.build_client()
+        core_api = kubernetes.client.CoreV1Api(client)
 
-            if event_type == EVENT_ADDED:
-                endpoints.add(model_endpoint)
-            elif event_type == EVENT_MODIFIED:
-                endpoints.add(model_endpoint)
-            elif event_type == EVENT_DELETED:
-                if model_endpoint in endpoints:
-                    endpoints.remove(model_endpoint)
+        watch = ResourceWatch(core_api.list_namespaced_endpoints,
+                              namespace=self.namespace,
+                              label_selector=k8s_utils.build_label_selector({DOMAIN_MODEL_ID: None,
+                                                                             DOMAIN_MODEL_VERSION: None}),
+                              filter_callable=ModelService.is_model_service,
+                              metrics_log_interval=metrics_log_interval)
+
+        upstreams = {}
+        for event_type, k8s_endpoints in watch.stream:
+            name = k8s_endpoints.metadata.name
+            servers = get_ready_endpoint_addresses(k8s_endpoints) if event_type != EVENT_DELETED else []
+
+            current = upstreams.get(name)
+            if (current.servers if current else []) == servers:
+                continue
+
+            upstreams = dict(upstreams)
+            if servers:
+                upstreams[name] = ModelUpstream(name, servers)
             else:
-                LOGGER.error('Got unknown event type: {}'.format(event_type))
+                upstreams.pop(name, None)
 
-            yield normalize_endpoints(endpoints)
+            LOGGER.info('Ready pods of model service {} have been changed: {}'.format(name, ', '.join(servers)))
+            yield upstreams
 
-    def watch_services(self):
+    def watch_services(self, metrics_log_interval=None):
         """
         Generate which returns events for services updates
 
+        :param metrics_log_interval: (Optional) interval of logging of watch metrics in seconds
+        :type metrics_log_interval: float
         :return: (str, :py:class:`legion.k8s.services.Service`) -- (event type [ADDED, DELETED, MODIFIED], service)
         """
         client = k8s_utils.build_client()
@@ -430,8 +477,11 @@ class Enclave:
 
         watch = ResourceWatch(core_api.list_namespaced_service,
                               namespace=self.namespace,
+                              label_selector=k8s_utils.build_label_selector({LEGION_COMPONENT_LABEL: None,
+                                                                             LEGION_SYSTEM_LABEL: None}),
                               filter_callable=Service.is_legion_service,
-                              object_constructor=Service)
+                              object_constructor=Service,
+                              metrics_log_interval=metrics_log_interval)
         for event_type, event_object in watch.stream:
             yield event_type, event_object
 
@@ -448,6 +498,7 @@ class Enclave:
         core_api = kubernetes.client.CoreV1Api(client)
 
         watch = ResourceWatch(core_api.list_namespace,
+                              label_selector=k8s_utils.build_label_selector({ENCLAVE_NAMESPACE_LABEL: None}),
                               filter_callable=Enclave.is_enclave,
                               object_constructor=Enclave.build_from_namespace_object)
 
@@ -480,11 +531,8 @@ def find_enclaves():
     client = k8s_utils.build_client()
 
     core_api = kubernetes.client.CoreV1Api(client)
-    all_namespaces = core_api.list_namespace()
-
-    enclaves = []
-    for namespace in all_namespaces.items:
-        if namespace.metadata.labels and ENCLAVE_NAMESPACE_LABEL in namespace.metadata.labels:
-            enclaves.append(Enclave(namespace.metadata.name))
+    enclave_namespaces = k8s_utils.list_all_items(core_api.list_namespace,
+                                                  label_selector=k8s_utils.build_label_selector(
+                                                      {ENCLAVE_NAMESPACE_LABEL: None}))
 
-    return enclaves
+    return [Enclave(namespace.metadata.name) for namespace in enclave_namespaces]
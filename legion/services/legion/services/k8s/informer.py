@@ -0,0 +1,463 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+legion k8s informers (list-then-watch in-memory caches of K8S resources)
+"""
+import logging
+import threading
+import time
+
+import kubernetes.client
+
+from legion.sdk import config
+from legion.sdk.containers.headers import DOMAIN_MODEL_ID, DOMAIN_MODEL_VERSION
+from legion.sdk.definitions import LEGION_COMPONENT_LABEL, EVENT_DELETED
+from legion.services.k8s import utils as k8s_utils
+from legion.services.k8s.watch import ResourceWatch
+
+LOGGER = logging.getLogger(__name__)
+
+# Delay before next attempt to list resources if informer has failed
+INFORMER_RETRY_DELAY = 5
+# Default time to wait for initial sync of namespace cache
+INFORMER_SYNC_TIMEOUT = 30
+
+CACHE_SERVICES = 'services'
+CACHE_DEPLOYMENTS = 'deployments'
+CACHE_INGRESSES = 'ingresses'
+CACHE_KINDS = CACHE_SERVICES, CACHE_DEPLOYMENTS, CACHE_INGRESSES
+
+# API class and list function of each cached kind of resources
+_CACHE_LIST_FUNCTIONS = {
+    CACHE_SERVICES: ('CoreV1Api', 'list_namespaced_service'),
+    CACHE_DEPLOYMENTS: ('AppsV1Api', 'list_namespaced_deployment'),
+    CACHE_INGRESSES: ('ExtensionsV1beta1Api', 'list_namespaced_ingress'),
+}
+
+INDEX_COMPONENT = 'component'
+INDEX_MODEL = 'model'
+
+_NAMESPACE_CACHES = {}
+_NAMESPACE_CACHES_LOCK = threading.Lock()
+
+
+def _get_labels(k8s_object):
+    """
+    Get labels of K8S object
+
+    :param k8s_object: K8S object
+    :return: dict[str, str] -- labels
+    """
+    return k8s_object.metadata.labels or {}
+
+
+def index_by_component(k8s_object):
+    """
+    Get index values of object by legion component label
+
+    :param k8s_object: K8S object
+    :return: list[str] -- index values
+    """
+    component = _get_labels(k8s_object).get(LEGION_COMPONENT_LABEL)
+    return [component] if component else []
+
+
+def index_by_model(k8s_object):
+    """
+    Get index values of object by model id and model version labels.
+    Object is indexed by (model id, None) and by (model id, model version)
+
+    :param k8s_object: K8S object
+    :return: list[tuple[str, str]] -- index values
+    """
+    labels = _get_labels(k8s_object)
+    model_id, model_version = labels.get(DOMAIN_MODEL_ID), labels.get(DOMAIN_MODEL_VERSION)
+    if not model_id:
+        return []
+
+    return [(model_id, None), (model_id, model_version)] if model_version else [(model_id, None)]
+
+
+DEFAULT_INDEXES = {
+    INDEX_COMPONENT: index_by_component,
+    INDEX_MODEL: index_by_model,
+}
+
+
+class ResourceInformer:
+    """
+    In-memory cache of K8S resources of one kind.
+    Resources are listed once, then cache is updated by watch events and is fully resynced periodically
+    """
+
+    def __init__(self, list_function, *args, indexes=None, resync_period=None, **kwargs):
+        """
+        Initialize informer
+
+        :param list_function: API function to list (and watch) resources, e.g. CoreV1Api.list_namespaced_service
+        :param args: additional positional arguments for API function
+        :param indexes: (Optional) index functions by index name, index function returns list of values for object
+        :type indexes: dict[str, Callable[[Any], list[Any]]]
+        :param resync_period: (Optional) period of full resync in seconds, K8S_INFORMER_RESYNC_PERIOD by default
+        :type resync_period: int
+        :param kwargs: additional key value arguments for API function
+        """
+        self._list_function = list_function
+        self._args = args
+        self._kwargs = kwargs
+        self._index_functions = indexes if indexes is not None else DEFAULT_INDEXES
+        self._resync_period = resync_period or config.K8S_INFORMER_RESYNC_PERIOD
+
+        self._lock = threading.RLock()
+        self._objects = {}
+        self._indexes = {name: {} for name in self._index_functions}
+
+        self._synced = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def synced(self):
+        """
+        Has informer finished initial listing of resources
+
+        :return: bool -- is synced
+        """
+        return self._synced.is_set()
+
+    def start(self):
+        """
+        Start informer in background thread
+
+        :return: None
+        """
+        if self._thread:
+            return
+
+        self._thread = threading.Thread(target=self._run, daemon=True,
+                                        name='informer-{}'.format(self._list_function.__name__))
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop informer. It is stopped after next watch event or resync
+
+        :return: None
+        """
+        self._stopped.set()
+
+    def wait_for_sync(self, timeout=None):
+        """
+        Wait until initial listing of resources is finished
+
+        :param timeout: (Optional) timeout in seconds
+        :type timeout: float
+        :return: bool -- is synced
+        """
+        return self._synced.wait(timeout)
+
+    def get(self, name):
+        """
+        Get resource by name
+
+        :param name: name of resource
+        :type name: str
+        :return: Any -- resource or None
+        """
+        with self._lock:
+            return self._objects.get(name)
+
+    def list(self):
+        """
+        Get all resources (sorted by name)
+
+        :return: list[Any] -- resources
+        """
+        with self._lock:
+            return [self._objects[name] for name in sorted(self._objects)]
+
+    def by_index(self, index_name, value):
+        """
+        Get resources by index value (sorted by name)
+
+        :param index_name: name of index
+        :type index_name: str
+        :param value: value of index
+        :type value: Any
+        :return: list[Any] -- resources
+        """
+        with self._lock:
+            names = self._indexes[index_name].get(value, ())
+            return [self._objects[name] for name in sorted(names)]
+
+    def _add_to_indexes(self, name, k8s_object):
+        """
+        Add object to all indexes
+
+        :param name: name of object
+        :type name: str
+        :param k8s_object: K8S object
+        :return: None
+        """
+        for index_name, index_function in self._index_functions.items():
+            for value in index_function(k8s_object):
+                self._indexes[index_name].setdefault(value, set()).add(name)
+
+    def _remove_from_indexes(self, name, k8s_object):
+        """
+        Remove object from all indexes
+
+        :param name: name of object
+        :type name: str
+        :param k8s_object: K8S object
+        :return: None
+        """
+        for index_name, index_function in self._index_functions.items():
+            index = self._indexes[index_name]
+            for value in index_function(k8s_object):
+                names = index.get(value)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del index[value]
+
+    def _replace(self, k8s_objects):
+        """
+        Replace all cached resources
+
+        :param k8s_objects: new resources
+        :type k8s_objects: list[Any]
+        :return: None
+        """
+        with self._lock:
+            self._objects = {}
+            self._indexes = {name: {} for name in self._index_functions}
+            for k8s_object in k8s_objects:
+                self._objects[k8s_object.metadata.name] = k8s_object
+                self._add_to_indexes(k8s_object.metadata.name, k8s_object)
+
+    def handle_event(self, event_type, k8s_object):
+        """
+        Update cache with watch event
+
+        :param event_type: type of event (ADDED, MODIFIED, DELETED)
+        :type event_type: str
+        :param k8s_object: K8S object
+        :return: None
+        """
+        name = k8s_object.metadata.name
+        with self._lock:
+            previous = self._objects.pop(name, None)
+            if previous is not None:
+                self._remove_from_indexes(name, previous)
+
+            if event_type != EVENT_DELETED:
+                self._objects[name] = k8s_object
+                self._add_to_indexes(name, k8s_object)
+
+    def resync(self):
+        """
+        List all resources and replace cache content
+
+        :return: Any -- result of list function, e.g. V1ServiceList
+        """
+        result = self._list_function(*self._args, **self._kwargs)
+        self._replace(result.items)
+        self._synced.set()
+
+        LOGGER.debug('Informer {} has been resynced: {} objects'.format(self._list_function.__name__,
+                                                                        len(result.items)))
+        return result
+
+    def _run(self):
+        """
+        Informer loop: list resources, then watch them till resync period ends
+
+        :return: None
+        """
+        while not self._stopped.is_set():
+            try:
+                listed = self.resync()
+
+                # Watch is finished by API server after timeout, so cache is resynced after each period
+                watch = ResourceWatch(self._list_function, *self._args,
+                                      resource_version=listed.metadata.resource_version,
+                                      initial_objects=listed.items,
+                                      timeout_seconds=self._resync_period,
+                                      **self._kwargs)
+                for event_type, k8s_object in watch.stream:
+                    self.handle_event(event_type, k8s_object)
+                    if self._stopped.is_set():
+                        break
+            except Exception as informer_exception:
+                LOGGER.exception('Informer {} has failed: {}. Retrying in {}s'
+                                 .format(self._list_function.__name__, informer_exception, INFORMER_RETRY_DELAY))
+                self._stopped.wait(INFORMER_RETRY_DELAY)
+
+
+class NamespaceCache:
+    """
+    Informers for legion services, deployments and ingresses of one namespace
+    """
+
+    def __init__(self, namespace, resync_period=None, kinds=None):
+        """
+        Build informers for namespace
+
+        :param namespace: K8S namespace
+        :type namespace: str
+        :param resync_period: (Optional) period of full resync in seconds
+        :type resync_period: int
+        :param kinds: (Optional) kinds of resources to cache (all from CACHE_KINDS by default)
+        :type kinds: tuple[str]
+        """
+        kinds = kinds or CACHE_KINDS
+        unknown_kinds = set(kinds) - set(CACHE_KINDS)
+        if unknown_kinds:
+            raise ValueError('Unknown kinds of cached resources: {}'.format(', '.join(sorted(unknown_kinds))))
+
+        client = k8s_utils.build_client()
+
+        self.namespace = namespace
+        self._informers = {}
+        for kind in kinds:
+            api_name, function_name = _CACHE_LIST_FUNCTIONS[kind]
+            list_function = getattr(getattr(kubernetes.client, api_name)(client), function_name)
+            self._informers[kind] = ResourceInformer(list_function, namespace, resync_period=resync_period)
+
+    @property
+    def informers(self):
+        """
+        Get all informers of namespace
+
+        :return: tuple[ResourceInformer] -- informers
+        """
+        return tuple(self._informers.values())
+
+    def get_informer(self, kind):
+        """
+        Get informer for kind of resources
+
+        :param kind: kind of resources (one of CACHE_KINDS)
+        :type kind: str
+        :return: Optional[ResourceInformer] -- informer or None if the kind is not cached
+        """
+        return self._informers.get(kind)
+
+    @property
+    def synced(self):
+        """
+        Have all informers finished initial listing
+
+        :return: bool -- is synced
+        """
+        return all(informer.synced for informer in self.informers)
+
+    def start(self):
+        """
+        Start all informers
+
+        :return: None
+        """
+        for informer in self.informers:
+            informer.start()
+
+    def stop(self):
+        """
+        Stop all informers
+
+        :return: None
+        """
+        for informer in self.informers:
+            informer.stop()
+
+    def wait_for_sync(self, timeout=None):
+        """
+        Wait until all informers finish initial listing
+
+        :param timeout: (Optional) total timeout in seconds
+        :type timeout: float
+        :return: bool -- is synced
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        for informer in self.informers:
+            remaining = max(deadline - time.time(), 0) if deadline is not None else None
+            if not informer.wait_for_sync(remaining):
+                return False
+        return True
+
+
+def start_namespace_cache(namespace, resync_period=None, wait_timeout=INFORMER_SYNC_TIMEOUT, kinds=None):
+    """
+    Start shared cache for namespace (if it has not been started). Lookup functions from
+    :py:mod:`legion.services.k8s.services` read from the informer of a kind after it has been synced
+    and query API server directly until then (or if the kind is not cached)
+
+    :param namespace: K8S namespace
+    :type namespace: str
+    :param resync_period: (Optional) period of full resync in seconds
+    :type resync_period: int
+    :param wait_timeout: (Optional) time to wait for initial sync in seconds, None for no limit, 0 for no waiting
+    :type wait_timeout: float
+    :param kinds: (Optional) kinds of resources to cache (all from CACHE_KINDS by default)
+    :type kinds: tuple[str]
+    :return: :py:class:`legion.services.k8s.informer.NamespaceCache` -- namespace cache
+    """
+    with _NAMESPACE_CACHES_LOCK:
+        cache = _NAMESPACE_CACHES.get(namespace)
+        if not cache:
+            LOGGER.info('Starting cache for namespace {}'.format(namespace))
+            cache = NamespaceCache(namespace, resync_period, kinds)
+            cache.start()
+            _NAMESPACE_CACHES[namespace] = cache
+
+    if wait_timeout != 0:
+        start = time.time()
+        if not cache.wait_for_sync(wait_timeout):
+            LOGGER.warning('Cache for namespace {} has not been synced in {:.1f}s, '
+                           'lookups go to API server until it is synced'.format(namespace, time.time() - start))
+
+    return cache
+
+
+def stop_namespace_cache(namespace):
+    """
+    Stop shared cache for namespace
+
+    :param namespace: K8S namespace
+    :type namespace: str
+    :return: None
+    """
+    with _NAMESPACE_CACHES_LOCK:
+        cache = _NAMESPACE_CACHES.pop(namespace, None)
+
+    if cache:
+        cache.stop()
+
+
+def get_namespace_informer(namespace, kind):
+    """
+    Get informer of shared namespace cache if it has been started for the kind and synced
+
+    :param namespace: K8S namespace
+    :type namespace: str
+    :param kind: kind of resources (one of CACHE_KINDS)
+    :type kind: str
+    :return: Optional[:py:class:`legion.services.k8s.informer.ResourceInformer`] -- informer
+    """
+    cache = _NAMESPACE_CACHES.get(namespace) if namespace else None
+    informer = cache.get_informer(kind) if cache else None
+    return informer if informer and informer.synced else None
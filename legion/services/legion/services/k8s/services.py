@@ -17,6 +17,7 @@
 legion k8s services classes
 """
 import logging
+from typing import NamedTuple
 
 import kubernetes
 import kubernetes.client
@@ -28,14 +29,38 @@ from legion.sdk import config
 from legion.sdk.containers.definitions import ModelIdVersion, STATUS_OK, STATUS_FAIL, STATUS_WARN
 from legion.sdk.containers.headers import DOMAIN_MODEL_ID, DOMAIN_MODEL_VERSION
 from legion.services.k8s import utils as k8s_utils
-from legion.sdk.definitions import LEGION_COMPONENT_LABEL, LEGION_SYSTEM_LABEL, LEGION_API_SERVICE_PORT
+from legion.services.k8s.informer import get_namespace_informer, INDEX_COMPONENT, INDEX_MODEL, \
+    CACHE_SERVICES, CACHE_DEPLOYMENTS, CACHE_INGRESSES
+from legion.sdk.definitions import LEGION_COMPONENT_LABEL, LEGION_SYSTEM_LABEL, LEGION_API_SERVICE_PORT, EVENT_DELETED
 from legion.sdk.definitions import LOAD_DATA_ITERATIONS, LOAD_DATA_TIMEOUT, LEGION_COMPONENT_NAME_MODEL
 from legion.services.k8s.exceptions import UnknownDeploymentForModelService, KubernetesOperationIsNotConfirmed
 from legion.services.k8s.utils import normalize_k8s_name
+from legion.services.k8s.watch import wait_for_object
 from legion.sdk.utils import ensure_function_succeed, normalize_name
 
 LOGGER = logging.getLogger(__name__)
 
+ModelEndpointsState = NamedTuple('ModelEndpointsState', [
+    ('models', list),
+    ('unspecified_version_endpoints', list),
+    ('changes', dict),
+])
+
+ModelUpstream = NamedTuple('ModelUpstream', [
+    ('name', str),
+    ('servers', list),
+])
+
+
+def _object_is_deleted(k8s_object):
+    """
+    Check that K8S object does not exist (condition for waiting of object deletion)
+
+    :param k8s_object: K8S object or None
+    :return: bool -- has object been deleted
+    """
+    return k8s_object is None
+
 
 class Service:
     """
@@ -219,18 +244,20 @@ class ModelService(Service):
     Data-structure for describing model service
     """
 
-    def __init__(self, k8s_service):
+    def __init__(self, k8s_service, deployment=None):
         """
         Build model service structure from K8S Service
 
         :param k8s_service: K8S service
         :type k8s_service: V1Service
+        :param deployment: (Optional) already fetched model deployment, it is loaded lazily if it is not passed
+        :type deployment: :py:class:`kubernetes.client.models.v1_deployment.V1Deployment`
         """
         super().__init__(k8s_service)
         self._model_id = k8s_service.metadata.labels.get(DOMAIN_MODEL_ID)
         self._model_version = k8s_service.metadata.labels.get(DOMAIN_MODEL_VERSION)
 
-        self._deployment = None
+        self._deployment = deployment
 
     @staticmethod
     def is_model_service(k8s_service):
@@ -341,33 +368,17 @@ class ModelService(Service):
         apps_api = kubernetes.client.AppsV1Api(client)
 
         old_scale = self.deployment.spec.replicas
-        self.deployment.spec.replicas = new_scale
 
         LOGGER.info('Scaling service {} in namespace {} from {} to {} replicas'
                     .format(self.deployment.metadata.name, self.deployment.metadata.namespace, old_scale, new_scale))
 
+        # Deployment object is not modified in place because it can be shared with namespace cache
         apps_api.patch_namespaced_deployment(self.deployment.metadata.name,
                                              self.deployment.metadata.namespace,
-                                             self.deployment)
+                                             {'spec': {'replicas': new_scale}})
 
         self.reload_cache()
 
-    def check_service_is_deleted(self):
-        """
-        Check that this service has been deleted
-
-        :return: bool -- has services been deleted
-        """
-        return not find_model_service(self.namespace, self.id, self.version)
-
-    def check_deployment_is_deleted(self):
-        """
-        Check that this deployment has been deleted
-
-        :return: bool -- has deployment been deleted
-        """
-        return not find_model_deployment(self.namespace, self.id, self.version)
-
     def delete(self, grace_period_seconds=0):
         """
         Remove model from cluster
@@ -388,13 +399,9 @@ class ModelService(Service):
         core_v1api.delete_namespaced_service(name=self.k8s_service.metadata.name, body=body,
                                              namespace=self.namespace)
 
-        retries = config.K8S_API_RETRY_NUMBER_MAX_LIMIT
-        retry_timeout = config.K8S_API_RETRY_DELAY_SEC
-
-        service_deleted = ensure_function_succeed(
-            self.check_service_is_deleted,
-            retries, retry_timeout, boolean_check=True
-        )
+        service_deleted, _ = wait_for_object(core_v1api.list_namespaced_service, self.namespace,
+                                             self.k8s_service.metadata.name, _object_is_deleted,
+                                             config.K8S_API_CONFIRMATION_TIMEOUT_SEC)
 
         if not service_deleted:
             raise KubernetesOperationIsNotConfirmed(
@@ -408,16 +415,25 @@ class ModelService(Service):
                                                   grace_period_seconds=grace_period_seconds,
                                                   propagation_policy='Background')
 
-        deployment_deleted = ensure_function_succeed(
-            self.check_deployment_is_deleted,
-            retries, retry_timeout, boolean_check=True
-        )
+        deployment_deleted, _ = wait_for_object(api_instance.list_namespaced_deployment, self.namespace,
+                                                self.deployment.metadata.name, _object_is_deleted,
+                                                config.K8S_API_CONFIRMATION_TIMEOUT_SEC)
 
         if not deployment_deleted:
             raise KubernetesOperationIsNotConfirmed(
                 'Cannot remove deployment {}'.format(self.deployment.metadata.name)
             )
 
+    def delete_async(self, grace_period_seconds=0):
+        """
+        Remove model from cluster in background thread, so many models can be removed in parallel
+
+        :param grace_period_seconds: grace period in seconds
+        :type grace_period_seconds: int
+        :return: :py:class:`concurrent.futures.Future` -- future that is done when model has been removed
+        """
+        return k8s_utils.run_operation_async(self.delete, grace_period_seconds)
+
     @property
     def desired_scale(self):
         """
@@ -553,6 +569,129 @@ class ModelServiceEndpoint:
         return self.url == other.url
 
 
+def get_ready_endpoint_addresses(k8s_endpoints):
+    """
+    Get addresses of ready pods behind service (API port of pods)
+
+    :param k8s_endpoints: K8S endpoints of service
+    :type k8s_endpoints: V1Endpoints
+    :return: list[str] -- sorted addresses in format ip:port
+    """
+    servers = set()
+
+    for subset in k8s_endpoints.subsets or []:
+        ports = subset.ports or []
+        if len(ports) == 1:
+            api_ports = [ports[0].port]
+        else:
+            api_ports = [port.port for port in ports if port.name == LEGION_API_SERVICE_PORT]
+
+        if not api_ports:
+            continue
+
+        # Not ready addresses are placed to subset.not_ready_addresses
+        for address in subset.addresses or []:
+            servers.add('{}:{}'.format(address.ip, api_ports[0]))
+
+    return sorted(servers)
+
+
+class ModelEndpointsIndex:
+    """
+    Endpoints of model services, maintained incrementally by model id.
+    Each model has an endpoint for each version and one default endpoint: if there is only one version of model,
+    default endpoint is routed to it, otherwise it is an unspecified version endpoint
+    """
+
+    def __init__(self):
+        """
+        Build empty index
+        """
+        self._model_services = {}
+        self._model_endpoints = {}
+        self._snapshot = [], []
+
+    @staticmethod
+    def _build_model_endpoints(model_services):
+        """
+        Build endpoints of one model
+
+        :param model_services: model services of model by version
+        :type model_services: dict[str, :py:class:`legion.k8s.services.ModelService`]
+        :return: (list[ModelServiceEndpoint], list[ModelServiceEndpoint]) -- versioned (and default if model has
+                 one version) endpoints, unspecified version endpoints
+        """
+        endpoints = [ModelServiceEndpoint(model_services[version]) for version in sorted(model_services)]
+        if len(endpoints) == 1:
+            return [endpoints[0], endpoints[0].build_default()], []
+
+        return endpoints, [endpoints[-1].build_default()]
+
+    @staticmethod
+    def _get_fingerprint(model_endpoints):
+        """
+        Get values of model endpoints that are used for routing
+
+        :param model_endpoints: versioned and unspecified version endpoints of model
+        :type model_endpoints: (list[ModelServiceEndpoint], list[ModelServiceEndpoint])
+        :return: tuple -- fingerprint of endpoints
+        """
+        return tuple(tuple((endpoint.url, endpoint.model_service.url_with_ip) for endpoint in endpoints)
+                     for endpoints in model_endpoints)
+
+    def update(self, event_type, model_service):
+        """
+        Update endpoints of model service's model with watch event
+
+        :param event_type: type of event (ADDED, MODIFIED, DELETED)
+        :type event_type: str
+        :param model_service: model service
+        :type model_service: :py:class:`legion.k8s.services.ModelService`
+        :return: dict[str, list[ModelServiceEndpoint]] -- new endpoints of model by model id if they have been
+                 changed (empty list if model has been removed), empty dict otherwise
+        """
+        model_id = model_service.id
+        model_services = self._model_services.setdefault(model_id, {})
+
+        if event_type == EVENT_DELETED:
+            model_services.pop(model_service.version, None)
+        else:
+            model_services[model_service.version] = model_service
+
+        previous_endpoints = self._model_endpoints.get(model_id, ([], []))
+        if model_services:
+            current_endpoints = self._build_model_endpoints(model_services)
+            self._model_endpoints[model_id] = current_endpoints
+        else:
+            current_endpoints = [], []
+            del self._model_services[model_id]
+            self._model_endpoints.pop(model_id, None)
+
+        if self._get_fingerprint(previous_endpoints) == self._get_fingerprint(current_endpoints):
+            return {}
+
+        self._snapshot = None
+        return {model_id: current_endpoints[0] + current_endpoints[1]}
+
+    @property
+    def snapshot(self):
+        """
+        Get endpoints of all models (sorted by model id)
+
+        :return: (list[ModelServiceEndpoint], list[ModelServiceEndpoint]) -- model endpoints,
+                 unspecified version endpoints
+        """
+        if self._snapshot is None:
+            models, unspecified_version_endpoints = [], []
+            for model_id in sorted(self._model_endpoints):
+                model_endpoints, model_unspecified_version_endpoints = self._model_endpoints[model_id]
+                models.extend(model_endpoints)
+                unspecified_version_endpoints.extend(model_unspecified_version_endpoints)
+            self._snapshot = models, unspecified_version_endpoints
+
+        return self._snapshot
+
+
 def _generate_model_labels(model_id=None, model_version=None):
     """
     Generate kubernetes labels by model id and version.
@@ -573,6 +712,30 @@ def _generate_model_labels(model_id=None, model_version=None):
     return label_selector
 
 
+def _filter_model_objects(informer, model_id=None, model_version=None):
+    """
+    Get model objects from informer cache by model id and version (None or * matches all)
+
+    :param informer: informer with model objects
+    :type informer: :py:class:`legion.services.k8s.informer.ResourceInformer`
+    :param model_id: model id
+    :type model_id: str or None
+    :param model_version: model version
+    :type model_version: str or None
+    :return: list[Any] -- K8S objects
+    """
+    model_id = model_id if model_id != '*' else None
+    model_version = model_version if model_version != '*' else None
+    if model_id:
+        k8s_objects = informer.by_index(INDEX_MODEL, (model_id, model_version))
+    else:
+        k8s_objects = [k8s_object for k8s_object in informer.by_index(INDEX_COMPONENT, LEGION_COMPONENT_NAME_MODEL)
+                       if not model_version or k8s_object.metadata.labels.get(DOMAIN_MODEL_VERSION) == model_version]
+
+    return [k8s_object for k8s_object in k8s_objects
+            if k8s_object.metadata.labels.get(LEGION_COMPONENT_LABEL) == LEGION_COMPONENT_NAME_MODEL]
+
+
 def find_model_deployment(namespace, model_id, model_version):
     """
     Find one model deployment. Return None if there is no the deployment
@@ -586,6 +749,10 @@ def find_model_deployment(namespace, model_id, model_version):
 
     :return: :py:class:`kubernetes.client.models.v1_deployment.V1Deployment`
     """
+    informer = get_namespace_informer(namespace, CACHE_DEPLOYMENTS)
+    if informer:
+        return informer.get(normalize_k8s_name(model_id, model_version))
+
     client = k8s_utils.build_client()
     apps_api = kubernetes.client.AppsV1Api(client)
 
@@ -601,6 +768,29 @@ def find_model_deployment(namespace, model_id, model_version):
         raise e
 
 
+def find_model_deployments_by(namespace, model_id=None, model_version=None):
+    """
+    Find all models deployments
+
+    :param namespace: namespace
+    :type namespace: str
+    :param model_id: model id
+    :type model_id: str or None
+    :param model_version: model version
+    :type model_version: str or None
+    :return: list[:py:class:`kubernetes.client.models.v1_deployment.V1Deployment`]
+    """
+    informer = get_namespace_informer(namespace, CACHE_DEPLOYMENTS)
+    if informer:
+        return _filter_model_objects(informer, model_id, model_version)
+
+    client = k8s_utils.build_client()
+    apps_api = kubernetes.client.AppsV1Api(client)
+
+    return k8s_utils.list_all_items(apps_api.list_namespaced_deployment, namespace,
+                                    label_selector=_generate_model_labels(model_id, model_version))
+
+
 def find_model_services_by(namespace, model_id=None, model_version=None):
     """
     Find all models services
@@ -613,13 +803,15 @@ def find_model_services_by(namespace, model_id=None, model_version=None):
     :type model_version: str or None
     :return: list[:py:class:`kubernetes.client.models.v1_service.V1Service`]
     """
+    informer = get_namespace_informer(namespace, CACHE_SERVICES)
+    if informer:
+        return _filter_model_objects(informer, model_id, model_version)
+
     client = k8s_utils.build_client()
     core_v1api = kubernetes.client.CoreV1Api(client)
 
-    services = core_v1api.list_namespaced_service(namespace,
-                                                  label_selector=_generate_model_labels(model_id, model_version))
-
-    return services.items
+    return k8s_utils.list_all_items(core_v1api.list_namespaced_service, namespace,
+                                    label_selector=_generate_model_labels(model_id, model_version))
 
 
 def find_model_service(namespace, model_id, model_version):
@@ -634,6 +826,10 @@ def find_model_service(namespace, model_id, model_version):
     :type model_version: str
     :return: Optional[:py:class:`kubernetes.client.models.v1_service.V1Service`]
     """
+    informer = get_namespace_informer(namespace, CACHE_SERVICES)
+    if informer:
+        return informer.get(normalize_k8s_name(model_id, model_version))
+
     client = k8s_utils.build_client()
     core_v1api = kubernetes.client.CoreV1Api(client)
 
@@ -659,24 +855,19 @@ def find_all_services(namespace='', component=''):
     :type component: str
     :return: list[V1Service]
     """
+    informer = get_namespace_informer(namespace, CACHE_SERVICES)
+    if informer:
+        return informer.by_index(INDEX_COMPONENT, component) if component else informer.list()
+
     client = k8s_utils.build_client()
 
     core_api = kubernetes.client.CoreV1Api(client)
+    label_selector = k8s_utils.build_label_selector({LEGION_COMPONENT_LABEL: component}) if component else None
+
     if namespace:
-        all_services = core_api.list_namespaced_service(namespace)
-    else:
-        all_services = core_api.list_service_for_all_namespaces()
-
-    if component:
-        all_services = [
-            service
-            for service in all_services.items
-            if service.metadata.labels.get(LEGION_COMPONENT_LABEL) == component
-        ]
+        return k8s_utils.list_all_items(core_api.list_namespaced_service, namespace, label_selector=label_selector)
     else:
-        all_services = all_services.items
-
-    return all_services
+        return k8s_utils.list_all_items(core_api.list_service_for_all_namespaces, label_selector=label_selector)
 
 
 def get_service(namespace='', component=''):
@@ -702,24 +893,20 @@ def find_all_ingresses(namespace='', component=''):
     :type component: filter by specified component value, or none for all
     :return: list[V1beta1Ingress]
     """
+    informer = get_namespace_informer(namespace, CACHE_INGRESSES)
+    if informer:
+        return informer.by_index(INDEX_COMPONENT, component) if component else informer.list()
+
     client = k8s_utils.build_client()
 
     extension_api = kubernetes.client.ExtensionsV1beta1Api(client)
+    label_selector = k8s_utils.build_label_selector({LEGION_COMPONENT_LABEL: component}) if component else None
+
     if namespace:
-        all_ingresses = extension_api.list_namespaced_ingress(namespace)
-    else:
-        all_ingresses = extension_api.list_ingress_for_all_namespaces()
-
-    if component:
-        all_ingresses = [
-            ingress
-            for ingress in all_ingresses.items
-            if ingress.metadata.labels.get(LEGION_COMPONENT_LABEL) == component
-        ]
+        return k8s_utils.list_all_items(extension_api.list_namespaced_ingress, namespace,
+                                        label_selector=label_selector)
     else:
-        all_ingresses = all_ingresses.items
-
-    return all_ingresses
+        return k8s_utils.list_all_items(extension_api.list_ingress_for_all_namespaces, label_selector=label_selector)
 
 
 def get_ingress(namespace='', component=''):
@@ -16,17 +16,24 @@
 """
 legion k8s utils functions
 """
+import collections
+import concurrent.futures
 import json
 import logging
 import os
 import re
+import sqlite3
+import threading
+import time
 from typing import NamedTuple
 
 import kubernetes
 import kubernetes.client
+import kubernetes.client.rest
 from kubernetes.client import V1Pod, V1ContainerStatus
 import kubernetes.config
 import kubernetes.config.config_exception
+import requests
 import urllib3
 import urllib3.exceptions
 from docker_registry_client import DockerRegistryClient
@@ -43,6 +50,20 @@ from legion.sdk.utils import normalize_name
 
 LOGGER = logging.getLogger(__name__)
 CONNECTION_CONTEXT = None
+_CLIENT_LOCK = threading.Lock()
+_SHARED_CLIENT = None
+_OPERATIONS_EXECUTOR = None
+_OPERATIONS_EXECUTOR_LOCK = threading.Lock()
+# Registry clients are not thread safe, so each thread uses its own clients
+_REGISTRY_CLIENTS = threading.local()
+# Threads of prefetch executor are kept, so their registry clients are reused by next prefetches
+_IMAGE_LABELS_EXECUTOR = None
+_IMAGE_LABELS_EXECUTOR_LOCK = threading.Lock()
+_IMAGE_LABELS_LOCK = threading.Lock()
+# Image manifest digest -> labels
+_IMAGE_LABELS_CACHE = collections.OrderedDict()
+# Connections to persisted labels cache (DOCKER_IMAGE_LABELS_CACHE_FILE), SQLite connections are used by one thread
+_IMAGE_LABELS_STORE = threading.local()
 KUBERNETES_SERVICE_ACCOUNT_NAMESPACE_PATH = '/var/run/secrets/kubernetes.io/serviceaccount/namespace'
 ImageAttributes = NamedTuple('ImageAttributes', [
     ('host', str),
@@ -53,6 +74,18 @@ ImageAttributes = NamedTuple('ImageAttributes', [
 CPU_REDUCE_PAT = re.compile(r"^(\d+)(m?)$")
 MEM_REDUCE_PAT = re.compile(r"^(\d+)(E|P|T|G|M|K|Ei|Pi|Ti|Gi|Mi|Ki|)$")
 
+MANIFEST_DIGEST_HEADER = 'Docker-Content-Digest'
+
+IMAGE_LABELS_STORE_SCHEMA = 'CREATE TABLE IF NOT EXISTS image_labels ' \
+                            '(digest TEXT PRIMARY KEY, labels TEXT NOT NULL, used_at REAL NOT NULL)'
+IMAGE_LABELS_STORE_LOCK_TIMEOUT = 5
+
+SharedApiClientInformation = NamedTuple('SharedApiClientInformation', [
+    ('client', kubernetes.client.ApiClient),
+    ('context', str),
+    ('built_at', float)
+])
+
 
 def _calculate_request_res(value: int) -> int:
     """
@@ -105,11 +138,38 @@ def reduce_cpu_resource(res: str):
     return '{}{}'.format(_calculate_request_res(num), res_type)
 
 
-def build_client():
+class _SharedApiClient(kubernetes.client.ApiClient):
     """
-    Configure and returns kubernetes client
+    Kubernetes API client that is shared between threads. Reloads configuration if credentials are rejected
+    """
+
+    def call_api(self, *args, **kwargs):
+        """
+        Make API call. If credentials have expired, configuration is reloaded and call is repeated once
+
+        :param args: positional arguments of :py:meth:`kubernetes.client.ApiClient.call_api`
+        :param kwargs: key value arguments of :py:meth:`kubernetes.client.ApiClient.call_api`
+        :return: Any -- API response
+        """
+        try:
+            return super().call_api(*args, **kwargs)
+        except kubernetes.client.rest.ApiException as api_exception:
+            if api_exception.status != 401:
+                raise
 
-    :return: :py:module:`kubernetes.client`
+            LOGGER.info('K8S API credentials have been rejected, reloading configuration')
+            # Client could have already been rebuilt by another thread
+            if build_client() is self:
+                reset_client()
+
+            return super(_SharedApiClient, build_client()).call_api(*args, **kwargs)
+
+
+def _create_client():
+    """
+    Load kubernetes configuration (in-cluster or kube config) and create new client
+
+    :return: :py:class:`kubernetes.client.ApiClient`
     """
     try:
         kubernetes.config.load_incluster_config()
@@ -120,7 +180,97 @@ def build_client():
     # Disable SSL warning for self-signed certificates
     urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-    return kubernetes.client.ApiClient()
+    return _SharedApiClient()
+
+
+def build_client():
+    """
+    Configure and returns kubernetes client.
+    Client (with its connection pool) is shared by all callers in process. Configuration is reloaded if
+    CONNECTION_CONTEXT has been changed or after K8S_API_CLIENT_TTL seconds (to refresh credentials)
+
+    :return: :py:class:`kubernetes.client.ApiClient`
+    """
+    global _SHARED_CLIENT
+
+    with _CLIENT_LOCK:
+        shared = _SHARED_CLIENT
+        if shared is None or shared.context != CONNECTION_CONTEXT \
+                or time.monotonic() - shared.built_at >= config.K8S_API_CLIENT_TTL:
+            _SHARED_CLIENT = SharedApiClientInformation(_create_client(), CONNECTION_CONTEXT, time.monotonic())
+
+        return _SHARED_CLIENT.client
+
+
+def reset_client():
+    """
+    Drop shared kubernetes client, next call of build_client will reload configuration
+
+    :return: None
+    """
+    global _SHARED_CLIENT
+
+    with _CLIENT_LOCK:
+        _SHARED_CLIENT = None
+
+
+def run_operation_async(function, *args, **kwargs):
+    """
+    Run K8S operation (e.g. model deploy) in background thread.
+    Count of operations running in parallel is limited by K8S_PARALLEL_OPERATIONS
+
+    :param function: operation
+    :type function: Callable
+    :param args: positional arguments of operation
+    :param kwargs: key value arguments of operation
+    :return: :py:class:`concurrent.futures.Future` -- future with result of operation
+    """
+    global _OPERATIONS_EXECUTOR
+
+    with _OPERATIONS_EXECUTOR_LOCK:
+        if _OPERATIONS_EXECUTOR is None:
+            _OPERATIONS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=config.K8S_PARALLEL_OPERATIONS,
+                                                                         thread_name_prefix='k8s-operation')
+
+    return _OPERATIONS_EXECUTOR.submit(function, *args, **kwargs)
+
+
+def list_all_items(list_function, *args, page_size=None, **kwargs):
+    """
+    Get all objects from K8S API list function, fetching them page by page (with limit and continue token)
+
+    :param list_function: API list function, e.g. CoreV1Api.list_namespace
+    :param args: additional positional arguments for API function (e.g. namespace)
+    :param page_size: (Optional) count of objects in one page, K8S_API_LIST_PAGE_SIZE by default
+    :type page_size: int
+    :param kwargs: additional key value arguments for API function (e.g. label_selector)
+    :return: list[Any] -- objects from all pages
+    """
+    page_size = page_size or config.K8S_API_LIST_PAGE_SIZE
+    items = []
+    continue_token = None
+
+    while True:
+        if continue_token:
+            kwargs['_continue'] = continue_token
+
+        page = list_function(*args, limit=page_size, **kwargs)
+        items.extend(page.items)
+
+        continue_token = page.metadata._continue if page.metadata else None  # pylint: disable=W0212
+        if not continue_token:
+            return items
+
+
+def build_label_selector(labels):
+    """
+    Build label selector for K8S API. Label with None value is checked for existence only
+
+    :param labels: label values by label names
+    :type labels: dict[str, Optional[str]]
+    :return: str -- label selector
+    """
+    return ','.join(name if value is None else '{}={}'.format(name, value) for name, value in labels.items())
 
 
 def extract_container_id(container_id: str) -> str:
@@ -225,9 +375,192 @@ def load_secrets(path_to_secrets):
     return secrets
 
 
+def _get_registry_client(registry_host):
+    """
+    Get registry client of current thread for registry (client is built once per thread)
+
+    :param registry_host: registry URL including scheme
+    :type registry_host: str
+    :return: :py:class:`docker_registry_client.DockerRegistryClient` -- registry client
+    """
+    clients = getattr(_REGISTRY_CLIENTS, 'clients', None)
+    if clients is None:
+        clients = _REGISTRY_CLIENTS.clients = {}
+
+    key = registry_host, config.DOCKER_REGISTRY_USER
+    if key not in clients:
+        clients[key] = DockerRegistryClient(
+            host=registry_host,
+            username=config.DOCKER_REGISTRY_USER,
+            password=config.DOCKER_REGISTRY_PASSWORD,
+            api_version=2
+        )
+
+    return clients[key]
+
+
+def _put_to_bounded_cache(cache, key, value):
+    """
+    Put value to LRU cache, removing least recently used values above DOCKER_IMAGE_LABELS_CACHE_SIZE
+    (should be called with acquired _IMAGE_LABELS_LOCK)
+
+    :param cache: cache
+    :type cache: collections.OrderedDict
+    :param key: key
+    :param value: value
+    :return: None
+    """
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > config.DOCKER_IMAGE_LABELS_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+def _get_cached_docker_image_labels(digest):
+    """
+    Get labels of image manifest from cache
+
+    :param digest: image manifest digest
+    :type digest: str
+    :return: dict[str, Any] or None -- image labels
+    """
+    with _IMAGE_LABELS_LOCK:
+        labels = _IMAGE_LABELS_CACHE.get(digest)
+        if labels is not None:
+            _IMAGE_LABELS_CACHE.move_to_end(digest)
+        return labels
+
+
+def _get_image_labels_store():
+    """
+    Get connection of current thread to persisted labels cache (DOCKER_IMAGE_LABELS_CACHE_FILE)
+
+    :return: :py:class:`sqlite3.Connection` or None -- connection (None if persisted cache is disabled)
+    """
+    path = config.DOCKER_IMAGE_LABELS_CACHE_FILE
+    if not path:
+        return None
+
+    # Connections must not be reused by forked processes
+    key = os.path.abspath(path), os.getpid()
+    if getattr(_IMAGE_LABELS_STORE, 'key', None) != key:
+        directory = os.path.dirname(key[0])
+        os.makedirs(directory, exist_ok=True)
+
+        connection = sqlite3.connect(key[0], timeout=IMAGE_LABELS_STORE_LOCK_TIMEOUT)
+        connection.execute(IMAGE_LABELS_STORE_SCHEMA)
+        connection.commit()
+        _IMAGE_LABELS_STORE.key, _IMAGE_LABELS_STORE.connection = key, connection
+
+    return _IMAGE_LABELS_STORE.connection
+
+
+def _load_stored_docker_image_labels(digest):
+    """
+    Get labels of image manifest from persisted cache. Errors of persisted cache are logged and ignored
+
+    :param digest: image manifest digest
+    :type digest: str
+    :return: dict[str, Any] or None -- image labels
+    """
+    try:
+        connection = _get_image_labels_store()
+        if not connection:
+            return None
+
+        with connection:
+            row = connection.execute('SELECT labels FROM image_labels WHERE digest = ?', (digest,)).fetchone()
+            if row:
+                connection.execute('UPDATE image_labels SET used_at = ? WHERE digest = ?', (time.time(), digest))
+    except (sqlite3.Error, OSError) as store_exception:
+        LOGGER.warning('Cannot read persisted labels of image {}: {}'.format(digest, store_exception))
+        return None
+
+    return json.loads(row[0]) if row else None
+
+
+def _store_docker_image_labels(digest, labels):
+    """
+    Put labels of image manifest to persisted cache, removing least recently used labels above
+    DOCKER_IMAGE_LABELS_CACHE_FILE_SIZE. Errors of persisted cache are logged and ignored
+
+    :param digest: image manifest digest
+    :type digest: str
+    :param labels: image labels
+    :type labels: dict[str, Any]
+    :return: None
+    """
+    try:
+        connection = _get_image_labels_store()
+        if not connection:
+            return
+
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO image_labels (digest, labels, used_at) VALUES (?, ?, ?)',
+                               (digest, json.dumps(labels), time.time()))
+            connection.execute('DELETE FROM image_labels WHERE digest NOT IN '
+                               '(SELECT digest FROM image_labels ORDER BY used_at DESC LIMIT ?)',
+                               (config.DOCKER_IMAGE_LABELS_CACHE_FILE_SIZE,))
+    except (sqlite3.Error, OSError) as store_exception:
+        LOGGER.warning('Cannot persist labels of image {}: {}'.format(digest, store_exception))
+
+
+def _get_docker_image_digest(registry_client, repo, ref):
+    """
+    Resolve image reference to manifest digest with HEAD request (manifest is not downloaded).
+    HEAD request is sent with internals of docker_registry_client, if they are not available
+    None is returned, so labels are fetched by manifest GET (which returns the digest too)
+
+    :param registry_client: registry client
+    :type registry_client: :py:class:`docker_registry_client.DockerRegistryClient`
+    :param repo: image repository
+    :type repo: str
+    :param ref: image tag
+    :type ref: str
+    :return: str or None -- manifest digest (None if it has not been resolved)
+    """
+    try:
+        base_client = registry_client._base_client
+        base_client.auth.desired_scope = 'repository:{}:*'.format(repo)
+        # Manifest of the same schema as in _fetch_docker_image_labels is requested, so digests are the same
+        response = base_client._http_response(base_client.MANIFEST, requests.head, name=repo, reference=ref,
+                                              schema=base_client.schema_1_signed)
+    except (AttributeError, TypeError) as client_exception:
+        LOGGER.debug('Cannot resolve digest of {}:{} with HEAD request, manifest is fetched: {}'
+                     .format(repo, ref, client_exception))
+        return None
+
+    return response.headers.get(MANIFEST_DIGEST_HEADER)
+
+
+def _fetch_docker_image_labels(registry_client, repo, ref):
+    """
+    Get labels of image from registry and put them to cache (if manifest digest is known)
+
+    :param registry_client: registry client
+    :type registry_client: :py:class:`docker_registry_client.DockerRegistryClient`
+    :param repo: image repository
+    :type repo: str
+    :param ref: image tag or digest
+    :type ref: str
+    :return: dict[str, Any] -- image labels
+    """
+    manifest, digest = registry_client.repository(repo).manifest(ref)
+    labels = json.loads(manifest["history"][0]["v1Compatibility"])["container_config"]["Labels"]
+
+    if digest:
+        with _IMAGE_LABELS_LOCK:
+            _put_to_bounded_cache(_IMAGE_LABELS_CACHE, digest, labels)
+        _store_docker_image_labels(digest, labels)
+
+    return labels
+
+
 def get_docker_image_labels(image):
     """
-    Get labels from docker image
+    Get labels from docker image. Image reference is resolved to manifest digest on each call,
+    labels are cached by the digest in memory and (if DOCKER_IMAGE_LABELS_CACHE_FILE is set) on disk
+
     :param image: docker image
     :type image: str
     :return: dict[str, Any] -- image labels
@@ -246,16 +579,20 @@ def get_docker_image_labels(image):
         raise err
 
     try:
-        registry_client = DockerRegistryClient(
-            host=registry_host,
-            username=config.DOCKER_REGISTRY_USER,
-            password=config.DOCKER_REGISTRY_PASSWORD,
-            api_version=2
-        )
-        manifest = registry_client.repository(image_attributes.repo).manifest(image_attributes.ref)
-        labels = json.loads(
-            manifest[0]["history"][0]["v1Compatibility"])["container_config"]["Labels"]
-
+        registry_client = _get_registry_client(registry_host)
+        digest = _get_docker_image_digest(registry_client, image_attributes.repo, image_attributes.ref)
+
+        labels = _get_cached_docker_image_labels(digest) if digest else None
+        if labels is None and digest:
+            labels = _load_stored_docker_image_labels(digest)
+            if labels is not None:
+                with _IMAGE_LABELS_LOCK:
+                    _put_to_bounded_cache(_IMAGE_LABELS_CACHE, digest, labels)
+
+        if labels is not None:
+            LOGGER.debug('Labels for {} image ({}) have been found in cache'.format(image, digest))
+        else:
+            labels = _fetch_docker_image_labels(registry_client, image_attributes.repo, digest or image_attributes.ref)
     except Exception as err:
         raise Exception('Can\'t get image labels for {} image: {}'.format(image, err))
 
@@ -267,7 +604,48 @@ def get_docker_image_labels(image):
             ', '.join(tuple(labels.keys()))
         ))
 
-    return labels
+    return dict(labels)
+
+
+def prefetch_docker_image_labels(images):
+    """
+    Get labels of docker images concurrently (e.g. before bulk deploy), so following calls of
+    :py:func:`get_docker_image_labels` are served from cache
+
+    :param images: docker images
+    :type images: list[str]
+    :return: dict[str, dict[str, Any]] -- labels of images by image (images which labels cannot be got are skipped)
+    """
+    global _IMAGE_LABELS_EXECUTOR
+
+    images = list(dict.fromkeys(images))
+    if not images:
+        return {}
+
+    with _IMAGE_LABELS_EXECUTOR_LOCK:
+        if _IMAGE_LABELS_EXECUTOR is None:
+            _IMAGE_LABELS_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=config.K8S_PARALLEL_OPERATIONS,
+                                                                           thread_name_prefix='image-labels')
+
+    result = {}
+    futures = {_IMAGE_LABELS_EXECUTOR.submit(get_docker_image_labels, image): image for image in images}
+    for future in concurrent.futures.as_completed(futures):
+        try:
+            result[futures[future]] = future.result()
+        except Exception as prefetch_exception:
+            LOGGER.warning('Cannot prefetch labels of {} image: {}'.format(futures[future], prefetch_exception))
+
+    return result
+
+
+def reset_docker_image_labels_cache():
+    """
+    Drop all image labels cached in memory (persisted labels are kept)
+
+    :return: None
+    """
+    with _IMAGE_LABELS_LOCK:
+        _IMAGE_LABELS_CACHE.clear()
 
 
 def get_meta_from_docker_labels(labels):
@@ -17,28 +17,106 @@
 legion k8s watch context manager
 """
 import logging
+import random
+import time
+import typing
 
 import kubernetes
 import kubernetes.client
 import kubernetes.client.rest
 import kubernetes.config
 import kubernetes.config.config_exception
+import kubernetes.watch
 import urllib3
 import urllib3.exceptions
 
+from legion.sdk.definitions import EVENT_ADDED, EVENT_MODIFIED, EVENT_DELETED
+
 LOGGER = logging.getLogger(__name__)
 CONNECTION_CONTEXT = None
 
+EVENT_BOOKMARK = 'BOOKMARK'
+EVENT_ERROR = 'ERROR'
+HTTP_STATUS_GONE = 410
+HTTP_CLIENT_ERRORS = range(400, 500)
+
+WATCH_RECONNECT_INITIAL_DELAY = 0.5
+WATCH_RECONNECT_MAX_DELAY = 30
+WATCH_RECONNECT_BACKOFF_FACTOR = 2
+
+# Arguments of list functions that are used only for watching
+_WATCH_ONLY_ARGUMENTS = ('resource_version', 'timeout_seconds', 'allow_watch_bookmarks')
+
+
+class WatchMetrics(typing.NamedTuple):
+    """
+    Metrics of resource watch
+    """
+
+    events: int
+    bookmarks: int
+    reconnects: int
+    relists: int
+    last_event_time: typing.Optional[float]
+    last_event_lag: typing.Optional[float]
+
+
+class ResourceVersionExpired(Exception):
+    """
+    Resource version of watch is too old (410 Gone), resources should be relisted
+    """
+
+    pass
+
+
+def _get_event_lag(event_type, event_object):
+    """
+    Get time between change of object in cluster and receiving of the event (if it can be detected)
+
+    :param event_type: type of event
+    :type event_type: str
+    :param event_object: K8S object
+    :return: Optional[float] -- lag in seconds
+    """
+    metadata = getattr(event_object, 'metadata', None)
+    if event_type == EVENT_ADDED:
+        changed_at = getattr(metadata, 'creation_timestamp', None)
+    elif event_type == EVENT_DELETED:
+        changed_at = getattr(metadata, 'deletion_timestamp', None)
+    else:
+        changed_at = None
+
+    if not changed_at or not hasattr(changed_at, 'timestamp'):
+        return None
+
+    return max(time.time() - changed_at.timestamp(), 0.0)
+
+
+def _supports_watch_bookmarks(api_function):
+    """
+    Check that API function accepts allow_watch_bookmarks argument (depends on version of kubernetes client)
+
+    :param api_function: API list function
+    :return: bool -- are bookmarks supported
+    """
+    return 'allow_watch_bookmarks' in (getattr(api_function, '__doc__', None) or '')
+
 
 class ResourceWatch:
     """
-    Watch for K8S resources (context manager)
+    Watch for K8S resources (context manager).
+    Watch is resumed from the latest resource version after connection and server errors (with jittered
+    exponential backoff), client errors (4xx) are raised.
+    If resource version has expired (410 Gone), resources are relisted and differences are emitted as events
     """
 
     def __init__(self, api_function, *args,
                  filter_callable=None,
                  object_constructor=None,
                  resource_version=None,
+                 initial_objects=None,
+                 deadline=None,
+                 metrics_log_interval=None,
                  **kwargs):
         """
         Initialize context manager for resource watch
@@ -48,6 +126,15 @@ class ResourceWatch:
         :param filter_callable: (Optional) callable to filter objects
         :param object_constructor:  (Optional) callable to construct object wrappers
         :param resource_version: (Optional) start resource version
+        :param initial_objects: (Optional) objects already known by consumer (e.g. listed at resource_version),
+                                they are used to detect deletions after relisting
+        :type initial_objects: list[Any]
+        :param deadline: (Optional) time (as returned by time.time()) after which watch is not reconnected,
+                         watch requests and reconnect delays are limited by it
+        :type deadline: float
+        :param metrics_log_interval: (Optional) interval of logging of watch metrics in seconds
+                                     (metrics are logged on each reconnect regardless of it)
+        :type metrics_log_interval: float
         :param kwargs: additional key value arguments for API function
         """
         self._api_function = api_function
@@ -56,6 +143,181 @@ class ResourceWatch:
         self._resource_version = resource_version
         self._args = args
         self._kwargs = kwargs
+        self._deadline = deadline
+        self._metrics_log_interval = metrics_log_interval
+        self._metrics_logged_at = time.time()
+
+        # Latest versions of objects which have been seen by consumer, key is (namespace, name)
+        self._known_objects = {self._get_object_key(item): item for item in initial_objects or ()}
+
+        self._events = 0
+        self._bookmarks = 0
+        self._reconnects = 0
+        self._relists = 0
+        self._last_event_time = None
+        self._last_event_lag = None
+
+    @property
+    def resource_version(self):
+        """
+        Get latest seen resource version
+
+        :return: str -- resource version
+        """
+        return self._resource_version
+
+    @property
+    def metrics(self):
+        """
+        Get metrics of watch (count of events, reconnects, relists and lag of the latest event)
+
+        :return: :py:class:`legion.services.k8s.watch.WatchMetrics` -- metrics
+        """
+        return WatchMetrics(self._events, self._bookmarks, self._reconnects, self._relists,
+                            self._last_event_time, self._last_event_lag)
+
+    def log_metrics(self, level=logging.INFO):
+        """
+        Log metrics of watch (count of events, reconnects, relists and lag of the latest event)
+
+        :param level: (Optional) logging level
+        :type level: int
+        :return: None
+        """
+        self._metrics_logged_at = time.time()
+        metrics = self.metrics
+        lag = '{:.2f}s'.format(metrics.last_event_lag) if metrics.last_event_lag is not None else 'unknown'
+        LOGGER.log(level, 'Watch {} metrics: {} events, {} bookmarks, {} reconnects, {} relists, last event lag {}'
+                   .format(self._api_function.__name__, metrics.events, metrics.bookmarks, metrics.reconnects,
+                           metrics.relists, lag))
+
+    def _log_metrics_periodically(self):
+        """
+        Log metrics of watch if metrics_log_interval has passed since they have been logged
+
+        :return: None
+        """
+        if self._metrics_log_interval is not None \
+                and time.time() - self._metrics_logged_at >= self._metrics_log_interval:
+            self.log_metrics()
+
+    @staticmethod
+    def _get_object_key(event_object):
+        """
+        Get key of K8S object
+
+        :param event_object: K8S object
+        :return: tuple[str, str] -- namespace and name
+        """
+        return event_object.metadata.namespace, event_object.metadata.name
+
+    def _build_event(self, event_type, event_object):
+        """
+        Remember object and build event for consumer (if object passes filter)
+
+        :param event_type: type of event
+        :type event_type: str
+        :param event_object: K8S object
+        :return: Optional[tuple(str, Any)] -- event type and event object (plain or constructed)
+        """
+        metadata = getattr(event_object, 'metadata', None)
+        if metadata is not None and hasattr(metadata, 'resource_version'):
+            key = self._get_object_key(event_object)
+            if event_type == EVENT_DELETED:
+                self._known_objects.pop(key, None)
+            else:
+                self._known_objects[key] = event_object
+
+        # Check if valid object
+        if self._filter_callable and not self._filter_callable(event_object):
+            return None
+
+        # Construct specific object
+        if self._object_constructor:
+            event_object = self._object_constructor(event_object)
+
+        return event_type, event_object
+
+    def _relist(self):
+        """
+        List resources and build events for differences with known objects
+
+        :return: list[tuple(str, Any)] -- events for consumer
+        """
+        self._relists += 1
+        kwargs = {key: value for key, value in self._kwargs.items() if key not in _WATCH_ONLY_ARGUMENTS}
+        LOGGER.info('Relisting resources using {}'.format(self._api_function.__name__))
+
+        result = self._api_function(*self._args, **kwargs)
+        self._resource_version = result.metadata.resource_version
+
+        events = []
+        listed_keys = set()
+        for item in result.items:
+            key = self._get_object_key(item)
+            listed_keys.add(key)
+
+            known_object = self._known_objects.get(key)
+            if known_object is not None and known_object.metadata.resource_version == item.metadata.resource_version:
+                continue
+
+            event = self._build_event(EVENT_ADDED if known_object is None else EVENT_MODIFIED, item)
+            if event:
+                events.append(event)
+
+        # Objects which have been deleted while watch was not active are emitted with their latest known state
+        for key in set(self._known_objects) - listed_keys:
+            event = self._build_event(EVENT_DELETED, self._known_objects[key])
+            if event:
+                events.append(event)
+
+        return events
+
+    def _watch(self):
+        """
+        Open watch stream from the latest resource version
+
+        :return: Iterator[tuple(str, Any)] -- event type and event object (plain or constructed)
+        """
+        watch = kubernetes.watch.Watch()
+        kwargs = dict(self._kwargs)
+        if self._resource_version:
+            LOGGER.debug('Using latest resource version: {}'.format(self._resource_version))
+            kwargs['resource_version'] = self._resource_version
+        if self._deadline is not None:
+            kwargs['timeout_seconds'] = max(int(self._deadline - time.time()), 1)
+        if _supports_watch_bookmarks(self._api_function):
+            kwargs['allow_watch_bookmarks'] = True
+
+        LOGGER.debug('Creating watcher for function {}. Args: {!r}, Kwargs: {!r}'
+                     .format(self._api_function.__name__, self._args, kwargs))
+
+        for event in watch.stream(self._api_function, *self._args, **kwargs):
+            self._log_metrics_periodically()
+            event_type = event['type']
+            event_object = event['object']
+
+            if event_type == EVENT_ERROR:
+                raw_object = event.get('raw_object') or {}
+                if raw_object.get('code') == HTTP_STATUS_GONE:
+                    raise ResourceVersionExpired(raw_object.get('message'))
+                raise kubernetes.client.rest.ApiException(status=raw_object.get('code'),
+                                                          reason=raw_object.get('message'))
+
+            if hasattr(event_object, 'metadata') and hasattr(event_object.metadata, 'resource_version'):
+                self._resource_version = event_object.metadata.resource_version
+
+            if event_type == EVENT_BOOKMARK:
+                self._bookmarks += 1
+                continue
+
+            self._events += 1
+            self._last_event_time = time.time()
+            self._last_event_lag = _get_event_lag(event_type, event_object)
+
+            built_event = self._build_event(event_type, event_object)
+            if built_event:
+                yield built_event
 
     @property
     def stream(self):
@@ -66,52 +328,137 @@ class ResourceWatch:
                                     object_constructor has been passed)
         """
         LOGGER.debug('Starting watch stream')
+        delay = WATCH_RECONNECT_INITIAL_DELAY
 
-        while True:
+        while not self._is_deadline_reached():
             LOGGER.debug('Entering event loop iteration in watch')
+            self._log_metrics_periodically()
             try:
-                watch = kubernetes.watch.Watch()
-                kwargs = self._kwargs
-                if self._resource_version:
-                    LOGGER.debug('Using latest resource version: {}'.format(self._resource_version))
-                    kwargs['resource_version'] = self._resource_version
-
-                LOGGER.debug('Creating watcher for function {}. Args: {!r}, Kwargs: {!r}'
-                             .format(self._api_function.__name__, self._args, kwargs))
-
-                stream = watch.stream(self._api_function,
-                                      *self._args,
-                                      **kwargs)
-                for event in stream:
-                    event_type = event['type']
-                    event_object = event['object']
-
-                    if hasattr(event['object'], 'metadata') and hasattr(event['object'].metadata, 'resource_version'):
-                        self._resource_version = event['object'].metadata.resource_version
-
-                    # Check if valid object
-                    pass_event = not self._filter_callable or self._filter_callable(event_object)
+                for event in self._watch():
+                    delay = WATCH_RECONNECT_INITIAL_DELAY
+                    yield event
 
-                    if pass_event:
-                        # Construct specific object
-                        if self._object_constructor:
-                            event_object = self._object_constructor(event_object)
-
-                        yield event_type, event_object
+                # Watch with timeout is finished by API server, so there is no need to reconnect
+                if 'timeout_seconds' in self._kwargs or self._deadline is not None:
+                    break
 
-            except urllib3.exceptions.ProtocolError as protocol_error:
-                LOGGER.warning('Connection to K8S API has been lost: {}. Reconnecting...'.format(protocol_error))
+                LOGGER.debug('Watch stream has been closed by API server. Reconnecting...')
+                continue
+            except ResourceVersionExpired as expired:
+                LOGGER.warning('Resource version {} has expired: {}'.format(self._resource_version, expired))
+                yield from self._relist_with_retries()
+                delay = WATCH_RECONNECT_INITIAL_DELAY
                 continue
             except kubernetes.client.rest.ApiException as kube_api_exception:
-                LOGGER.warning('Got Kubernetes API exception: {}'.format(kube_api_exception))
-                if kube_api_exception.status == 500:
-                    LOGGER.warning('Got Kubernetes error 500. Reconnecting...')
+                if kube_api_exception.status == HTTP_STATUS_GONE:
+                    LOGGER.warning('Resource version {} has expired'.format(self._resource_version))
+                    yield from self._relist_with_retries()
+                    delay = WATCH_RECONNECT_INITIAL_DELAY
                     continue
-                else:
-                    LOGGER.warning('Got wrong error code. Breaking...')
-                    break
+
+                # Client errors (e.g. 403 Forbidden, 404 Not Found) are not fixed by reconnect
+                if kube_api_exception.status in HTTP_CLIENT_ERRORS:
+                    raise
+
+                LOGGER.warning('Got Kubernetes API exception: {}'.format(kube_api_exception))
+            except (urllib3.exceptions.HTTPError, ConnectionError) as connection_error:
+                LOGGER.warning('Connection to K8S API has been lost: {}'.format(connection_error))
             except Exception as general_exception:
                 LOGGER.exception('Got general exception: {}. Breaking...'.format(general_exception))
                 break
 
+            delay = self._wait_before_reconnect(delay)
+
         LOGGER.debug('Watch stream has been ended')
+
+    def _relist_with_retries(self):
+        """
+        Relist resources, retrying with backoff on API errors
+
+        :return: Iterator[tuple(str, Any)] -- events for differences with known objects
+        """
+        delay = WATCH_RECONNECT_INITIAL_DELAY
+        while True:
+            try:
+                events = self._relist()
+            except (kubernetes.client.rest.ApiException, urllib3.exceptions.HTTPError, ConnectionError) as error:
+                if isinstance(error, kubernetes.client.rest.ApiException) and error.status in HTTP_CLIENT_ERRORS:
+                    raise
+
+                LOGGER.warning('Cannot relist resources: {}'.format(error))
+                delay = self._wait_before_reconnect(delay)
+                if self._is_deadline_reached():
+                    return
+                continue
+
+            yield from events
+            return
+
+    def _is_deadline_reached(self):
+        """
+        Check that deadline of watch has been reached
+
+        :return: bool -- has deadline been reached
+        """
+        return self._deadline is not None and time.time() >= self._deadline
+
+    def _wait_before_reconnect(self, delay):
+        """
+        Sleep random (jittered) time before reconnect (not longer than till deadline)
+
+        :param delay: current upper bound of delay in seconds
+        :type delay: float
+        :return: float -- next upper bound of delay
+        """
+        self._reconnects += 1
+        sleep_time = random.uniform(0, delay)
+        if self._deadline is not None:
+            sleep_time = max(min(sleep_time, self._deadline - time.time()), 0)
+        LOGGER.warning('Reconnecting to K8S API in {:.2f}s (reconnect #{})'.format(sleep_time, self._reconnects))
+        self.log_metrics(logging.WARNING)
+        time.sleep(sleep_time)
+
+        return min(delay * WATCH_RECONNECT_BACKOFF_FACTOR, WATCH_RECONNECT_MAX_DELAY)
+
+
+def wait_for_object(list_function, namespace, name, condition, timeout):
+    """
+    Wait till K8S object satisfies condition. Object is watched by name (field selector on metadata.name),
+    so function returns as soon as the event arrives
+
+    :param list_function: API function to list (and watch) objects, e.g. CoreV1Api.list_namespaced_service
+    :param namespace: namespace of object
+    :type namespace: str
+    :param name: name of object
+    :type name: str
+    :param condition: callable that checks object state, it gets None if object does not exist
+    :type condition: Callable[[Any], bool]
+    :param timeout: timeout in seconds
+    :type timeout: float
+    :return: tuple(bool, Any) -- has condition been satisfied and latest object state (or None)
+    """
+    deadline = time.time() + timeout
+    field_selector = 'metadata.name={}'.format(name)
+
+    # Current state is listed first, watch starts from its resource version so no event can be missed
+    listed = list_function(namespace, field_selector=field_selector)
+    current = listed.items[0] if listed.items else None
+    if condition(current):
+        return True, current
+
+    resource_version = listed.metadata.resource_version
+    while time.time() < deadline:
+        watch = ResourceWatch(list_function, namespace,
+                              field_selector=field_selector,
+                              resource_version=resource_version,
+                              deadline=deadline)
+        for event_type, event_object in watch.stream:
+            current = None if event_type == EVENT_DELETED else event_object
+            if condition(current):
+                return True, current
+            if time.time() >= deadline:
+                break
+
+        resource_version = watch.resource_version
+
+    return False, current
@@ -22,7 +22,7 @@ import logging
 import signal
 from enum import IntEnum
 
-from legion.services.template.engine import LegionTemplateEngine
+from legion.services.template.engine import LegionTemplateEngine, RENDER_DEBOUNCE_DELAY, RENDER_MAX_WAIT
 
 
 def main():
@@ -47,6 +47,10 @@ def main():
                         help='Signal to send')
     parser.add_argument('--pid', '-p', type=int, help='PID to send the signal')
     parser.add_argument('--pid-file', '-f', type=str, help='Target process .pid file')
+    parser.add_argument('--debounce', type=float, default=RENDER_DEBOUNCE_DELAY,
+                        help='Coalesce updates within this delay (in seconds) into one render, 0 to disable')
+    parser.add_argument('--max-wait', type=float, default=RENDER_MAX_WAIT,
+                        help='Max delay (in seconds) of render since first coalesced update')
     parser.add_argument('--verbose',
                         help='verbose log output',
                         action='store_true')
@@ -62,5 +66,6 @@ def main():
     logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
 
     template_system = LegionTemplateEngine(args.template, args.output, command=args.command,
-                                           pid=args.pid, pid_file=args.pid_file, signal=target_signal)
+                                           pid=args.pid, pid_file=args.pid_file, signal=target_signal,
+                                           debounce_delay=args.debounce, max_wait=args.max_wait)
     template_system.render_loop()
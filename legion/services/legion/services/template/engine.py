@@ -21,19 +21,28 @@ import logging
 import os
 import os.path
 import importlib
+import shutil
+import tempfile
+import time
 
 import threading
 from jinja2 import Environment, FileSystemLoader, Undefined
 
 LOGGER = logging.getLogger(__name__)
 
+# Renders requested within this window (in seconds) are coalesced into one
+RENDER_DEBOUNCE_DELAY = 0.5
+# Max delay (in seconds) of render since first coalesced request
+RENDER_MAX_WAIT = 5
+
 
 class LegionTemplateEngine:
     """
     Extensible template system
     """
 
-    def __init__(self, template_file, output_file, command=None, signal=None, pid=None, pid_file=None):
+    def __init__(self, template_file, output_file, command=None, signal=None, pid=None, pid_file=None,
+                 debounce_delay=RENDER_DEBOUNCE_DELAY, max_wait=RENDER_MAX_WAIT):
         """
         Initialize template system
 
@@ -49,6 +58,11 @@ class LegionTemplateEngine:
         :type pid: int
         :param pid_file: (Optional) process id file, that receives signal on render
         :type pid_file: str
+        :param debounce_delay: (Optional) renders requested within this delay (in seconds) are coalesced,
+                               0 for rendering on each request
+        :type debounce_delay: float
+        :param max_wait: (Optional) max delay (in seconds) of render since first coalesced request
+        :type max_wait: float
         """
         LOGGER.debug('Creating LegionTemplateEngine instance for source={}, destination={}'
                      .format(template_file, output_file))
@@ -74,6 +88,17 @@ class LegionTemplateEngine:
         self._plugins = []
         self._initializing_mode = True
 
+        self._debounce_delay = debounce_delay
+        self._max_wait = max_wait
+        # Guards context and render schedule, plugins threads wait on it
+        self._condition = threading.Condition()
+        # Serializes rendering and notification of targets
+        self._render_lock = threading.Lock()
+        self._first_request_time = None
+        self._last_request_time = None
+        self._last_content = None
+        self._scheduler = None
+
     @property
     def template_file_path(self):
         """
@@ -121,13 +146,13 @@ class LegionTemplateEngine:
 
     def render(self, **items):
         """
-        Render template and notify targets (execute bash command or send signal)
+        Update context and schedule render of template. Renders requested within debounce delay are coalesced
 
         :param items: values to update context
         :type items: dict[str, Any]
         :return: None
         """
-        with threading.Lock():
+        with self._condition:
             LOGGER.debug('Updating context')
             self._context.update(items)
 
@@ -135,11 +160,109 @@ class LegionTemplateEngine:
             if self._initializing_mode:
                 return None
 
-            LOGGER.debug('Rendering')
-            # Render and update target file
-            content = self._template.render(self._context)
-            with open(self._output_file, 'w') as file_stream:
+            if not self._scheduler:
+                render_now = True
+            else:
+                render_now = False
+                now = time.monotonic()
+                if self._first_request_time is None:
+                    self._first_request_time = now
+                self._last_request_time = now
+                self._condition.notify()
+
+        if render_now:
+            self.render_now()
+
+    def _get_scheduled_render_time(self):
+        """
+        Get time of next render (should be called with acquired condition)
+
+        :return: float or None -- monotonic time of render or None if render has not been requested
+        """
+        if self._first_request_time is None:
+            return None
+
+        return min(self._last_request_time + self._debounce_delay, self._first_request_time + self._max_wait)
+
+    def _render_scheduler(self):
+        """
+        Render template when debounce delay or max wait time has passed since requests
+
+        :return: None
+        """
+        while True:
+            with self._condition:
+                render_time = self._get_scheduled_render_time()
+                while render_time is None or render_time > time.monotonic():
+                    self._condition.wait(None if render_time is None else render_time - time.monotonic())
+                    render_time = self._get_scheduled_render_time()
+
+                self._first_request_time = self._last_request_time = None
+
+            try:
+                self.render_now()
+            except Exception as render_exception:
+                LOGGER.exception('Cannot render template: {}'.format(render_exception))
+
+    def _write_output(self, content):
+        """
+        Atomically replace output file (write temporary file in the same directory and rename it)
+
+        :param content: new content
+        :type content: str
+        :return: None
+        """
+        output_directory = os.path.dirname(os.path.abspath(self._output_file))
+        file_descriptor, temp_path = tempfile.mkstemp(dir=output_directory,
+                                                      prefix='.{}.'.format(os.path.basename(self._output_file)))
+        try:
+            with os.fdopen(file_descriptor, 'w') as file_stream:
                 file_stream.write(content)
+                file_stream.flush()
+                os.fsync(file_stream.fileno())
+
+            if os.path.exists(self._output_file):
+                shutil.copymode(self._output_file, temp_path)
+            os.replace(temp_path, self._output_file)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def _read_output(self):
+        """
+        Read current output file
+
+        :return: str or None -- content of output file or None if it cannot be read
+        """
+        try:
+            with open(self._output_file) as file_stream:
+                return file_stream.read()
+        except OSError:
+            return None
+
+    def render_now(self):
+        """
+        Render template and notify targets (execute bash command or send signal).
+        If rendered content equals to current output, file is not rewritten and targets are not notified
+
+        :return: bool -- has output been changed
+        """
+        with self._render_lock:
+            with self._condition:
+                context = dict(self._context)
+
+            LOGGER.debug('Rendering')
+            content = self._template.render(context)
+
+            previous_content = self._last_content if self._last_content is not None else self._read_output()
+            if content == previous_content:
+                LOGGER.debug('Rendered content has not been changed, skipping update of {}'.format(self._output_file))
+                self._last_content = content
+                return False
+
+            self._write_output(content)
+            self._last_content = content
 
             # Notify targets
             if self._command:
@@ -153,6 +276,8 @@ class LegionTemplateEngine:
                         raise ValueError('PID "{}" is not an integer'.format(pid))
                     os.kill(int(pid), self._signal)
 
+            return True
+
     def render_loop(self):
         """
         Start render loop
@@ -168,7 +293,11 @@ class LegionTemplateEngine:
 
         # Do first render
         LOGGER.debug('Staring first render')
-        self.render()
+        self.render_now()
+
+        if self._debounce_delay > 0:
+            self._scheduler = threading.Thread(target=self._render_scheduler, daemon=True, name='render-scheduler')
+            self._scheduler.start()
 
         # Check is any plugin present
         if not self._plugins:
@@ -16,5 +16,5 @@
 """
 legion template plugins
 """
-from .enclave import enclave_models_monitor
+from .enclave import enclave_models_monitor, enclave_model_upstreams_monitor
 from .os_environ import environment_variables_provider
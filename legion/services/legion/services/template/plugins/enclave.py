@@ -19,9 +19,12 @@ Enclave models Notifier module for Legion Template
 import logging
 
 from legion.services.k8s.enclave import Enclave
+from legion.services.k8s.informer import start_namespace_cache, CACHE_SERVICES
 from legion.services.k8s.utils import get_current_namespace
 
 LOGGER = logging.getLogger(__name__)
+# Metrics of watches (reconnects, relists, event lag) are logged with this interval (in seconds) and on reconnects
+WATCH_METRICS_LOG_INTERVAL = 300
 
 
 def enclave_models_monitor(template_system):
@@ -34,9 +37,32 @@ def enclave_models_monitor(template_system):
     namespace = get_current_namespace()
     LOGGER.info('Starting models monitor in namespace {}'.format(namespace))
 
+    # Lookups of services are served from in-memory cache, models monitor does not read other resources
+    start_namespace_cache(namespace, kinds=(CACHE_SERVICES,))
+
     enclave = Enclave(namespace)
     LOGGER.info('Loaded enclave {}'.format(enclave))
 
-    for model_endpoints, unspecified_version_endpoints in enclave.watch_model_service_endpoints_state():
-        LOGGER.info('Got updated model state')
-        template_system.render(models=model_endpoints, unspecified_version_endpoints=unspecified_version_endpoints)
+    for state in enclave.watch_model_service_endpoints_state(WATCH_METRICS_LOG_INTERVAL):
+        if not state.changes:
+            LOGGER.debug('Model state has not been changed')
+            continue
+
+        LOGGER.info('Got updated model state for models {}'.format(', '.join(sorted(state.changes))))
+        template_system.render(models=state.models, unspecified_version_endpoints=state.unspecified_version_endpoints)
+
+
+def enclave_model_upstreams_monitor(template_system):
+    """
+    Update template with ready pods of model services (for rendering of upstreams)
+
+    :param template_system: Object, that contains 'render' callback function
+    :return: None
+    """
+    namespace = get_current_namespace()
+    LOGGER.info('Starting model upstreams monitor in namespace {}'.format(namespace))
+
+    enclave = Enclave(namespace)
+
+    for model_upstreams in enclave.watch_model_upstreams(WATCH_METRICS_LOG_INTERVAL):
+        template_system.render(model_upstreams=model_upstreams)
@@ -0,0 +1,113 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import unittest2
+from legion.toolchain import benchmark, model
+from legion.toolchain.pymodel.model import Model, ModelEndpoint
+
+
+def apply_sum(x):
+    return {'result': x['a'] + x['b']}
+
+
+def apply_fail(x):
+    if x['fail']:
+        raise ValueError('Failed')
+    return x
+
+
+class TestModelBenchmark(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self._test_dir = tempfile.mkdtemp()
+        self._model_file = os.path.join(self._test_dir, 'model.bin')
+
+        model.reset_context()
+        with patch('legion.toolchain.model.clear_metric_store'):
+            model.init('bench-model', '1.0')
+        model.export(apply_sum, {'a': model.int32, 'b': model.float64})
+        model.export_untyped(apply_fail, endpoint='untyped')
+        model.save(self._model_file)
+        model.reset_context()
+
+        patcher = patch.dict(benchmark._MODELS, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self._test_dir)
+
+    def test_sample_input(self):
+        endpoints = Model.load(self._model_file).endpoints
+
+        self.assertEqual(benchmark.build_sample_input(endpoints['default']), {'a': '1', 'b': '1.0'})
+        with self.assertRaises(ValueError):
+            benchmark.build_sample_input(endpoints['untyped'])
+
+    def test_invoke_stages_are_measured(self):
+        stage_timings = {}
+        result = Model.load(self._model_file).endpoints['default'].invoke({'a': '1', 'b': '2.5'}, stage_timings)
+
+        self.assertEqual(result, {'result': 3.5})
+        self.assertEqual(sorted(stage_timings), ['apply', 'parse', 'prepare'])
+
+    def test_benchmark_results(self):
+        results = benchmark.run_benchmark(self._model_file, endpoints=['default'], batch_size=3, concurrency=2,
+                                          requests=20, warmup_requests=1)
+
+        self.assertEqual((results['model_id'], results['model_version']), ('bench-model', '1.0'))
+        endpoint_results = results['endpoints']['default']
+        self.assertEqual((endpoint_results['requests'], endpoint_results['errors']), (20, 0))
+        self.assertGreater(endpoint_results['throughput'], 0)
+        self.assertLessEqual(endpoint_results['latency_ms']['p50'], endpoint_results['latency_ms']['p99'])
+        self.assertEqual(sorted(endpoint_results['stages_ms']), ['apply', 'parse', 'prepare'])
+        # Results can be stored as JSON
+        self.assertEqual(json.loads(json.dumps(results)), results)
+
+    def test_each_worker_is_warmed_up(self):
+        with patch.object(ModelEndpoint, 'invoke', autospec=True, side_effect=ModelEndpoint.invoke) as invoke:
+            benchmark.run_benchmark(self._model_file, endpoints=['default'], concurrency=3, requests=10,
+                                    warmup_requests=2)
+
+        self.assertEqual(invoke.call_count, 3 * 2 + 10)
+
+    def test_benchmark_in_processes(self):
+        results = benchmark.run_benchmark(self._model_file, endpoints=['default'], concurrency=2, use_processes=True,
+                                          requests=4, warmup_requests=1)
+
+        self.assertEqual(results['workers'], 'processes')
+        self.assertEqual(results['endpoints']['default']['errors'], 0)
+
+    def test_errors_are_counted(self):
+        inputs = {'untyped': [{'fail': False}, {'fail': True}]}
+        results = benchmark.run_benchmark(self._model_file, inputs=inputs, endpoints=['untyped'], requests=10,
+                                          warmup_requests=0)
+
+        self.assertEqual(results['endpoints']['untyped']['errors'], 5)
+
+    def test_unknown_endpoint(self):
+        with self.assertRaises(ValueError):
+            benchmark.run_benchmark(self._model_file, endpoints=['missed'])
+
+
+if __name__ == '__main__':
+    unittest2.main()
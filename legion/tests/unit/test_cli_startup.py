@@ -0,0 +1,117 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import argparse
+import importlib
+import json
+import os
+import pkgutil
+import subprocess
+import sys
+
+import unittest2
+from legion.cli import main, parsers
+
+# Budget for import of the CLI and handling of `legionctl --version` (in seconds).
+# Wall-clock check is flaky on loaded machines, so it is enabled only if the budget is set
+CLI_STARTUP_BUDGET = os.environ.get('LEGION_TEST_CLI_STARTUP_BUDGET')
+HEAVY_MODULES = ('docker', 'requests', 'jinja2', 'yaml', 'texttable', 'kubernetes')
+
+STARTUP_SCRIPT = '''
+import json, sys, time
+
+start = time.perf_counter()
+sys.argv = ['legionctl'] + {args!r}
+from legion.cli.main import build_parser
+parser, _ = build_parser(sys.argv[1:])
+duration = time.perf_counter() - start
+
+print(json.dumps({{
+    'duration': duration,
+    'modules': [name for name in sys.modules
+                if name.split('.')[0] in {heavy!r} or name.startswith('legion.cli.parsers.')]
+}}))
+'''
+
+
+def measure_cli_startup(*args):
+    """
+    Build CLI parser in a fresh interpreter
+
+    :param args: command line arguments
+    :type args: str
+    :return: dict -- startup duration and imported heavy modules
+    """
+    env = os.environ.copy()
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+
+    script = STARTUP_SCRIPT.format(args=list(args), heavy=HEAVY_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', script], env=env)
+    return json.loads(output.decode('utf-8').splitlines()[-1])
+
+
+class TestCliStartup(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def test_version_does_not_load_subcommands(self):
+        result = measure_cli_startup('--version')
+
+        self.assertEqual(result['modules'], [])
+
+    @unittest2.skipUnless(CLI_STARTUP_BUDGET, 'LEGION_TEST_CLI_STARTUP_BUDGET is not set')
+    def test_startup_time(self):
+        result = measure_cli_startup('--version')
+
+        self.assertLess(result['duration'], float(CLI_STARTUP_BUDGET))
+
+    def test_only_called_subcommand_is_loaded(self):
+        result = measure_cli_startup('--verbose', 'config', 'get', 'EDI_URL')
+
+        self.assertIn('legion.cli.parsers.config', result['modules'])
+        self.assertNotIn('legion.cli.parsers.deployment', result['modules'])
+        self.assertNotIn('docker', result['modules'])
+
+    def test_remote_subcommand_does_not_load_docker(self):
+        result = measure_cli_startup('md', 'get')
+
+        self.assertIn('legion.cli.parsers.deployment', result['modules'])
+        self.assertNotIn('legion.cli.parsers.training', result['modules'])
+        self.assertNotIn('docker', result['modules'])
+
+    def test_help_loads_all_subcommands(self):
+        result = measure_cli_startup('--help')
+
+        self.assertIn('legion.cli.parsers.cloud', result['modules'])
+        self.assertIn('legion.cli.parsers.local', result['modules'])
+
+
+class TestCliSubcommandModules(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def test_parsers_declare_listed_subcommands(self):
+        for module_name, subcommands in main.SUBCOMMAND_MODULES:
+            subparsers = argparse.ArgumentParser().add_subparsers()
+            importlib.import_module('legion.cli.parsers.' + module_name).generate_parsers(subparsers)
+
+            self.assertEqual(set(subparsers.choices), set(subcommands), module_name)
+
+    def test_all_parsers_are_listed(self):
+        modules = {module.name for module in pkgutil.iter_modules(parsers.__path__)}
+
+        self.assertEqual(modules, {module_name for module_name, _ in main.SUBCOMMAND_MODULES})
+
+
+if __name__ == '__main__':
+    unittest2.main()
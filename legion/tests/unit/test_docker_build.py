@@ -0,0 +1,303 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import json
+import os
+import tarfile
+import tempfile
+from unittest.mock import MagicMock, patch
+
+import docker.errors
+import unittest2
+
+from legion.sdk import utils
+from legion.sdk.containers import docker as legion_docker
+
+
+class TestDockerBuildContext(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def test_context_contains_workspace_and_model(self):
+        with utils.TemporaryFolder('legion-test-build') as temp_directory:
+            workspace = os.path.join(temp_directory.path, 'workspace')
+            additional = os.path.join(temp_directory.path, 'additional')
+            for directory in (os.path.join(workspace, 'data'), additional):
+                os.makedirs(directory)
+            for path in (os.path.join(workspace, 'train.py'), os.path.join(workspace, 'data', 'train.csv'),
+                         os.path.join(additional, 'uwsgi.ini'), os.path.join(temp_directory.path, 'model.bin')):
+                with open(path, 'w') as stream:
+                    stream.write(path)
+
+            with tempfile.TemporaryFile() as context_file:
+                legion_docker.write_build_context(context_file, 'FROM scratch', additional, workspace,
+                                                  os.path.join(temp_directory.path, 'model.bin'), 'model-id')
+
+                with tarfile.open(fileobj=context_file) as context:
+                    members = {member.name: member for member in context.getmembers()}
+                    dockerfile = context.extractfile('Dockerfile').read()
+
+        self.assertEqual(dockerfile, b'FROM scratch')
+        self.assertTrue({'uwsgi.ini', 'workspace/train.py', 'workspace/data/train.csv',
+                         'model/model-id'}.issubset(members))
+        self.assertEqual({(member.uid, member.gid, member.uname) for member in members.values()}, {(0, 0, '')})
+
+    def test_only_changed_workspace_items_are_sent(self):
+        client = MagicMock()
+        with utils.TemporaryFolder('legion-test-build') as temp_directory:
+            workspace = os.path.join(temp_directory.path, 'workspace')
+            os.makedirs(os.path.join(workspace, 'data'))
+            for name in ('train.py', 'data/train.csv'):
+                with open(os.path.join(workspace, name), 'w') as stream:
+                    stream.write(name)
+            manifest_path = os.path.join(temp_directory.path, 'manifest.json')
+
+            self.assertEqual(legion_docker.get_previous_build(client, manifest_path, workspace, 'model-id', {}),
+                             (None, None))
+
+            legion_docker.save_build_manifest(manifest_path, 'sha256:previous', workspace, 'model-id',
+                                              legion_docker.get_workspace_manifest(workspace))
+            with open(os.path.join(workspace, 'data', 'train.csv'), 'w') as stream:
+                stream.write('changed')
+            os.makedirs(os.path.join(workspace, 'new'))
+            manifest = legion_docker.get_workspace_manifest(workspace)
+
+            image_id, items = legion_docker.get_previous_build(client, manifest_path, workspace, 'model-id', manifest)
+            self.assertEqual((image_id, sorted(items)), ('sha256:previous', ['data/train.csv', 'new']))
+            self.assertEqual(legion_docker.get_previous_build(client, manifest_path, workspace, 'other', manifest),
+                             (None, None))
+
+            additional = os.path.join(temp_directory.path, 'additional')
+            os.makedirs(additional)
+            with tempfile.TemporaryFile() as context_file:
+                legion_docker.write_build_context(context_file, 'FROM scratch', additional, workspace,
+                                                  manifest_path, 'model-id', items)
+                with tarfile.open(fileobj=context_file) as context:
+                    names = [name for name in context.getnames() if name.startswith('workspace')]
+
+            self.assertEqual(names, ['workspace', 'workspace/data/train.csv', 'workspace/new'])
+
+            # Removed items cannot be removed from previous workspace
+            os.remove(os.path.join(workspace, 'train.py'))
+            manifest = legion_docker.get_workspace_manifest(workspace)
+            self.assertEqual(legion_docker.get_previous_build(client, manifest_path, workspace, 'model-id', manifest),
+                             (None, None))
+
+            with open(manifest_path) as stream:
+                self.assertEqual(json.load(stream)['image'], 'sha256:previous')
+
+    def test_model_binary_is_not_copied_from_previous_build(self):
+        dockerfile = legion_docker.generate_dockerfile('sha256:base', 'sha256:previous', 'model-id', 'true')
+        lines = dockerfile.splitlines()
+
+        copied_from_previous = [line.split()[2] for line in lines if line.startswith('COPY --from=previous')]
+        model_file = next(line.split('"')[1] for line in lines if line.startswith('ENV MODEL_FILE='))
+
+        self.assertEqual(copied_from_previous, [legion_docker.MODEL_TARGET_WORKSPACE + '/'])
+        self.assertEqual(model_file, os.path.join(legion_docker.MODEL_TARGET_DIRECTORY, 'model-id'))
+        self.assertFalse(model_file.startswith(copied_from_previous[0]))
+        self.assertIn('COPY model/model-id {}'.format(model_file), lines)
+
+    def test_first_build_does_not_use_previous_image(self):
+        dockerfile = legion_docker.generate_dockerfile('sha256:base', None, 'model-id', 'true')
+
+        self.assertNotIn('previous', dockerfile)
+
+
+class TestDockerBuildBaseImage(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(utils.remove_directory, self.root)
+        for path in ('usr/lib/python3/site-packages/pandas', 'work-directory/train.py'):
+            self._write(path, path)
+
+        patcher = patch.object(legion_docker, 'CURRENT_CONTAINER_ROOT', self.root)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.container = MagicMock(attrs={'Image': 'sha256:toolchain'})
+        self.container.diff.return_value = [{'Path': '/usr/lib/python3/site-packages/pandas', 'Kind': 1},
+                                            {'Path': '/tmp/model.bin', 'Kind': 1},
+                                            {'Path': '/work-directory/train.py', 'Kind': 0}]
+        self.container.commit.return_value = MagicMock(id='sha256:committed')
+
+        self.client = MagicMock()
+        self.client.containers.get.return_value = self.container
+
+    def _write(self, path, content):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as stream:
+            stream.write(content)
+
+    def test_fingerprint_ignores_paths(self):
+        fingerprint = legion_docker.get_container_fingerprint(self.container, ('/tmp', '/work-directory'), self.root)
+
+        self.container.diff.return_value = self.container.diff.return_value[:1]
+        self.assertEqual(legion_docker.get_container_fingerprint(self.container, ('/tmp',), self.root), fingerprint)
+
+        self.container.diff.return_value.append({'Path': '/usr/lib/python3/site-packages/numpy', 'Kind': 2})
+        self.assertNotEqual(legion_docker.get_container_fingerprint(self.container, ('/tmp',), self.root),
+                            fingerprint)
+
+    def test_fingerprint_depends_on_contents(self):
+        fingerprint = legion_docker.get_container_fingerprint(self.container, ('/tmp',), self.root)
+
+        self._write('work-directory/train.py', 'changed')
+        self.assertNotEqual(legion_docker.get_container_fingerprint(self.container, ('/tmp',), self.root),
+                            fingerprint)
+
+        # Contents cannot be compared if they cannot be read
+        self.assertIsNone(legion_docker.get_container_fingerprint(self.container, ('/tmp',)))
+        os.remove(os.path.join(self.root, 'work-directory/train.py'))
+        self.assertIsNone(legion_docker.get_container_fingerprint(self.container, ('/tmp',), self.root))
+
+    @patch.object(legion_docker, 'get_current_docker_container_id', return_value='container')
+    def test_container_is_committed_if_changed(self, _):
+        self.client.images.list.return_value = []
+
+        image_id = legion_docker.get_build_base_image(self.client, None, ('/tmp', '/work-directory'))
+
+        self.assertEqual(image_id, 'sha256:committed')
+        labels = self.container.commit.call_args[1]['conf']['Labels']
+        self.assertEqual(self.client.images.list.call_args_list[0][1]['filters']['label'],
+                         '{}={}'.format(*labels.popitem()))
+
+    @patch.object(legion_docker, 'get_current_docker_container_id', return_value='container')
+    def test_committed_image_is_reused(self, _):
+        self.client.images.list.return_value = [MagicMock(id='sha256:previous')]
+
+        image_id = legion_docker.get_build_base_image(self.client)
+
+        self.assertEqual(image_id, 'sha256:previous')
+        self.container.commit.assert_not_called()
+
+    def test_other_container_is_always_committed(self):
+        self.client.images.list.return_value = [MagicMock(id='sha256:previous')]
+
+        image_id = legion_docker.get_build_base_image(self.client, 'container')
+
+        self.assertEqual(image_id, 'sha256:committed')
+        self.assertEqual(self.client.images.list.call_args[1]['filters']['label'],
+                         legion_docker.BUILD_BASE_FINGERPRINT_LABEL)
+
+    def test_old_base_images_are_pruned(self):
+        images = [MagicMock(id='sha256:{}'.format(index), attrs={'Created': '2019-01-0{}'.format(index)})
+                  for index in range(1, 6)]
+        self.client.images.list.return_value = images
+
+        def remove(image_id):
+            if image_id == 'sha256:1':
+                raise legion_docker.docker.errors.APIError('Image has dependent child images')
+
+        self.client.images.remove.side_effect = remove
+
+        self.assertEqual(legion_docker.prune_build_base_images(self.client, kept=2), ['sha256:3', 'sha256:2'])
+        self.assertEqual(self.client.images.remove.call_count, 3)
+
+
+class TestDockerImagePush(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    EVENTS = [
+        {'status': 'The push refers to repository [registry/legion/model]'},
+        {'status': 'Preparing', 'id': 'a'},
+        {'status': 'Preparing', 'id': 'b'},
+        {'status': 'Layer already exists', 'id': 'a'},
+        {'status': 'Pushing', 'id': 'b', 'progressDetail': {'current': 10, 'total': 100}},
+        {'status': 'Pushing', 'id': 'b', 'progressDetail': {'current': 60, 'total': 100}},
+        {'status': 'Pushed', 'id': 'b'},
+        {'progressDetail': {}, 'aux': {'Tag': '1.0', 'Digest': 'sha256:abc', 'Size': 100}},
+    ]
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.image = MagicMock()
+
+        self.sleeps = []
+        patcher = patch.object(legion_docker.time, 'sleep', side_effect=self.sleeps.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = patch.object(legion_docker.utils, 'send_header_to_stderr')
+        self.send_header = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_push_progress(self):
+        self.client.images.push.return_value = iter(self.EVENTS)
+
+        progress = legion_docker.push_image_to_registry(self.client, self.image, 'registry/legion/model:1.0')
+
+        self.assertEqual(progress.digest, 'sha256:abc')
+        self.assertEqual(progress.skipped_layers, ['a'])
+        self.assertEqual(progress.pushed_layers, ['b'])
+        self.client.images.push.assert_called_once_with('registry/legion/model', tag='1.0', auth_config=None,
+                                                        stream=True, decode=True)
+        self.send_header.assert_called_once_with(legion_docker.headers.IMAGE_TAG_EXTERNAL,
+                                                 'registry/legion/model:1.0')
+
+    def test_failed_push_is_retried(self):
+        failed = [{'status': 'Pushing', 'id': 'b'}, {'error': 'connection reset', 'errorDetail': {}}]
+        self.client.images.push.side_effect = [iter(failed), iter(failed), iter(self.EVENTS)]
+
+        progress = legion_docker.push_image_to_registry(self.client, self.image, 'registry/legion/model:1.0')
+
+        self.assertEqual(progress.digest, 'sha256:abc')
+        delay = legion_docker.PUSH_RETRY_INITIAL_DELAY
+        self.assertEqual(self.sleeps, [delay, delay * legion_docker.PUSH_RETRY_BACKOFF_FACTOR])
+
+    def test_server_error_is_retried(self):
+        response = MagicMock(status_code=503)
+        self.client.images.push.side_effect = [docker.errors.APIError('unavailable', response=response),
+                                               iter(self.EVENTS)]
+
+        progress = legion_docker.push_image_to_registry(self.client, self.image, 'registry/legion/model:1.0')
+
+        self.assertEqual(progress.digest, 'sha256:abc')
+        self.assertEqual(self.client.images.push.call_count, 2)
+
+    def test_push_fails_after_retries(self):
+        error = {'error': 'received unexpected HTTP status: 502 Bad Gateway'}
+        self.client.images.push.side_effect = lambda *args, **kwargs: iter([error])
+
+        with self.assertRaisesRegex(Exception, '502 Bad Gateway'):
+            legion_docker.push_image_to_registry(self.client, self.image, 'registry/legion/model:1.0', retries=2)
+
+        self.assertEqual(self.client.images.push.call_count, 2)
+        self.send_header.assert_not_called()
+
+    def test_client_errors_are_not_retried(self):
+        response = MagicMock(status_code=404)
+        for failure in (iter([{'error': 'unauthorized: authentication required'}]),
+                        docker.errors.APIError('not found', response=response)):
+            self.client.images.push.reset_mock()
+            self.client.images.push.side_effect = [failure, iter(self.EVENTS)]
+
+            with self.assertRaises(Exception):
+                legion_docker.push_image_to_registry(self.client, self.image, 'registry/legion/model:1.0')
+
+            self.assertEqual(self.client.images.push.call_count, 1)
+        self.assertEqual(self.sleeps, [])
+
+    def test_invalid_retries_count(self):
+        with self.assertRaises(ValueError):
+            legion_docker.push_image_to_registry(self.client, self.image, 'registry/legion/model:1.0', retries=0)
+
+        self.client.images.push.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -0,0 +1,113 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from unittest.mock import patch, MagicMock
+
+import unittest2
+
+from legion.sdk.clients import edi_aggregated
+from legion.sdk.clients.edi_aggregated import LegionCloudResourceUpdatePair, LegionCloudResourcesUpdateList, apply
+from legion.sdk.clients.deployment import ModelDeployment
+from legion.sdk.clients.training import ModelTraining
+from legion.sdk.clients.vcs import VCSCredential
+
+VCS = VCSCredential(name='vcs', type='git', uri='git@github.com:legion-platform/legion.git',
+                    default_reference='origin/develop')
+TRAINING = ModelTraining(name='mt', toolchain_type='python', entrypoint='simple.py', vcs_name='vcs')
+DEPLOYMENT = ModelDeployment(name='md', image='legion/test:1')
+
+
+def _build_updates(*resources):
+    return LegionCloudResourcesUpdateList(changes=tuple(
+        LegionCloudResourceUpdatePair(resource_name=resource.name, resource=resource) for resource in resources
+    ))
+
+
+class TestEdiAggregatedApply(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.calls = []
+        self.clients = {}
+        for resource_type in edi_aggregated.RESOURCES_APPLY_ORDER:
+            client = MagicMock()
+            client.get_all.return_value = []
+            kind = resource_type.__name__
+            client.create.side_effect = lambda resource, kind=kind: self.calls.append(('create', kind))
+            client.edit.side_effect = lambda resource, kind=kind: self.calls.append(('edit', kind))
+            client.delete.side_effect = lambda name, kind=kind: self.calls.append(('delete', kind))
+            self.clients[resource_type] = client
+
+        patcher = patch.object(edi_aggregated, 'build_client',
+                               side_effect=lambda change, _: self.clients[type(change.resource)])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_apply_in_dependency_order(self):
+        result = apply(_build_updates(DEPLOYMENT, TRAINING, VCS), MagicMock(), False, parallelism=2)
+
+        self.assertEqual(self.calls, [('create', 'VCSCredential'), ('create', 'ModelTraining'),
+                                      ('create', 'ModelDeployment')])
+        self.assertEqual([change.resource for change in result.created], [DEPLOYMENT, TRAINING, VCS])
+        self.assertFalse(result.errors)
+
+    def test_removal_in_reversed_dependency_order(self):
+        for resource_type, resource in ((VCSCredential, VCS), (ModelTraining, TRAINING),
+                                        (ModelDeployment, DEPLOYMENT)):
+            self.clients[resource_type].get_all.return_value = [resource]
+
+        result = apply(_build_updates(VCS, TRAINING, DEPLOYMENT), MagicMock(), True)
+
+        self.assertEqual(self.calls, [('delete', 'ModelDeployment'), ('delete', 'ModelTraining'),
+                                      ('delete', 'VCSCredential')])
+        self.assertEqual(len(result.removed), 3)
+
+    def test_existence_is_checked_once_per_kind(self):
+        second_training = TRAINING._replace(name='mt-2')
+        self.clients[ModelTraining].get_all.return_value = [TRAINING]
+
+        result = apply(_build_updates(TRAINING, second_training), MagicMock(), False)
+
+        self.clients[ModelTraining].get_all.assert_called_once_with()
+        self.clients[ModelTraining].get.assert_not_called()
+        self.assertEqual([change.resource for change in result.changed], [TRAINING])
+        self.assertEqual([change.resource for change in result.created], [second_training])
+
+    def test_dry_run_does_not_change_resources(self):
+        self.clients[ModelTraining].get_all.return_value = [TRAINING]
+        self.clients[ModelDeployment].get_all.return_value = [DEPLOYMENT._replace(replicas=2)]
+
+        result = apply(_build_updates(VCS, TRAINING, DEPLOYMENT), MagicMock(), False, dry_run=True)
+
+        self.assertEqual(self.calls, [])
+        self.assertEqual([change.resource for change in result.created], [VCS])
+        self.assertEqual([change.resource for change in result.changed], [DEPLOYMENT])
+
+    def test_errors_are_collected(self):
+        self.clients[ModelTraining].create.side_effect = Exception('Some exception')
+
+        result = apply(_build_updates(VCS, TRAINING), MagicMock(), False)
+
+        self.assertEqual([change.resource for change in result.created], [VCS])
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('Some exception', str(result.errors[0]))
+
+    def test_invalid_parallelism(self):
+        with self.assertRaises(ValueError):
+            apply(_build_updates(VCS), MagicMock(), False, parallelism=0)
+
+
+if __name__ == '__main__':
+    unittest2.main()
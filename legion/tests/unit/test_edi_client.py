@@ -0,0 +1,121 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from unittest.mock import patch, MagicMock
+
+import unittest2
+
+from legion.sdk.clients import edi
+from legion.sdk.clients.deployment import ModelDeploymentClient, ModelDeployment
+from legion.sdk.clients.edi import WrongHttpStatusCode, EDIConnectionException, IncorrectAuthorizationToken
+from legion.sdk.clients.training import ModelTrainingClient
+
+
+class TestEdiClientWatch(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.sleeps = []
+        patcher = patch.object(edi.time, 'sleep', side_effect=self.sleeps.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.client = ModelDeploymentClient('http://edi')
+
+    def test_watch_yields_only_changes(self):
+        states = [
+            WrongHttpStatusCode(404),
+            ModelDeployment(name='md', image='image', state='Processing'),
+            ModelDeployment(name='md', image='image', state='Processing'),
+            ModelDeployment(name='md', image='image', state='DeploymentCreated'),
+        ]
+        self.client.get = MagicMock(side_effect=states)
+
+        watch = self.client.watch('md')
+        self.assertEqual(next(watch).state, 'Processing')
+        self.assertEqual(next(watch).state, 'DeploymentCreated')
+
+        self.assertEqual(self.client.get.call_count, 4)
+
+    def test_watch_backoff_is_reset_on_change(self):
+        unchanged = ModelDeployment(name='md', image='image', state='Processing')
+        changed = unchanged._replace(state='DeploymentCreated')
+        self.client.get = MagicMock(side_effect=[unchanged, unchanged, unchanged, changed])
+
+        watch = self.client.watch('md', initial_delay=1, max_delay=3, backoff_factor=2)
+        next(watch)
+        next(watch)
+
+        self.assertEqual(self.sleeps, [1, 2, 3])
+
+    def test_watch_retries_errors_until_timeout(self):
+        self.client.get = MagicMock(side_effect=[edi.requests.exceptions.ReadTimeout('Timeout'),
+                                                 edi.HTTPException('Broken response'),
+                                                 EDIConnectionException('Can not reach'),
+                                                 ModelDeployment(name='md', image='image'),
+                                                 ModelDeployment(name='md', image='image')])
+
+        with patch.object(edi.time, 'time', side_effect=[0, 0, 1, 2, 3, 4]):
+            result = list(self.client.watch('md', timeout=4, initial_delay=1, max_delay=2, backoff_factor=2))
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(self.sleeps, [1, 2, 2, 1])
+
+        self.client.get = MagicMock(side_effect=IncorrectAuthorizationToken('Credentials are not correct'))
+        with self.assertRaises(IncorrectAuthorizationToken):
+            next(self.client.watch('md'))
+
+    def test_watch_stops_on_timeout(self):
+        self.client.get = MagicMock(return_value=ModelDeployment(name='md', image='image'))
+
+        with patch.object(edi.time, 'time', side_effect=[0, 0, 1, 2, 3]):
+            result = list(self.client.watch('md', timeout=2, initial_delay=1, backoff_factor=1))
+
+        self.assertEqual(len(result), 1)
+        self.assertEqual(self.sleeps, [1, 1])
+
+
+class TestEdiClientTrainingLogs(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    LOGS = [
+        '2019-05-27T10:00:00.9Z first',
+        '2019-05-27T10:00:00.12Z second',
+        '2019-05-27T10:00:01Z third line',
+    ]
+
+    def test_log_since_without_cursor(self):
+        client = ModelTrainingClient('http://edi')
+        client.stream = MagicMock(return_value=iter(self.LOGS))
+
+        lines = list(client.log_since('mt'))
+
+        self.assertEqual([line.message for line in lines], ['first', 'second', 'third line'])
+        self.assertEqual(lines[-1].timestamp, '2019-05-27T10:00:01Z')
+        self.assertNotIn('sinceTime', client.stream.call_args[1]['params'])
+
+    def test_log_since_skips_received_lines(self):
+        client = ModelTrainingClient('http://edi')
+        client.stream = MagicMock(return_value=iter(self.LOGS))
+
+        lines = list(client.log_since('mt', '2019-05-27T10:00:00.5Z'))
+
+        self.assertEqual([line.message for line in lines], ['first', 'third line'])
+        self.assertEqual(client.stream.call_args[1]['params'],
+                         {'follow': False, 'sinceTime': '2019-05-27T10:00:00.5Z', 'timestamps': True})
+
+
+if __name__ == '__main__':
+    unittest2.main()
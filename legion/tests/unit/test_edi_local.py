@@ -15,14 +15,20 @@
 #
 from __future__ import print_function
 
+import json
 import os
 import logging
 import sys
+from unittest.mock import patch, MagicMock
+from urllib.parse import urlencode
+
+import requests
 import responses
 
 import unittest2
 from legion.sdk.clients.edi import LocalEdiClient
 
+from legion.sdk.containers import local_deploy
 from legion.sdk.containers.definitions import ModelDeploymentDescription, ModelBuildInformation
 from legion.sdk.containers.docker import build_docker_client
 
@@ -39,6 +45,29 @@ DOCKER_INSPECT_API_CALL = '/containers/json?limit=-1&all=0&size=0&trunc_cmd=0'
 DOCKER_LIST_IMAGES_API_CALL = '/images/json?only_ids=0&all=0&filters=%' + \
                               '7B%22label%22%3A+%5B%22com.epam.legion.model.id%22%5D%7D'
 
+
+def build_docker_inspect_api_call(name=None, model_id=None, model_version=None):
+    """
+    Build URL of containers list API call with filters that are sent by local deploy functions
+
+    :param name: (Optional) name of deployment
+    :type name: str
+    :param model_id: (Optional) model id
+    :type model_id: str
+    :param model_version: (Optional) model version
+    :type model_version: str
+    :return: str -- API call URL
+    """
+    filters = {'label': [
+        label if value in (None, '*') else '{}={}'.format(label, value)
+        for label, value in (('com.epam.legion.model.id', model_id), ('com.epam.legion.model.version', model_version))
+    ]}
+    if name:
+        filters['name'] = [name]
+
+    return DOCKER_INSPECT_API_CALL + '&' + urlencode({'filters': json.dumps(filters)})
+
+
 MODEL_A_ID = 'test-math'
 MODEL_A_VERSION = '1.0'
 MODEL_A_IMAGE = '50d4b8ffcbea59707422d862fe5fea018f6387df2094925241e41ee3846e04b9'
@@ -120,48 +149,38 @@ class TestEDILocal(unittest2.TestCase):
         self.docker_api_client = build_docker_client()
         self.prefix = self.docker_api_client.api._url('')
 
-    def _register_no_models_inspect(self):
-        add_response_from_file(self.prefix + DOCKER_INSPECT_API_CALL,
+    def _register_no_models_inspect(self, **filters):
+        add_response_from_file(self.prefix + build_docker_inspect_api_call(**filters),
                                'local_deploy_docker_list_empty')
 
-    def _register_model_a_info(self):
-        add_response_from_file(self.prefix + '/containers/{}/json'.format(MODEL_A_CONTAINER),
-                               'local_deploy_docker_container_a_info')
+    def _register_model_images_list(self):
+        add_response_from_file(self.prefix + DOCKER_LIST_IMAGES_API_CALL,
+                               'local_deploy_docker_image_list_a_b')
 
-        add_response_from_file(self.prefix + '/images/{}/json'.format(MODEL_A_IMAGE),
-                               'local_deploy_docker_image_a_info')
+    def _register_model_a_info(self):
+        self._register_model_images_list()
 
         add_response_from_file(MODEL_A_INFO_URL,
                                'local_deploy_model_a_info')
 
-        add_response_from_file(self.prefix + '/images/{}/json'.format(MODEL_A_IMAGE),
-                               'local_deploy_docker_image_a_info')
-
-    def _register_model_a_inspect(self):
-        add_response_from_file(self.prefix + DOCKER_INSPECT_API_CALL,
+    def _register_model_a_inspect(self, **filters):
+        add_response_from_file(self.prefix + build_docker_inspect_api_call(**filters),
                                'local_deploy_docker_list_one_a')
         self._register_model_a_info()
 
     def _register_model_b_info(self):
-        add_response_from_file(self.prefix + '/containers/{}/json'.format(MODEL_B_CONTAINER),
-                               'local_deploy_docker_container_b_info')
-
-        add_response_from_file(self.prefix + '/images/{}/json'.format(MODEL_B_IMAGE),
-                               'local_deploy_docker_image_b_info')
+        self._register_model_images_list()
 
         add_response_from_file(MODEL_B_INFO_URL,
                                'local_deploy_model_b_info')
 
-        add_response_from_file(self.prefix + '/images/{}/json'.format(MODEL_B_IMAGE),
-                               'local_deploy_docker_image_b_info')
-
-    def _register_model_b_inspect(self):
-        add_response_from_file(self.prefix + DOCKER_INSPECT_API_CALL,
+    def _register_model_b_inspect(self, **filters):
+        add_response_from_file(self.prefix + build_docker_inspect_api_call(**filters),
                                'local_deploy_docker_list_one_b')
         self._register_model_b_info()
 
-    def _register_model_a_and_b_inspect(self):
-        add_response_from_file(self.prefix + DOCKER_INSPECT_API_CALL,
+    def _register_model_a_and_b_inspect(self, **filters):
+        add_response_from_file(self.prefix + build_docker_inspect_api_call(**filters),
                                'local_deploy_docker_list_a_b')
         self._register_model_a_info()
         self._register_model_b_info()
@@ -170,7 +189,7 @@ class TestEDILocal(unittest2.TestCase):
         add_response_from_file(self.prefix + '/images/{}/json'.format(MODEL_A_IMAGE_REF),
                                'local_deploy_docker_image_a_info')
 
-        add_response_from_file(self.prefix + DOCKER_INSPECT_API_CALL,
+        add_response_from_file(self.prefix + build_docker_inspect_api_call(name='test-math-deployment'),
                                'local_deploy_docker_list_empty')
 
         add_response_from_file(self.prefix + '/containers/create',
@@ -229,7 +248,7 @@ class TestEDILocalInspect(TestEDILocal):
 
     @responses.activate
     def test_inspect_one_alive_model_id_correct(self):
-        self._register_model_a_inspect()
+        self._register_model_a_inspect(model_id=MODEL_A_ID)
 
         items = self.client.inspect(model=MODEL_A_ID)
         self.assertEqual(len(items), 1, 'could not find one model')
@@ -245,14 +264,14 @@ class TestEDILocalInspect(TestEDILocal):
 
     @responses.activate
     def test_inspect_one_alive_model_id_incorrect(self):
-        self._register_model_a_inspect()
+        self._register_model_a_inspect(model_id=MODEL_A_ID + '_incorrect')
 
         items = self.client.inspect(model=MODEL_A_ID + '_incorrect')
         self.assertListEqual(items, [])
 
     @responses.activate
     def test_inspect_one_alive_model_id_version_correct(self):
-        self._register_model_a_inspect()
+        self._register_model_a_inspect(model_id=MODEL_A_ID, model_version=MODEL_A_VERSION)
 
         items = self.client.inspect(model=MODEL_A_ID, version=MODEL_A_VERSION)
         self.assertEqual(len(items), 1, 'could not find one model')
@@ -260,7 +279,7 @@ class TestEDILocalInspect(TestEDILocal):
 
     @responses.activate
     def test_inspect_one_alive_model_id_version_asterisk(self):
-        self._register_model_a_inspect()
+        self._register_model_a_inspect(model_id=MODEL_A_ID)
 
         items = self.client.inspect(model=MODEL_A_ID, version='*')
         self.assertEqual(len(items), 1, 'could not find one model')
@@ -268,7 +287,7 @@ class TestEDILocalInspect(TestEDILocal):
 
     @responses.activate
     def test_inspect_one_alive_model_id_version_incorrect(self):
-        self._register_model_a_inspect()
+        self._register_model_a_inspect(model_id=MODEL_A_ID, model_version=MODEL_A_VERSION + '_incorrect')
 
         items = self.client.inspect(model=MODEL_A_ID, version=MODEL_A_VERSION + '_incorrect')
         self.assertListEqual(items, [])
@@ -281,7 +300,7 @@ class TestEDILocalDeploy(TestEDILocal):
 
         self._register_model_a_deploy()
 
-        self._register_model_a_inspect()
+        self._register_model_a_inspect(name='test-math-deployment')
 
         items = self.client.inspect()
         self.assertListEqual(items, [])
@@ -308,7 +327,7 @@ class TestEDILocalListBuilds(TestEDILocal):
 class TestEDILocalUndeploy(TestEDILocal):
     @responses.activate
     def test_undeploy_on_empty(self):
-        self._register_no_models_inspect()
+        self._register_no_models_inspect(model_id=MODEL_A_ID)
 
         with self.assertRaises(Exception) as exc_info:
             self.client.undeploy(model=MODEL_A_ID)
@@ -317,7 +336,7 @@ class TestEDILocalUndeploy(TestEDILocal):
 
     @responses.activate
     def test_undeploy_correct(self):
-        self._register_model_a_inspect()
+        self._register_model_a_inspect(model_id=MODEL_A_ID)
 
         add_response_from_file(self.prefix + '/containers/{}/stop'.format(MODEL_A_CONTAINER),
                                'local_deploy_docker_container_a_stop',
@@ -329,7 +348,7 @@ class TestEDILocalUndeploy(TestEDILocal):
 
     @responses.activate
     def test_undeploy_correct_with_filter(self):
-        self._register_model_a_and_b_inspect()
+        self._register_model_a_and_b_inspect(model_id=MODEL_A_ID, model_version=MODEL_A_VERSION)
 
         add_response_from_file(self.prefix + '/containers/{}/stop'.format(MODEL_A_CONTAINER),
                                'local_deploy_docker_container_a_stop',
@@ -341,7 +360,7 @@ class TestEDILocalUndeploy(TestEDILocal):
 
     @responses.activate
     def test_undeploy_correct_with_asterisk(self):
-        self._register_model_a_and_b_inspect()
+        self._register_model_a_and_b_inspect(model_id=MODEL_A_ID)
 
         add_response_from_file(self.prefix + '/containers/{}/stop'.format(MODEL_A_CONTAINER),
                                'local_deploy_docker_container_a_stop',
@@ -358,7 +377,7 @@ class TestEDILocalUndeploy(TestEDILocal):
 
     @responses.activate
     def test_undeploy_correct_without_filter(self):
-        self._register_model_a_and_b_inspect()
+        self._register_model_a_and_b_inspect(model_id=MODEL_A_ID)
 
         with self.assertRaises(Exception) as exc_info:
             self.client.undeploy(model=MODEL_A_ID)
@@ -367,7 +386,7 @@ class TestEDILocalUndeploy(TestEDILocal):
 
     @responses.activate
     def test_undeploy_incorrect_id_filter(self):
-        self._register_model_a_inspect()
+        self._register_no_models_inspect(model_id=MODEL_A_ID + '_incorrect')
 
         with self.assertRaises(Exception) as exc_info:
             self.client.undeploy(model=MODEL_A_ID + '_incorrect')
@@ -376,7 +395,7 @@ class TestEDILocalUndeploy(TestEDILocal):
 
     @responses.activate
     def test_undeploy_incorrect_id_version_filter(self):
-        self._register_model_a_inspect()
+        self._register_no_models_inspect(model_id=MODEL_A_ID, model_version=MODEL_A_VERSION + '_incorrect')
 
         with self.assertRaises(Exception) as exc_info:
             self.client.undeploy(model=MODEL_A_ID, version=MODEL_A_VERSION + '_incorrect')
@@ -384,5 +403,124 @@ class TestEDILocalUndeploy(TestEDILocal):
         self.assertTupleEqual(exc_info.exception.args, ('No one model can be found',))
 
 
+class TestLocalDeployInspection(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    CONTAINER = {
+        'Id': MODEL_A_CONTAINER,
+        'Names': ['/test-math-deployment'],
+        'ImageID': 'sha256:' + MODEL_A_IMAGE,
+        'State': 'running',
+        'Ports': [{'PrivatePort': 5000, 'PublicPort': 32768, 'Type': 'tcp'}],
+        'Labels': {'com.epam.legion.model.id': MODEL_A_ID, 'com.epam.legion.model.version': MODEL_A_VERSION},
+    }
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.api.containers.return_value = [self.CONTAINER]
+        self.client.api.images.return_value = [{'Id': 'sha256:' + MODEL_A_IMAGE, 'RepoTags': [MODEL_A_IMAGE_REF]}]
+
+        patcher = patch.dict(local_deploy._MODEL_PORTS_CACHE, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_containers_are_filtered_by_daemon(self):
+        items = local_deploy.get_models(self.client, model_id=MODEL_A_ID)
+
+        self.assertEqual(items, [MODEL_A_DEPLOYMENT_DESCRIPTION])
+        self.client.api.containers.assert_called_once_with(filters={
+            'label': ['com.epam.legion.model.id=test-math', 'com.epam.legion.model.version']
+        })
+        self.client.api.images.assert_called_once_with(filters={'label': 'com.epam.legion.model.id'})
+        self.client.containers.get.assert_not_called()
+
+    def test_name_is_matched_exactly(self):
+        self.assertEqual(local_deploy.get_models(self.client, name='test-math'), [])
+        self.client.api.images.assert_not_called()
+
+    def test_health_is_checked(self):
+        with patch.object(local_deploy.requests, 'get', return_value=MagicMock(ok=True)) as get_mock:
+            items = local_deploy.get_models(self.client, check_health=True)
+
+        get_mock.assert_called_once_with('http://localhost:32768/healthcheck',
+                                         timeout=local_deploy.LOCAL_HEALTH_CHECK_TIMEOUT)
+        self.assertTrue(items[0].model_api_ok)
+
+        with patch.object(local_deploy.requests, 'get', side_effect=requests.exceptions.ConnectionError()):
+            items = local_deploy.get_models(self.client, check_health=True)
+
+        self.assertFalse(items[0].model_api_ok)
+
+    def test_model_port_is_cached(self):
+        self.assertEqual(local_deploy.get_model_port(self.client, MODEL_A_ID, MODEL_A_VERSION), 32768)
+        self.assertEqual(local_deploy.get_model_port(self.client, MODEL_A_ID, MODEL_A_VERSION), 32768)
+        self.assertEqual(self.client.api.containers.call_count, 1)
+
+        local_deploy.invalidate_model_port(MODEL_A_ID, MODEL_A_VERSION)
+        self.client.api.containers.return_value = []
+
+        with self.assertRaises(ValueError):
+            local_deploy.get_model_port(self.client, MODEL_A_ID, MODEL_A_VERSION)
+
+
+class TestLocalDeployReadiness(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.client = MagicMock()
+        self.client.api.containers.return_value = [TestLocalDeployInspection.CONTAINER]
+        self.container = MagicMock(id=MODEL_A_CONTAINER)
+
+        self.sleeps = []
+        patcher = patch.object(local_deploy.time, 'sleep', side_effect=self.sleeps.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_readiness_is_polled_with_backoff(self):
+        with patch.object(local_deploy, '_check_local_model_health', side_effect=[False, False, False, True]) as check:
+            local_deploy.wait_for_model_ready(self.client, self.container)
+
+        check.assert_called_with(32768)
+        self.assertEqual(self.sleeps, [0.1, 0.2, 0.4])
+        self.client.api.containers.assert_called_with(filters={'id': MODEL_A_CONTAINER})
+
+    def test_stopped_container_is_not_awaited(self):
+        self.client.api.containers.side_effect = [[TestLocalDeployInspection.CONTAINER], []]
+
+        with patch.object(local_deploy, '_check_local_model_health', return_value=False):
+            with self.assertRaises(Exception) as exc_info:
+                local_deploy.wait_for_model_ready(self.client, self.container)
+
+        self.assertIn('has stopped', str(exc_info.exception))
+        self.assertEqual(len(self.sleeps), 1)
+
+    def test_readiness_timeout(self):
+        with patch.object(local_deploy, '_check_local_model_health', return_value=False), \
+                patch.object(local_deploy.time, 'monotonic', side_effect=[0, 0, 1, 2.5]):
+            with self.assertRaises(Exception) as exc_info:
+                local_deploy.wait_for_model_ready(self.client, self.container, timeout=2)
+
+        self.assertIn('has not become ready', str(exc_info.exception))
+        self.assertEqual(self.sleeps, [0.1, 0.2])
+
+    def test_images_are_pulled_before_deploy(self):
+        events = []
+        self.client.images.get.side_effect = lambda image: events.append(('pull', image))
+        deployments = [local_deploy.LocalModelDeployment('b', MODEL_B_IMAGE_REF, 0),
+                       local_deploy.LocalModelDeployment('a', MODEL_A_IMAGE_REF, 0),
+                       local_deploy.LocalModelDeployment('a-copy', MODEL_A_IMAGE_REF, 0)]
+
+        def deploy_model(client, name, *args):
+            events.append(('deploy', name))
+            return [MagicMock(deployment_name=name)]
+
+        with patch.object(local_deploy, 'deploy_model', side_effect=deploy_model):
+            items = local_deploy.deploy_models(self.client, deployments, wait_ready=True, parallelism=2)
+
+        self.assertEqual([item.deployment_name for item in items], ['a', 'a-copy', 'b'])
+        self.assertCountEqual(events[:2], [('pull', MODEL_A_IMAGE_REF), ('pull', MODEL_B_IMAGE_REF)])
+        self.assertCountEqual(events[2:], [('deploy', 'a'), ('deploy', 'a-copy'), ('deploy', 'b')])
+
+
 if __name__ == '__main__':
     unittest2.main()
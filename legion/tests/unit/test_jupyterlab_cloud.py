@@ -0,0 +1,136 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import unittest2
+
+from legion.jupyterlab import api_state
+from legion.jupyterlab.api_state import ApiState
+from legion.jupyterlab.handlers.cloud import CloudAllEntitiesHandler
+
+CREDENTIALS = ('http://edi', 'token')
+TRAINING = {'name': 'training'}
+DEPLOYMENT = {'name': 'deployment'}
+VCS = {'name': 'vcs'}
+
+
+class TestApiState(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.now = 100.0
+        patcher = patch.object(api_state.time, 'time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.state = ApiState(cache_ttl=5)
+
+    def test_cache_hit_and_expiry(self):
+        cached = self.state.update_cloud_entities(CREDENTIALS, 'trainings', [TRAINING])
+
+        self.now += 4
+        self.assertEqual(self.state.get_cloud_entities(CREDENTIALS, 'trainings'), cached)
+        self.assertIsNone(self.state.get_cloud_entities(CREDENTIALS, 'deployments'))
+        self.assertIsNone(self.state.get_cloud_entities(('http://other', 'token'), 'trainings'))
+
+        self.now += 1
+        self.assertIsNone(self.state.get_cloud_entities(CREDENTIALS, 'trainings'))
+
+    def test_version_is_changed_only_for_changed_entities(self):
+        first = self.state.update_cloud_entities(CREDENTIALS, 'trainings', [TRAINING])
+
+        self.assertEqual(self.state.update_cloud_entities(CREDENTIALS, 'trainings', [TRAINING]).version,
+                         first.version)
+        self.assertGreater(self.state.update_cloud_entities(CREDENTIALS, 'trainings', []).version, first.version)
+
+    def test_invalidate_forces_fetch_and_version_bump(self):
+        trainings = self.state.update_cloud_entities(CREDENTIALS, 'trainings', [TRAINING])
+        deployments = self.state.update_cloud_entities(CREDENTIALS, 'deployments', [DEPLOYMENT])
+
+        self.state.invalidate_cloud_entities(CREDENTIALS)
+
+        self.assertIsNone(self.state.get_cloud_entities(CREDENTIALS, 'trainings'))
+        self.assertIsNone(self.state.get_cloud_entities(CREDENTIALS, 'deployments'))
+
+        changed = self.state.update_cloud_entities(CREDENTIALS, 'trainings', [TRAINING, {'name': 'new'}])
+        unchanged = self.state.update_cloud_entities(CREDENTIALS, 'deployments', [DEPLOYMENT])
+        self.assertGreater(changed.version, max(trainings.version, deployments.version))
+        self.assertEqual(unchanged.version, deployments.version)
+
+
+class TestCloudAllEntitiesHandler(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.state = ApiState()
+        self.trainings = [TRAINING]
+
+    def _get(self, version=None):
+        handler = CloudAllEntitiesHandler.__new__(CloudAllEntitiesHandler)
+        handler.state = self.state
+        handler.get_cloud_credentials = MagicMock(return_value=CREDENTIALS)
+        handler.get_query_argument = lambda name, default: default if version is None else str(version)
+        handler.get_cloud_trainings = MagicMock(return_value=list(self.trainings))
+        handler.get_cloud_deployments = MagicMock(return_value=[DEPLOYMENT])
+        handler.get_vcs_instances = MagicMock(return_value=[VCS])
+        handler.finish_with_json = MagicMock()
+
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(handler.get())
+        finally:
+            loop.close()
+
+        handler.finish_with_json.assert_called_once()
+        return handler.finish_with_json.call_args[0][0], handler.get_cloud_trainings
+
+    def test_entities_are_cached(self):
+        response, trainings_loader = self._get()
+
+        self.assertEqual({key: value for key, value in response.items() if key != 'version'},
+                         {'trainings': [TRAINING], 'deployments': [DEPLOYMENT], 'vcss': [VCS]})
+        trainings_loader.assert_called_once_with()
+
+        cached_response, trainings_loader = self._get()
+
+        self.assertEqual(cached_response, response)
+        trainings_loader.assert_not_called()
+
+    def test_unchanged_kinds_are_not_returned(self):
+        response, _ = self._get()
+        version = response['version']
+
+        self.assertEqual(self._get(version)[0], {'version': version})
+
+        self.trainings.append({'name': 'new'})
+        self.state.invalidate_cloud_entities(CREDENTIALS)
+        changed_response, _ = self._get(version)
+
+        self.assertEqual(changed_response['trainings'], self.trainings)
+        self.assertEqual(set(changed_response), {'trainings', 'version'})
+        self.assertGreater(changed_response['version'], version)
+
+    def test_version_from_previous_run_returns_all_kinds(self):
+        response, _ = self._get()
+
+        restarted_response, _ = self._get(response['version'] + 1)
+
+        self.assertEqual(restarted_response, response)
+
+
+if __name__ == '__main__':
+    unittest2.main()
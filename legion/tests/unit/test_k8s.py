@@ -15,12 +15,19 @@
 #
 from __future__ import print_function
 
+import json
 import os
 import os.path
 import logging
+import threading
+import types
 
 from unittest import mock
 import unittest2
+import kubernetes.client
+import kubernetes.client.rest
+from kubernetes.client import V1Namespace, V1NamespaceList, V1ObjectMeta, V1ListMeta, V1Service, V1ServiceList, \
+    V1ServiceSpec, V1ServicePort
 
 from legion.sdk.containers import headers
 from legion.sdk.containers.docker import build_docker_client, get_docker_container_id_from_cgroup_line
@@ -29,7 +36,8 @@ from legion.services.k8s.utils import ImageAttributes
 from legion.services.k8s.utils import parse_docker_image_url
 from legion.services.k8s.utils import reduce_cpu_resource
 from legion.services.k8s.utils import reduce_mem_resource
-from legion.services.k8s import utils as k8s_utils
+from legion.services.k8s import utils as k8s_utils, enclave as k8s_enclave, services as k8s_services
+from legion.services.template.plugins import enclave as enclave_plugins
 from legion.sdk import utils as legion_utils
 
 REGISTRY_IMAGE = 'registry:2.6.1'
@@ -218,5 +226,374 @@ class TestK8S(unittest2.TestCase):
                          "40985bfadf82466b4241ef1f7c7c926c98d3943456")
 
 
+class TestK8SSharedClient(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        k8s_utils.reset_client()
+        self.addCleanup(k8s_utils.reset_client)
+
+        patcher = mock.patch('kubernetes.config.load_incluster_config')
+        self.load_config = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_client_is_shared(self):
+        client = k8s_utils.build_client()
+
+        self.assertIs(k8s_utils.build_client(), client)
+        self.load_config.assert_called_once_with()
+
+    def test_client_is_rebuilt_after_ttl_or_context_change(self):
+        client = k8s_utils.build_client()
+
+        with mock.patch.object(k8s_utils, 'CONNECTION_CONTEXT', 'other-cluster'):
+            self.assertIsNot(k8s_utils.build_client(), client)
+
+        with mock.patch('legion.sdk.config.K8S_API_CLIENT_TTL', 0):
+            self.assertIsNot(k8s_utils.build_client(), k8s_utils.build_client())
+
+    def test_configuration_is_reloaded_on_rejected_credentials(self):
+        client = k8s_utils.build_client()
+
+        with mock.patch.object(kubernetes.client.ApiClient, 'call_api',
+                               side_effect=[kubernetes.client.rest.ApiException(status=401), 'result']):
+            self.assertEqual(client.call_api('/api/v1/pods', 'GET'), 'result')
+
+        self.assertIsNot(k8s_utils.build_client(), client)
+        self.assertEqual(self.load_config.call_count, 2)
+
+    def test_other_errors_are_raised(self):
+        client = k8s_utils.build_client()
+
+        with mock.patch.object(kubernetes.client.ApiClient, 'call_api',
+                               side_effect=kubernetes.client.rest.ApiException(status=403)):
+            with self.assertRaises(kubernetes.client.rest.ApiException):
+                client.call_api('/api/v1/pods', 'GET')
+
+        self.assertIs(k8s_utils.build_client(), client)
+
+
+class TestK8SListing(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    @staticmethod
+    def _build_pages(*pages):
+        return [V1NamespaceList(items=[V1Namespace(metadata=V1ObjectMeta(name=name)) for name in names],
+                                metadata=V1ListMeta(_continue=continue_token))
+                for names, continue_token in pages]
+
+    def test_list_all_items_fetches_all_pages(self):
+        list_function = mock.MagicMock(side_effect=self._build_pages((['a', 'b'], 'token'), (['c'], None)))
+
+        items = k8s_utils.list_all_items(list_function, label_selector='enclave', page_size=2)
+
+        self.assertEqual([item.metadata.name for item in items], ['a', 'b', 'c'])
+        self.assertEqual(list_function.call_args_list, [
+            mock.call(label_selector='enclave', limit=2),
+            mock.call(label_selector='enclave', limit=2, _continue='token'),
+        ])
+
+    def test_build_label_selector(self):
+        self.assertEqual(k8s_utils.build_label_selector({'component': 'legion-edi', 'enclave': None}),
+                         'component=legion-edi,enclave')
+
+    def test_enclaves_are_filtered_by_api_server(self):
+        core_api = mock.MagicMock()
+        core_api.list_namespace.side_effect = self._build_pages((['company-a'], None))
+
+        with mock.patch.object(k8s_utils, 'build_client'), \
+                mock.patch.object(kubernetes.client, 'CoreV1Api', return_value=core_api):
+            enclaves = k8s_enclave.find_enclaves()
+
+        self.assertEqual([enclave.name for enclave in enclaves], ['company-a'])
+        self.assertEqual(core_api.list_namespace.call_args[1]['label_selector'], 'enclave')
+
+    def test_services_are_filtered_by_api_server(self):
+        core_api = mock.MagicMock()
+        core_api.list_service_for_all_namespaces.side_effect = self._build_pages(([], None))
+
+        with mock.patch.object(k8s_utils, 'build_client'), \
+                mock.patch.object(kubernetes.client, 'CoreV1Api', return_value=core_api):
+            k8s_services.find_all_services(component='legion-edi')
+
+        self.assertEqual(core_api.list_service_for_all_namespaces.call_args[1]['label_selector'],
+                         'component=legion-edi')
+
+
+class TestEnclaveModels(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    @staticmethod
+    def _build_metadata(model_id, model_version):
+        return V1ObjectMeta(name=k8s_utils.normalize_k8s_name(model_id, model_version), namespace='legion',
+                            labels={'component': 'legion-model', headers.DOMAIN_MODEL_ID: model_id,
+                                    headers.DOMAIN_MODEL_VERSION: model_version})
+
+    def test_deployments_are_fetched_in_one_call(self):
+        models = [('a', '1'), ('b', '2')]
+        core_api, apps_api = mock.MagicMock(), mock.MagicMock()
+        core_api.list_namespaced_service.return_value = V1ServiceList(
+            items=[V1Service(metadata=self._build_metadata(*model),
+                             spec=V1ServiceSpec(ports=[V1ServicePort(port=5000)])) for model in models],
+            metadata=V1ListMeta())
+        apps_api.list_namespaced_deployment.return_value = types.SimpleNamespace(
+            items=[types.SimpleNamespace(metadata=self._build_metadata(*model),
+                                         spec=types.SimpleNamespace(replicas=index + 1))
+                   for index, model in enumerate(models)],
+            metadata=None)
+
+        with mock.patch.object(k8s_utils, 'build_client'), \
+                mock.patch.object(kubernetes.client, 'CoreV1Api', return_value=core_api), \
+                mock.patch.object(kubernetes.client, 'AppsV1Api', return_value=apps_api):
+            model_services = k8s_enclave.Enclave('legion').get_models()
+
+            self.assertEqual([ms.deployment.spec.replicas for ms in model_services], [1, 2])
+
+        apps_api.list_namespaced_deployment.assert_called_once()
+        apps_api.read_namespaced_deployment.assert_not_called()
+        core_api.list_namespaced_service.assert_called_once()
+
+
+class TestModelEndpointsIndex(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    @staticmethod
+    def _build_model_service(model_id, version, ip='10.0.0.1'):
+        return types.SimpleNamespace(id=model_id, version=version, url_with_ip='http://{}:5000'.format(ip))
+
+    def test_single_version_has_default_endpoint(self):
+        index = k8s_services.ModelEndpointsIndex()
+
+        changes = index.update('ADDED', self._build_model_service('a', '1'))
+
+        self.assertEqual([endpoint.url for endpoint in changes['a']], ['a/1', 'a'])
+        models, unspecified_version_endpoints = index.snapshot
+        self.assertEqual([endpoint.url for endpoint in models], ['a/1', 'a'])
+        self.assertEqual(unspecified_version_endpoints, [])
+
+    def test_multiple_versions_have_unspecified_version_endpoint(self):
+        index = k8s_services.ModelEndpointsIndex()
+        index.update('ADDED', self._build_model_service('b', '1'))
+        index.update('ADDED', self._build_model_service('a', '1'))
+
+        changes = index.update('ADDED', self._build_model_service('a', '2'))
+
+        self.assertEqual(list(changes), ['a'])
+        models, unspecified_version_endpoints = index.snapshot
+        self.assertEqual([endpoint.url for endpoint in models], ['a/1', 'a/2', 'b/1', 'b'])
+        self.assertEqual([endpoint.url for endpoint in unspecified_version_endpoints], ['a'])
+
+    def test_unchanged_routing_gives_empty_changes(self):
+        index = k8s_services.ModelEndpointsIndex()
+        index.update('ADDED', self._build_model_service('a', '1'))
+
+        self.assertEqual(index.update('MODIFIED', self._build_model_service('a', '1')), {})
+        self.assertEqual(list(index.update('MODIFIED', self._build_model_service('a', '1', ip='10.0.0.2'))), ['a'])
+        self.assertEqual(index.snapshot[0][0].model_service.url_with_ip, 'http://10.0.0.2:5000')
+
+    def test_deleted_model_is_removed(self):
+        index = k8s_services.ModelEndpointsIndex()
+        index.update('ADDED', self._build_model_service('a', '1'))
+
+        self.assertEqual(index.update('DELETED', self._build_model_service('a', '1')), {'a': []})
+        self.assertEqual(index.snapshot, ([], []))
+        self.assertEqual(index.update('DELETED', self._build_model_service('a', '1')), {})
+
+    def test_watch_yields_state_with_changes(self):
+        enclave = k8s_enclave.Enclave('default')
+        events = [('ADDED', self._build_model_service('a', '1')),
+                  ('MODIFIED', self._build_model_service('a', '1'))]
+
+        with mock.patch.object(enclave, 'watch_models', return_value=iter(events)):
+            states = list(enclave.watch_model_service_endpoints_state())
+
+        self.assertEqual(list(states[0].changes), ['a'])
+        self.assertEqual([endpoint.url for endpoint in states[1].models], ['a/1', 'a'])
+        self.assertEqual(states[1].changes, {})
+
+
+class TestModelUpstreams(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    @staticmethod
+    def _build_endpoints(name, *ips, not_ready_ips=(), port_name=None):
+        ports = [types.SimpleNamespace(name=port_name, port=5000)]
+        if port_name:
+            ports.append(types.SimpleNamespace(name='metrics', port=9000))
+
+        subset = types.SimpleNamespace(addresses=[types.SimpleNamespace(ip=ip) for ip in ips],
+                                       not_ready_addresses=[types.SimpleNamespace(ip=ip) for ip in not_ready_ips],
+                                       ports=ports)
+        return types.SimpleNamespace(metadata=types.SimpleNamespace(name=name), subsets=[subset])
+
+    def test_ready_addresses(self):
+        endpoints = self._build_endpoints('model-a', '10.0.0.2', '10.0.0.1', not_ready_ips=['10.0.0.3'])
+
+        self.assertEqual(k8s_services.get_ready_endpoint_addresses(endpoints), ['10.0.0.1:5000', '10.0.0.2:5000'])
+
+    def test_ready_addresses_use_api_port(self):
+        endpoints = self._build_endpoints('model-a', '10.0.0.1', port_name='api')
+
+        self.assertEqual(k8s_services.get_ready_endpoint_addresses(endpoints), ['10.0.0.1:5000'])
+        self.assertEqual(k8s_services.get_ready_endpoint_addresses(types.SimpleNamespace(subsets=None)), [])
+
+    def test_watch_yields_only_changed_upstreams(self):
+        events = [
+            ('ADDED', self._build_endpoints('model-a', not_ready_ips=['10.0.0.1'])),
+            ('MODIFIED', self._build_endpoints('model-a', '10.0.0.1')),
+            ('MODIFIED', self._build_endpoints('model-a', '10.0.0.1')),
+            ('ADDED', self._build_endpoints('model-b', '10.0.0.2')),
+            ('DELETED', self._build_endpoints('model-a', '10.0.0.1')),
+        ]
+        watch = mock.MagicMock(stream=iter(events))
+
+        with mock.patch.object(k8s_enclave, 'ResourceWatch', return_value=watch), \
+                mock.patch.object(k8s_utils, 'build_client'):
+            states = list(k8s_enclave.Enclave('default').watch_model_upstreams())
+
+        self.assertEqual([sorted(state) for state in states], [['model-a'], ['model-a', 'model-b'], ['model-b']])
+        self.assertEqual(states[1]['model-b'], k8s_services.ModelUpstream('model-b', ['10.0.0.2:5000']))
+
+    def test_monitors_log_watch_metrics(self):
+        template_system = mock.MagicMock()
+        resource_watch = mock.MagicMock(stream=iter([]))
+        with mock.patch.object(enclave_plugins, 'Enclave') as enclave_class, \
+                mock.patch.object(enclave_plugins, 'start_namespace_cache'), \
+                mock.patch.object(enclave_plugins, 'get_current_namespace', return_value='default'), \
+                mock.patch.object(k8s_enclave, 'ResourceWatch', return_value=resource_watch) as watch, \
+                mock.patch.object(k8s_utils, 'build_client'):
+            enclave_class.return_value.watch_model_service_endpoints_state.return_value = iter([])
+            enclave_class.return_value.watch_model_upstreams.return_value = iter([])
+            enclave_plugins.enclave_models_monitor(template_system)
+            enclave_plugins.enclave_model_upstreams_monitor(template_system)
+
+            list(k8s_enclave.Enclave('default').watch_model_upstreams(60))
+
+        interval = enclave_plugins.WATCH_METRICS_LOG_INTERVAL
+        enclave_class.return_value.watch_model_service_endpoints_state.assert_called_once_with(interval)
+        enclave_class.return_value.watch_model_upstreams.assert_called_once_with(interval)
+        self.assertEqual(watch.call_args[1]['metrics_log_interval'], 60)
+
+
+class TestDockerImageLabelsCache(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    LABELS = {headers.DOMAIN_MODEL_ID: 'a', headers.DOMAIN_MODEL_VERSION: '1', headers.DOMAIN_CONTAINER_TYPE: 'model'}
+
+    def setUp(self):
+        k8s_utils.reset_docker_image_labels_cache()
+        self.addCleanup(k8s_utils.reset_docker_image_labels_cache)
+
+        self.manifest_data = {'history': [{'v1Compatibility': json.dumps({'container_config':
+                                                                          {'Labels': self.LABELS}})}]}
+        self.registry_client = mock.MagicMock()
+        self.manifest = self.registry_client.repository.return_value.manifest
+        self.manifest.side_effect = lambda ref: (self.manifest_data, ref if ref.startswith('sha256:') else None)
+        self.head = self.registry_client._base_client._http_response
+        self.set_digests('sha256:abc')
+
+        patcher = mock.patch.object(k8s_utils, '_REGISTRY_CLIENTS', threading.local())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(k8s_utils, '_IMAGE_LABELS_STORE', threading.local())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(k8s_utils, '_IMAGE_LABELS_EXECUTOR', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: k8s_utils._IMAGE_LABELS_EXECUTOR and k8s_utils._IMAGE_LABELS_EXECUTOR.shutdown())
+
+        patcher = mock.patch.object(k8s_utils, 'DockerRegistryClient', return_value=self.registry_client)
+        self.registry_client_class = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for name, value in (('MODEL_IMAGES_REGISTRY_HOST', None), ('DOCKER_REGISTRY_PROTOCOL', 'https'),
+                            ('DOCKER_REGISTRY_USER', None), ('DOCKER_REGISTRY_PASSWORD', None),
+                            ('DOCKER_IMAGE_LABELS_CACHE_SIZE', 2), ('DOCKER_IMAGE_LABELS_CACHE_FILE', None),
+                            ('DOCKER_IMAGE_LABELS_CACHE_FILE_SIZE', 2), ('K8S_PARALLEL_OPERATIONS', 1)):
+            patcher = mock.patch('legion.sdk.config.{}'.format(name), value, create=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def set_digests(self, *digests):
+        self.head.side_effect = [digest if isinstance(digest, Exception) else
+                                 mock.MagicMock(headers={k8s_utils.MANIFEST_DIGEST_HEADER: digest} if digest else {})
+                                 for digest in digests]
+
+    def test_labels_are_cached_by_digest(self):
+        self.set_digests('sha256:abc', 'sha256:abc')
+
+        first = k8s_utils.get_docker_image_labels('registry/legion/model:1.0')
+        first['changed'] = True
+        second = k8s_utils.get_docker_image_labels('registry/legion/model:1.0')
+
+        self.assertEqual(second, self.LABELS)
+        self.manifest.assert_called_once_with('sha256:abc')
+        self.assertEqual(self.head.call_count, 2)
+        self.assertEqual(self.head.call_args[1]['reference'], '1.0')
+        self.assertIs(self.head.call_args[0][1], k8s_utils.requests.head)
+        self.registry_client_class.assert_called_once_with(host='https://registry', username=None, password=None,
+                                                           api_version=2)
+
+    def test_moved_tag_is_resolved(self):
+        self.set_digests('sha256:abc', 'sha256:def', None, None)
+
+        for _ in range(4):
+            k8s_utils.get_docker_image_labels('registry/legion/model:1.0')
+
+        # Labels are not cached if registry has not returned digest
+        self.assertEqual([call[0][0] for call in self.manifest.call_args_list],
+                         ['sha256:abc', 'sha256:def', '1.0', '1.0'])
+
+    def test_cache_is_bounded(self):
+        self.set_digests('sha256:1', 'sha256:2', 'sha256:3', 'sha256:1')
+        for ref in ('1', '2', '3', '1'):
+            k8s_utils.get_docker_image_labels('registry/legion/model:{}'.format(ref))
+
+        self.assertEqual(self.manifest.call_count, 4)
+        self.assertEqual(len(k8s_utils._IMAGE_LABELS_CACHE), 2)
+
+    def test_labels_are_persisted_by_digest(self):
+        with legion_utils.TemporaryFolder('legion-test-labels') as temp_directory:
+            cache_file = os.path.join(temp_directory.path, 'cache', 'labels.db')
+            self.set_digests('sha256:1', 'sha256:2', 'sha256:3', 'sha256:3', 'sha256:1')
+
+            with mock.patch('legion.sdk.config.DOCKER_IMAGE_LABELS_CACHE_FILE', cache_file):
+                for ref in ('1', '2', '3'):
+                    k8s_utils.get_docker_image_labels('registry/legion/model:{}'.format(ref))
+
+                # Persisted labels are used by new process (memory cache and connections are empty)
+                k8s_utils.reset_docker_image_labels_cache()
+                with mock.patch.object(k8s_utils, '_IMAGE_LABELS_STORE', threading.local()):
+                    self.assertEqual(k8s_utils.get_docker_image_labels('registry/legion/model:3'), self.LABELS)
+                    k8s_utils.get_docker_image_labels('registry/legion/model:1')
+
+        self.assertEqual([call[0][0] for call in self.manifest.call_args_list],
+                         ['sha256:1', 'sha256:2', 'sha256:3', 'sha256:1'])
+
+    def test_digest_is_taken_from_manifest_if_head_is_not_supported(self):
+        self.registry_client._base_client = object()
+        self.manifest.side_effect = lambda ref: (self.manifest_data, 'sha256:abc')
+
+        self.assertEqual(k8s_utils.get_docker_image_labels('registry/legion/model:1.0'), self.LABELS)
+        self.manifest.assert_called_once_with('1.0')
+        self.assertEqual(list(k8s_utils._IMAGE_LABELS_CACHE), ['sha256:abc'])
+
+    def test_prefetch(self):
+        self.set_digests(Exception('Not found'), 'sha256:abc', 'sha256:abc')
+
+        result = k8s_utils.prefetch_docker_image_labels(['registry/legion/a:1', 'registry/legion/b:1',
+                                                         'registry/legion/a:1'])
+        self.assertEqual(len(result), 1)
+        self.assertEqual(list(result.values()), [self.LABELS])
+
+        # Registry client of executor thread is reused
+        self.assertEqual(k8s_utils.prefetch_docker_image_labels(['registry/legion/b:1']),
+                         {'registry/legion/b:1': self.LABELS})
+        self.registry_client_class.assert_called_once()
+
+
 if __name__ == '__main__':
     unittest2.main()
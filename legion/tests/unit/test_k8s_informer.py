@@ -0,0 +1,125 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+from unittest.mock import patch, MagicMock
+
+import unittest2
+from kubernetes.client import V1Service, V1ServiceList, V1ObjectMeta, V1ListMeta
+
+from legion.sdk.containers.headers import DOMAIN_MODEL_ID, DOMAIN_MODEL_VERSION
+from legion.sdk.definitions import LEGION_COMPONENT_LABEL, LEGION_COMPONENT_NAME_MODEL, LEGION_COMPONENT_NAME_EDI, \
+    EVENT_ADDED, EVENT_MODIFIED, EVENT_DELETED
+from legion.services.k8s import informer, services
+from legion.services.k8s.informer import ResourceInformer, NamespaceCache, INDEX_COMPONENT, INDEX_MODEL, \
+    CACHE_SERVICES
+
+
+def build_service(name, component=LEGION_COMPONENT_NAME_MODEL, model_id=None, model_version=None):
+    labels = {LEGION_COMPONENT_LABEL: component}
+    if model_id:
+        labels[DOMAIN_MODEL_ID] = model_id
+        labels[DOMAIN_MODEL_VERSION] = model_version
+
+    return V1Service(metadata=V1ObjectMeta(name=name, namespace='legion', labels=labels))
+
+
+def build_list_function(*items):
+    list_function = MagicMock(return_value=V1ServiceList(items=list(items), metadata=V1ListMeta(resource_version='10')))
+    list_function.__name__ = 'list_namespaced_service'
+    return list_function
+
+
+MODEL_A_1 = build_service('model-a-1', model_id='a', model_version='1')
+MODEL_A_2 = build_service('model-a-2', model_id='a', model_version='2')
+MODEL_B_1 = build_service('model-b-1', model_id='b', model_version='1')
+EDI = build_service('edi', component=LEGION_COMPONENT_NAME_EDI)
+
+
+class TestResourceInformer(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def test_resync_fills_indexes(self):
+        cache = ResourceInformer(build_list_function(MODEL_B_1, MODEL_A_2, EDI, MODEL_A_1), 'legion')
+
+        self.assertEqual(cache.resync().metadata.resource_version, '10')
+        self.assertTrue(cache.synced)
+
+        self.assertEqual(cache.get('edi'), EDI)
+        self.assertEqual(cache.list(), [EDI, MODEL_A_1, MODEL_A_2, MODEL_B_1])
+        self.assertEqual(cache.by_index(INDEX_MODEL, ('a', None)), [MODEL_A_1, MODEL_A_2])
+        self.assertEqual(cache.by_index(INDEX_MODEL, ('a', '2')), [MODEL_A_2])
+        self.assertEqual(cache.by_index(INDEX_COMPONENT, LEGION_COMPONENT_NAME_EDI), [EDI])
+
+    def test_events_update_indexes(self):
+        cache = ResourceInformer(build_list_function(MODEL_A_1), 'legion')
+        cache.resync()
+
+        cache.handle_event(EVENT_ADDED, MODEL_B_1)
+        relabeled = build_service('model-a-1', model_id='c', model_version='1')
+        cache.handle_event(EVENT_MODIFIED, relabeled)
+
+        self.assertEqual(cache.by_index(INDEX_MODEL, ('a', None)), [])
+        self.assertEqual(cache.by_index(INDEX_MODEL, ('c', '1')), [relabeled])
+
+        cache.handle_event(EVENT_DELETED, MODEL_B_1)
+        self.assertIsNone(cache.get('model-b-1'))
+        self.assertEqual(cache.by_index(INDEX_COMPONENT, LEGION_COMPONENT_NAME_MODEL), [relabeled])
+
+    def test_lookups_use_synced_namespace_cache(self):
+        with patch.object(informer.k8s_utils, 'build_client'):
+            cache = NamespaceCache('legion', kinds=(CACHE_SERVICES,))
+        services_informer = cache.get_informer(CACHE_SERVICES)
+        services_informer._list_function = build_list_function(MODEL_A_1, MODEL_A_2, MODEL_B_1, EDI)
+        services_informer.resync()
+
+        with patch.dict(informer._NAMESPACE_CACHES, {'legion': cache}), \
+                patch.object(services.k8s_utils, 'build_client') as build_client:
+            self.assertEqual(services.find_model_services_by('legion', 'a'), [MODEL_A_1, MODEL_A_2])
+            self.assertEqual(services.find_model_services_by('legion', '*', '1'), [MODEL_A_1, MODEL_B_1])
+            self.assertEqual(services.find_model_service('legion', 'b', '1'), MODEL_B_1)
+            self.assertEqual(services.find_all_services('legion', LEGION_COMPONENT_NAME_EDI), [EDI])
+
+            build_client.assert_not_called()
+
+    def test_lookups_fall_back_to_api(self):
+        with patch.object(informer.k8s_utils, 'build_client'):
+            cache = NamespaceCache('legion', kinds=(CACHE_SERVICES,))
+
+        self.assertEqual(len(cache.informers), 1)
+        with patch.dict(informer._NAMESPACE_CACHES, {'legion': cache}), \
+                patch.object(services.k8s_utils, 'build_client'), \
+                patch.object(services.k8s_utils, 'list_all_items', return_value=[]) as list_all_items:
+            # Services informer has not been synced, deployments are not cached
+            self.assertEqual(services.find_model_services_by('legion', 'a'), [])
+            self.assertEqual(services.find_model_deployments_by('legion', 'a'), [])
+
+            self.assertEqual(list_all_items.call_count, 2)
+
+    def test_initial_sync_wait_is_bounded(self):
+        cache = MagicMock()
+        cache.wait_for_sync.return_value = False
+
+        with patch.dict(informer._NAMESPACE_CACHES, {'legion': cache}):
+            self.assertEqual(informer.start_namespace_cache('legion'), cache)
+
+        cache.wait_for_sync.assert_called_once_with(informer.INFORMER_SYNC_TIMEOUT)
+
+    def test_unknown_kinds(self):
+        with patch.object(informer.k8s_utils, 'build_client'), self.assertRaises(ValueError):
+            NamespaceCache('legion', kinds=('pods',))
+
+
+if __name__ == '__main__':
+    unittest2.main()
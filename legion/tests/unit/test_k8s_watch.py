@@ -0,0 +1,239 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import itertools
+from unittest.mock import patch, MagicMock
+
+import unittest2
+import urllib3.exceptions
+from kubernetes.client import V1Service, V1ServiceList, V1ObjectMeta, V1ListMeta
+from kubernetes.client.rest import ApiException
+
+from legion.services.k8s import watch, utils as k8s_utils
+from legion.services.k8s.watch import ResourceWatch, wait_for_object
+
+
+def build_service(name, resource_version):
+    return V1Service(metadata=V1ObjectMeta(name=name, namespace='legion', resource_version=resource_version))
+
+
+def build_event(event_type, service):
+    return {'type': event_type, 'object': service, 'raw_object': {}}
+
+
+GONE_EVENT = {'type': 'ERROR', 'object': None, 'raw_object': {'code': 410, 'message': 'too old resource version'}}
+
+
+class FakeWatch:
+    """
+    Fake of kubernetes.watch.Watch that replays scripted streams (lists of events or exceptions)
+    """
+
+    def __init__(self, streams):
+        self.streams = iter(streams)
+        self.calls = []
+
+    def __call__(self):
+        return self
+
+    def stream(self, function, *args, **kwargs):
+        self.calls.append(kwargs)
+        for item in next(self.streams):
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+class WatchTestCase(unittest2.TestCase):
+    def setUp(self):
+        self.sleeps = []
+        for patcher in (patch.object(watch.time, 'sleep', side_effect=self.sleeps.append),
+                        patch.object(watch.random, 'uniform', side_effect=lambda low, high: high)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.list_function = MagicMock(__name__='list_namespaced_service',
+                                       __doc__=':param bool allow_watch_bookmarks: ...')
+
+
+class TestResourceWatch(WatchTestCase):
+    _multiprocess_can_split_ = True
+
+    def _stream(self, streams, count, **kwargs):
+        fake_watch = FakeWatch(streams)
+        with patch.object(watch.kubernetes.watch, 'Watch', fake_watch):
+            resource_watch = ResourceWatch(self.list_function, 'legion', **kwargs)
+            events = list(itertools.islice(resource_watch.stream, count))
+
+        return resource_watch, events, fake_watch.calls
+
+    def test_reconnects_with_backoff_from_latest_version(self):
+        first, second = build_service('a', '5'), build_service('b', '6')
+        streams = [
+            [build_event('ADDED', first), urllib3.exceptions.ProtocolError('lost')],
+            [ApiException(status=500)],
+            [ApiException(status=503)],
+            [build_event('ADDED', second)],
+        ]
+
+        resource_watch, events, calls = self._stream(streams, 2)
+
+        self.assertEqual(events, [('ADDED', first), ('ADDED', second)])
+        self.assertEqual(self.sleeps, [watch.WATCH_RECONNECT_INITIAL_DELAY, watch.WATCH_RECONNECT_INITIAL_DELAY * 2,
+                                       watch.WATCH_RECONNECT_INITIAL_DELAY * 4])
+        self.assertEqual([call.get('resource_version') for call in calls], [None, '5', '5', '5'])
+        self.assertTrue(all(call['allow_watch_bookmarks'] for call in calls))
+        self.assertEqual(resource_watch.metrics.reconnects, 3)
+
+    def test_client_errors_are_raised(self):
+        for status in (403, 404):
+            streams = [[ApiException(status=status)], [build_event('ADDED', build_service('a', '1'))]]
+
+            with self.assertRaises(ApiException) as raised:
+                self._stream(streams, 1)
+
+            self.assertEqual(raised.exception.status, status)
+        self.assertEqual(self.sleeps, [])
+
+    def test_client_error_on_relist_is_raised(self):
+        self.list_function.side_effect = ApiException(status=403)
+
+        with self.assertRaises(ApiException):
+            self._stream([[GONE_EVENT]], 1, resource_version='3')
+
+        self.assertEqual(self.sleeps, [])
+
+    def test_bookmarks_update_resource_version(self):
+        service = build_service('a', '20')
+        streams = [
+            [build_event('BOOKMARK', build_service(None, '15')), urllib3.exceptions.ProtocolError('lost')],
+            [build_event('MODIFIED', service)],
+        ]
+
+        resource_watch, events, calls = self._stream(streams, 1)
+
+        self.assertEqual(events, [('MODIFIED', service)])
+        self.assertEqual(calls[1]['resource_version'], '15')
+        self.assertEqual(resource_watch.metrics.bookmarks, 1)
+        self.assertEqual(resource_watch.resource_version, '20')
+
+    def test_relist_on_expired_resource_version(self):
+        kept, changed, deleted = build_service('kept', '1'), build_service('changed', '2'), build_service('gone', '3')
+        changed_new, added = build_service('changed', '7'), build_service('added', '8')
+        self.list_function.return_value = V1ServiceList(items=[kept, changed_new, added],
+                                                        metadata=V1ListMeta(resource_version='9'))
+        streams = [
+            [GONE_EVENT],
+            [build_event('ADDED', build_service('after', '10'))],
+        ]
+
+        resource_watch, events, calls = self._stream(streams, 4, resource_version='3',
+                                                     initial_objects=[kept, changed, deleted])
+
+        self.assertEqual(events[:3], [('MODIFIED', changed_new), ('ADDED', added), ('DELETED', deleted)])
+        self.assertEqual(events[3][1].metadata.name, 'after')
+        self.assertEqual(self.list_function.call_args, (('legion',), {}))
+        self.assertEqual(calls[1]['resource_version'], '9')
+        self.assertEqual(resource_watch.metrics.relists, 1)
+
+    def test_metrics_are_logged_on_reconnect(self):
+        streams = [[urllib3.exceptions.ProtocolError('lost')], [build_event('ADDED', build_service('a', '1'))]]
+
+        with self.assertLogs(watch.LOGGER, 'WARNING') as logs:
+            self._stream(streams, 1)
+
+        self.assertEqual(len([line for line in logs.output if '1 reconnects, 0 relists' in line]), 1)
+
+    def test_metrics_are_logged_periodically(self):
+        events = [build_event('ADDED', build_service('a', '1')), build_event('ADDED', build_service('b', '2'))]
+
+        with self.assertLogs(watch.LOGGER, 'INFO') as logs:
+            self._stream([events], 2, metrics_log_interval=0)
+            self._stream([events], 2)
+            watch.LOGGER.info('end')
+
+        metrics_lines = [line for line in logs.output if 'list_namespaced_service metrics' in line]
+        self.assertEqual(len(metrics_lines), 3)
+        self.assertIn('1 events, 0 bookmarks, 0 reconnects, 0 relists', metrics_lines[-1])
+
+    def test_watch_with_timeout_is_finished(self):
+        _, events, calls = self._stream([[build_event('ADDED', build_service('a', '1'))]], 10, timeout_seconds=5)
+
+        self.assertEqual(len(events), 1)
+        self.assertEqual(len(calls), 1)
+
+
+class TestWaitForObject(WatchTestCase):
+    _multiprocess_can_split_ = True
+
+    def _wait(self, listed, streams, condition):
+        self.list_function.return_value = V1ServiceList(items=listed, metadata=V1ListMeta(resource_version='1'))
+        fake_watch = FakeWatch(streams)
+        with patch.object(watch.kubernetes.watch, 'Watch', fake_watch):
+            result = wait_for_object(self.list_function, 'legion', 'model-a', condition, timeout=10)
+
+        return result, fake_watch.calls
+
+    def test_object_is_already_in_desired_state(self):
+        service = build_service('model-a', '1')
+        (confirmed, current), calls = self._wait([service], [], lambda item: item is not None)
+
+        self.assertTrue(confirmed)
+        self.assertEqual(current, service)
+        self.assertEqual(calls, [])
+        self.assertEqual(self.list_function.call_args[1], {'field_selector': 'metadata.name=model-a'})
+
+    def test_deletion_is_confirmed_by_event(self):
+        service = build_service('model-a', '1')
+        streams = [[build_event('MODIFIED', build_service('model-a', '2')), build_event('DELETED', service)]]
+
+        (confirmed, current), calls = self._wait([service], streams, lambda item: item is None)
+
+        self.assertTrue(confirmed)
+        self.assertIsNone(current)
+        self.assertEqual(calls[0]['field_selector'], 'metadata.name=model-a')
+        self.assertEqual(calls[0]['resource_version'], '1')
+
+    def test_not_confirmed_after_deadline(self):
+        with patch.object(watch.time, 'time', side_effect=itertools.count(0, 6)):
+            (confirmed, _), _ = self._wait([], [[]], lambda item: item is not None)
+
+        self.assertFalse(confirmed)
+
+    def test_reconnect_delay_is_limited_by_deadline(self):
+        clock = [100.0]
+
+        def sleep(seconds):
+            self.sleeps.append(seconds)
+            clock[0] += seconds
+
+        streams = [[urllib3.exceptions.ProtocolError('lost')]] * 3
+        with patch.object(watch.time, 'time', side_effect=lambda: clock[0]), \
+                patch.object(watch.time, 'sleep', side_effect=sleep), \
+                patch.object(watch, 'WATCH_RECONNECT_INITIAL_DELAY', 60):
+            (confirmed, _), calls = self._wait([], streams, lambda item: item is not None)
+
+        self.assertFalse(confirmed)
+        self.assertEqual(self.sleeps, [10])
+        self.assertEqual([call['timeout_seconds'] for call in calls], [10])
+
+    def test_operations_run_in_parallel(self):
+        futures = [k8s_utils.run_operation_async(lambda value: value * 2, value) for value in range(3)]
+
+        self.assertEqual([future.result(timeout=5) for future in futures], [0, 2, 4])
+
+
+if __name__ == '__main__':
+    unittest2.main()
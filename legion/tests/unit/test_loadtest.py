@@ -0,0 +1,248 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import argparse
+import copy
+import json
+import os
+import shutil
+import tempfile
+from unittest.mock import patch
+
+import unittest2
+from legion.cli.parsers import edge
+from legion.sdk import loadtest
+from legion.toolchain import model
+
+
+class FakeModelClient:
+    """
+    Model client that answers without HTTP requests
+    """
+
+    calls = []
+
+    def invoke(self, endpoint=None, **parameters):
+        self.calls.append(('invoke', endpoint, parameters))
+        if parameters.get('fail'):
+            raise Exception('Failed')
+        return parameters
+
+    def batch(self, invoke_parameters, endpoint=None):
+        self.calls.append(('batch', endpoint, invoke_parameters))
+        return invoke_parameters
+
+
+class TestLatencyHistogram(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def test_percentiles_precision(self):
+        histogram = loadtest.LatencyHistogram()
+        for ms in range(1, 10001):
+            histogram.record(ms / 1000)
+
+        summary = histogram.summary()
+        for name, expected in (('p50', 5000), ('p90', 9000), ('p99', 9900), ('p99.9', 9990)):
+            self.assertAlmostEqual(summary[name], expected, delta=expected * 0.001)
+        self.assertEqual((summary['min'], summary['max']), (1, 10000))
+        self.assertAlmostEqual(summary['mean'], 5000.5)
+
+    def test_merge_and_serialization(self):
+        first, second = loadtest.LatencyHistogram(), loadtest.LatencyHistogram()
+        first.record(0.001, count=99)
+        second.record(0.5)
+        first.merge(second)
+
+        restored = loadtest.LatencyHistogram.from_dict(json.loads(json.dumps(first.to_dict())))
+
+        self.assertEqual(restored.count, 100)
+        self.assertEqual(restored.summary(), first.summary())
+        self.assertAlmostEqual(restored.percentile(99), 1, delta=0.001)
+        self.assertAlmostEqual(restored.percentile(100), 500, delta=0.5)
+
+    def test_empty_histogram(self):
+        histogram = loadtest.LatencyHistogram()
+
+        self.assertIsNone(histogram.percentile(99))
+        self.assertEqual(histogram.summary(), {})
+
+
+class TestLoadTestScenario(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self._test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._test_dir)
+
+    def _write(self, name, content, mode='w'):
+        with open(os.path.join(self._test_dir, name), mode) as stream:
+            stream.write(content)
+        return os.path.join(self._test_dir, name)
+
+    def test_load_scenario(self):
+        self._write('payloads.json', json.dumps([{'a': 1}, {'a': 2}]))
+        self._write('image.png', b'image', 'wb')
+        path = self._write('scenario.yaml', '\n'.join((
+            'name: test',
+            'model_id: summation',
+            'model_version: 1.0',
+            'phases:',
+            '  - {rate: 5, duration: 10}',
+            '  - ramp: {from: 30, to: 10, step: 10, step_duration: 2}',
+            'requests:',
+            '  - {name: invoke, parameters: {a: 1}, weight: 3}',
+            '  - {name: batch, endpoint: sum, batch: [{a: 1}, {a: 2}]}',
+            '  - {name: file, payload_file: payloads.json, batch_size: 3}',
+            '  - {name: image, files: {image: image.png}}',
+        )))
+
+        scenario = loadtest.load_scenario(path)
+
+        self.assertEqual((scenario.model_id, scenario.model_version), ('summation', '1.0'))
+        self.assertEqual(scenario.phases, [loadtest.Phase(5, 10), loadtest.Phase(30, 2), loadtest.Phase(20, 2),
+                                           loadtest.Phase(10, 2)])
+        targets = {target.name: target for target in scenario.targets}
+        self.assertEqual((targets['invoke'].weight, targets['invoke'].batch_size), (3, None))
+        self.assertEqual((targets['batch'].endpoint, targets['batch'].batch_size), ('sum', 2))
+        self.assertEqual(targets['file'].payloads, [{'a': 1}, {'a': 2}])
+        self.assertEqual(targets['image'].payloads, [{'image': b'image'}])
+
+    def test_invalid_scenarios(self):
+        request = {'parameters': {'a': 1}}
+        for data in ({'phases': [{'rate': 1, 'duration': 1}]},
+                     {'requests': [request]},
+                     {'phases': [{'rate': 0, 'duration': 1}], 'requests': [request]},
+                     {'phases': [{'rate': 1, 'duration': 1}], 'requests': [request, request]}):
+            with self.assertRaises(ValueError):
+                loadtest.parse_scenario(data)
+
+    def test_schedule_is_reproducible(self):
+        scenario = loadtest.parse_scenario({
+            'seed': 7,
+            'phases': [{'rate': 10, 'duration': 2}, {'rate': 20, 'duration': 1}],
+            'requests': [{'name': 'a', 'parameters': {'x': 1}, 'weight': 3},
+                         {'name': 'b', 'batch': [{'x': 1}, {'x': 2}]}],
+        })
+
+        schedule = loadtest.build_schedule(scenario)
+
+        self.assertEqual(schedule, loadtest.build_schedule(scenario))
+        self.assertEqual(len(schedule), 40)
+        self.assertEqual([phase for _, phase, _, _ in schedule].count(1), 20)
+        self.assertAlmostEqual(schedule[20][0], 2)
+        self.assertAlmostEqual(schedule[21][0], 2.05)
+        self.assertEqual({len(payloads) for _, _, target, payloads in schedule if target == 1}, {2})
+        self.assertNotEqual(schedule, loadtest.build_schedule(scenario._replace(seed=8)))
+
+
+class TestLoadTestRun(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        FakeModelClient.calls = []
+
+    def test_run_scenario(self):
+        scenario = loadtest.parse_scenario({
+            'name': 'fake',
+            'concurrency': 4,
+            'warmup_requests': 2,
+            'phases': [{'rate': 200, 'duration': 0.1}, {'rate': 400, 'duration': 0.1}],
+            'requests': [{'name': 'invoke', 'endpoint': 'sum', 'parameters': {'a': 1}},
+                         {'name': 'fail', 'parameters': {'fail': True}},
+                         {'name': 'batch', 'batch': [{'a': 1}, {'a': 2}]}],
+        })
+
+        results = loadtest.run_scenario(scenario, FakeModelClient)
+
+        self.assertEqual(len(FakeModelClient.calls), 62)
+        self.assertEqual(results['requests'], 60)
+        self.assertEqual([phase['requests'] for phase in results['phases']], [20, 40])
+        self.assertEqual(results['errors'], results['targets']['fail']['requests'])
+        self.assertEqual(results['targets']['invoke']['errors'], 0)
+        self.assertEqual(results['targets']['invoke']['histogram']['count'],
+                         results['targets']['invoke']['requests'])
+        self.assertIn('p99.9', results['latency_ms'])
+        self.assertIn(('batch', None, [{'a': 1}, {'a': 2}]), FakeModelClient.calls)
+        # Results are machine readable
+        self.assertEqual(json.loads(json.dumps(results)), results)
+
+    def test_compare_with_baseline(self):
+        baseline = {
+            'scenario': 'fake',
+            'throughput': 100,
+            'error_rate': 0,
+            'latency_ms': {'p50': 10, 'p95': 20, 'p99': 30},
+            'targets': {'invoke': {'error_rate': 0, 'latency_ms': {'p50': 10, 'p95': 20, 'p99': 30}}},
+        }
+        results = copy.deepcopy(baseline)
+        results['latency_ms']['p99'] = 32
+        results['targets']['invoke']['latency_ms']['p50'] = 10.5
+
+        self.assertEqual(loadtest.compare_results(results, baseline), [])
+
+        results['targets']['invoke']['latency_ms']['p95'] = 30
+        results['targets']['invoke']['error_rate'] = 0.05
+        results['throughput'] = 50
+
+        regressions = loadtest.compare_results(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('invoke: p95'))
+        self.assertTrue(regressions[1].startswith('invoke: error rate'))
+
+        with self.assertRaises(ValueError):
+            loadtest.compare_results(dict(results, scenario='other'), baseline)
+
+
+class TestLoadTestCommand(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self._test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self._test_dir)
+
+        self._model_file = os.path.join(self._test_dir, 'model.bin')
+        model.reset_context()
+        with patch('legion.toolchain.model.clear_metric_store'):
+            model.init('loadtest-model', '1.0')
+        model.export(lambda x: {'result': int(x['a'] + x['b'])}, {'a': model.int32, 'b': model.int32})
+        model.save(self._model_file)
+        model.reset_context()
+
+        self._scenario = os.path.join(self._test_dir, 'scenario.yaml')
+        with open(self._scenario, 'w') as stream:
+            stream.write('\n'.join((
+                'name: local',
+                'concurrency: 2',
+                'phases: [{rate: 20, duration: 0.5}]',
+                'requests: [{name: invoke, parameters: {a: 1, b: 2}}]',
+            )))
+
+    def test_scenario_against_model_file(self):
+        output = os.path.join(self._test_dir, 'results.json')
+        args = argparse.Namespace(scenario=self._scenario, model_file=self._model_file, model_server_url=None,
+                                  model_id=None, model_version=None, jwt=None, output=output, baseline=None,
+                                  update_baseline=False, tolerance=None)
+
+        edge.loadtest_command(args)
+
+        results = loadtest.load_results(output)
+        self.assertEqual((results['model_id'], results['model_version']), ('loadtest-model', '1.0'))
+        self.assertEqual((results['requests'], results['errors']), (10, 0))
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -13,6 +13,8 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 #
+import json
+import multiprocessing
 import os
 import shutil
 import sys
@@ -35,6 +37,12 @@ from legion_test_utils import patch_config
 MODEL_ID = 'test-model'
 
 
+def _send_metrics_in_process(metric_store, worker, count):
+    config.MODEL_LOCAL_METRIC_STORE = metric_store
+    for index in range(count):
+        send_metric(MODEL_ID, '1.0', f'worker-{worker}-metric-{index}', index)
+
+
 class TestMetrics(unittest2.TestCase):
     _multiprocess_can_split_ = True
 
@@ -73,17 +81,18 @@ class TestMetrics(unittest2.TestCase):
             'MODEL_CLUSTER_TRAIN_METRICS_ENABLED': 'true'
         }
 
-        with patch_config(additional_environment):
-            with patch('legion.toolchain.metrics.send_tcp') as send_tcp_mock, patch('time.time',
-                                                                                    return_value=timestamp):
+        with patch_config(additional_environment), patch.dict(metrics._METRICS_EMITTERS, clear=True):
+            with patch('legion.toolchain.metrics.socket.create_connection') as create_connection_mock, \
+                    patch('time.time', return_value=timestamp):
                 metrics.send_metric(model_id, model_version, metric, value)
+                metrics.flush_metrics()
 
-                self.assertEqual(1, len(send_tcp_mock.call_args_list), '2 calls have not been founded')
-                for call in send_tcp_mock.call_args_list:
-                    self.assertEqual(call[0][0], host)
-                    self.assertEqual(call[0][1], port)
+                create_connection_mock.assert_called_once_with((host, port), timeout=metrics.METRICS_SOCKET_TIMEOUT)
 
-                passed_metrics: typing.List[str] = send_tcp_mock.call_args_list[0][0][2]
+                sendall_mock = create_connection_mock.return_value.sendall
+                self.assertEqual(1, len(sendall_mock.call_args_list), '1 call has not been founded')
+
+                passed_metrics: typing.List[str] = sendall_mock.call_args[0][0].decode('utf-8').splitlines()
                 self.assertEqual(2, len(passed_metrics))
 
                 call_with_metric, call_with_build_number = tuple(passed_metrics)
@@ -103,10 +112,10 @@ class TestMetrics(unittest2.TestCase):
             'MODEL_CLUSTER_TRAIN_METRICS_ENABLED': False
         }
         with patch_config(additional_environment):
-            with patch('legion.toolchain.metrics.send_tcp') as send_tcp_mock:
+            with patch.object(metrics, 'get_metrics_emitter') as get_metrics_emitter_mock:
                 metrics.send_metric(model_id, model_version, metric, value)
 
-                self.assertTrue(len(send_tcp_mock.call_args_list) == 0, '0 calls have not been founded')
+                get_metrics_emitter_mock.assert_not_called()
 
     def test_default_endpoint_detection(self):
         host, port, namespace = metrics.get_metric_endpoint()
@@ -194,6 +203,58 @@ class TestMetrics(unittest2.TestCase):
         self.assertEqual(metric_value_2_2, metrics_series_2[4])
         self.assertEqual(metric_value_2_3, metrics_series_2[5])
 
+    def test_metrics_are_saved_by_parallel_processes(self):
+        processes = [multiprocessing.Process(target=_send_metrics_in_process, args=(self._metric_store, worker, 50))
+                     for worker in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        df = show_local_metrics(MODEL_ID, '1.0')
+
+        self.assertEqual(len(df), 1)
+        self.assertEqual(len(df.columns), 3 + 4 * 50)
+        self.assertEqual(df['worker-3-metric-49'][0], 49)
+
+    def test_metric_value_is_replaced(self):
+        send_metric(MODEL_ID, '1.0', 'accuracy', 0.5)
+        send_metric(MODEL_ID, '1.0', 'accuracy', 0.7)
+        send_metric(MODEL_ID, '2.0', 'accuracy', 0.9)
+
+        df = show_local_metrics(MODEL_ID)
+        self.assertEqual(list(df['accuracy']), [0.7, 0.9])
+
+        metrics.clear_metric_store(MODEL_ID, '1.0')
+        self.assertEqual(list(show_local_metrics(MODEL_ID)[metrics.MODEL_VALUE_HEADER]), ['2.0'])
+
+    def test_legacy_metric_store_is_converted(self):
+        with open(self._metric_store, 'w') as f:
+            json.dump({MODEL_ID: {'1.0': {'accuracy': 0.5, metrics.MODEL_UPDATED_AT_HEADER: '05/27/19 10:00:00'}}}, f)
+
+        send_metric(MODEL_ID, '1.0', 'loss', 0.1)
+        df = show_local_metrics(MODEL_ID, '1.0')
+
+        self.assertEqual(df['accuracy'][0], 0.5)
+        self.assertEqual(df['loss'][0], 0.1)
+        with open(self._metric_store, 'rb') as f:
+            self.assertEqual(f.read(len(metrics.SQLITE_FILE_HEADER)), metrics.SQLITE_FILE_HEADER)
+
+    def test_legacy_metric_store_with_json_name_is_converted(self):
+        with open(self._metric_store + metrics.LEGACY_METRIC_STORE_SUFFIX, 'w') as f:
+            json.dump({MODEL_ID: {'1.0': {'accuracy': 0.5}}}, f)
+
+        processes = [multiprocessing.Process(target=_send_metrics_in_process, args=(self._metric_store, worker, 1))
+                     for worker in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        df = show_local_metrics(MODEL_ID, '1.0')
+        self.assertEqual(df['accuracy'][0], 0.5)
+        self.assertEqual(len(df.columns), 3 + 1 + 4)
+
     def test_custom_endpoint_detection(self):
         new_host = 'localhost'
         new_port = 1000
@@ -212,5 +273,58 @@ class TestMetrics(unittest2.TestCase):
             self.assertEqual(namespace, new_namespace)
 
 
+class TestMetricsEmitter(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        patcher = patch('legion.toolchain.metrics.socket')
+        self.socket_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_metrics_are_sent_in_batches_through_one_connection(self):
+        emitter = metrics.MetricsEmitter('statsd', 9125, flush_interval=60)
+        for index in range(metrics.METRICS_BATCH_SIZE + 1):
+            emitter.emit([f'metric-{index}:1|c'])
+        emitter.close()
+
+        self.socket_mock.create_connection.assert_called_once()
+        sendall_mock = self.socket_mock.create_connection.return_value.sendall
+        self.assertEqual([len(call[0][0].splitlines()) for call in sendall_mock.call_args_list],
+                         [metrics.METRICS_BATCH_SIZE, 1])
+        self.assertEqual((emitter.sent, emitter.dropped), (metrics.METRICS_BATCH_SIZE + 1, 0))
+
+    def test_metrics_are_dropped_if_buffer_is_full(self):
+        emitter = metrics.MetricsEmitter('statsd', 9125, buffer_size=3, flush_interval=60)
+        emitter.emit(['a:1|c', 'b:1|c'])
+        emitter.emit(['c:1|c', 'd:1|c'])
+        emitter.flush()
+
+        self.assertEqual((emitter.sent, emitter.dropped), (2, 2))
+
+    def test_server_failure_does_not_raise(self):
+        self.socket_mock.create_connection.side_effect = OSError('Connection refused')
+        emitter = metrics.MetricsEmitter('statsd', 9125, flush_interval=60)
+
+        emitter.emit(['a:1|c'])
+        emitter.flush()
+        emitter.emit(['b:1|c'])
+        emitter.flush()
+
+        self.assertEqual((emitter.sent, emitter.dropped), (0, 2))
+        # Next attempt to connect is delayed
+        self.socket_mock.create_connection.assert_called_once()
+
+    def test_udp_datagrams_are_limited(self):
+        emitter = metrics.MetricsEmitter('statsd', 9125, protocol=metrics.METRICS_PROTOCOL_UDP)
+        lines = ['{}:1|c'.format('m' * 600) for _ in range(5)]
+        emitter.emit(lines)
+        emitter.flush()
+
+        datagrams = [call[0][0] for call in self.socket_mock.socket.return_value.sendto.call_args_list]
+        self.assertEqual(len(datagrams), 3)
+        self.assertTrue(all(len(datagram) <= metrics.METRICS_MAX_DATAGRAM_SIZE for datagram in datagrams))
+        self.assertEqual(b'\n'.join(datagrams).decode('utf-8').splitlines(), lines)
+
+
 if __name__ == '__main__':
     unittest2.main()
@@ -0,0 +1,131 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import os
+import shutil
+import tempfile
+import tracemalloc
+from unittest.mock import patch
+
+import unittest2
+from legion.toolchain import model, profiling
+from legion.toolchain.pymodel.model import Model, PROPERTY_TRAINING_PROFILE
+
+
+class TestProfiler(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+
+        self.assertEqual(profiling.percentile(values, 0.95), 95)
+        self.assertEqual(profiling.percentile(values, 0.5), 50)
+        self.assertEqual(profiling.percentile([3], 0.95), 3)
+
+    def test_repeated_stages_are_aggregated(self):
+        profiler = profiling.Profiler()
+        for wall_time in range(1, 21):
+            profiler.add_sample('fit', profiling.StageSample(wall_time, 1.0, 100.0, None, None))
+        profiler.add_sample('load', profiling.StageSample(0.5, 0.5, 120.0, None, None))
+
+        summary = profiler.summary()
+
+        self.assertEqual(list(summary), ['fit', 'load'])
+        self.assertEqual(summary['fit']['count'], 20)
+        self.assertEqual(summary['fit']['wall_time_total'], 210)
+        self.assertEqual(summary['fit']['wall_time_mean'], 10.5)
+        self.assertEqual(summary['fit']['wall_time_p95'], 19)
+        self.assertEqual(summary['fit']['cpu_time_total'], 20)
+        self.assertEqual(summary['load']['peak_rss_mb'], 120)
+        self.assertNotIn('allocated_mb', summary['load'])
+        self.assertEqual(profiler.get_metrics()['profile.fit.wall_time_p95'], 19)
+
+    def test_stage_as_context_manager_and_decorator(self):
+        profiler = profiling.Profiler()
+
+        @profiler.stage('step')
+        def step():
+            return 42
+
+        with profiler.stage('prepare'):
+            pass
+
+        self.assertEqual([step() for _ in range(3)], [42] * 3)
+
+        stages = profiler.stages
+        self.assertEqual([(stage.name, stage.count) for stage in stages], [('prepare', 1), ('step', 3)])
+        self.assertTrue(all(sample.wall_time >= 0 for sample in stages[1].samples))
+
+    def test_stage_is_recorded_on_exception(self):
+        profiler = profiling.Profiler()
+
+        with self.assertRaises(ValueError):
+            with profiler.stage('fail'):
+                raise ValueError()
+
+        self.assertEqual(profiler.stages[0].count, 1)
+
+    def test_memory_tracing(self):
+        profiler = profiling.Profiler()
+
+        with profiler.stage('allocate', trace_memory=True):
+            data = bytearray(4 * profiling.BYTES_IN_MB)
+
+        summary = profiler.summary()['allocate']
+        self.assertGreaterEqual(summary['allocated_mb'], 3.9)
+        self.assertGreaterEqual(summary['peak_allocated_mb'], summary['allocated_mb'])
+        self.assertFalse(tracemalloc.is_tracing())
+        del data
+
+
+class TestModelProfile(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self._test_dir = tempfile.mkdtemp()
+        model.reset_context()
+
+    def tearDown(self):
+        model.reset_context()
+        shutil.rmtree(self._test_dir)
+
+    def test_profile_is_saved_in_manifest(self):
+        path = os.path.join(self._test_dir, 'model.bin')
+        with patch('legion.toolchain.model.clear_metric_store'):
+            model.init('profiled-model', '1.0')
+
+        with model.profile('fit'):
+            pass
+
+        model.export_untyped(lambda x: x)
+        with patch('legion.toolchain.metrics.send_metrics') as send_metrics_mock:
+            model.save(path)
+
+        send_metrics_mock.assert_called_once()
+        model_id, model_version, values = send_metrics_mock.call_args[0]
+        self.assertEqual((model_id, model_version), ('profiled-model', '1.0'))
+        self.assertEqual(values['profile.fit.count'], 1)
+
+        loaded_model = Model.load(path)
+        self.assertEqual(loaded_model.training_profile['fit']['count'], 1)
+        self.assertIn(PROPERTY_TRAINING_PROFILE, loaded_model.meta_information)
+
+    def test_profile_without_context(self):
+        with self.assertRaises(Exception):
+            model.profile('fit')
+
+
+if __name__ == '__main__':
+    unittest2.main()
@@ -0,0 +1,112 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+import unittest2
+
+from legion.services.template import engine
+from legion.services.template.engine import LegionTemplateEngine
+
+
+class TestTemplateEngineRender(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.template_file = os.path.join(self.directory, 'config.ltmpl')
+        with open(self.template_file, 'w') as stream:
+            stream.write('value={{ value }}')
+        self.output_file = os.path.join(self.directory, 'config.conf')
+
+        patcher = patch.object(engine.os, 'system')
+        self.system = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _build_engine(self, **kwargs):
+        template_engine = LegionTemplateEngine(self.template_file, self.output_file, command='reload', **kwargs)
+        template_engine._initializing_mode = False
+        return template_engine
+
+    def _read_output(self):
+        with open(self.output_file) as stream:
+            return stream.read()
+
+    def test_render_writes_output_and_notifies(self):
+        template_engine = self._build_engine()
+
+        self.assertTrue(template_engine.render_now())
+
+        self.assertEqual(self._read_output(), 'value=')
+        self.system.assert_called_once_with('reload')
+        self.assertEqual(sorted(os.listdir(self.directory)), ['config.conf', 'config.ltmpl'])
+
+    def test_identical_output_is_not_rewritten(self):
+        with open(self.output_file, 'w') as stream:
+            stream.write('value=1')
+        os.chmod(self.output_file, 0o640)
+        template_engine = self._build_engine()
+        template_engine._context['value'] = 1
+
+        self.assertFalse(template_engine.render_now())
+        self.system.assert_not_called()
+
+        template_engine._context['value'] = 2
+        self.assertTrue(template_engine.render_now())
+        self.assertEqual(self._read_output(), 'value=2')
+        self.assertEqual(os.stat(self.output_file).st_mode & 0o777, 0o640)
+        self.system.assert_called_once_with('reload')
+
+    def test_render_without_scheduler_is_synchronous(self):
+        template_engine = self._build_engine(debounce_delay=0)
+
+        template_engine.render(value=1)
+        template_engine.render(value=2)
+
+        self.assertEqual(self._read_output(), 'value=2')
+        self.assertEqual(self.system.call_count, 2)
+
+    def test_renders_are_coalesced(self):
+        template_engine = self._build_engine(debounce_delay=0.2, max_wait=5)
+        template_engine._scheduler = threading.Thread(target=template_engine._render_scheduler, daemon=True)
+        template_engine._scheduler.start()
+
+        for value in range(10):
+            template_engine.render(value=value)
+
+        time.sleep(1)
+        self.assertEqual(self._read_output(), 'value=9')
+        self.system.assert_called_once_with('reload')
+
+    def test_render_time_is_capped_by_max_wait(self):
+        template_engine = self._build_engine(debounce_delay=1, max_wait=3)
+        template_engine._first_request_time = 10
+        template_engine._last_request_time = 12.5
+
+        self.assertEqual(template_engine._get_scheduled_render_time(), 13)
+
+        template_engine._last_request_time = 11
+        self.assertEqual(template_engine._get_scheduled_render_time(), 12)
+
+
+if __name__ == '__main__':
+    unittest2.main()
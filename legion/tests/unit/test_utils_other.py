@@ -13,6 +13,12 @@
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 #
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
 import unittest2
 
 from legion.sdk import utils as legion_utils
@@ -90,5 +96,76 @@ class TestUtilsOther(unittest2.TestCase):
         self.assertEqual(counter, 2)
 
 
+class TestUtilsDependencies(unittest2.TestCase):
+    _multiprocess_can_split_ = True
+
+    def setUp(self):
+        self.temp_directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_directory)
+        self.site_packages = os.path.join(self.temp_directory, 'site-packages')
+        os.makedirs(self.site_packages)
+        self.cache_file = os.path.join(self.temp_directory, 'cache', 'installed_packages.json')
+        self.sys_path = list(legion_utils.sys.path)
+
+        for patcher in (mock.patch('legion.sdk.config.INSTALLED_PACKAGES_CACHE_FILE', self.cache_file),
+                        mock.patch.object(legion_utils.sys, 'path', ['', self.temp_directory, self.site_packages])):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_installed_packages_are_cached(self):
+        distributions = [('Foo_Bar', '1.0'), ('zope.interface', '4.0'), ('foo-bar', '0.1')]
+        with mock.patch.object(legion_utils, '_get_installed_distributions', return_value=distributions) as getter:
+            first = legion_utils.get_installed_packages()
+            # Files in working directory and other sys.path entries do not invalidate cache
+            with open(os.path.join(self.temp_directory, 'file'), 'w'):
+                pass
+            second = legion_utils.get_installed_packages()
+
+        self.assertEqual(first, [('foo-bar', '1.0'), ('zope.interface', '4.0')])
+        self.assertEqual(second, first)
+        getter.assert_called_once_with()
+        with open(self.cache_file) as cache_stream:
+            self.assertEqual(json.load(cache_stream)['key'][1:], [[self.site_packages,
+                                                                   os.stat(self.site_packages).st_mtime_ns]])
+
+    def test_installed_packages_are_reloaded_after_change(self):
+        with mock.patch.object(legion_utils, '_get_installed_distributions', return_value=[]) as getter:
+            legion_utils.get_installed_packages()
+            os.utime(self.site_packages, ns=(1, 1))
+            legion_utils.get_installed_packages()
+
+        self.assertEqual(getter.call_count, 2)
+
+    def test_cache_can_be_disabled(self):
+        with mock.patch('legion.sdk.config.INSTALLED_PACKAGES_CACHE_FILE', ''), \
+                mock.patch.object(legion_utils, '_get_installed_distributions', return_value=[]) as getter:
+            legion_utils.get_installed_packages()
+            legion_utils.get_installed_packages()
+
+        self.assertEqual(getter.call_count, 2)
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_installed_distributions(self):
+        with mock.patch.object(legion_utils.sys, 'path', self.sys_path):
+            packages = dict(legion_utils.get_installed_packages())
+
+        self.assertIn('jinja2', packages)
+
+    def test_requirements(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.lock') as lock_file:
+            json.dump({'default': {'foo': {'version': '==1.0'}, 'bar': {'version': '==2.0'}}}, lock_file)
+            lock_file.flush()
+
+            with mock.patch.object(legion_utils, '_get_requirements_file_path', return_value=lock_file.name):
+                self.assertEqual(legion_utils.get_list_of_requirements(), [('bar', '2.0'), ('foo', '1.0')])
+
+    def test_missed_requirements(self):
+        requirements = [('foo-bar', '1.0'), ('baz', '2.0'), ('qux', '3.0')]
+        with mock.patch.object(legion_utils, 'get_list_of_requirements', return_value=requirements), \
+                mock.patch.object(legion_utils, 'get_installed_packages',
+                                  return_value=[('baz', '2.1'), ('foo.bar', '1.0')]):
+            self.assertEqual(legion_utils.get_missed_requirements(), [('baz', '2.0'), ('qux', '3.0')])
+
+
 if __name__ == '__main__':
     unittest2.main()
@@ -0,0 +1,290 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+In-process benchmark of model endpoints
+"""
+import itertools
+import json
+import logging
+import multiprocessing
+import multiprocessing.pool
+import threading
+import time
+
+import numpy as np
+from legion.toolchain import profiling
+from legion.toolchain.pymodel.model import Model
+
+LOGGER = logging.getLogger(__name__)
+
+BENCHMARK_REQUESTS = 100
+BENCHMARK_WARMUP_REQUESTS = 5
+BENCHMARK_PERCENTILES = (0.5, 0.95, 0.99)
+
+# Models loaded by benchmark workers (one model instance per file is shared by threads of process)
+_MODELS = {}
+_MODELS_LOCK = threading.Lock()
+
+
+def _get_model(model_file):
+    """
+    Get model loaded from file in current process
+
+    :param model_file: path to model file
+    :type model_file: str
+    :return: :py:class:`legion.toolchain.pymodel.model.Model` -- model
+    """
+    with _MODELS_LOCK:
+        if model_file not in _MODELS:
+            _MODELS[model_file] = Model.load(model_file)
+        return _MODELS[model_file]
+
+
+def build_sample_input(endpoint):
+    """
+    Build sample input for endpoint from types of its columns
+
+    :param endpoint: model endpoint
+    :type endpoint: :py:class:`legion.toolchain.pymodel.model.ModelEndpoint`
+    :return: dict[str, str] -- input values
+    """
+    if not endpoint.column_types:
+        raise ValueError('Cannot build sample input for untyped endpoint {!r}, inputs should be provided'
+                         .format(endpoint.name))
+
+    sample = {}
+    for column_name, column_information in endpoint.column_types.items():
+        kind = np.dtype(column_information.numpy_type).kind
+        if kind in 'iu':
+            sample[column_name] = '1'
+        elif kind == 'f':
+            sample[column_name] = '1.0'
+        elif kind == 'b':
+            sample[column_name] = 'true'
+        else:
+            raise ValueError('Cannot build sample value for column {!r} of endpoint {!r}, inputs should be provided'
+                             .format(column_name, endpoint.name))
+
+    return sample
+
+
+def load_inputs(path):
+    """
+    Load benchmark inputs from JSON file: list of inputs for all endpoints or dict of lists by endpoint names
+
+    :param path: path to JSON file
+    :type path: str
+    :return: dict[str, list[dict]] or list[dict] -- inputs
+    """
+    with open(path, 'r') as inputs_file:
+        inputs = json.load(inputs_file)
+
+    if not isinstance(inputs, (list, dict)):
+        raise ValueError('Inputs file should contain list of inputs or dict of lists by endpoint names')
+
+    return inputs
+
+
+def _invoke_batch(model_file, endpoint_name, batch):
+    """
+    Invoke endpoint with each input of batch (like batch API of model server does)
+
+    :param model_file: path to model file
+    :type model_file: str
+    :param endpoint_name: name of endpoint
+    :type endpoint_name: str
+    :param batch: inputs
+    :type batch: list[dict]
+    :return: tuple[float, dict[str, float], str or None] -- latency, durations of invocation stages and error
+    """
+    endpoint = _get_model(model_file).endpoints[endpoint_name]
+    stage_totals = {}
+
+    start = time.perf_counter()
+    try:
+        for input_vector in batch:
+            stage_timings = {}
+            endpoint.invoke(input_vector, stage_timings)
+            for stage, duration in stage_timings.items():
+                stage_totals[stage] = stage_totals.get(stage, 0) + duration
+    except Exception as invoke_exception:
+        return time.perf_counter() - start, stage_totals, repr(invoke_exception)
+
+    return time.perf_counter() - start, stage_totals, None
+
+
+def _init_worker(model_file, endpoint_name, warmup_batch, warmup_requests, ready):
+    """
+    Load model and warm up endpoint in benchmark worker before measured requests
+
+    :param model_file: path to model file
+    :type model_file: str
+    :param endpoint_name: name of endpoint
+    :type endpoint_name: str
+    :param warmup_batch: inputs of warm up requests
+    :type warmup_batch: list[dict]
+    :param warmup_requests: count of warm up requests
+    :type warmup_requests: int
+    :param ready: semaphore, that is released when worker is ready
+    :type ready: :py:class:`threading.Semaphore` or :py:class:`multiprocessing.Semaphore`
+    :return: None
+    """
+    try:
+        _get_model(model_file)
+        for _ in range(warmup_requests):
+            _invoke_batch(model_file, endpoint_name, warmup_batch)
+    finally:
+        ready.release()
+
+
+def _summarize(values):
+    """
+    Get latency statistics (in milliseconds)
+
+    :param values: durations in seconds
+    :type values: list[float]
+    :return: dict[str, float] -- mean, max and percentiles
+    """
+    if not values:
+        return {}
+
+    result = {'mean': sum(values) / len(values) * 1000, 'max': max(values) * 1000}
+    for fraction in BENCHMARK_PERCENTILES:
+        result['p{:g}'.format(fraction * 100)] = profiling.percentile(values, fraction) * 1000
+    return result
+
+
+def benchmark_endpoint(model_file, endpoint_name, inputs, batch_size=1, concurrency=1, use_processes=False,
+                       requests=BENCHMARK_REQUESTS, warmup_requests=BENCHMARK_WARMUP_REQUESTS):
+    """
+    Benchmark one model endpoint
+
+    :param model_file: path to model file
+    :type model_file: str
+    :param endpoint_name: name of endpoint
+    :type endpoint_name: str
+    :param inputs: inputs to replay (in cycle)
+    :type inputs: list[dict]
+    :param batch_size: (Optional) count of inputs in one request
+    :type batch_size: int
+    :param concurrency: (Optional) count of parallel workers
+    :type concurrency: int
+    :param use_processes: (Optional) use processes instead of threads as workers
+    :type use_processes: bool
+    :param requests: (Optional) count of measured requests
+    :type requests: int
+    :param warmup_requests: (Optional) count of requests of each worker before measurement
+    :type warmup_requests: int
+    :return: dict -- endpoint benchmark results
+    """
+    if not inputs:
+        raise ValueError('No inputs for endpoint {!r}'.format(endpoint_name))
+
+    input_cycle = itertools.cycle(inputs)
+    batches = [[next(input_cycle) for _ in range(batch_size)] for _ in range(requests)]
+
+    pool_class, ready = (multiprocessing.Pool, multiprocessing.Semaphore(0)) if use_processes \
+        else (multiprocessing.pool.ThreadPool, threading.Semaphore(0))
+    # Each worker loads model and warms up in initializer, measurement is started when all workers are ready
+    with pool_class(concurrency, initializer=_init_worker,
+                    initargs=(model_file, endpoint_name, batches[0], warmup_requests, ready)) as pool:
+        for _ in range(concurrency):
+            ready.acquire()
+
+        start = time.perf_counter()
+        results = pool.starmap(_invoke_batch, [(model_file, endpoint_name, batch) for batch in batches])
+        duration = time.perf_counter() - start
+
+    latencies = [latency for latency, _, error in results if not error]
+    errors = [error for _, _, error in results if error]
+    stages = {}
+    for _, stage_totals, error in results:
+        if not error:
+            for stage, stage_duration in stage_totals.items():
+                stages.setdefault(stage, []).append(stage_duration)
+
+    if errors:
+        LOGGER.warning('{} requests to endpoint {!r} have failed, first error: {}'
+                       .format(len(errors), endpoint_name, errors[0]))
+
+    return {
+        'requests': requests,
+        'errors': len(errors),
+        'duration': duration,
+        'throughput': len(latencies) * batch_size / duration if duration else 0,
+        'latency_ms': _summarize(latencies),
+        'stages_ms': {stage: _summarize(durations) for stage, durations in stages.items()},
+    }
+
+
+def run_benchmark(model_file, inputs=None, endpoints=None, batch_size=1, concurrency=1, use_processes=False,
+                  requests=BENCHMARK_REQUESTS, warmup_requests=BENCHMARK_WARMUP_REQUESTS):
+    """
+    Benchmark model endpoints in current process (or in worker processes)
+
+    :param model_file: path to model file
+    :type model_file: str
+    :param inputs: (Optional) inputs to replay: list for all endpoints or dict of lists by endpoint names,
+                   sample inputs are built from endpoint column types by default
+    :type inputs: list[dict] or dict[str, list[dict]]
+    :param endpoints: (Optional) names of endpoints, all endpoints by default
+    :type endpoints: list[str]
+    :param batch_size: (Optional) count of inputs in one request
+    :type batch_size: int
+    :param concurrency: (Optional) count of parallel workers
+    :type concurrency: int
+    :param use_processes: (Optional) use processes instead of threads as workers
+    :type use_processes: bool
+    :param requests: (Optional) count of measured requests per endpoint
+    :type requests: int
+    :param warmup_requests: (Optional) count of requests of each worker before measurement
+    :type warmup_requests: int
+    :return: dict -- benchmark results (JSON serializable)
+    """
+    if batch_size < 1 or concurrency < 1 or requests < 1:
+        raise ValueError('Batch size, concurrency and count of requests should be positive')
+
+    model = _get_model(model_file)
+    endpoint_names = endpoints or sorted(model.endpoints)
+    for endpoint_name in endpoint_names:
+        if endpoint_name not in model.endpoints:
+            raise ValueError('Model does not have endpoint {!r}'.format(endpoint_name))
+
+    results = {
+        'model_id': model.model_id,
+        'model_version': model.model_version,
+        'model_file': model_file,
+        'batch_size': batch_size,
+        'concurrency': concurrency,
+        'workers': 'processes' if use_processes else 'threads',
+        'endpoints': {},
+    }
+
+    for endpoint_name in endpoint_names:
+        if isinstance(inputs, dict):
+            endpoint_inputs = inputs.get(endpoint_name)
+        elif inputs:
+            endpoint_inputs = inputs
+        else:
+            endpoint_inputs = [build_sample_input(model.endpoints[endpoint_name])]
+
+        LOGGER.info('Benchmarking endpoint {!r} of model {}'.format(endpoint_name, model_file))
+        results['endpoints'][endpoint_name] = benchmark_endpoint(model_file, endpoint_name, endpoint_inputs,
+                                                                 batch_size, concurrency, use_processes,
+                                                                 requests, warmup_requests)
+
+    results['peak_rss_mb'] = profiling.get_peak_rss_mb(include_children=use_processes)
+    return results
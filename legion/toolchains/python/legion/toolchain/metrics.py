@@ -16,10 +16,19 @@
 """
 Model metrics
 """
+import atexit
+import collections
+import contextlib
+import fcntl
 import json
 import logging
+import os
 import socket
+import sqlite3
 import sys
+import tempfile
+import threading
+import time
 import typing
 from datetime import datetime
 from enum import Enum
@@ -37,6 +46,37 @@ MODEL_VALUE_HEADER = "Model Version"
 MODEL_UPDATED_AT_HEADER = "Last Update"
 LOGGER = logging.getLogger(__name__)
 
+METRICS_PROTOCOL_TCP = 'tcp'
+METRICS_PROTOCOL_UDP = 'udp'
+# Limits of batches sent by metrics emitter: lines in one batch and bytes in one UDP datagram
+METRICS_BATCH_SIZE = 500
+METRICS_MAX_DATAGRAM_SIZE = 1432
+METRICS_SOCKET_TIMEOUT = 5
+# Delay before next connection attempt after failure of metrics server (in seconds)
+METRICS_RECONNECT_DELAY = 5
+METRICS_CLOSE_TIMEOUT = 5
+
+# Time to wait for lock of local metric store held by another process (in seconds)
+METRIC_STORE_LOCK_TIMEOUT = 30
+SQLITE_FILE_HEADER = b'SQLite format 3\x00'
+# Suffix of legacy JSON metric store (it is converted if metric store with the same name does not exist)
+LEGACY_METRIC_STORE_SUFFIX = '.json'
+# Suffix of lock file, that serializes conversion of legacy metric store
+METRIC_STORE_LOCK_SUFFIX = '.lock'
+METRIC_STORE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS metrics (
+    model_id TEXT NOT NULL,
+    model_version TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (model_id, model_version, name)
+)
+'''
+
+# Connections to local metric stores are reused by thread (sqlite connections can not be shared between threads)
+_METRIC_STORE_CONNECTIONS = threading.local()
+
 
 class Metric(Enum):
     """
@@ -117,106 +157,416 @@ def send_udp(host, port, message):
     sock.sendto(message, (host, port))
 
 
-def send_tcp(host: str, port: str, messages: typing.List[str]) -> None:
+def _send_metrics_remotely(model_id: str, values: typing.Dict[str, float]):
     """
-    Send messages with TCP
+    Send build metric values remotely using statsd format
 
-    :param host: target host
-    :param port: target port
-    :param messages: stasd metrics
+    :param model_id: model ID
+    :param values: metric values by metric names
+    :return: None
     """
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.connect((host, port))
+    _, _, namespace = get_metric_endpoint()
+    messages: typing.List[str] = [
+        STATSD_METRIC_FORMAT.format(f'{namespace}.{get_metric_name(metric, model_id)}', float(value))
+        for metric, value in values.items()
+    ]
 
-    encoded_message = "\n".join(messages).encode('utf-8')
-    LOGGER.debug('Send metrics %s to the statsd', encoded_message)
+    build_no = get_build_number()
+    message = STATSD_METRIC_FORMAT.format(f'{namespace}.{get_metric_name("build", model_id)}', build_no)
+    messages.append(message)
 
-    sock.send(encoded_message)
-    sock.close()
+    get_metrics_emitter().emit(messages)
 
 
-def _send_metrics_remotely(model_id: str, metric: str, value: float):
+class MetricsEmitter:
+    """
+    Background sender of statsd metrics. Metrics are buffered and are sent in batches through one
+    persistent connection. Metrics are dropped (and counted) instead of blocking if buffer is full
     """
-    Send build metric values remotely using statsd format
 
-    :param model_id: model ID
-    :param metric: metric type or metric name
-    :param value: metric value
+    def __init__(self, host: str, port: int, protocol: str = METRICS_PROTOCOL_TCP,
+                 buffer_size: typing.Optional[int] = None, flush_interval: typing.Optional[float] = None):
+        """
+        Create emitter, background thread is started on first metric
+
+        :param host: metrics server host
+        :param port: metrics server port
+        :param protocol: (Optional) protocol, tcp or udp
+        :param buffer_size: (Optional) max count of buffered lines, METRICS_BUFFER_SIZE by default
+        :param flush_interval: (Optional) max time between flushes in seconds, METRICS_FLUSH_INTERVAL by default
+        """
+        if protocol not in (METRICS_PROTOCOL_TCP, METRICS_PROTOCOL_UDP):
+            raise ValueError(f'Unknown metrics protocol: {protocol}')
+
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.buffer_size = buffer_size or config.METRICS_BUFFER_SIZE
+        self.flush_interval = flush_interval if flush_interval is not None else config.METRICS_FLUSH_INTERVAL
+
+        self.sent = 0
+        self.dropped = 0
+
+        self._buffer: typing.Deque[str] = collections.deque()
+        self._condition = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._socket: typing.Optional[socket.socket] = None
+        self._reconnect_at = 0.0
+        self._closed = False
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def emit(self, lines: typing.List[str]) -> None:
+        """
+        Put metric lines to buffer. Does not block on network I/O
+
+        :param lines: statsd metric lines
+        """
+        with self._condition:
+            if self._closed or len(self._buffer) + len(lines) > self.buffer_size:
+                # Counter of dropped lines is guarded by condition lock (it is updated by emitting and sending threads)
+                self.dropped += len(lines)
+                return
+
+            self._buffer.extend(lines)
+            if len(self._buffer) >= METRICS_BATCH_SIZE:
+                self._condition.notify()
+
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='metrics-emitter', daemon=True)
+                self._thread.start()
+
+    def flush(self) -> None:
+        """
+        Send all buffered metrics in current thread
+        """
+        while True:
+            with self._condition:
+                batch = [self._buffer.popleft() for _ in range(min(len(self._buffer), METRICS_BATCH_SIZE))]
+            if not batch:
+                return
+
+            self._send_batch(batch)
+
+    def close(self) -> None:
+        """
+        Flush buffered metrics and close connection
+
+        :return: None
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+        if self._thread:
+            self._thread.join(METRICS_CLOSE_TIMEOUT)
+
+        self.flush()
+        self._disconnect()
+
+        if self.dropped:
+            LOGGER.warning('%d metric lines have been dropped', self.dropped)
+
+    def _run(self) -> None:
+        """
+        Flush buffered metrics every flush interval or when batch is full
+        """
+        while True:
+            with self._condition:
+                if not self._closed and len(self._buffer) < METRICS_BATCH_SIZE:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+
+            self.flush()
+
+    def _connect(self) -> socket.socket:
+        """
+        Get connection to metrics server (it is created if needed)
+
+        :return: socket
+        """
+        if not self._socket:
+            if self.protocol == METRICS_PROTOCOL_UDP:
+                self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            else:
+                self._socket = socket.create_connection((self.host, self.port), timeout=METRICS_SOCKET_TIMEOUT)
+
+        return self._socket
+
+    def _disconnect(self) -> None:
+        """
+        Close connection to metrics server
+        """
+        if self._socket:
+            try:
+                self._socket.close()
+            except OSError:
+                pass
+            self._socket = None
+
+    def _count_dropped(self, count: int) -> None:
+        """
+        Count dropped metric lines
+
+        :param count: count of dropped lines
+        """
+        with self._condition:
+            self.dropped += count
+
+    def _send_batch(self, batch: typing.List[str]) -> None:
+        """
+        Send batch of lines. Batch is dropped if metrics server is unavailable
+
+        :param batch: statsd metric lines
+        """
+        with self._send_lock:
+            if time.monotonic() < self._reconnect_at:
+                self._count_dropped(len(batch))
+                return
+
+            try:
+                sock = self._connect()
+                if self.protocol == METRICS_PROTOCOL_UDP:
+                    for datagram in _split_datagrams(batch, METRICS_MAX_DATAGRAM_SIZE):
+                        sock.sendto(datagram, (self.host, self.port))
+                else:
+                    sock.sendall(''.join(f'{line}\n' for line in batch).encode('utf-8'))
+                self.sent += len(batch)
+                LOGGER.debug('%d metric lines have been sent to %s:%s', len(batch), self.host, self.port)
+            except OSError as send_exception:
+                self._count_dropped(len(batch))
+                self._disconnect()
+                self._reconnect_at = time.monotonic() + METRICS_RECONNECT_DELAY
+                LOGGER.warning('Cannot send metrics to %s:%s: %s. %d metric lines have been dropped',
+                               self.host, self.port, send_exception, len(batch))
+
+
+def _split_datagrams(lines: typing.List[str], max_size: int) -> typing.Iterator[bytes]:
+    """
+    Join metric lines into datagrams of limited size
+
+    :param lines: statsd metric lines
+    :param max_size: max size of datagram in bytes (one line may exceed it)
+    :return: datagrams
+    """
+    datagram = b''
+    for line in lines:
+        encoded_line = line.encode('utf-8')
+        if datagram and len(datagram) + 1 + len(encoded_line) > max_size:
+            yield datagram
+            datagram = b''
+        datagram = datagram + b'\n' + encoded_line if datagram else encoded_line
+
+    if datagram:
+        yield datagram
+
+
+_METRICS_EMITTERS: typing.Dict[typing.Tuple[str, int, str, int], MetricsEmitter] = {}
+_METRICS_EMITTERS_LOCK = threading.Lock()
+
+
+def get_metrics_emitter() -> MetricsEmitter:
+    """
+    Get shared metrics emitter for current metrics endpoint, emitter is flushed on interpreter exit
+
+    :return: metrics emitter
+    """
+    host, port, _ = get_metric_endpoint()
+    # Emitters (their threads and sockets) must not be reused by forked processes
+    key = host, port, config.METRICS_PROTOCOL, os.getpid()
+
+    with _METRICS_EMITTERS_LOCK:
+        emitter = _METRICS_EMITTERS.get(key)
+        if not emitter:
+            emitter = _METRICS_EMITTERS[key] = MetricsEmitter(host, port, config.METRICS_PROTOCOL)
+            atexit.register(emitter.close)
+
+    return emitter
+
+
+def flush_metrics() -> None:
+    """
+    Send all buffered metrics of current process
+
     :return: None
     """
-    host, port, namespace = get_metric_endpoint()
-    messages: typing.List[str] = []
+    with _METRICS_EMITTERS_LOCK:
+        emitters = [emitter for key, emitter in _METRICS_EMITTERS.items() if key[-1] == os.getpid()]
 
-    message = STATSD_METRIC_FORMAT.format(f'{namespace}.{get_metric_name(metric, model_id)}', float(value))
-    messages.append(message)
+    for emitter in emitters:
+        emitter.flush()
 
-    build_no = get_build_number()
-    message = STATSD_METRIC_FORMAT.format(f'{namespace}.{get_metric_name("build", model_id)}', build_no)
-    messages.append(message)
 
-    send_tcp(host, port, messages)
+def _migrate_legacy_metric_store(metrics_store_path: Path, connection: sqlite3.Connection):
+    """
+    Import metrics from legacy JSON metric store (model ID -> model version -> metrics)
+
+    :param metrics_store_path: path to legacy metric store
+    :param connection: connection to new metric store
+    :return: None
+    """
+    with open(metrics_store_path, 'r') as f:
+        content = f.read()
+
+    build_metrics: typing.Dict[str, typing.Dict] = json.loads(content) if content.strip() else {}
+    rows = []
+    for model_id, model_versions in build_metrics.items():
+        for model_version, metrics in model_versions.items():
+            updated_at = metrics.get(MODEL_UPDATED_AT_HEADER)
+            updated_at = datetime.strptime(updated_at, MODEL_UPDATED_AT_TEMPLATE).timestamp() \
+                if updated_at else time.time()
+            rows.extend((model_id, model_version, name, value, updated_at)
+                        for name, value in metrics.items() if name != MODEL_UPDATED_AT_HEADER)
 
+    connection.executemany('INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?, ?)', rows)
+    LOGGER.info('%d metrics have been imported from legacy metric store %s', len(rows), metrics_store_path)
 
-def _save_metrics_locally(model_id: str, model_version: str, metric: typing.Union[str, Metric], value: float):
+
+def _is_legacy_metric_store(path: Path) -> bool:
     """
-    Save metrics locally to a file
+    Check that file is legacy JSON metric store (it is not empty and is not SQLite database)
 
-    :param model_id: model ID
-    :param model_version: model version
-    :param metric: metric type or metric name
-    :param value: metric value
+    :param path: path to file
+    :return: is file legacy metric store
+    """
+    if not path.is_file():
+        return False
+
+    with open(path, 'rb') as f:
+        header = f.read(len(SQLITE_FILE_HEADER))
+    return bool(header) and header != SQLITE_FILE_HEADER
+
+
+def _find_legacy_metric_store(metrics_store_path: Path) -> typing.Optional[Path]:
+    """
+    Find legacy JSON metric store to convert: metric store itself or, if metric store does not exist,
+    a file with the same name and LEGACY_METRIC_STORE_SUFFIX
+
+    :param metrics_store_path: path to metric store
+    :return: path to legacy metric store or None if there is nothing to convert
+    """
+    if _is_legacy_metric_store(metrics_store_path):
+        return metrics_store_path
+
+    legacy_store_path = metrics_store_path.with_suffix(LEGACY_METRIC_STORE_SUFFIX)
+    if not metrics_store_path.exists() and _is_legacy_metric_store(legacy_store_path):
+        return legacy_store_path
+
+    return None
+
+
+def _convert_legacy_metric_store(legacy_store_path: Path, metrics_store_path: Path):
+    """
+    Build metric store from legacy JSON store. New database is built aside and atomically replaces metric store
+
+    :param legacy_store_path: path to legacy metric store
+    :param metrics_store_path: path to metric store
     :return: None
     """
-    metrics_store_path = Path(config.MODEL_LOCAL_METRIC_STORE)
+    fd, temp_path = tempfile.mkstemp(dir=str(metrics_store_path.parent), prefix=metrics_store_path.name)
+    os.close(fd)
+    try:
+        with contextlib.closing(sqlite3.connect(temp_path)) as temp_connection:
+            temp_connection.execute(METRIC_STORE_SCHEMA)
+            _migrate_legacy_metric_store(legacy_store_path, temp_connection)
+            temp_connection.commit()
+        os.replace(temp_path, str(metrics_store_path))
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def _open_metric_store(metrics_store_path: Path) -> sqlite3.Connection:
+    """
+    Open local metric store (SQLite database), store is created if it does not exist.
+    Legacy JSON store is converted into database (see _find_legacy_metric_store)
+
+    :param metrics_store_path: path to metric store
+    :return: connection to metric store
+    """
     metrics_store_path.parent.mkdir(mode=0o775, parents=True, exist_ok=True)
-    metrics_store_path.touch(mode=0o775, exist_ok=True)
 
-    if metrics_store_path.stat().st_size == 0:
-        build_metrics = {}
-    else:
-        with open(metrics_store_path, 'r') as f:
-            build_metrics = json.load(f)
+    if _find_legacy_metric_store(metrics_store_path):
+        lock_path = metrics_store_path.with_name(metrics_store_path.name + METRIC_STORE_LOCK_SUFFIX)
+        with open(lock_path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                # Store could have been converted by another process while the lock was being acquired
+                legacy_store_path = _find_legacy_metric_store(metrics_store_path)
+                if legacy_store_path:
+                    _convert_legacy_metric_store(legacy_store_path, metrics_store_path)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    connection = sqlite3.connect(str(metrics_store_path), timeout=METRIC_STORE_LOCK_TIMEOUT)
+    # WAL journal allows reading of metrics while other processes are writing them
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    connection.execute(METRIC_STORE_SCHEMA)
+    connection.commit()
+    return connection
+
+
+def _get_metric_store(create: bool = True) -> typing.Optional[sqlite3.Connection]:
+    """
+    Get connection to local metric store (MODEL_LOCAL_METRIC_STORE)
 
-    if not build_metrics.get(model_id):
-        build_metrics[model_id] = {}
+    :param create: create metric store if it does not exist
+    :return: connection to metric store or None if it does not exist
+    """
+    metrics_store_path = Path(config.MODEL_LOCAL_METRIC_STORE)
+    # Connections must not be reused by forked processes
+    key = str(metrics_store_path.absolute()), os.getpid()
 
-    if not build_metrics[model_id].get(model_version):
-        build_metrics[model_id][model_version] = {}
+    connections = getattr(_METRIC_STORE_CONNECTIONS, 'connections', None)
+    if connections is None:
+        connections = _METRIC_STORE_CONNECTIONS.connections = {}
 
-    build_metrics[model_id][model_version][metric] = value
-    build_metrics[model_id][model_version][MODEL_UPDATED_AT_HEADER] = datetime.now().strftime(MODEL_UPDATED_AT_TEMPLATE)
+    connection = connections.get(key)
+    if connection and metrics_store_path.exists():
+        return connection
 
-    with open(metrics_store_path, 'w') as f:
-        json.dump(build_metrics, f)
+    if connection:
+        connection.close()
 
+    if not create and not metrics_store_path.exists():
+        return None
 
-def clear_metric_store(model_id: str, model_version: str):
+    connection = connections[key] = _open_metric_store(metrics_store_path)
+    return connection
+
+
+def _save_metrics_locally(model_id: str, model_version: str, values: typing.Dict[str, float]):
     """
-    Clear metrics from local storage
+    Save metrics locally to a metric store (in one transaction)
 
     :param model_id: model ID
     :param model_version: model version
+    :param values: metric values by metric names
     :return: None
     """
-    metrics_store_path = Path(config.MODEL_LOCAL_METRIC_STORE)
-    if not metrics_store_path.exists():
-        return
-
-    if metrics_store_path.stat().st_size == 0:
-        return
+    updated_at = time.time()
+    connection = _get_metric_store()
+    with connection:
+        connection.executemany('INSERT OR REPLACE INTO metrics VALUES (?, ?, ?, ?, ?)',
+                               [(model_id, model_version, metric, value, updated_at)
+                                for metric, value in values.items()])
 
-    with open(metrics_store_path, 'r') as f:
-        build_metrics = json.load(f)
 
-    if model_id in build_metrics.items():
-        if model_version in build_metrics[model_id]:
-            del build_metrics[model_id][model_version]
+def clear_metric_store(model_id: str, model_version: str):
+    """
+    Clear metrics from local storage
 
-        if not build_metrics[model_id]:
-            del build_metrics[model_id]
+    :param model_id: model ID
+    :param model_version: model version
+    :return: None
+    """
+    connection = _get_metric_store(create=False)
+    if not connection:
+        return
 
-    with open(metrics_store_path, 'w') as f:
-        json.dump(build_metrics, f)
+    with connection:
+        connection.execute('DELETE FROM metrics WHERE model_id = ? AND model_version = ?', (model_id, model_version))
 
 
 def show_local_metrics(model_id: typing.Optional[str] = None,
@@ -232,36 +582,38 @@ def show_local_metrics(model_id: typing.Optional[str] = None,
         LOGGER.warning('Local metrics are unavailable in a cloud mode. Use the Grafana dashboard.')
         return pd.DataFrame()
 
-    metrics_store_path = Path(config.MODEL_LOCAL_METRIC_STORE)
-    if not metrics_store_path.exists():
-        print(f"Can't find local store: {metrics_store_path}", file=sys.stderr)
+    connection = _get_metric_store(create=False)
+    if not connection:
+        print(f"Can't find local store: {config.MODEL_LOCAL_METRIC_STORE}", file=sys.stderr)
         return pd.DataFrame()
 
-    with open(metrics_store_path, 'r') as f:
-        build_metrics: typing.Dict[str, typing.Dict] = json.load(f)
-
-    metric_keys = set()
-    models = []
-    for md_id, model_versions in build_metrics.items():
-        if model_id and model_id != md_id:
-            continue
-
-        for version, metrics in model_versions.items():
-            if model_version and model_version != version:
-                continue
-
-            current_model = {MODEL_ID_HEADER: md_id, MODEL_VALUE_HEADER: version}
-            models.append(current_model)
+    conditions, parameters = [], []
+    for column, value in (('model_id', model_id), ('model_version', model_version)):
+        if value:
+            conditions.append(f'{column} = ?')
+            parameters.append(value)
 
-            for metric_name, metric_value in metrics.items():
-                if metric_name != MODEL_UPDATED_AT_HEADER:
-                    metric_keys.add(metric_name)
+    query = 'SELECT model_id, model_version, name, value, updated_at FROM metrics'
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += ' ORDER BY model_id, model_version'
 
-                current_model[metric_name] = metric_value
+    metric_keys = set()
+    models: typing.Dict[typing.Tuple[str, str], typing.Dict] = {}
+    for md_id, version, metric_name, metric_value, updated_at in connection.execute(query, parameters):
+        current_model = models.setdefault((md_id, version), {MODEL_ID_HEADER: md_id, MODEL_VALUE_HEADER: version,
+                                                             MODEL_UPDATED_AT_HEADER: updated_at})
+        current_model[metric_name] = metric_value
+        current_model[MODEL_UPDATED_AT_HEADER] = max(current_model[MODEL_UPDATED_AT_HEADER], updated_at)
+        metric_keys.add(metric_name)
+
+    for current_model in models.values():
+        current_model[MODEL_UPDATED_AT_HEADER] = datetime.fromtimestamp(current_model[MODEL_UPDATED_AT_HEADER]) \
+            .strftime(MODEL_UPDATED_AT_TEMPLATE)
 
     metric_keys = list(sorted(metric_keys))
     table_header = [MODEL_ID_HEADER, MODEL_VALUE_HEADER, MODEL_UPDATED_AT_HEADER] + metric_keys
-    return pd.DataFrame([[model.get(name) for name in table_header] for model in models],
+    return pd.DataFrame([[model.get(name) for name in table_header] for model in models.values()],
                         columns=table_header)
 
 
@@ -275,8 +627,23 @@ def send_metric(model_id: str, model_version: str, metric: typing.Union[str, Met
     :param value: metric value
     :return: None
     """
-    metric = metric.value if isinstance(metric, Metric) else str(metric)
+    send_metrics(model_id, model_version, {metric: value})
+
+
+def send_metrics(model_id: str, model_version: str, values: typing.Dict[typing.Union[str, Metric], float]):
+    """
+    Send several build metric values as one batch
+
+    :param model_id: model ID
+    :param model_version: model version
+    :param values: metric values by metric types or metric names
+    :return: None
+    """
+    values = {(metric.value if isinstance(metric, Metric) else str(metric)): value for metric, value in values.items()}
+    if not values:
+        return
+
     if not config.MODEL_CLUSTER_TRAIN_METRICS_ENABLED:
-        _save_metrics_locally(model_id, model_version, metric, value)
+        _save_metrics_locally(model_id, model_version, values)
     else:
-        _send_metrics_remotely(model_id, metric, value)
+        _send_metrics_remotely(model_id, values)
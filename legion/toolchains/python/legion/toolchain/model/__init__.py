@@ -107,6 +107,35 @@ def send_metric(metric, value):
     return _model.send_metric(metric, value)
 
 
+def profile(stage, trace_memory=False):
+    """
+    Profile training stage (wall time, CPU time, peak RSS and optionally memory allocations).
+    Can be used as a context manager or as a decorator, repeated stages are aggregated
+
+    :param stage: name of stage
+    :type stage: str
+    :param trace_memory: (Optional) trace memory allocations with tracemalloc (it slows down the stage)
+    :type trace_memory: bool
+    :return: context manager
+    """
+    if not _model:
+        raise Exception('Context has not been defined')
+
+    return _model.profile(stage, trace_memory=trace_memory)
+
+
+def send_profile():
+    """
+    Send aggregated metrics of profiled stages as one batch of build metrics (it is done on model save too)
+
+    :return: None
+    """
+    if not _model:
+        raise Exception('Context has not been defined')
+
+    return _model.send_profile()
+
+
 def export_df(apply_func, input_data_frame, *, prepare_func=None, endpoint='default'):
     """
     Export simple Pandas DF based model as a bundle
@@ -0,0 +1,241 @@
+#
+#    Copyright 2019 EPAM Systems
+#
+#    Licensed under the Apache License, Version 2.0 (the "License");
+#    you may not use this file except in compliance with the License.
+#    You may obtain a copy of the License at
+#
+#        http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS,
+#    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#    See the License for the specific language governing permissions and
+#    limitations under the License.
+#
+"""
+Profiling of model training stages
+"""
+import contextlib
+import logging
+import math
+import sys
+import threading
+import time
+import tracemalloc
+import typing
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+LOGGER = logging.getLogger(__name__)
+
+PROFILE_METRIC_PREFIX = 'profile'
+BYTES_IN_MB = 1024 * 1024
+
+StageSample = typing.NamedTuple('StageSample', [
+    ('wall_time', float),
+    ('cpu_time', float),
+    ('peak_rss_mb', typing.Optional[float]),
+    ('allocated_mb', typing.Optional[float]),
+    ('peak_allocated_mb', typing.Optional[float]),
+])
+
+
+def get_peak_rss_mb(include_children=False):
+    """
+    Get peak resident set size of current process
+
+    :param include_children: (Optional) take into account terminated child processes (the largest of them)
+    :type include_children: bool
+    :return: float or None -- peak RSS in MB (None if it is not available on current platform)
+    """
+    if not resource:
+        return None
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if include_children:
+        peak_rss = max(peak_rss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # ru_maxrss is measured in bytes on macOS and in kilobytes on Linux
+    return peak_rss / BYTES_IN_MB if sys.platform == 'darwin' else peak_rss / 1024
+
+
+def percentile(values, fraction):
+    """
+    Get percentile of values (nearest-rank method)
+
+    :param values: values
+    :type values: list[float]
+    :param fraction: fraction of percentile, e.g. 0.95
+    :type fraction: float
+    :return: float -- percentile
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+class StageProfile:
+    """
+    Aggregated samples of one named stage
+    """
+
+    def __init__(self, name):
+        """
+        Create empty stage profile
+
+        :param name: name of stage
+        :type name: str
+        """
+        self.name = name
+        self.samples = []
+
+    def add(self, sample):
+        """
+        Add sample of stage
+
+        :param sample: stage sample
+        :type sample: :py:class:`legion.toolchain.profiling.StageSample`
+        :return: None
+        """
+        self.samples.append(sample)
+
+    @property
+    def count(self):
+        """
+        Get count of stage executions
+
+        :return: int -- count of executions
+        """
+        return len(self.samples)
+
+    def summary(self):
+        """
+        Get aggregated stage metrics
+
+        :return: dict[str, float] -- metrics: count, wall and CPU time (total, mean, p95), peak memory
+        """
+        wall_times = [sample.wall_time for sample in self.samples]
+        cpu_times = [sample.cpu_time for sample in self.samples]
+
+        result = {
+            'count': self.count,
+            'wall_time_total': sum(wall_times),
+            'wall_time_mean': sum(wall_times) / self.count,
+            'wall_time_p95': percentile(wall_times, 0.95),
+            'cpu_time_total': sum(cpu_times),
+            'cpu_time_mean': sum(cpu_times) / self.count,
+        }
+
+        for field in ('peak_rss_mb', 'allocated_mb', 'peak_allocated_mb'):
+            values = [getattr(sample, field) for sample in self.samples if getattr(sample, field) is not None]
+            if values:
+                result[field] = max(values)
+
+        return result
+
+
+class Profiler:
+    """
+    Profiler of named stages (repeated stages are aggregated)
+    """
+
+    def __init__(self):
+        """
+        Create empty profiler
+        """
+        self._lock = threading.Lock()
+        self._stages = {}
+
+    @property
+    def stages(self):
+        """
+        Get profiles of stages in order of first execution
+
+        :return: list[:py:class:`legion.toolchain.profiling.StageProfile`] -- stage profiles
+        """
+        with self._lock:
+            return list(self._stages.values())
+
+    @contextlib.contextmanager
+    def stage(self, name, trace_memory=False):
+        """
+        Profile stage: wall time, CPU time, peak RSS and (optionally) python memory allocations.
+        Can be used as a context manager or as a decorator
+
+        :param name: name of stage
+        :type name: str
+        :param trace_memory: (Optional) trace memory allocations with tracemalloc (it slows down the stage)
+        :type trace_memory: bool
+        :return: None
+        """
+        tracing_started = False
+        allocated_before = 0
+        if trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                tracing_started = True
+            allocated_before = tracemalloc.get_traced_memory()[0]
+
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall_time, cpu_time = time.perf_counter() - wall_start, time.process_time() - cpu_start
+
+            allocated_mb = peak_allocated_mb = None
+            if trace_memory:
+                allocated, peak_allocated = tracemalloc.get_traced_memory()
+                allocated_mb = (allocated - allocated_before) / BYTES_IN_MB
+                # Peak of traced memory is related to the stage only if tracing has been started for it
+                if tracing_started:
+                    peak_allocated_mb = peak_allocated / BYTES_IN_MB
+                    tracemalloc.stop()
+
+            self.add_sample(name, StageSample(wall_time, cpu_time, get_peak_rss_mb(), allocated_mb, peak_allocated_mb))
+
+    def add_sample(self, name, sample):
+        """
+        Add sample of stage
+
+        :param name: name of stage
+        :type name: str
+        :param sample: stage sample
+        :type sample: :py:class:`legion.toolchain.profiling.StageSample`
+        :return: None
+        """
+        LOGGER.debug('Stage {!r} took {:.3f}s (CPU {:.3f}s)'.format(name, sample.wall_time, sample.cpu_time))
+        with self._lock:
+            if name not in self._stages:
+                self._stages[name] = StageProfile(name)
+            self._stages[name].add(sample)
+
+    def summary(self):
+        """
+        Get aggregated metrics of all stages
+
+        :return: dict[str, dict[str, float]] -- metrics by stage names
+        """
+        return {stage.name: stage.summary() for stage in self.stages}
+
+    def get_metrics(self):
+        """
+        Get aggregated metrics of all stages as flat build metrics
+
+        :return: dict[str, float] -- metric values by metric names, e.g. profile.fit.wall_time_mean
+        """
+        return {
+            '{}.{}.{}'.format(PROFILE_METRIC_PREFIX, stage_name, metric_name): value
+            for stage_name, stage_summary in self.summary().items()
+            for metric_name, value in stage_summary.items()
+        }
+
+    def reset(self):
+        """
+        Drop all collected samples
+
+        :return: None
+        """
+        with self._lock:
+            self._stages = {}
@@ -20,6 +20,7 @@ import json
 import logging
 import os
 import sys
+import time
 import typing  # pylint: disable=W0611
 import zipfile
 
@@ -29,7 +30,7 @@ from legion.sdk.containers import headers
 from legion.sdk.model import ModelMeta
 from legion.sdk.utils import send_header_to_stderr, \
     extract_archive_item, TemporaryFolder, deduce_model_file_name, save_file
-from legion.toolchain import version, metrics
+from legion.toolchain import version, metrics, profiling
 from legion.toolchain import types
 
 LOGGER = logging.getLogger(__name__)
@@ -43,6 +44,11 @@ PROPERTY_MODEL_ID = 'model.id'
 PROPERTY_MODEL_VERSION = 'model.version'
 PROPERTY_ENDPOINT_NAMES = 'model.endpoints'
 PROPERTY_TRAINING_WORKING_DIRECTORY = 'model.trainWorkDir'
+PROPERTY_TRAINING_PROFILE = 'model.trainProfile'
+
+INVOKE_STAGE_PARSE = 'parse'
+INVOKE_STAGE_PREPARE = 'prepare'
+INVOKE_STAGE_APPLY = 'apply'
 
 
 class ModelEndpoint:
@@ -90,23 +96,36 @@ class ModelEndpoint:
 
         return data
 
-    def invoke(self, input_vector):
+    def invoke(self, input_vector, stage_timings=None):
         """
         Calculate result of model execution
 
         :param input_vector: input data
         :type input_vector: dict[str, union[str, Image]]
+        :param stage_timings: (Optional) dict to store durations of invocation stages (parse, prepare, apply) into
+        :type stage_timings: dict[str, float]
         :return: dict -- output data
         """
-        LOGGER.info('Input vector: %r' % input_vector)
+        LOGGER.info('Input vector: %r', input_vector)
+        parse_start = time.perf_counter()
         data_frame = types.build_df(self.column_types, input_vector, not self.use_df)
+        parsed = time.perf_counter()
 
-        LOGGER.info('Running prepare with DataFrame: %r' % data_frame)
+        LOGGER.info('Running prepare with DataFrame: %r', data_frame)
+        prepare_start = time.perf_counter()
         data_frame = self.prepare(data_frame)  # pylint: disable=E1102
+        prepared = time.perf_counter()
 
-        LOGGER.info('Applying function with DataFrame: %s' % str(data_frame))
+        LOGGER.info('Applying function with DataFrame: %s', data_frame)
+        apply_start = time.perf_counter()
         response = self.apply(data_frame)  # pylint: disable=E1102
-        LOGGER.info('Returning response: %s' % str(response))
+        applied = time.perf_counter()
+        LOGGER.info('Returning response: %s', response)
+
+        if stage_timings is not None:
+            stage_timings[INVOKE_STAGE_PARSE] = parsed - parse_start
+            stage_timings[INVOKE_STAGE_PREPARE] = prepared - prepare_start
+            stage_timings[INVOKE_STAGE_APPLY] = applied - apply_start
 
         return response
 
@@ -180,6 +199,7 @@ class Model(ModelMeta):
 
         self._endpoints = {}  # type: dict or None
         self._path = None  # type: str or None
+        self._profiler = profiling.Profiler()
 
         send_header_to_stderr(headers.MODEL_ID, self.model_id)
         send_header_to_stderr(headers.MODEL_VERSION, self.model_version)
@@ -304,6 +324,9 @@ class Model(ModelMeta):
         meta_information_to_save[PROPERTY_MODEL_VERSION] = self.model_version
         meta_information_to_save[PROPERTY_ENDPOINT_NAMES] = list(self._endpoints.keys())
         meta_information_to_save[PROPERTY_TRAINING_WORKING_DIRECTORY] = os.getcwd()
+        if self._profiler.stages:
+            meta_information_to_save[PROPERTY_TRAINING_PROFILE] = self._profiler.summary()
+            self.send_profile()
 
         self._path = path
 
@@ -475,3 +498,42 @@ class Model(ModelMeta):
         :return: None
         """
         return metrics.send_metric(self.model_id, self.model_version, metric, value)
+
+    @property
+    def profiler(self):
+        """
+        Get profiler of training stages
+
+        :return: :py:class:`legion.toolchain.profiling.Profiler` -- profiler
+        """
+        return self._profiler
+
+    @property
+    def training_profile(self):
+        """
+        Get training profile (aggregated metrics of training stages) saved in model binary
+
+        :return: dict[str, dict[str, float]] or None -- metrics by stage names
+        """
+        return self._meta_information.get(PROPERTY_TRAINING_PROFILE)
+
+    def profile(self, stage, trace_memory=False):
+        """
+        Profile training stage. Can be used as a context manager or as a decorator.
+        Profile is saved in model binary and is sent as build metrics on model save
+
+        :param stage: name of stage
+        :type stage: str
+        :param trace_memory: (Optional) trace memory allocations with tracemalloc (it slows down the stage)
+        :type trace_memory: bool
+        :return: context manager
+        """
+        return self._profiler.stage(stage, trace_memory=trace_memory)
+
+    def send_profile(self):
+        """
+        Send aggregated metrics of profiled stages as one batch of build metrics
+
+        :return: None
+        """
+        return metrics.send_metrics(self.model_id, self.model_version, self._profiler.get_metrics())
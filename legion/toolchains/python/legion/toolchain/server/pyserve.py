@@ -17,12 +17,15 @@
 Flask app
 """
 
+import argparse
 import itertools
 import logging
+import multiprocessing
 import os
 
 from flask import Flask, Blueprint, request, jsonify, redirect
 from flask import current_app as app
+from werkzeug.serving import make_server, WSGIRequestHandler
 from legion.toolchain.pymodel.model import Model
 from legion.toolchain.server.http import parse_batch_request, parse_request, configure_application, prepare_response
 
@@ -37,6 +40,10 @@ SERVE_BATCH = '/api/model/{model_id}/{model_version}/batch/{endpoint}'
 SERVE_BATCH_DEFAULT = '/api/model/{model_id}/{model_version}/batch'
 SERVE_HEALTH_CHECK = '/healthcheck'
 
+# Time to wait for start of local model server (in seconds)
+LOCAL_SERVER_START_TIMEOUT = 60
+LOCAL_SERVER_STOP_TIMEOUT = 5
+
 ALL_URLS = SERVE_ROOT, \
            SERVE_INFO, \
            SERVE_INVOKE, SERVE_INVOKE_DEFAULT, \
@@ -271,3 +278,119 @@ def serve_model(args):
                     use_reloader=False)
 
     return application
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    """
+    Request handler without logging of each request (it slows down server under load)
+    """
+
+    def log_request(self, *args, **kwargs):
+        """
+        Skip logging of request
+
+        :return: None
+        """
+        pass
+
+
+def _run_local_server(model_file, host, port, connection):
+    """
+    Load model and serve it (target of local model server process). Port and model information
+    (or error of start) are sent to parent process through connection
+
+    :param model_file: path to model file
+    :type model_file: str
+    :param host: address to listen on
+    :type host: str
+    :param port: port to listen on, 0 for any free port
+    :type port: int
+    :param connection: write end of pipe to parent process
+    :type connection: :py:class:`multiprocessing.connection.Connection`
+    :return: None
+    """
+    try:
+        application = init_application(argparse.Namespace(model_file=model_file))
+        server = make_server(host, port, application, threaded=True, request_handler=_QuietRequestHandler)
+    except Exception as start_exception:
+        connection.send({'error': repr(start_exception)})
+        raise
+
+    model = application.config['model']
+    connection.send({'port': server.server_port, 'model_id': model.model_id, 'model_version': model.model_version})
+    connection.close()
+    server.serve_forever()
+
+
+class LocalModelServer:
+    """
+    Model server running in child process, so it does not share GIL with process that loads it
+    """
+
+    def __init__(self, process, server_port, model_id, model_version):
+        """
+        Create local model server information
+
+        :param process: server process
+        :type process: :py:class:`multiprocessing.Process`
+        :param server_port: port of server
+        :type server_port: int
+        :param model_id: id of served model
+        :type model_id: str
+        :param model_version: version of served model
+        :type model_version: str
+        """
+        self.process = process
+        self.server_port = server_port
+        self.model_id = model_id
+        self.model_version = model_version
+
+    def shutdown(self):
+        """
+        Stop server process
+
+        :return: None
+        """
+        self.process.terminate()
+        self.process.join(LOCAL_SERVER_STOP_TIMEOUT)
+
+
+def start_local_server(model_file, host='127.0.0.1', port=0, timeout=LOCAL_SERVER_START_TIMEOUT):
+    """
+    Start model server in child process (e.g. for load tests in CI)
+
+    :param model_file: path to model file
+    :type model_file: str
+    :param host: (Optional) address to listen on
+    :type host: str
+    :param port: (Optional) port to listen on, any free port by default
+    :type port: int
+    :param timeout: (Optional) time to wait for start of server in seconds
+    :type timeout: float
+    :return: :py:class:`legion.toolchain.server.pyserve.LocalModelServer` -- server, it should be stopped
+             with .shutdown()
+    """
+    reader, writer = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=_run_local_server, args=(model_file, host, port, writer),
+                                      name='pyserve', daemon=True)
+    process.start()
+    writer.close()
+
+    try:
+        if not reader.poll(timeout):
+            raise Exception('Model server has not been started in {}s'.format(timeout))
+        state = reader.recv()
+    except EOFError:
+        state = {'error': 'process has exited with code {}'.format(process.exitcode)}
+    except Exception:
+        process.terminate()
+        raise
+    finally:
+        reader.close()
+
+    if 'error' in state:
+        process.join(LOCAL_SERVER_STOP_TIMEOUT)
+        raise Exception('Can not start model server for {}: {}'.format(model_file, state['error']))
+
+    LOGGER.info('Model server has been started on http://{}:{} (pid {})'.format(host, state['port'], process.pid))
+    return LocalModelServer(process, state['port'], state['model_id'], state['model_version'])